@@ -230,18 +230,18 @@ class OMMXHighsAdapter(SolverAdapter):
         return State(
             entries={
                 var.id: solution.col_value[i]
-                for i, var in enumerate(self.instance.raw.decision_variables)
+                for i, var in enumerate(self.instance.raw_view.decision_variables)
             }
         )
 
     def _set_decision_variables(self):
-        num_cols = len(self.instance.raw.decision_variables)
+        num_cols = len(self.instance.raw_view.decision_variables)
         lower = np.zeros(num_cols)
         upper = np.zeros(num_cols)
         types = []
         var_ids = []
 
-        for i, var in enumerate(self.instance.raw.decision_variables):
+        for i, var in enumerate(self.instance.raw_view.decision_variables):
             var_ids.append(var.id)
             if var.kind == DecisionVariable.BINARY:
                 lower[i] = 0
@@ -285,18 +285,18 @@ class OMMXHighsAdapter(SolverAdapter):
             )
 
     def _set_objective(self):
-        obj = self._linear_expr_conversion(self.instance.raw.objective)
+        obj = self._linear_expr_conversion(self.instance.raw_view.objective)
         if isinstance(obj, float):
             return
-        if self.instance.raw.sense == Instance.MAXIMIZE:
+        if self.instance.sense == Instance.MAXIMIZE:
             self.model.maximize(highs_linear_expression(obj))
-        elif self.instance.raw.sense == Instance.MINIMIZE:
+        elif self.instance.sense == Instance.MINIMIZE:
             self.model.minimize(highs_linear_expression(obj))
         else:
-            raise OMMXHighsAdapterError(f"Unsupported sense: {self.instance.raw.sense}")
+            raise OMMXHighsAdapterError(f"Unsupported sense: {self.instance.sense}")
 
     def _set_constraints(self):
-        for constr in self.instance.raw.constraints:
+        for constr in self.instance.raw_view.constraints:
             const_expr = self._linear_expr_conversion(constr.function)
             if isinstance(const_expr, float):
                 val = const_expr
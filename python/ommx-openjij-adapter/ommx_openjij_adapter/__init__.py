@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from ommx.v1 import Instance, State, Samples, SampleSet
+from ommx.v1 import Instance, Samples, SampleSet, samples_from_array
 from ommx.adapter import SamplerAdapter
 import openjij as oj
 from typing_extensions import deprecated
@@ -178,22 +178,14 @@ def decode_to_samples(response: oj.Response) -> Samples:
     Convert `openjij.Response <https://openjij.github.io/OpenJij/reference/openjij/index.html#openjij.Response>`_ to :class:`Samples`
     """
     # Filling into ommx.v1.Samples
-    # Since OpenJij does not issue the sample ID, we need to generate it in the responsibility of this OMMX Adapter
-    sample_id = 0
-    entries = []
-
-    num_reads = len(response.record.num_occurrences)
-    for i in range(num_reads):
-        sample = response.record.sample[i]
-        state = State(entries=zip(response.variables, sample))  # type: ignore
-        # `num_occurrences` is encoded into sample ID list.
-        # For example, if `num_occurrences` is 2, there are two samples with the same state, thus two sample IDs are generated.
-        ids = []
-        for _ in range(response.record.num_occurrences[i]):
-            ids.append(sample_id)
-            sample_id += 1
-        entries.append(Samples.SamplesEntry(state=state, ids=ids))
-    return Samples(entries=entries)
+    # Since OpenJij does not issue the sample ID, we need to generate it in the responsibility of this OMMX Adapter.
+    # `num_occurrences` is encoded into sample ID list.
+    # For example, if `num_occurrences` is 2, there are two samples with the same state, thus two sample IDs are generated.
+    return samples_from_array(
+        response.record.sample,
+        variable_ids=response.variables,
+        occurrences=response.record.num_occurrences,
+    )
 
 
 @deprecated("Use `OMMXOpenJijSAAdapter.sample` instead")
@@ -248,7 +248,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
             return State(
                 entries={
                     var.id: sol[varname_map[str(var.id)]]
-                    for var in self.instance.raw.decision_variables
+                    for var in self.instance.raw_view.decision_variables
                 }
             )
         except Exception:
@@ -257,7 +257,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
             )
 
     def _set_decision_variables(self):
-        for var in self.instance.raw.decision_variables:
+        for var in self.instance.raw_view.decision_variables:
             if var.kind == DecisionVariable.BINARY:
                 self.model.addVar(name=str(var.id), vtype="B")
             elif var.kind == DecisionVariable.INTEGER:
@@ -274,7 +274,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
                     f"id: {var.id}, kind: {var.kind}"
                 )
 
-        if self.instance.raw.objective.HasField("quadratic"):
+        if self.instance.raw_view.objective.HasField("quadratic"):
             # If objective function is quadratic, add the auxiliary variable for the linealized objective function,
             # because the setObjective method in PySCIPOpt does not support quadratic objective functions.
             self.model.addVar(
@@ -284,7 +284,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
         self.varname_map = {var.name: var for var in self.model.getVars()}
 
     def _set_objective(self):
-        objective = self.instance.raw.objective
+        objective = self.instance.raw_view.objective
 
         if self.instance.sense == Instance.MAXIMIZE:
             sense = "maximize"
@@ -331,7 +331,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
         pass
 
     def _set_constraints(self):
-        ommx_hints: ConstraintHints = self.instance.raw.constraint_hints
+        ommx_hints: ConstraintHints = self.instance.raw_view.constraint_hints
 
         excluded = set()
 
@@ -352,7 +352,7 @@ class OMMXPySCIPOptAdapter(SolverAdapter):
                 vars = [self.varname_map[str(v)] for v in sos1.decision_variables]
                 self.model.addConsSOS1(vars, name=name)
 
-        for constraint in self.instance.raw.constraints:
+        for constraint in self.instance.raw_view.constraints:
             if constraint.id in excluded:
                 continue
             if constraint.function.HasField("linear"):
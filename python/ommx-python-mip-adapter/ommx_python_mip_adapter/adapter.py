@@ -29,14 +29,12 @@ class OMMXPythonMIPAdapter(SolverAdapter):
         :param solver: Passes a specific solver to the Python-MIP model.
         :param verbose: If True, enable Python-MIP's verbose mode
         """
-        if ommx_instance.raw.sense == Instance.MAXIMIZE:
+        if ommx_instance.sense == Instance.MAXIMIZE:
             sense = mip.MAXIMIZE
-        elif ommx_instance.raw.sense == Instance.MINIMIZE:
+        elif ommx_instance.sense == Instance.MINIMIZE:
             sense = mip.MINIMIZE
         else:
-            raise OMMXPythonMIPAdapterError(
-                f"Unsupported sense: {ommx_instance.raw.sense}"
-            )
+            raise OMMXPythonMIPAdapterError(f"Unsupported sense: {ommx_instance.sense}")
         self.instance = ommx_instance
         self.model = mip.Model(
             sense=sense,
@@ -303,12 +301,12 @@ class OMMXPythonMIPAdapter(SolverAdapter):
         return State(
             entries={
                 var.id: data.var_by_name(str(var.id)).x  # type: ignore
-                for var in self.instance.raw.decision_variables
+                for var in self.instance.raw_view.decision_variables
             }
         )
 
     def _set_decision_variables(self):
-        for var in self.instance.raw.decision_variables:
+        for var in self.instance.raw_view.decision_variables:
             if var.kind == DecisionVariable.BINARY:
                 self.model.add_var(
                     name=str(var.id),
@@ -357,10 +355,10 @@ class OMMXPythonMIPAdapter(SolverAdapter):
         )
 
     def _set_objective(self):
-        self.model.objective = self._as_lin_expr(self.instance.raw.objective)  # type: ignore
+        self.model.objective = self._as_lin_expr(self.instance.raw_view.objective)  # type: ignore
 
     def _set_constraints(self):
-        for constraint in self.instance.raw.constraints:
+        for constraint in self.instance.raw_view.constraints:
             lin_expr = self._as_lin_expr(constraint.function)
             if constraint.equality == Constraint.EQUAL_TO_ZERO:
                 constr_expr = lin_expr == 0
@@ -1,4 +1,9 @@
-from ommx.artifact import Artifact
+import io
+
+import numpy as np
+import pytest
+
+from ommx.artifact import Artifact, ArtifactBuilder
 from ommx._ommx_rust import Descriptor
 
 
@@ -9,3 +14,55 @@ def test_serialize():
         assert layer == Descriptor.from_dict(d)
         json = layer.to_json()
         assert layer == Descriptor.from_json(json)
+
+
+def test_layer_index():
+    builder = ArtifactBuilder.temp()
+    descriptors = [
+        builder.add_ndarray(np.array([i]), title=f"array{i}") for i in range(3)
+    ]
+    descriptors.append(builder.add_json({"a": 1}, title="json"))
+    artifact = builder.build()
+
+    assert artifact.layers == descriptors
+    for desc in descriptors:
+        assert artifact.get_layer_descriptor(desc.digest) == desc
+    assert artifact.get_layer_descriptors("application/vnd.numpy") == descriptors[:3]
+    assert artifact.get_layer_descriptors("application/json") == descriptors[3:]
+    assert artifact.get_layer_descriptors("application/org.ommx.v1.instance") == []
+    with pytest.raises(ValueError):
+        artifact.get_layer_descriptor("sha256:" + "0" * 64)
+
+
+def test_add_layer(tmp_path):
+    small = b"small"
+    large = bytes(range(256)) * 8192  # 2 MiB, larger than the in-memory limit
+    path = tmp_path / "blob"
+    path.write_bytes(large)
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+
+    builder = ArtifactBuilder.temp()
+    media_type = "application/octet-stream"
+    blobs = {
+        builder.add_layer(media_type, path).digest: large,
+        builder.add_layer(media_type, str(path)).digest: large,
+    }
+    for blob in [small, large]:
+        # File-like object and iterator of chunks
+        desc = builder.add_layer(media_type, io.BytesIO(blob), spool_dir=spool_dir)
+        assert desc.size == len(blob)
+        blobs[desc.digest] = blob
+        chunks = (blob[i : i + 1000] for i in range(0, len(blob), 1000))
+        desc = builder.add_layer(media_type, chunks, spool_dir=spool_dir)
+        assert desc.size == len(blob)
+        blobs[desc.digest] = blob
+    # Spooled files are removed after added
+    assert list(spool_dir.iterdir()) == []
+    artifact = builder.build()
+
+    assert len(blobs) == 2
+    for desc in artifact.layers:
+        assert artifact.get_blob(desc) == blobs[desc.digest]
+    desc = artifact.layers[0]
+    assert artifact.get_blob_range(desc, 100, 200) == large[100:200]
@@ -1,5 +1,10 @@
 # FIXME: Use test case generator like Hypothesis
 
+import copy
+import pickle
+
+import numpy as np
+
 from ommx.v1 import Linear, DecisionVariable, Quadratic, Polynomial, Function
 
 
@@ -165,3 +170,106 @@ def test_function():
     assert_eq(Function(x1) + Function(x2), Function(x1 + x2))
     assert_eq(Function(x1) * Function(x2), Function(x1 * x2))
     assert_eq(Function(x1 * x2) * Function(x3), Function(x1 * x2 * x3))
+
+
+def test_iadd():
+    x = [DecisionVariable.binary(i) for i in range(4)]
+
+    f = Linear(terms={})
+    g = f
+    for i in [2, 0, 3, 1]:
+        f += (i + 1) * x[i]
+    f += 1
+    # updated in place
+    assert f is g
+    assert_eq(f, Linear(terms={0: 1, 1: 2, 2: 3, 3: 4}, constant=1))
+    f += f
+    assert_eq(f, Linear(terms={0: 2, 1: 4, 2: 6, 3: 8}, constant=2))
+
+    # `+` does not modify the operands
+    h = Linear(terms={0: 1})
+    assert_eq(h + 1, Linear(terms={0: 1}, constant=1))
+    assert_eq(h, Linear(terms={0: 1}))
+
+    q = x[0] * x[1]
+    q += x[2]
+    q += x[0] * x[1]
+    assert_eq(q, 2 * x[0] * x[1] + x[2])
+
+    p = x[0] * x[1] * x[2]
+    p += x[0] * x[1] + 3
+    assert_eq(p, x[0] * x[1] * x[2] + x[0] * x[1] + 3)
+
+    # promoted to a higher degree
+    f = Linear(terms={0: 1})
+    f += x[1] * x[2]
+    assert isinstance(f, Quadratic)
+    assert_eq(f, x[0] + x[1] * x[2])
+
+    # `Function(f)` does not share the expression with `f`
+    f = Function(x[0])
+    g = Function(f)
+    g += x[1]
+    assert_eq(f, Function(x[0]))
+    assert_eq(g, Function(x[0] + x[1]))
+    g += g
+    assert_eq(g, Function(2 * x[0] + 2 * x[1]))
+
+
+def test_from_arrays():
+    assert_eq(
+        Linear.from_arrays(np.array([3, 1, 3]), np.array([1.0, 2.0, 1.0]), 4),
+        Linear(terms={1: 2, 3: 2}, constant=4),
+    )
+    # Rows and columns are disjoint and not paired index-wise,
+    # so using only one of them or misaligning the entries changes the result
+    x = [DecisionVariable.binary(i) for i in range(5)]
+    q = Quadratic.from_coo(
+        rows=np.array([0, 1, 1], dtype=np.int32),
+        cols=np.array([3, 3, 4], dtype=np.int32),
+        values=[2.0, 3.0, 5.0],
+        linear=Linear(terms={2: 1}),
+    )
+    assert_eq(q, 2 * x[0] * x[3] + 3 * x[1] * x[3] + 5 * x[1] * x[4] + x[2])
+    assert_eq(
+        q,
+        Quadratic(
+            columns=[3, 3, 4],
+            rows=[0, 1, 1],
+            values=[2.0, 3.0, 5.0],
+            linear=Linear(terms={2: 1}),
+        ),
+    )
+
+
+def test_copy_and_pickle():
+    x = [DecisionVariable.binary(i) for i in range(3)]
+    linear = x[0] + 2 * x[1] + 3
+    quadratic = x[0] * x[1] + x[2]
+    polynomial = x[0] * x[1] * x[2] + 1
+    function = Function(quadratic)
+    for f in [linear, quadratic, polynomial, function]:
+        copied = copy.deepcopy(f)
+        assert type(copied) is type(f)
+        assert_eq(copied, f)
+        # The copy does not share the Rust-side object with the original
+        copied += x[2]
+        assert not copied.almost_equal(f)
+
+        unpickled = pickle.loads(pickle.dumps(f))
+        assert type(unpickled) is type(f)
+        assert_eq(unpickled, f)
+
+
+def test_evaluate_value():
+    x = [DecisionVariable.binary(i) for i in range(3)]
+    state = {0: 1, 1: 2, 2: 3, 3: 4}
+    for f in [
+        x[0] + 2 * x[1] + 3,
+        x[0] * x[1] + x[2],
+        x[0] * x[1] * x[2] + 1,
+        Function(x[0] * x[2]),
+        Function(5),
+    ]:
+        value, _ = f.evaluate(state)
+        assert f.evaluate_value(state) == value
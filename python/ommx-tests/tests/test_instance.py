@@ -1,5 +1,9 @@
-from ommx.v1 import Instance, DecisionVariable, Function
+from ommx.v1 import Instance, DecisionVariable, Function, Constraint
+import copy
 import math
+import pickle
+
+import numpy as np
 import pytest
 
 
@@ -202,3 +206,206 @@ def test_to_qubo_invalid_penalty_option():
         str(e.value)
         == "Both uniform_penalty_weight and penalty_weights are specified. Please choose one."
     )
+
+
+def test_raw_after_rust_method():
+    x = [
+        DecisionVariable.integer(i, lower=0, upper=3, name="x", subscripts=[i])
+        for i in range(2)
+    ]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum(x),
+        constraints=[(x[0] + x[1] <= 3).set_id(0)],
+        sense=Instance.MAXIMIZE,
+    )
+    # Modify the instance in the Rust side, and then read it as a protobuf message
+    instance.relax_constraint(0, "testing")
+    assert len(instance.raw_view.removed_constraints) == 1
+    assert len(instance.raw.constraints) == 0
+    assert len(instance.raw.removed_constraints) == 1
+
+    # Modification of the protobuf message is visible from the Rust side
+    instance.raw.decision_variables[0].bound.upper = 1
+    instance.log_encode({0})
+    assert instance.to_bytes() == Instance.from_bytes(instance.to_bytes()).to_bytes()
+    log_encoded = [
+        v for v in instance.get_decision_variables() if v.name == "ommx.log_encode"
+    ]
+    assert len(log_encoded) == 1
+
+
+def test_evaluate_after_modification():
+    x = [DecisionVariable.binary(i) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum(x),
+        constraints=[(x[0] + x[1] <= 1).set_id(0)],
+        sense=Instance.MAXIMIZE,
+    )
+    state = {0: 1, 1: 1, 2: 0}
+    solution = instance.evaluate(state)
+    assert not solution.feasible
+    assert solution.raw.evaluated_constraints[0].used_decision_variable_ids == [0, 1]
+
+    # Used IDs of the constraints cached by the first evaluation are not reused for the modified instance
+    instance.relax_constraint(0, "testing")
+    instance.add_linear_constraints_csr(
+        indptr=[0, 2],
+        indices=[1, 2],
+        data=[1.0, 1.0],
+        rhs=[1.0],
+        equality=Constraint.LESS_THAN_OR_EQUAL_TO_ZERO,
+    )
+    solution = instance.evaluate(state)
+    assert solution.feasible_relaxed
+    used_ids = {
+        c.id: list(c.used_decision_variable_ids)
+        for c in solution.raw.evaluated_constraints
+    }
+    assert used_ids == {0: [0, 1], 1: [1, 2]}
+
+
+def test_copy_and_pickle():
+    x = [DecisionVariable.binary(i) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum(x),
+        constraints=[(x[0] + x[1] <= 1).set_id(0)],
+        sense=Instance.MAXIMIZE,
+    )
+    instance.title = "copy"
+    # Hold the instance only in the Rust side
+    instance.relax_constraint(0, "testing")
+
+    copied = copy.deepcopy(instance)
+    assert copied == instance
+    copied.annotations["org.ommx.user.key"] = "value"
+    copied.restore_constraint(0)
+    assert len(instance.get_removed_constraints()) == 1
+    assert "org.ommx.user.key" not in instance.annotations
+
+    unpickled = pickle.loads(pickle.dumps(instance))
+    assert unpickled == instance
+    assert unpickled.title == "copy"
+
+
+def test_compile():
+    x = [DecisionVariable.binary(i) for i in range(4)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] * x[1] + 2 * x[2] - x[3] + 1,
+        constraints=[
+            (x[0] + x[1] + x[2] <= 2).set_id(0),
+            (x[1] * x[2] * x[3] == 0).set_id(1),
+        ],
+        sense=Instance.MINIMIZE,
+    )
+    instance.relax_constraint(1, "testing")
+    compiled = instance.compile()
+    assert compiled.decision_variable_ids.tolist() == [0, 1, 2, 3]
+    assert compiled.constraint_ids.tolist() == [0, 1]
+    assert compiled.num_active_constraints == 1
+
+    xs = np.array([[(s >> i) & 1 for i in range(4)] for s in range(16)], dtype=float)
+    objectives, constraints, feasible = compiled.evaluate_batch(xs)
+    assert constraints.shape == (16, 2)
+    for k, x_ in enumerate(xs):
+        solution = instance.evaluate({i: x_[i] for i in range(4)})
+        objective, values, feasible_ = compiled.evaluate(x_)
+        assert objective == pytest.approx(solution.objective)
+        assert objectives[k] == pytest.approx(solution.objective)
+        assert feasible_ == feasible[k] == solution.feasible
+        assert values.tolist() == constraints[k].tolist()
+
+
+def test_compile_without_decision_variables():
+    instance = Instance.from_components(
+        decision_variables=[], objective=3, constraints=[], sense=Instance.MINIMIZE
+    )
+    objectives, constraints, feasible = instance.compile().evaluate_batch(
+        np.zeros((5, 0))
+    )
+    assert objectives.tolist() == [3.0] * 5
+    assert constraints.shape == (5, 0)
+    assert feasible.tolist() == [True] * 5
+
+
+def test_incremental_flip():
+    x = [DecisionVariable.binary(i) for i in range(4)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] * x[1] + 2 * x[2] - x[3],
+        constraints=[(x[0] + x[1] + x[2] <= 1).set_id(10)],
+        sense=Instance.MINIMIZE,
+    )
+    compiled = instance.compile()
+    incremental = compiled.incremental(np.zeros(4))
+    assert incremental.objective == 0.0
+    assert incremental.feasible
+
+    assert incremental.delta(3) == (-1.0, {}, True)
+    assert incremental.flip(0) == (0.0, {10: 1.0}, True)
+    objective, constraints, feasible = incremental.flip(1)
+    assert (objective, constraints, feasible) == (1.0, {10: 1.0}, False)
+    assert incremental.num_violated == 1
+    assert incremental.x.tolist() == [1.0, 1.0, 0.0, 0.0]
+
+    expected, values, feasible = compiled.evaluate(incremental.x)
+    assert incremental.objective == expected
+    assert incremental.constraint_values.tolist() == values.tolist()
+    assert incremental.feasible == feasible
+
+
+def test_add_linear_constraints_csr():
+    x = [DecisionVariable.continuous(i) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum(x),
+        constraints=[(x[0] + x[1] == 1).set_id(3)],
+        sense=Instance.MINIMIZE,
+    )
+    # CSR buffers of scipy.sparse use int32 indices
+    ids = instance.add_linear_constraints_csr(
+        indptr=np.array([0, 2, 3], dtype=np.int32),
+        indices=np.array([0, 2, 1], dtype=np.int32),
+        data=np.array([1.0, -1.0, 2.0]),
+        rhs=np.array([0.0, 5.0]),
+        equality=Constraint.EQUAL_TO_ZERO,
+    )
+    assert ids.tolist() == [4, 5]
+    constraints = instance.get_constraints()
+    assert [c.id for c in constraints] == [3, 4, 5]
+    assert constraints[1].function.almost_equal(Function(x[0] - x[2]))
+    assert constraints[2].function.almost_equal(Function(2 * x[1] - 5))
+    assert constraints[2].equality == Constraint.EQUAL_TO_ZERO
+
+    with pytest.raises(RuntimeError):
+        # x3 is not defined
+        instance.add_linear_constraints_csr(
+            [0, 1], [3], [1.0], [0.0], Constraint.EQUAL_TO_ZERO
+        )
+
+
+def test_to_qubo_coo():
+    x = [DecisionVariable.integer(i, lower=0, upper=2) for i in range(2)]
+
+    def create():
+        return Instance.from_components(
+            decision_variables=x,
+            objective=x[0] + x[1],
+            constraints=[(x[0] + 2 * x[1] <= 3).set_id(0)],
+            sense=Instance.MAXIMIZE,
+        )
+
+    qubo, offset = create().to_qubo()
+    arrays = create().to_qubo(format="coo")
+    assert arrays.offset == pytest.approx(offset)
+    coo = {
+        (int(arrays.ids[i]), int(arrays.ids[j])): v
+        for i, j, v in zip(arrays.rows, arrays.columns, arrays.values)
+    }
+    assert coo == pytest.approx(qubo)
+
+    state = arrays.to_state([1] * len(arrays.ids))
+    assert dict(state.entries) == {int(id): 1.0 for id in arrays.ids}
@@ -1,4 +1,12 @@
-from ommx.v1 import Instance, DecisionVariable
+import copy
+import io
+import pickle
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from ommx.v1 import Instance, DecisionVariable, SampleSet, samples_from_array
 
 
 def test_evaluate_samples_type_check():
@@ -23,3 +31,314 @@ def test_evaluate_samples_type_check():
     assert sample_set.extract_decision_variables("x", 0) == {(0,): 1, (1,): 0, (2,): 0}
     assert sample_set.extract_decision_variables("x", 1) == {(0,): 0, (1,): 0, (2,): 1}
     assert sample_set.extract_decision_variables("x", 2) == {(0,): 1, (1,): 1, (2,): 0}
+
+
+def test_extract_by_sample_id():
+    x = [DecisionVariable.binary(i, name="x", subscripts=[i]) for i in range(3)]
+    c = (x[1] + x[2] <= 1).add_name("c").add_subscripts([0])
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1] + 3 * x[2],
+        constraints=[c],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = {
+        10: {0: 1, 1: 0, 2: 0},
+        20: {0: 0, 1: 0, 2: 1},
+        30: {0: 1, 1: 1, 2: 1},
+        40: {0: 1, 1: 0, 2: 0},
+    }
+    sample_set = instance.evaluate_samples(samples)
+
+    for sample_id, state in samples.items():
+        solution = sample_set.get(sample_id)
+        assert dict(solution.state.entries) == state
+        assert sample_set.extract_decision_variables("x", sample_id) == {
+            (i,): value for i, value in state.items()
+        }
+        assert sample_set.extract_constraints("c", sample_id) == {
+            (0,): state[1] + state[2] - 1
+        }
+    assert sample_set.best_feasible().objective == 3.0
+    assert sample_set.best_feasible_unrelaxed().objective == 3.0
+
+    with pytest.raises(KeyError):
+        sample_set.extract_decision_variables("x", 0)
+    with pytest.raises(KeyError):
+        sample_set.extract_constraints("c", 0)
+
+
+def test_copy_and_pickle():
+    x = [DecisionVariable.binary(i) for i in range(2)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1],
+        constraints=[],
+        sense=Instance.MAXIMIZE,
+    )
+    sample_set = instance.evaluate_samples({1: {0: 1, 1: 0}, 2: {0: 1, 1: 1}})
+    # Build the cached Rust-side sample set
+    assert sample_set.get(2).objective == 3.0
+
+    for copied in [
+        copy.deepcopy(sample_set),
+        pickle.loads(pickle.dumps(sample_set)),
+    ]:
+        assert copied.raw == sample_set.raw
+        assert copied.get(2).objective == 3.0
+        assert copied.best_feasible().objective == 3.0
+
+
+def test_assign_raw():
+    x = [DecisionVariable.binary(i) for i in range(2)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1],
+        constraints=[],
+        sense=Instance.MAXIMIZE,
+    )
+    sample_set = instance.evaluate_samples({1: {0: 1, 1: 0}})
+    assert sample_set.best_feasible().objective == 1.0
+
+    # The cached lookups follow the newly assigned message
+    sample_set.raw = instance.evaluate_samples({2: {0: 1, 1: 1}}).raw
+    assert sample_set.best_feasible().objective == 3.0
+    assert sample_set.get(2).objective == 3.0
+    with pytest.raises(KeyError):
+        sample_set.get(1)
+
+
+def test_top_k_and_iter_solutions():
+    x = [DecisionVariable.binary(i) for i in range(10)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum((i + 1) * x[i] for i in range(10)),
+        constraints=[(x[i] + x[i + 1] <= 1).set_id(i) for i in range(9)],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = [{i: (s >> i) & 1 for i in range(10)} for s in range(64)]
+    sample_set = instance.evaluate_samples(samples)
+
+    objectives = sample_set.objectives
+    feasible = sample_set.feasible
+    expected = sorted(
+        (id for id in objectives if feasible[id]), key=lambda id: (-objectives[id], id)
+    )
+    top = sample_set.top_k(5)
+    assert [s.objective for s in top] == [objectives[id] for id in expected[:5]]
+    assert top[0].objective == sample_set.best_feasible_unrelaxed().objective
+    assert all(s.feasible for s in top)
+    assert len(sample_set.top_k(100, feasible_only=False)) == 64
+
+    solutions = list(sample_set.iter_solutions(feasible_only=True))
+    assert [s.objective for s in solutions] == [objectives[id] for id in expected]
+    by_id = sample_set.iter_solutions(order="sample_id")
+    assert dict(next(by_id).state.entries) == samples[0]
+
+
+def test_statistics():
+    x = [DecisionVariable.binary(i) for i in range(10)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum((i + 1) * x[i] for i in range(10)),
+        constraints=[(x[i] + x[i + 1] <= 1).set_id(i) for i in range(9)],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = [{i: (s >> i) & 1 for i in range(10)} for s in range(64)]
+    sample_set = instance.evaluate_samples(samples)
+    stats = sample_set.statistics(quantiles=[0.0, 0.5, 0.9, 1.0], bins=3)
+
+    objectives = list(sample_set.objectives.values())
+    assert stats.num_samples == 64
+    assert stats.num_feasible == sum(sample_set.feasible.values())
+    assert stats.feasibility_rate == stats.num_feasible / 64
+    assert stats.objective_quantiles == [
+        (q, pytest.approx(float(np.quantile(objectives, q))))
+        for q in [0.0, 0.5, 0.9, 1.0]
+    ]
+    assert set(stats.violation_histograms) == set(range(9))
+    for edges, counts in stats.violation_histograms.values():
+        assert len(edges) == 4
+        assert counts.sum() == 64
+
+    with pytest.raises(RuntimeError):
+        sample_set.statistics(quantiles=[2.0])
+
+
+def test_decision_variable_matrix():
+    x = [DecisionVariable.binary(i, name="x", subscripts=[i]) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1] + 3 * x[2],
+        constraints=[x[1] + x[2] <= 1],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = [
+        {0: 1, 1: 0, 2: 0},
+        {0: 0, 1: 0, 2: 1},
+        {0: 1, 1: 1, 2: 0},
+    ]
+    sample_set = instance.evaluate_samples(samples)
+    matrix = sample_set.decision_variable_matrix()
+
+    assert matrix.shape == (3, 3)
+    assert matrix.sample_ids.tolist() == [0, 1, 2]
+    assert matrix.decision_variable_ids.tolist() == [0, 1, 2]
+    assert matrix.values.tolist() == [
+        [1.0, 0.0, 0.0],
+        [0.0, 0.0, 1.0],
+        [1.0, 1.0, 0.0],
+    ]
+    assert not matrix.values.flags.writeable
+    for sample_id in range(3):
+        for id, value in sample_set.get(sample_id).state.entries.items():
+            assert matrix.get(sample_id, id) == value
+    assert matrix.get(3, 0) is None
+
+
+def test_evaluate_samples_num_threads():
+    x = [DecisionVariable.binary(i) for i in range(10)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=sum((i + 1) * x[i] for i in range(10)),
+        constraints=[(x[i] + x[i + 1] <= 1).set_id(i) for i in range(9)],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = [{i: (s >> i) & 1 for i in range(10)} for s in range(64)]
+
+    expected = instance.evaluate_samples(samples)
+    for num_threads in [1, 2, 4]:
+        sample_set = instance.evaluate_samples(samples, num_threads=num_threads)
+        assert sample_set.objectives == expected.objectives
+        assert sample_set.feasible == expected.feasible
+        assert sample_set.feasible_relaxed == expected.feasible_relaxed
+
+
+def test_samples_from_array():
+    x = [DecisionVariable.binary(i) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1] + 3 * x[2],
+        constraints=[],
+        sense=Instance.MAXIMIZE,
+    )
+    # Columns are ordered as `variable_ids`, and the last two reads are identical
+    reads = np.array([[1, 0, 0], [0, 0, 1], [0, 0, 1]], dtype=np.int8)
+    samples = samples_from_array(reads, variable_ids=[2, 1, 0], occurrences=[1, 2, 1])
+    assert sorted(sorted(entry.ids) for entry in samples.entries) == [[0], [1, 2, 3]]
+
+    sample_set = instance.evaluate_samples(samples)
+    assert sample_set.objectives == {0: 3.0, 1: 1.0, 2: 1.0, 3: 1.0}
+
+    with pytest.raises(RuntimeError):
+        # 3 columns but 2 IDs
+        samples_from_array(reads, variable_ids=[0, 1])
+
+
+def test_to_arrow():
+    x = [DecisionVariable.binary(i, name="x", subscripts=[i]) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x,
+        objective=x[0] + 2 * x[1] + 3 * x[2],
+        constraints=[(x[1] + x[2] <= 1).set_id(5), (x[0] + x[1] == 1).set_id(2)],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = {
+        3: {0: 1, 1: 0, 2: 0},
+        1: {0: 0, 1: 1, 2: 1},
+    }
+    sample_set = instance.evaluate_samples(samples)
+
+    summary = sample_set.to_arrow("summary").to_pydict()
+    assert summary["sample_id"] == [1, 3]
+    assert summary["objective"] == [5.0, 1.0]
+    assert summary["feasible"] == [False, True]
+
+    long = sample_set.to_arrow("decision_variables").to_pylist()
+    assert long == [
+        {"sample_id": id, "decision_variable_id": i, "value": float(samples[id][i])}
+        for id in [1, 3]
+        for i in range(3)
+    ]
+    wide = sample_set.to_arrow("decision_variables", layout="wide").to_pydict()
+    assert wide == {
+        "sample_id": [1, 3],
+        "0": [0.0, 1.0],
+        "1": [1.0, 0.0],
+        "2": [1.0, 0.0],
+    }
+
+    constraints = sample_set.to_arrow("constraints").to_pylist()
+    assert constraints == [
+        {"sample_id": 1, "constraint_id": 2, "value": 0.0, "feasible": True},
+        {"sample_id": 3, "constraint_id": 2, "value": 0.0, "feasible": True},
+        {"sample_id": 1, "constraint_id": 5, "value": 1.0, "feasible": False},
+        {"sample_id": 3, "constraint_id": 5, "value": -1.0, "feasible": True},
+    ]
+    wide = sample_set.to_arrow("constraints", layout="wide").to_pydict()
+    assert wide == {
+        "sample_id": [1, 3],
+        "value.2": [0.0, 0.0],
+        "value.5": [1.0, -1.0],
+        "feasible.2": [True, True],
+        "feasible.5": [False, True],
+    }
+
+    metadata = sample_set.metadata_to_arrow("decision_variables").to_pydict()
+    assert metadata["id"] == [0, 1, 2]
+    assert metadata["name"] == ["x", "x", "x"]
+    assert metadata["subscripts"] == [[0], [1], [2]]
+    assert instance.to_arrow("decision_variables").to_pydict() == metadata
+    assert sorted(instance.to_arrow("constraints").column("id").to_pylist()) == [2, 5]
+
+    solution = sample_set.get(3)
+    table = solution.to_arrow("decision_variables")
+    assert table.column("value").to_pylist() == [1.0, 0.0, 0.0]
+    assert solution.to_arrow("constraints", layout="wide").to_pydict() == {
+        "value.2": [0.0],
+        "value.5": [-1.0],
+    }
+
+    # A missing value is exported as null without being added to the solution
+    del solution.raw.state.entries[1]
+    table = solution.to_arrow("decision_variables")
+    assert table.column("value").to_pylist() == [1.0, None, 0.0]
+    assert solution.to_arrow(layout="wide").to_pydict()["1"] == [None]
+    assert 1 not in solution.raw.state.entries
+
+    f = io.BytesIO()
+    sample_set.write_parquet(f, "constraints")
+    f.seek(0)
+    assert pq.read_table(f).equals(sample_set.to_arrow("constraints"))
+
+
+def test_compact_bytes():
+    x = [DecisionVariable.binary(i) for i in range(10)]
+    y = [DecisionVariable.integer(10 + i, lower=-3, upper=3) for i in range(3)]
+    instance = Instance.from_components(
+        decision_variables=x + y,
+        objective=sum((i + 1) * x[i] for i in range(10)) + y[0] * y[1] + y[2],
+        constraints=[(x[i] + x[i + 1] <= 1).set_id(i) for i in range(9)],
+        sense=Instance.MAXIMIZE,
+    )
+    samples = [
+        {i: (s >> i) & 1 for i in range(10)}
+        | {10 + i: s % (i + 3) - 2 for i in range(3)}
+        for s in range(200)
+    ]
+    sample_set = instance.evaluate_samples(samples)
+
+    for zstd_level in [None, 3]:
+        data = sample_set.to_bytes("compact", zstd_level=zstd_level)
+        assert len(data) < len(sample_set.to_bytes())
+        decoded = SampleSet.from_bytes(data)
+        assert decoded.objectives == sample_set.objectives
+        assert decoded.feasible == sample_set.feasible
+        assert decoded.feasible_relaxed == sample_set.feasible_relaxed
+        for sample_id in [0, 57, 199]:
+            assert dict(decoded.get(sample_id).state.entries) == samples[sample_id]
+        # Re-encoding the decoded one into protobuf is readable as usual
+        assert SampleSet.from_bytes(decoded.to_bytes()).objectives == decoded.objectives
+
+    with pytest.raises(ValueError):
+        sample_set.to_bytes("unknown")  # type: ignore[arg-type]
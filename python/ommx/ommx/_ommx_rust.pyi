@@ -2,6 +2,8 @@
 # ruff: noqa: E501, F401
 
 import builtins
+import numpy
+import numpy.typing
 import os
 import pathlib
 import typing
@@ -13,8 +15,37 @@ class ArtifactArchive:
     @staticmethod
     def from_oci_archive(
         path: builtins.str | os.PathLike | pathlib.Path,
-    ) -> ArtifactArchive: ...
+        persist_index: builtins.bool = False,
+    ) -> ArtifactArchive:
+        r"""
+        Open an OCI archive, indexing the offsets of blobs in it
+
+        If `persist_index` is true, the index is stored as a sidecar file `<path>.index.json` to skip indexing on the next open.
+        """
+        ...
+    def get_layer_descriptor(self, digest: builtins.str) -> Descriptor:
+        r"""
+        Look up a layer descriptor by digest
+        """
+        ...
+    def get_layer_descriptors(
+        self, media_type: builtins.str
+    ) -> builtins.list[Descriptor]:
+        r"""
+        Layer descriptors of the media type in the order of the manifest
+        """
+        ...
     def get_blob(self, digest: builtins.str) -> bytes: ...
+    def get_blob_range(
+        self,
+        digest: builtins.str,
+        offset: builtins.int,
+        length: typing.Optional[builtins.int] = None,
+    ) -> bytes:
+        r"""
+        Read `length` bytes of the blob from `offset`, or until the end of the blob if `length` is not given
+        """
+        ...
     def push(self) -> None: ...
 
 class ArtifactArchiveBuilder:
@@ -34,6 +65,16 @@ class ArtifactArchiveBuilder:
         blob: bytes,
         annotations: typing.Mapping[builtins.str, builtins.str],
     ) -> Descriptor: ...
+    def add_layer_from_file(
+        self,
+        media_type: builtins.str,
+        path: builtins.str | os.PathLike | pathlib.Path,
+        annotations: typing.Mapping[builtins.str, builtins.str],
+    ) -> Descriptor:
+        r"""
+        Add a layer with the content of the file at `path`, without reading the whole file into memory
+        """
+        ...
     def add_annotation(self, key: builtins.str, value: builtins.str) -> None: ...
     def build(self) -> ArtifactArchive: ...
 
@@ -47,7 +88,29 @@ class ArtifactDir:
     def from_oci_dir(
         path: builtins.str | os.PathLike | pathlib.Path,
     ) -> ArtifactDir: ...
+    def get_layer_descriptor(self, digest: builtins.str) -> Descriptor:
+        r"""
+        Look up a layer descriptor by digest
+        """
+        ...
+    def get_layer_descriptors(
+        self, media_type: builtins.str
+    ) -> builtins.list[Descriptor]:
+        r"""
+        Layer descriptors of the media type in the order of the manifest
+        """
+        ...
     def get_blob(self, digest: builtins.str) -> bytes: ...
+    def get_blob_range(
+        self,
+        digest: builtins.str,
+        offset: builtins.int,
+        length: typing.Optional[builtins.int] = None,
+    ) -> bytes:
+        r"""
+        Read `length` bytes of the blob from `offset`, or until the end of the blob if `length` is not given
+        """
+        ...
     def push(self) -> None: ...
 
 class ArtifactDirBuilder:
@@ -63,9 +126,59 @@ class ArtifactDirBuilder:
         blob: bytes,
         annotations: typing.Mapping[builtins.str, builtins.str],
     ) -> Descriptor: ...
+    def add_layer_from_file(
+        self,
+        media_type: builtins.str,
+        path: builtins.str | os.PathLike | pathlib.Path,
+        annotations: typing.Mapping[builtins.str, builtins.str],
+    ) -> Descriptor:
+        r"""
+        Add a layer with the content of the file at `path`, without reading the whole file into memory
+        """
+        ...
     def add_annotation(self, key: builtins.str, value: builtins.str) -> None: ...
     def build(self) -> ArtifactDir: ...
 
+class CompiledInstance:
+    r"""
+    An instance compiled into sparse arrays for repeated evaluation on dense NumPy arrays.
+
+    The `i`-th value of the input array is for the decision variable `decision_variable_ids[i]`,
+    and the evaluated constraint values are ordered as `constraint_ids`, where the removed constraints follow the active constraints.
+    """
+
+    decision_variable_ids: numpy.typing.NDArray[numpy.uint64]
+    constraint_ids: numpy.typing.NDArray[numpy.uint64]
+    num_active_constraints: builtins.int
+    def incremental(
+        self, x: numpy.typing.NDArray[numpy.float64]
+    ) -> IncrementalEvaluator:
+        r"""
+        Start incremental evaluation from a 1-dimensional float64 array
+        """
+        ...
+    def evaluate(
+        self, x: numpy.typing.NDArray[numpy.float64]
+    ) -> tuple[builtins.float, numpy.typing.NDArray[numpy.float64], builtins.bool]:
+        r"""
+        Evaluate a 1-dimensional float64 array into the objective value, constraint values, and feasibility
+        """
+        ...
+    def evaluate_batch(
+        self, xs: numpy.typing.NDArray[numpy.float64]
+    ) -> tuple[
+        numpy.typing.NDArray[numpy.float64],
+        numpy.typing.NDArray[numpy.float64],
+        numpy.typing.NDArray[numpy.bool_],
+    ]:
+        r"""
+        Evaluate a C-contiguous `(num_samples, num_decision_variables)` float64 array in parallel without holding the GIL
+
+        Returns objective values of shape `(num_samples,)`, constraint values of shape `(num_samples, num_constraints)`,
+        and feasibility of shape `(num_samples,)`.
+        """
+        ...
+
 class Descriptor:
     r"""
     Descriptor of blob in artifact
@@ -98,8 +211,15 @@ class Function:
     def decode(bytes: bytes) -> Function: ...
     def encode(self) -> bytes: ...
     def almost_equal(self, other: Function, atol: builtins.float) -> builtins.bool: ...
+    def evaluate_value(self, state: bytes) -> builtins.float:
+        r"""
+        Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+        Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+        """
+        ...
     def __repr__(self) -> builtins.str: ...
     def __add__(self, rhs: Function) -> Function: ...
+    def __copy__(self) -> Function: ...
     def __sub__(self, rhs: Function) -> Function: ...
     def __mul__(self, rhs: Function) -> Function: ...
     def add_scalar(self, scalar: builtins.float) -> Function: ...
@@ -110,9 +230,64 @@ class Function:
     def mul_linear(self, linear: Linear) -> Function: ...
     def mul_quadratic(self, quadratic: Quadratic) -> Function: ...
     def mul_polynomial(self, polynomial: Polynomial) -> Function: ...
+    def add_assign(self, rhs: Function) -> None: ...
+    def add_assign_scalar(self, scalar: builtins.float) -> None: ...
+    def add_assign_linear(self, linear: Linear) -> None: ...
+    def add_assign_quadratic(self, quadratic: Quadratic) -> None: ...
+    def add_assign_polynomial(self, polynomial: Polynomial) -> None: ...
     def content_factor(self) -> builtins.float: ...
     def used_decision_variable_ids(self) -> builtins.set[builtins.int]: ...
 
+class IncrementalEvaluator:
+    r"""
+    Incremental evaluator for local search with single-variable moves.
+
+    The moves return a tuple of the change of the objective value, the changes of constraint values keyed by constraint ID,
+    and the feasibility after the move. Constraints not including the variable are not included in the changes.
+    """
+
+    objective: builtins.float
+    x: numpy.typing.NDArray[numpy.float64]
+    constraint_values: numpy.typing.NDArray[numpy.float64]
+    feasible: builtins.bool
+    num_violated: builtins.int
+    def delta(
+        self, decision_variable_id: builtins.int
+    ) -> tuple[
+        builtins.float, builtins.dict[builtins.int, builtins.float], builtins.bool
+    ]:
+        r"""
+        Change when the binary decision variable is flipped, without updating the state
+        """
+        ...
+    def flip(
+        self, decision_variable_id: builtins.int
+    ) -> tuple[
+        builtins.float, builtins.dict[builtins.int, builtins.float], builtins.bool
+    ]:
+        r"""
+        Flip the binary decision variable, and return the change
+        """
+        ...
+    def delta_to(
+        self, decision_variable_id: builtins.int, value: builtins.float
+    ) -> tuple[
+        builtins.float, builtins.dict[builtins.int, builtins.float], builtins.bool
+    ]:
+        r"""
+        Change when the decision variable is set to `value`, without updating the state
+        """
+        ...
+    def set(
+        self, decision_variable_id: builtins.int, value: builtins.float
+    ) -> tuple[
+        builtins.float, builtins.dict[builtins.int, builtins.float], builtins.bool
+    ]:
+        r"""
+        Set the decision variable to `value`, and return the change
+        """
+        ...
+
 class Instance:
     @staticmethod
     def from_bytes(bytes: bytes) -> Instance: ...
@@ -121,10 +296,38 @@ class Instance:
     def used_decision_variable_ids(self) -> builtins.set[builtins.int]: ...
     def as_pubo_format(self) -> dict: ...
     def as_qubo_format(self) -> tuple[dict, builtins.float]: ...
+    def as_qubo_coo(
+        self,
+    ) -> tuple[
+        numpy.typing.NDArray[numpy.uint64],
+        numpy.typing.NDArray[numpy.uint64],
+        numpy.typing.NDArray[numpy.uint64],
+        numpy.typing.NDArray[numpy.float64],
+        builtins.float,
+    ]:
+        r"""
+        Create QUBO as an upper-triangular matrix in the COO format,
+        and return `(ids, rows, columns, values, offset)` where `rows` and `columns` are indices of `ids`
+        """
+        ...
     def as_parametric_instance(self) -> ParametricInstance: ...
     def penalty_method(self) -> ParametricInstance: ...
     def uniform_penalty_method(self) -> ParametricInstance: ...
-    def evaluate_samples(self, samples: Samples) -> SampleSet: ...
+    def compile(self) -> CompiledInstance: ...
+    def as_minimization_problem(self) -> builtins.bool: ...
+    def as_maximization_problem(self) -> builtins.bool: ...
+    def evaluate(self, state: bytes) -> Solution: ...
+    def partial_evaluate(self, state: bytes) -> Instance: ...
+    def evaluate_samples(
+        self, samples: Samples, num_threads: typing.Optional[builtins.int] = None
+    ) -> SampleSet:
+        r"""
+        Evaluate the instance for each sample in parallel.
+
+        The GIL is released during the evaluation. `num_threads` limits the number of threads,
+        and the global rayon thread pool is used if it is not specified.
+        """
+        ...
     def relax_constraint(
         self,
         constraint_id: builtins.int,
@@ -132,6 +335,19 @@ class Instance:
         removed_reason_parameters: typing.Mapping[builtins.str, builtins.str],
     ) -> None: ...
     def restore_constraint(self, constraint_id: builtins.int) -> None: ...
+    def add_linear_constraints_csr(
+        self,
+        indptr: numpy.typing.NDArray[numpy.uint64],
+        indices: numpy.typing.NDArray[numpy.uint64],
+        data: numpy.typing.NDArray[numpy.float64],
+        rhs: numpy.typing.NDArray[numpy.float64],
+        equality: builtins.int,
+    ) -> numpy.typing.NDArray[numpy.uint64]:
+        r"""
+        Add linear constraints `A x = b` or `A x <= b` with `A` given in the CSR format,
+        and return the IDs of the new constraints
+        """
+        ...
     def log_encode(self, integer_variable_ids: builtins.set[builtins.int]) -> None: ...
     def convert_inequality_to_equality_with_integer_slack(
         self, constraint_id: builtins.int, max_integer_range: builtins.int
@@ -142,17 +358,44 @@ class Instance:
 
 class Linear:
     @staticmethod
+    def new(
+        terms: typing.Mapping[builtins.int, builtins.float], constant: builtins.float
+    ) -> Linear:
+        r"""
+        Create a linear function from the coefficients of each ID, sorted by ID
+        """
+        ...
+    @staticmethod
+    def from_arrays(
+        ids: numpy.typing.NDArray[numpy.uint64],
+        coefficients: numpy.typing.NDArray[numpy.float64],
+        constant: builtins.float,
+    ) -> Linear:
+        r"""
+        Create a linear function from arrays of IDs and coefficients
+        """
+        ...
+    @staticmethod
     def single_term(id: builtins.int, coefficient: builtins.float) -> Linear: ...
     @staticmethod
     def decode(bytes: bytes) -> Linear: ...
     def encode(self) -> bytes: ...
     def almost_equal(self, other: Linear, atol: builtins.float) -> builtins.bool: ...
+    def evaluate_value(self, state: bytes) -> builtins.float:
+        r"""
+        Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+        Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+        """
+        ...
     def __repr__(self) -> builtins.str: ...
     def __add__(self, rhs: Linear) -> Linear: ...
+    def __copy__(self) -> Linear: ...
     def __sub__(self, rhs: Linear) -> Linear: ...
     def __mul__(self, rhs: Linear) -> Quadratic: ...
     def add_scalar(self, scalar: builtins.float) -> Linear: ...
     def mul_scalar(self, scalar: builtins.float) -> Linear: ...
+    def add_assign(self, rhs: Linear) -> None: ...
+    def add_assign_scalar(self, scalar: builtins.float) -> None: ...
 
 class Parameters:
     @staticmethod
@@ -168,13 +411,28 @@ class ParametricInstance:
 
 class Polynomial:
     @staticmethod
+    def new(
+        terms: typing.Sequence[tuple[typing.Sequence[builtins.int], builtins.float]],
+    ) -> Polynomial:
+        r"""
+        Create a polynomial from pairs of IDs and coefficient of each monomial
+        """
+        ...
+    @staticmethod
     def decode(bytes: bytes) -> Polynomial: ...
     def encode(self) -> bytes: ...
     def almost_equal(
         self, other: Polynomial, atol: builtins.float
     ) -> builtins.bool: ...
+    def evaluate_value(self, state: bytes) -> builtins.float:
+        r"""
+        Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+        Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+        """
+        ...
     def __repr__(self) -> builtins.str: ...
     def __add__(self, rhs: Polynomial) -> Polynomial: ...
+    def __copy__(self) -> Polynomial: ...
     def __sub__(self, rhs: Polynomial) -> Polynomial: ...
     def __mul__(self, rhs: Polynomial) -> Polynomial: ...
     def add_scalar(self, scalar: builtins.float) -> Polynomial: ...
@@ -183,25 +441,105 @@ class Polynomial:
     def mul_scalar(self, scalar: builtins.float) -> Polynomial: ...
     def mul_linear(self, linear: Linear) -> Polynomial: ...
     def mul_quadratic(self, quadratic: Quadratic) -> Polynomial: ...
+    def add_assign(self, rhs: Polynomial) -> None: ...
+    def add_assign_scalar(self, scalar: builtins.float) -> None: ...
+    def add_assign_linear(self, linear: Linear) -> None: ...
+    def add_assign_quadratic(self, quadratic: Quadratic) -> None: ...
 
 class Quadratic:
     @staticmethod
+    def new(
+        columns: typing.Sequence[builtins.int],
+        rows: typing.Sequence[builtins.int],
+        values: typing.Sequence[builtins.float],
+        linear: typing.Optional[Linear] = None,
+    ) -> Quadratic: ...
+    @staticmethod
+    def from_coo(
+        rows: numpy.typing.NDArray[numpy.uint64],
+        columns: numpy.typing.NDArray[numpy.uint64],
+        values: numpy.typing.NDArray[numpy.float64],
+        linear: typing.Optional[Linear] = None,
+    ) -> Quadratic:
+        r"""
+        Create a quadratic function from the quadratic terms in the COO format
+        """
+        ...
+    @staticmethod
     def decode(bytes: bytes) -> Quadratic: ...
     def encode(self) -> bytes: ...
     def almost_equal(self, other: Quadratic, atol: builtins.float) -> builtins.bool: ...
+    def evaluate_value(self, state: bytes) -> builtins.float:
+        r"""
+        Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+        Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+        """
+        ...
     def __repr__(self) -> builtins.str: ...
     def __add__(self, rhs: Quadratic) -> Quadratic: ...
+    def __copy__(self) -> Quadratic: ...
     def __sub__(self, rhs: Quadratic) -> Quadratic: ...
     def __mul__(self, rhs: Quadratic) -> Polynomial: ...
     def add_scalar(self, scalar: builtins.float) -> Quadratic: ...
     def add_linear(self, linear: Linear) -> Quadratic: ...
     def mul_scalar(self, scalar: builtins.float) -> Quadratic: ...
     def mul_linear(self, linear: Linear) -> Polynomial: ...
+    def add_assign(self, rhs: Quadratic) -> None: ...
+    def add_assign_scalar(self, scalar: builtins.float) -> None: ...
+    def add_assign_linear(self, linear: Linear) -> None: ...
+
+class SampleMatrix:
+    r"""
+    Dense matrix of sampled decision variable values.
+
+    The arrays returned by the getters share the memory with this object without copying, and are read-only.
+    """
+
+    values: numpy.typing.NDArray[numpy.float64]
+    r"""
+    Values as a `(num_samples, num_decision_variables)` array in row-major order
+    """
+    sample_ids: numpy.typing.NDArray[numpy.uint64]
+    r"""
+    Sample IDs corresponding to the rows of :py:attr:`values`
+    """
+    decision_variable_ids: numpy.typing.NDArray[numpy.uint64]
+    r"""
+    Decision variable IDs corresponding to the columns of :py:attr:`values`
+    """
+    shape: tuple[builtins.int, builtins.int]
+    def get(
+        self, sample_id: builtins.int, decision_variable_id: builtins.int
+    ) -> typing.Optional[builtins.float]:
+        r"""
+        Get the value of a decision variable in a sample in O(1), or `None` if not found
+        """
+        ...
 
 class SampleSet:
     @staticmethod
-    def from_bytes(bytes: bytes) -> SampleSet: ...
+    def from_bytes(bytes: bytes) -> SampleSet:
+        r"""
+        Decode the protobuf encoding, or the compact encoding created by :py:meth:`to_compact_bytes`.
+        """
+        ...
+    @staticmethod
+    def is_compact_bytes(bytes: bytes) -> builtins.bool:
+        r"""
+        Check if the bytes are the compact encoding created by :py:meth:`to_compact_bytes`.
+        """
+        ...
     def to_bytes(self) -> bytes: ...
+    def to_compact_bytes(
+        self, zstd_level: typing.Optional[builtins.int] = None
+    ) -> bytes:
+        r"""
+        Encode into the compact columnar encoding, compressed by zstd if `zstd_level` is given.
+
+        The sample IDs are stored only once, and the sampled values of each decision variable or constraint
+        are bit-packed if binary, dictionary-encoded if they have a few distinct values, or stored as is.
+        """
+        ...
     def get(self, sample_id: builtins.int) -> Solution: ...
     def num_samples(self) -> builtins.int: ...
     def sample_ids(self) -> builtins.set[builtins.int]: ...
@@ -209,10 +547,120 @@ class SampleSet:
     def feasible_unrelaxed_ids(self) -> builtins.set[builtins.int]: ...
     def best_feasible(self) -> Solution: ...
     def best_feasible_unrelaxed(self) -> Solution: ...
+    def decision_variable_values(
+        self, sample_id: builtins.int
+    ) -> builtins.dict[builtins.int, builtins.float]:
+        r"""
+        Values of the decision variables including the substituted ones for a sample, keyed by the decision variable IDs.
+
+        Raises `KeyError` if the sample ID is not found.
+        """
+        ...
+    def constraint_values(
+        self, sample_id: builtins.int
+    ) -> builtins.dict[builtins.int, builtins.float]:
+        r"""
+        Evaluated values of the constraints for a sample, keyed by the constraint IDs.
+
+        Raises `KeyError` if the sample ID is not found.
+        """
+        ...
+    def top_k_ids(
+        self,
+        k: builtins.int,
+        feasible_only: builtins.bool = True,
+        relaxed: builtins.bool = False,
+    ) -> builtins.list[builtins.int]:
+        r"""
+        IDs of the best `k` samples in terms of the objective value, sorted from the best.
+
+        If `feasible_only`, only the feasible samples are ranked, where the feasibility is
+        for the remaining constraints if `relaxed`, and for the original constraints otherwise.
+        """
+        ...
+    def sorted_ids(
+        self, feasible_only: builtins.bool = False, relaxed: builtins.bool = False
+    ) -> builtins.list[builtins.int]:
+        r"""
+        IDs of the samples sorted by the objective value from the best, see :py:meth:`top_k_ids`
+        """
+        ...
+    def statistics(
+        self, quantiles: typing.Sequence[builtins.float], bins: builtins.int
+    ) -> SampleSetStatistics:
+        r"""
+        Aggregate the feasibility, objective quantiles and constraint violation histograms of all samples
+        """
+        ...
+    def decision_variable_matrix(self) -> SampleMatrix: ...
+    def constraint_columns(
+        self,
+    ) -> tuple[
+        numpy.typing.NDArray[numpy.uint64],
+        numpy.typing.NDArray[numpy.uint64],
+        numpy.typing.NDArray[numpy.float64],
+        numpy.typing.NDArray[numpy.bool_],
+    ]:
+        r"""
+        Evaluated values and feasibility of the constraints as `(sample_ids, constraint_ids, values, feasible)`.
+
+        `values` and `feasible` are `(len(constraint_ids), len(sample_ids))` arrays,
+        i.e. the values of a constraint are contiguous. The IDs are sorted in ascending order.
+        """
+        ...
+
+class SampleSetStatistics:
+    r"""
+    Aggregate statistics of a sample set, created by :py:meth:`SampleSet.statistics`
+    """
+
+    num_samples: builtins.int
+    num_feasible: builtins.int
+    r"""
+    Number of samples feasible for the original constraints
+    """
+    num_feasible_relaxed: builtins.int
+    r"""
+    Number of samples feasible for the remaining (non-removed) constraints
+    """
+    feasibility_rate: builtins.float
+    r"""
+    Ratio of the samples feasible for the original constraints, or NaN if there is no sample
+    """
+    feasibility_rate_relaxed: builtins.float
+    r"""
+    Ratio of the samples feasible for the remaining constraints, or NaN if there is no sample
+    """
+    objective_quantiles: builtins.list[tuple[builtins.float, builtins.float]]
+    r"""
+    Pairs of probability and the quantile of the objective values, interpolated linearly as `numpy.quantile`
+    """
+    violation_histograms: builtins.dict[
+        builtins.int,
+        tuple[numpy.typing.NDArray[numpy.float64], numpy.typing.NDArray[numpy.uint64]],
+    ]
+    r"""
+    Histograms of the constraint violations as `{constraint_id: (edges, counts)}`.
+
+    The violation is `|f(x)|` for equality constraints and `max(f(x), 0)` for inequality constraints.
+    `edges` are the `bins + 1` edges of the equal-width bins from zero to the largest violation,
+    and `counts` are the numbers of samples in the bins, where the last bin includes its right edge.
+    """
 
 class Samples:
     @staticmethod
     def from_bytes(bytes: bytes) -> Samples: ...
+    @staticmethod
+    def from_array(
+        xs: numpy.typing.NDArray[numpy.float64],
+        variable_ids: numpy.typing.NDArray[numpy.uint64],
+        sample_ids: typing.Optional[numpy.typing.NDArray[numpy.uint64]] = None,
+        occurrences: typing.Optional[numpy.typing.NDArray[numpy.uint64]] = None,
+    ) -> Samples:
+        r"""
+        Create samples from a `(num_rows, len(variable_ids))` matrix, merging identical rows into one entry
+        """
+        ...
     def to_bytes(self) -> bytes: ...
 
 class Solution:
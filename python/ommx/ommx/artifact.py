@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import io
 import json
+import tempfile
 import pandas
 import numpy
+import pyarrow
+import pyarrow.parquet
 from dataclasses import dataclass
 from pathlib import Path
 from abc import ABC, abstractmethod
+from typing import BinaryIO, Callable, Iterable, Literal, Optional, cast
 
 from ._ommx_rust import (
     ArtifactArchive as _ArtifactArchive,
@@ -17,6 +21,70 @@ from ._ommx_rust import (
 )
 from .v1 import Instance, Solution, ParametricInstance, SampleSet
 
+# Size of chunks read from a file-like object in `ArtifactBuilder.add_layer`
+_CHUNK_SIZE = 1 << 20
+
+# Layers up to this size are built in memory, and larger ones are spooled into a temporary file
+_SPOOL_THRESHOLD = 1 << 20
+
+_SAMPLE_SET_MEDIA_TYPES = (
+    "application/org.ommx.v1.sample-set",
+    "application/org.ommx.v1.compact-sample-set",
+)
+
+
+class _Spool(io.RawIOBase):
+    """
+    Write-only buffer kept in memory up to `max_size` bytes, and moved into a temporary file in `dir` once it exceeds
+    """
+
+    def __init__(self, max_size: int, dir: Optional[str | Path] = None):
+        self._max_size = max_size
+        self._dir = dir
+        self._file: BinaryIO = io.BytesIO()
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self._size = 0
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Path of the temporary file, or `None` while the content is in memory"""
+        if self._tmp is None:
+            return None
+        return Path(self._tmp.name) / "blob"
+
+    def getvalue(self) -> bytes:
+        assert isinstance(self._file, io.BytesIO)
+        return self._file.getvalue()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._size
+
+    def write(self, b) -> int:
+        n = memoryview(b).nbytes
+        if self._tmp is None and self._size + n > self._max_size:
+            self._tmp = tempfile.TemporaryDirectory(dir=self._dir)
+            assert self.path is not None
+            buffer = self.getvalue()
+            self._file = open(self.path, "wb")
+            self._file.write(buffer)
+        self._file.write(b)
+        self._size += n
+        return n
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._file.close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
 
 class ArtifactBase(ABC):
     @property
@@ -31,9 +99,20 @@ class ArtifactBase(ABC):
     @abstractmethod
     def layers(self) -> list[Descriptor]: ...
 
+    @abstractmethod
+    def get_layer_descriptor(self, digest: str) -> Descriptor: ...
+
+    @abstractmethod
+    def get_layer_descriptors(self, media_type: str) -> list[Descriptor]: ...
+
     @abstractmethod
     def get_blob(self, digest: str) -> bytes: ...
 
+    @abstractmethod
+    def get_blob_range(
+        self, digest: str, offset: int, length: Optional[int] = None
+    ) -> bytes: ...
+
     @abstractmethod
     def push(self): ...
 
@@ -45,8 +124,8 @@ class ArtifactArchive(ArtifactBase):
     _base: _ArtifactArchive
 
     @staticmethod
-    def from_oci_archive(path: str) -> ArtifactArchive:
-        return ArtifactArchive(_ArtifactArchive.from_oci_archive(path))
+    def from_oci_archive(path: str, persist_index: bool = False) -> ArtifactArchive:
+        return ArtifactArchive(_ArtifactArchive.from_oci_archive(path, persist_index))
 
     @property
     def image_name(self) -> str | None:
@@ -60,9 +139,20 @@ class ArtifactArchive(ArtifactBase):
     def layers(self) -> list[Descriptor]:
         return self._base.layers
 
+    def get_layer_descriptor(self, digest: str) -> Descriptor:
+        return self._base.get_layer_descriptor(digest)
+
+    def get_layer_descriptors(self, media_type: str) -> list[Descriptor]:
+        return self._base.get_layer_descriptors(media_type)
+
     def get_blob(self, digest: str) -> bytes:
         return self._base.get_blob(digest)
 
+    def get_blob_range(
+        self, digest: str, offset: int, length: Optional[int] = None
+    ) -> bytes:
+        return self._base.get_blob_range(digest, offset, length)
+
     def push(self):
         self._base.push()
 
@@ -93,9 +183,20 @@ class ArtifactDir(ArtifactBase):
     def layers(self) -> list[Descriptor]:
         return self._base.layers
 
+    def get_layer_descriptor(self, digest: str) -> Descriptor:
+        return self._base.get_layer_descriptor(digest)
+
+    def get_layer_descriptors(self, media_type: str) -> list[Descriptor]:
+        return self._base.get_layer_descriptors(media_type)
+
     def get_blob(self, digest: str) -> bytes:
         return self._base.get_blob(digest)
 
+    def get_blob_range(
+        self, digest: str, offset: int, length: Optional[int] = None
+    ) -> bytes:
+        return self._base.get_blob_range(digest, offset, length)
+
     def push(self):
         self._base.push()
 
@@ -109,10 +210,14 @@ class Artifact:
     _base: ArtifactBase
 
     @staticmethod
-    def load_archive(path: str | Path) -> Artifact:
+    def load_archive(path: str | Path, *, persist_index: bool = False) -> Artifact:
         """
         Load an artifact stored as a single file
 
+        The offsets of blobs in the archive file are indexed on loading, so that each layer is read directly without scanning the whole file.
+        If `persist_index` is `True`, the index is stored as a sidecar file `<path>.index.json` and reused while the archive is unchanged.
+        Reading a layer fails if the archive file is overwritten after loading, and the artifact must be loaded again.
+
         >>> artifact = Artifact.load_archive("data/random_lp_instance.ommx")
         >>> print(artifact.image_name)
         ghcr.io/jij-inc/ommx/random_lp_instance:...
@@ -125,7 +230,7 @@ class Artifact:
             path = Path(path)
 
         if path.is_file():
-            base = ArtifactArchive.from_oci_archive(str(path))
+            base = ArtifactArchive.from_oci_archive(str(path), persist_index)
         elif path.is_dir():
             base = ArtifactDir.from_oci_dir(str(path))
         else:
@@ -154,6 +259,9 @@ class Artifact:
     def push(self):
         """
         Push the artifact to remote registry
+
+        Blobs are uploaded in parallel by the number of workers set by the `OMMX_TRANSFER_CONCURRENCY` environment variable (8 by default).
+        If the push is interrupted, the blobs already uploaded are skipped on the next push.
         """
         self._base.push()
 
@@ -188,17 +296,48 @@ class Artifact:
         >>> print(layer.media_type)
         application/org.ommx.v1.instance
 
+        The manifest is parsed once and the layers are indexed by digest, so that this does not scan the layers.
+        """
+        return self._base.get_layer_descriptor(digest)
+
+    def get_layer_descriptors(self, media_type: str) -> list[Descriptor]:
+        """
+        Look up the layer descriptors of a media type in the order of the manifest
+
+        >>> artifact = Artifact.load("ghcr.io/jij-inc/ommx/random_lp_instance:4303c7f")
+        >>> layers = artifact.get_layer_descriptors("application/org.ommx.v1.instance")
+        >>> print(layers[0].digest)
+        sha256:93fdc9fcb8e21b34e3517809a348938d9455e9b9e579548bbf018a514c082df2
+
         """
-        for layer in self.layers:
-            if layer.digest == digest:
-                return layer
-        raise ValueError(f"Layer {digest} not found")
+        return self._base.get_layer_descriptors(media_type)
 
     def get_blob(self, digest: str | Descriptor) -> bytes:
         if isinstance(digest, Descriptor):
             digest = digest.digest
         return self._base.get_blob(digest)
 
+    def get_blob_range(
+        self, digest: str | Descriptor, offset: int, length: Optional[int] = None
+    ) -> bytes:
+        """
+        Read a part of the blob, `length` bytes from `offset` or until the end of the blob if `length` is not given
+
+        For an artifact loaded by :py:meth:`load_archive`, only the requested range is read from the archive file.
+
+        >>> artifact = Artifact.load_archive("data/random_lp_instance.ommx")
+        >>> layer = artifact.layers[0]
+        >>> blob = artifact.get_blob(layer)
+        >>> artifact.get_blob_range(layer, 10, 20) == blob[10:30]
+        True
+        >>> artifact.get_blob_range(layer, 10) == blob[10:]
+        True
+
+        """
+        if isinstance(digest, Descriptor):
+            digest = digest.digest
+        return self._base.get_blob_range(digest, offset, length)
+
     def get_layer(self, descriptor: Descriptor) -> Instance | Solution | numpy.ndarray:
         """
         Get the layer object corresponding to the descriptor
@@ -221,11 +360,10 @@ class Artifact:
         - If the artifact does not contain any instance layer, it raises an :py:exc:`ValueError`.
         - For multiple instance layers, use :py:meth:`Artifact.get_instance` instead.
         """
-        for desc in self.layers:
-            if desc.media_type == "application/org.ommx.v1.instance":
-                return self.get_instance(desc)
-        else:
+        layers = self.get_layer_descriptors("application/org.ommx.v1.instance")
+        if not layers:
             raise ValueError("Instance layer not found")
+        return self.get_instance(layers[0])
 
     def get_instance(self, descriptor: Descriptor) -> Instance:
         """
@@ -260,11 +398,10 @@ class Artifact:
         - If the artifact does not have a solution layer, it raises an :py:exc:`ValueError`.
         - For multiple solution layers, use :py:meth:`Artifact.get_solution` instead.
         """
-        for desc in self.layers:
-            if desc.media_type == "application/org.ommx.v1.solution":
-                return self.get_solution(desc)
-        else:
+        layers = self.get_layer_descriptors("application/org.ommx.v1.solution")
+        if not layers:
             raise ValueError("Solution layer not found")
+        return self.get_solution(layers[0])
 
     def get_solution(self, descriptor: Descriptor) -> Solution:
         assert descriptor.media_type == "application/org.ommx.v1.solution"
@@ -281,11 +418,12 @@ class Artifact:
         - If the artifact does not have a parametric instance layer, it raises an :py:exc:`ValueError`.
         - For multiple parametric instance layers, use :py:meth:`Artifact.get_parametric_instance` instead.
         """
-        for desc in self.layers:
-            if desc.media_type == "application/org.ommx.v1.parametric-instance":
-                return self.get_parametric_instance(desc)
-        else:
+        layers = self.get_layer_descriptors(
+            "application/org.ommx.v1.parametric-instance"
+        )
+        if not layers:
             raise ValueError("Parametric instance layer not found")
+        return self.get_parametric_instance(layers[0])
 
     def get_parametric_instance(self, descriptor: Descriptor) -> ParametricInstance:
         """
@@ -306,16 +444,16 @@ class Artifact:
         - For multiple sample set layers, use :py:meth:`Artifact.get_sample_set` instead.
         """
         for desc in self.layers:
-            if desc.media_type == "application/org.ommx.v1.sample-set":
+            if desc.media_type in _SAMPLE_SET_MEDIA_TYPES:
                 return self.get_sample_set(desc)
         else:
             raise ValueError("Sample set layer not found")
 
     def get_sample_set(self, descriptor: Descriptor) -> SampleSet:
         """
-        Get a sample set from the artifact
+        Get a sample set from the artifact, stored either in protobuf or in the compact encoding
         """
-        assert descriptor.media_type == "application/org.ommx.v1.sample-set"
+        assert descriptor.media_type in _SAMPLE_SET_MEDIA_TYPES
         blob = self.get_blob(descriptor)
         sample_set = SampleSet.from_bytes(blob)
         sample_set.annotations = descriptor.annotations
@@ -338,6 +476,14 @@ class Artifact:
         blob = self.get_blob(descriptor)
         return pandas.read_parquet(io.BytesIO(blob))
 
+    def get_table(self, descriptor: Descriptor) -> pyarrow.Table:
+        """
+        Get a pyarrow Table from an artifact layer stored by :py:meth:`ArtifactBuilder.add_dataframe`
+        """
+        assert descriptor.media_type == "application/vnd.apache.parquet"
+        blob = self.get_blob(descriptor)
+        return pyarrow.parquet.read_table(pyarrow.BufferReader(blob))
+
     def get_json(self, descriptor: Descriptor):
         """
         Get a JSON object from an artifact layer stored by :py:meth:`ArtifactBuilder.add_json`
@@ -353,6 +499,16 @@ class ArtifactBuilderBase(ABC):
         self, media_type: str, blob: bytes, annotations: dict[str, str]
     ) -> Descriptor: ...
 
+    def add_layer_from_file(
+        self, media_type: str, path: str, annotations: dict[str, str]
+    ) -> Descriptor:
+        """
+        Add a layer with the content of the file at `path`
+
+        This reads the whole file into memory, and the builders of this module override it to stream the file.
+        """
+        return self.add_layer(media_type, Path(path).read_bytes(), annotations)
+
     @abstractmethod
     def add_annotation(self, key: str, value: str): ...
 
@@ -383,6 +539,11 @@ class ArtifactArchiveBuilder(ArtifactBuilderBase):
     ) -> Descriptor:
         return self._base.add_layer(media_type, blob, annotations)
 
+    def add_layer_from_file(
+        self, media_type: str, path: str, annotations: dict[str, str] = {}
+    ) -> Descriptor:
+        return self._base.add_layer_from_file(media_type, path, annotations)
+
     def add_annotation(self, key: str, value: str):
         self._base.add_annotation(key, value)
 
@@ -409,6 +570,11 @@ class ArtifactDirBuilder(ArtifactBuilderBase):
     ) -> Descriptor:
         return self._base.add_layer(media_type, blob, annotations)
 
+    def add_layer_from_file(
+        self, media_type: str, path: str, annotations: dict[str, str] = {}
+    ) -> Descriptor:
+        return self._base.add_layer_from_file(media_type, path, annotations)
+
     def add_annotation(self, key: str, value: str):
         self._base.add_annotation(key, value)
 
@@ -655,14 +821,44 @@ class ArtifactBuilder:
             "application/org.ommx.v1.solution", blob, solution.annotations
         )
 
-    def add_sample_set(self, sample_set: SampleSet) -> Descriptor:
+    def add_sample_set(
+        self,
+        sample_set: SampleSet,
+        format: Literal["protobuf", "compact"] = "protobuf",
+        zstd_level: Optional[int] = None,
+    ) -> Descriptor:
         """
         Add a sample set to the artifact with annotations
+
+        With ``format="compact"``, the sample set is stored in the compact encoding of :py:meth:`SampleSet.to_bytes`
+        as ``application/org.ommx.v1.compact-sample-set`` media type, which is much smaller for binary or integer decision variables.
+        Clients not supporting this encoding do not recognize the layer as a sample set rather than failing to decode it.
+
+        >>> from ommx.v1 import Instance, DecisionVariable
+        >>> x = [DecisionVariable.binary(i) for i in range(3)]
+        >>> instance = Instance.from_components(
+        ...     decision_variables=x,
+        ...     objective=sum(x),
+        ...     constraints=[],
+        ...     sense=Instance.MINIMIZE,
+        ... )
+        >>> sample_set = instance.evaluate_samples({0: {0: 1, 1: 0, 2: 1}, 1: {0: 0, 1: 0, 2: 1}})
+        >>> builder = ArtifactBuilder.temp()
+        >>> desc = builder.add_sample_set(sample_set, format="compact", zstd_level=3)
+        >>> desc.media_type
+        'application/org.ommx.v1.compact-sample-set'
+        >>> artifact = builder.build()
+        >>> artifact.sample_set.objectives
+        {0: 2.0, 1: 1.0}
+
         """
-        blob = sample_set.to_bytes()
-        return self.add_layer(
-            "application/org.ommx.v1.sample-set", blob, sample_set.annotations
+        blob = sample_set.to_bytes(format, zstd_level)
+        media_type = (
+            "application/org.ommx.v1.compact-sample-set"
+            if format == "compact"
+            else "application/org.ommx.v1.sample-set"
         )
+        return self.add_layer(media_type, blob, sample_set.annotations)
 
     def add_ndarray(
         self,
@@ -670,11 +866,14 @@ class ArtifactBuilder:
         /,
         *,
         annotation_namespace: str = "org.ommx.user.",
+        spool_dir: Optional[str | Path] = None,
         **annotations: str,
     ) -> Descriptor:
         """
         Add a numpy ndarray to the artifact with npy format
 
+        A large array is written into a temporary file in `spool_dir` instead of memory, see :meth:`add_layer`.
+
         Example
         ========
 
@@ -704,24 +903,29 @@ class ArtifactBuilder:
         [1 2 3]
 
         """
-        f = io.BytesIO()
-        numpy.save(f, array)
-        blob = f.getvalue()
         if not annotation_namespace.endswith("."):
             annotation_namespace += "."
         annotations = {annotation_namespace + k: v for k, v in annotations.items()}
-        return self.add_layer("application/vnd.numpy", blob, annotations)
+        return self._add_layer_by_writer(
+            "application/vnd.numpy",
+            lambda f: numpy.save(f, array),
+            annotations,
+            spool_dir,
+        )
 
     def add_dataframe(
         self,
-        df: pandas.DataFrame,
+        df: pandas.DataFrame | pyarrow.Table,
         /,
         *,
         annotation_namespace: str = "org.ommx.user.",
+        spool_dir: Optional[str | Path] = None,
         **annotations: str,
     ) -> Descriptor:
         """
-        Add a pandas DataFrame to the artifact with parquet format
+        Add a pandas DataFrame or a pyarrow Table to the artifact with parquet format
+
+        A large table is written into a temporary file in `spool_dir` instead of memory, see :meth:`add_layer`.
 
         Example
         ========
@@ -754,12 +958,31 @@ class ArtifactBuilder:
         >>> print(desc.annotations)
         {'org.ommx.user2.title': 'test_dataframe'}
 
+        A pyarrow Table, e.g. created by :py:meth:`SampleSet.to_arrow`, is written into parquet directly without pandas.
+
+        >>> import pyarrow as pa
+        >>> table = pa.table({"a": [1, 2], "b": [3, 4]})
+        >>> builder = ArtifactBuilder.temp()
+        >>> desc = builder.add_dataframe(table, title="test_table")
+        >>> artifact = builder.build()
+        >>> assert artifact.get_table(artifact.layers[0]).equals(table)
+
         """
-        blob = df.to_parquet()
+        if isinstance(df, pyarrow.Table):
+
+            def write(f: BinaryIO):
+                pyarrow.parquet.write_table(df, f)
+        else:
+
+            def write(f: BinaryIO):
+                df.to_parquet(f)
+
         if not annotation_namespace.endswith("."):
             annotation_namespace += "."
         annotations = {annotation_namespace + k: v for k, v in annotations.items()}
-        return self.add_layer("application/vnd.apache.parquet", blob, annotations)
+        return self._add_layer_by_writer(
+            "application/vnd.apache.parquet", write, annotations, spool_dir
+        )
 
     def add_json(
         self,
@@ -801,12 +1024,62 @@ class ArtifactBuilder:
         return self.add_layer("application/json", blob, annotations)
 
     def add_layer(
-        self, media_type: str, blob: bytes, annotations: dict[str, str] = {}
+        self,
+        media_type: str,
+        blob: bytes | str | Path | BinaryIO | Iterable[bytes],
+        annotations: dict[str, str] = {},
+        spool_dir: Optional[str | Path] = None,
     ) -> Descriptor:
         """
         Low-level API to add any type of layer to the artifact with annotations. Use :meth:`add_instance` or other high-level methods if possible.
+
+        The content of the layer is given as one of the following:
+
+        - `bytes`
+        - a path of a file, which is read without loading the whole file into memory
+        - a binary file-like object, or an iterable of `bytes` chunks, which is read chunk by chunk.
+          The content is kept in memory while it is small, and written into a temporary file once it exceeds 1 MiB.
+          The temporary file is created in `spool_dir`, or the directory given by :py:func:`tempfile.gettempdir` if not specified.
+
+        >>> builder = ArtifactBuilder.temp()
+        >>> desc = builder.add_layer("application/octet-stream", (b"a" * 10 for _ in range(3)))
+        >>> desc.size
+        30
+        >>> import io
+        >>> desc2 = builder.add_layer("application/octet-stream", io.BytesIO(b"b" * 20))
+        >>> artifact = builder.build()
+        >>> artifact.get_blob(desc) == b"a" * 30
+        True
+        >>> artifact.get_blob(desc2) == b"b" * 20
+        True
+
         """
-        return self._base.add_layer(media_type, blob, annotations)
+        if isinstance(blob, (bytes, bytearray, memoryview)):
+            return self._base.add_layer(media_type, bytes(blob), annotations)
+        if isinstance(blob, (str, Path)):
+            return self._base.add_layer_from_file(media_type, str(blob), annotations)
+        if hasattr(blob, "read"):
+            reader = blob
+            blob = iter(lambda: reader.read(_CHUNK_SIZE), b"")
+
+        return self._add_layer_by_writer(
+            media_type, lambda f: f.writelines(blob), annotations, spool_dir
+        )
+
+    def _add_layer_by_writer(
+        self,
+        media_type: str,
+        write: Callable[[BinaryIO], None],
+        annotations: dict[str, str],
+        spool_dir: Optional[str | Path] = None,
+    ) -> Descriptor:
+        # Small content is added as `bytes`, and large one is spooled into a temporary file streamed by `add_layer_from_file`
+        with _Spool(_SPOOL_THRESHOLD, spool_dir) as f:
+            write(cast(BinaryIO, f))
+            if f.path is None:
+                return self._base.add_layer(media_type, f.getvalue(), annotations)
+            f.flush()
+            return self._base.add_layer_from_file(media_type, str(f.path), annotations)
 
     def add_annotation(self, key: str, value: str):
         """
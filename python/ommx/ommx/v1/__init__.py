@@ -1,10 +1,23 @@
 from __future__ import annotations
-from typing import Optional, Iterable, overload, Mapping
-from typing_extensions import deprecated, TypeAlias, Union, Sequence
+from typing import (
+    Optional,
+    Iterable,
+    Iterator,
+    overload,
+    Mapping,
+    Generic,
+    TypeVar,
+    Literal,
+)
+from typing_extensions import deprecated, TypeAlias, Union, Sequence, Self
 from dataclasses import dataclass, field
 from pandas import DataFrame, NA, Series
+from numpy.typing import ArrayLike, NDArray
 from abc import ABC, abstractmethod
 import collections.abc
+import copy
+import numpy as np
+import pyarrow as pa
 
 from .solution_pb2 import State, Optimality, Relaxation, Solution as _Solution
 from .instance_pb2 import Instance as _Instance, Parameters
@@ -61,6 +74,7 @@ __all__ = [
     "Bound",
     # Utility
     "SampledValues",
+    "QuboArrays",
     # Type Alias
     "ToState",
     "ToSamples",
@@ -98,6 +112,39 @@ def to_samples(samples: ToSamples) -> Samples:
     return samples
 
 
+def samples_from_array(
+    sample_matrix: ArrayLike,
+    variable_ids: ArrayLike,
+    sample_ids: Optional[ArrayLike] = None,
+    occurrences: Optional[ArrayLike] = None,
+) -> Samples:
+    """
+    Create :class:`Samples` from a 2-D array whose rows are the states of the decision variables ``variable_ids``, e.g. the reads of a sampler.
+
+    Each row is sampled ``occurrences[row]`` times (once if not given), and the sample IDs are assigned to them in order
+    from ``sample_ids``, or ``0, 1, ...`` if not given. Identical rows are merged into one entry.
+
+    >>> from ommx.v1 import samples_from_array
+    >>> samples = samples_from_array([[0, 1], [1, 1], [0, 1]], variable_ids=[3, 5])
+    >>> [(list(entry.ids), sorted(entry.state.entries.items())) for entry in samples.entries]
+    [([0, 2], [(3, 0.0), (5, 1.0)]), ([1], [(3, 1.0), (5, 1.0)])]
+
+    """
+    rust = _ommx_rust.Samples.from_array(
+        np.ascontiguousarray(sample_matrix, dtype=np.float64),
+        np.ascontiguousarray(variable_ids, dtype=np.uint64),
+        None
+        if sample_ids is None
+        else np.ascontiguousarray(sample_ids, dtype=np.uint64),
+        None
+        if occurrences is None
+        else np.ascontiguousarray(occurrences, dtype=np.uint64),
+    )
+    samples = Samples()
+    samples.ParseFromString(rust.to_bytes())
+    return samples
+
+
 class InstanceBase(ABC):
     @abstractmethod
     def get_decision_variables(self) -> list[DecisionVariable]: ...
@@ -154,6 +201,37 @@ class InstanceBase(ABC):
             df = df.set_index("id")
         return df
 
+    def to_arrow(
+        self,
+        table: Literal[
+            "decision_variables", "constraints", "removed_constraints"
+        ] = "decision_variables",
+    ) -> pa.Table:
+        """
+        Metadata of decision variables, constraints or removed constraints as a ``pyarrow.Table`` without pandas.
+
+        The columns are the same as :attr:`decision_variables`, :attr:`constraints` and :attr:`removed_constraints`
+        except for the functions and ``parameters``, and ``id`` is a column rather than the index. The rows are sorted by ``id``.
+        """
+        if table == "decision_variables":
+            return _decision_variables_arrow(
+                sorted((v.raw for v in self.get_decision_variables()), key=_id)
+            )
+        if table == "constraints":
+            return _constraints_arrow(
+                sorted((c.raw for c in self.get_constraints()), key=_id)
+            )
+        if table == "removed_constraints":
+            removed = sorted(
+                (rc.raw for rc in self.get_removed_constraints()),
+                key=lambda rc: rc.constraint.id,
+            )
+            return _constraints_arrow([rc.constraint for rc in removed]).append_column(
+                "removed_reason",
+                pa.array([rc.removed_reason for rc in removed], type=pa.string()),
+            )
+        raise ValueError(f"Unknown table: {table}")
+
 
 @dataclass
 class Instance(InstanceBase, UserAnnotationBase):
@@ -195,10 +273,21 @@ class Instance(InstanceBase, UserAnnotationBase):
         ...     sense=Instance.MAXIMIZE,
         ... )
 
+    Storage
+    ========
+
+    This class holds the instance either as a protobuf message (:py:attr:`raw`) or as a Rust-side ``_ommx_rust.Instance``.
+    Methods implemented in Rust, e.g. :py:meth:`evaluate` or :py:meth:`log_encode`, work on the Rust-side instance directly,
+    and the protobuf message is only re-created when :py:attr:`raw` is accessed.
+    Since the message returned by :py:attr:`raw` can be modified in place, accessing it discards the Rust-side instance,
+    and the next Rust method call decodes it again.
+
     """
 
-    raw: _Instance
-    """The raw protobuf message."""
+    _raw: Optional[_Instance] = field(default=None, repr=False, compare=False)
+    _rust: Optional[_ommx_rust.Instance] = field(
+        default=None, repr=False, compare=False
+    )
 
     # Annotations
     annotations: dict[str, str] = field(default_factory=dict)
@@ -221,6 +310,93 @@ class Instance(InstanceBase, UserAnnotationBase):
     created = datetime_annotation_property("created")
     "The creation date of the instance, stored as ``org.ommx.v1.instance.created`` annotation in RFC3339 format in OMMX artifact."
 
+    def __init__(self, raw: _Instance, annotations: Optional[dict[str, str]] = None):
+        self._raw = raw
+        self._rust = None
+        self.annotations = annotations if annotations is not None else {}
+
+    @staticmethod
+    def _from_rust(
+        instance: _ommx_rust.Instance, annotations: Optional[dict[str, str]] = None
+    ) -> Instance:
+        new = Instance(_Instance(), annotations)
+        new._raw = None
+        new._rust = instance
+        return new
+
+    @property
+    def raw(self) -> _Instance:
+        """The raw protobuf message."""
+        raw = self._raw_message()
+        # The returned message may be modified by the caller
+        self._rust = None
+        return raw
+
+    @raw.setter
+    def raw(self, raw: _Instance):
+        self._raw = raw
+        self._rust = None
+
+    @property
+    def raw_view(self) -> _Instance:
+        """
+        The raw protobuf message for read-only use.
+
+        Unlike :py:attr:`raw`, this keeps the Rust-side instance, so the returned message must not be modified.
+        """
+        return self._raw_message()
+
+    def _raw_message(self) -> _Instance:
+        """Get the protobuf message for read-only use, keeping the Rust-side instance."""
+        if self._raw is None:
+            assert self._rust is not None
+            raw = _Instance()
+            raw.ParseFromString(self._rust.to_bytes())
+            self._raw = raw
+        return self._raw
+
+    def _rust_instance(self) -> _ommx_rust.Instance:
+        """Get the Rust-side instance for read-only use, keeping the protobuf message."""
+        if self._rust is None:
+            assert self._raw is not None
+            self._rust = _ommx_rust.Instance.from_bytes(self._raw.SerializeToString())
+        return self._rust
+
+    def _rust_instance_mut(self) -> _ommx_rust.Instance:
+        """Get the Rust-side instance to be modified. The protobuf message is discarded."""
+        instance = self._rust_instance()
+        self._raw = None
+        return instance
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Instance):
+            return NotImplemented
+        return (
+            self._raw_message() == other._raw_message()
+            and self.annotations == other.annotations
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Instance(raw={self._raw_message()!r}, annotations={self.annotations!r})"
+        )
+
+    # The Rust-side instance cannot be copied or pickled, so both go through the serialized form
+    def __deepcopy__(self, memo) -> Instance:
+        new = Instance.from_bytes(self.to_bytes())
+        new.annotations = copy.deepcopy(self.annotations, memo)
+        return new
+
+    def __getstate__(self) -> dict:
+        return {"bytes": self.to_bytes(), "annotations": self.annotations}
+
+    def __setstate__(self, state: dict):
+        raw = _Instance()
+        raw.ParseFromString(state["bytes"])
+        self._raw = raw
+        self._rust = None
+        self.annotations = state["annotations"]
+
     @property
     def _annotations(self) -> dict[str, str]:
         return self.annotations
@@ -272,6 +448,13 @@ class Instance(InstanceBase, UserAnnotationBase):
 
     @staticmethod
     def load_mps(path: str) -> Instance:
+        """
+        Load an MPS file.
+
+        - Both gzipped and uncompressed files are supported.
+        - A gzipped file is decompressed on a background thread while being parsed.
+        - An uncompressed file is memory-mapped and its ``COLUMNS`` section is parsed on multiple threads.
+        """
         bytes = _ommx_rust.load_mps_bytes(path)
         return Instance.from_bytes(bytes)
 
@@ -357,15 +540,17 @@ class Instance(InstanceBase, UserAnnotationBase):
         return Instance(instance)
 
     def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
+        if self._raw is not None:
+            return self._raw.SerializeToString()
+        return self._rust_instance().to_bytes()
 
     @property
     def description(self) -> _Instance.Description:
-        return self.raw.description
+        return self._raw_message().description
 
     @property
     def objective(self) -> Function:
-        return Function(self.raw.objective)
+        return Function(self._raw_message().objective)
 
     @objective.setter
     def objective(
@@ -390,37 +575,98 @@ class Instance(InstanceBase, UserAnnotationBase):
 
     @property
     def sense(self) -> _Instance.Sense.ValueType:
-        return self.raw.sense
+        return self._raw_message().sense
 
     def get_decision_variables(self) -> list[DecisionVariable]:
         """
         Get decision variables as a list of :class:`DecisionVariable` instances.
         """
-        return [DecisionVariable(raw) for raw in self.raw.decision_variables]
+        return [DecisionVariable(raw) for raw in self._raw_message().decision_variables]
 
     def get_constraints(self) -> list[Constraint]:
         """
         Get constraints as a list of :class:`Constraint` instances.
         """
-        return [Constraint.from_raw(raw) for raw in self.raw.constraints]
+        return [Constraint.from_raw(raw) for raw in self._raw_message().constraints]
 
     def get_removed_constraints(self) -> list[RemovedConstraint]:
         """
         Get removed constraints as a list of :class:`RemovedConstraint` instances.
         """
-        return [RemovedConstraint(raw) for raw in self.raw.removed_constraints]
+        return [
+            RemovedConstraint(raw) for raw in self._raw_message().removed_constraints
+        ]
 
     def evaluate(self, state: ToState) -> Solution:
-        out, _ = _ommx_rust.evaluate_instance(
-            self.to_bytes(), to_state(state).SerializeToString()
-        )
-        return Solution.from_bytes(out)
+        solution = self._rust_instance().evaluate(to_state(state).SerializeToString())
+        return Solution.from_bytes(solution.to_bytes())
+
+    def compile(self) -> _ommx_rust.CompiledInstance:
+        """
+        Compile the instance into sparse arrays for repeated evaluation on dense NumPy arrays.
+
+        Decision variable IDs are remapped to the positions in :py:attr:`~_ommx_rust.CompiledInstance.decision_variable_ids` once,
+        so that the evaluation does not need hash lookup of the state.
+        This is useful for local search or post-processing of samplers, which evaluate the same instance many times.
+        Note that the compiled instance does not follow the later modification of this instance.
+
+        Examples
+        =========
+
+        .. doctest::
+
+            >>> import numpy as np
+            >>> x = [DecisionVariable.binary(i) for i in range(3)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=x[0] + 2*x[1] + 3*x[2],
+            ...     constraints=[(sum(x) == 1).set_id(0)],
+            ...     sense=Instance.MAXIMIZE,
+            ... )
+            >>> compiled = instance.compile()
+            >>> compiled.decision_variable_ids
+            array([0, 1, 2], dtype=uint64)
+
+            Evaluate a single state into the objective value, constraint values, and feasibility
+
+            >>> objective, constraints, feasible = compiled.evaluate(np.array([0.0, 0.0, 1.0]))
+            >>> objective, constraints, feasible
+            (3.0, array([0.]), True)
+
+            Evaluate multiple states at once. Each row is a state.
+
+            >>> objectives, constraints, feasible = compiled.evaluate_batch(
+            ...     np.array([[1.0, 0.0, 0.0], [1.0, 1.0, 0.0]])
+            ... )
+            >>> objectives
+            array([1., 3.])
+            >>> constraints
+            array([[0.],
+                   [1.]])
+            >>> feasible
+            array([ True, False])
+
+            For local search, :py:meth:`~_ommx_rust.CompiledInstance.incremental` creates an evaluator
+            which updates the objective and constraint values only for the terms including the flipped variable.
+
+            >>> incremental = compiled.incremental(np.array([1.0, 0.0, 0.0]))
+            >>> incremental.delta(2)  # change of objective, constraints, and feasibility after the flip
+            (3.0, {0: 1.0}, False)
+            >>> incremental.flip(0)
+            (-1.0, {0: -1.0}, False)
+            >>> incremental.flip(2)
+            (3.0, {0: 1.0}, True)
+            >>> incremental.objective
+            3.0
+
+        """
+        return self._rust_instance().compile()
 
     def partial_evaluate(self, state: ToState) -> Instance:
-        out, _ = _ommx_rust.partial_evaluate_instance(
-            self.to_bytes(), to_state(state).SerializeToString()
+        instance = self._rust_instance().partial_evaluate(
+            to_state(state).SerializeToString()
         )
-        return Instance.from_bytes(out)
+        return Instance._from_rust(instance)
 
     def used_decision_variable_ids(self) -> set[int]:
         """
@@ -453,17 +699,36 @@ class Instance(InstanceBase, UserAnnotationBase):
         {0, 1}
 
         """
-        return _ommx_rust.Instance.from_bytes(
-            self.to_bytes()
-        ).used_decision_variable_ids()
+        return self._rust_instance().used_decision_variable_ids()
+
+    @overload
+    def to_qubo(
+        self,
+        *,
+        uniform_penalty_weight: Optional[float] = None,
+        penalty_weights: dict[int, float] = {},
+        inequality_integer_slack_max_range: int = 32,
+        format: Literal["dict"] = "dict",
+    ) -> tuple[dict[tuple[int, int], float], float]: ...
 
+    @overload
     def to_qubo(
         self,
         *,
         uniform_penalty_weight: Optional[float] = None,
         penalty_weights: dict[int, float] = {},
         inequality_integer_slack_max_range: int = 32,
-    ) -> tuple[dict[tuple[int, int], float], float]:
+        format: Literal["coo"],
+    ) -> QuboArrays: ...
+
+    def to_qubo(
+        self,
+        *,
+        uniform_penalty_weight: Optional[float] = None,
+        penalty_weights: dict[int, float] = {},
+        inequality_integer_slack_max_range: int = 32,
+        format: Literal["dict", "coo"] = "dict",
+    ) -> tuple[dict[tuple[int, int], float], float] | QuboArrays:
         r"""
         Convert the instance to a QUBO format
 
@@ -483,7 +748,8 @@ class Instance(InstanceBase, UserAnnotationBase):
             * If ``uniform_penalty_weight`` is given, use :py:meth:`uniform_penalty_method` with the given weight.
             * If both are None, defaults to ``uniform_penalty_weight = 1.0``.
 
-        6. Finally convert to QUBO format by :py:meth:`as_qubo_format`.
+        6. Finally convert to QUBO format by :py:meth:`as_qubo_format`,
+           or by :py:meth:`as_qubo_arrays` if ``format="coo"`` is given.
 
         Please see the document of each method for details.
         If you want to customize the conversion, use the methods above manually.
@@ -638,10 +904,14 @@ class Instance(InstanceBase, UserAnnotationBase):
                 pi = self.uniform_penalty_method()
                 weight = pi.get_parameters()[0]
                 unconstrained = pi.with_parameters({weight.id: uniform_penalty_weight})
-            self.raw = unconstrained.raw
+            self._raw = None
+            self._rust = unconstrained._rust_instance()
 
         self.log_encode()
-        qubo = self.as_qubo_format()
+        if format == "coo":
+            qubo = self.as_qubo_arrays()
+        else:
+            qubo = self.as_qubo_format()
 
         if is_converted_to_minimize:
             # Convert back to maximization
@@ -692,12 +962,7 @@ class Instance(InstanceBase, UserAnnotationBase):
         Function(-x0 - x1 - x2)
 
         """
-        if self.raw.sense == Instance.MINIMIZE:
-            return False
-        self.raw.sense = Instance.MINIMIZE
-        obj = -self.objective
-        self.raw.objective.CopyFrom(obj.raw)
-        return True
+        return self._rust_instance_mut().as_minimization_problem()
 
     def as_maximization_problem(self) -> bool:
         """
@@ -742,12 +1007,7 @@ class Instance(InstanceBase, UserAnnotationBase):
         Function(-x0 - x1 - x2)
 
         """
-        if self.raw.sense == Instance.MAXIMIZE:
-            return False
-        self.raw.sense = Instance.MAXIMIZE
-        obj = -self.objective
-        self.raw.objective.CopyFrom(obj.raw)
-        return True
+        return self._rust_instance_mut().as_maximization_problem()
 
     def as_qubo_format(self) -> tuple[dict[tuple[int, int], float], float]:
         """
@@ -758,8 +1018,44 @@ class Instance(InstanceBase, UserAnnotationBase):
             Use :py:meth:`to_qubo` driver for the full QUBO conversion.
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        return instance.as_qubo_format()
+        return self._rust_instance().as_qubo_format()
+
+    def as_qubo_arrays(self) -> QuboArrays:
+        """
+        Convert unconstrained quadratic instance to QUBO as an upper-triangular matrix in the COO format.
+
+        This is the same as :py:meth:`as_qubo_format`, but returns NumPy arrays instead of a dictionary,
+        which is much smaller for large QUBOs and can be passed to samplers taking matrices.
+        See :py:class:`QuboArrays` for the format.
+
+        .. note::
+            This is a single-purpose method to only convert the format, not to execute any conversion of the instance.
+            Use :py:meth:`to_qubo` driver with ``format="coo"`` for the full QUBO conversion.
+
+        Examples
+        =========
+
+        >>> from ommx.v1 import Instance, DecisionVariable
+        >>> x = [DecisionVariable.binary(i) for i in range(3)]
+        >>> instance = Instance.from_components(
+        ...     decision_variables=x,
+        ...     objective=x[0] * x[2] - 2 * x[2] + 3,
+        ...     constraints=[],
+        ...     sense=Instance.MINIMIZE,
+        ... )
+        >>> qubo = instance.as_qubo_arrays()
+        >>> qubo.ids
+        array([0, 2], dtype=uint64)
+        >>> qubo.rows, qubo.columns, qubo.values
+        (array([0, 1], dtype=uint64), array([1, 1], dtype=uint64), array([ 1., -2.]))
+        >>> qubo.offset
+        3.0
+
+        """
+        ids, rows, columns, values, offset = self._rust_instance().as_qubo_coo()
+        return QuboArrays(
+            ids=ids, rows=rows, columns=columns, values=values, offset=offset
+        )
 
     def as_pubo_format(self) -> dict[tuple[int, ...], float]:
         """
@@ -768,8 +1064,7 @@ class Instance(InstanceBase, UserAnnotationBase):
         This method is designed for better composability rather than easy-to-use.
         This does not execute any conversion of the instance, only translates the data format.
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        return instance.as_pubo_format()
+        return self._rust_instance().as_pubo_format()
 
     def penalty_method(self) -> ParametricInstance:
         r"""
@@ -853,8 +1148,9 @@ class Instance(InstanceBase, UserAnnotationBase):
         Function(x0*x0 + 2*x0*x1 + 2*x1*x1 + 2*x1*x2 + x2*x2 - x0 - 3*x1 - x2 + 2)
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        return ParametricInstance.from_bytes(instance.penalty_method().to_bytes())
+        return ParametricInstance.from_bytes(
+            self._rust_instance().penalty_method().to_bytes()
+        )
 
     def uniform_penalty_method(self) -> ParametricInstance:
         r"""
@@ -934,29 +1230,90 @@ class Instance(InstanceBase, UserAnnotationBase):
         Function(x0*x0 + 2*x0*x1 + 2*x0*x2 + x1*x1 + 2*x1*x2 + x2*x2 - 5*x0 - 5*x1 - 5*x2 + 9)
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
         return ParametricInstance.from_bytes(
-            instance.uniform_penalty_method().to_bytes()
+            self._rust_instance().uniform_penalty_method().to_bytes()
         )
 
     def as_parametric_instance(self) -> ParametricInstance:
         """
         Convert the instance to a :class:`ParametricInstance`.
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
         return ParametricInstance.from_bytes(
-            instance.as_parametric_instance().to_bytes()
+            self._rust_instance().as_parametric_instance().to_bytes()
         )
 
-    def evaluate_samples(self, samples: ToSamples) -> SampleSet:
+    def evaluate_samples(
+        self, samples: ToSamples, *, num_threads: Optional[int] = None
+    ) -> SampleSet:
         """
         Evaluate the instance with multiple states.
+
+        The samples and constraints are evaluated in parallel without holding the GIL.
+
+        :param samples: The samples to be evaluated.
+        :param num_threads: The number of threads used for the evaluation. All available cores are used if not specified.
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
         samples_ = _ommx_rust.Samples.from_bytes(
             to_samples(samples).SerializeToString()
         )
-        return SampleSet.from_bytes(instance.evaluate_samples(samples_).to_bytes())
+        return SampleSet.from_bytes(
+            self._rust_instance()
+            .evaluate_samples(samples_, num_threads=num_threads)
+            .to_bytes()
+        )
+
+    def add_linear_constraints_csr(
+        self,
+        indptr: ArrayLike,
+        indices: ArrayLike,
+        data: ArrayLike,
+        rhs: ArrayLike,
+        equality: Equality.ValueType,
+    ) -> NDArray[np.uint64]:
+        r"""
+        Add linear constraints :math:`A x = b` or :math:`A x \leq b` where the matrix :math:`A` is given in the CSR format.
+
+        ``indptr``, ``indices`` and ``data`` are the same as the attributes of ``scipy.sparse.csr_array``,
+        and the column indices are regarded as decision variable IDs.
+        The constraints are built in Rust without creating Python objects for each row or term.
+
+        :param equality: :py:attr:`Constraint.EQUAL_TO_ZERO` for :math:`A x = b`, or :py:attr:`Constraint.LESS_THAN_OR_EQUAL_TO_ZERO` for :math:`A x \leq b`.
+        :return: The IDs of the added constraints in the order of rows. They are assigned after the largest ID of the existing and removed constraints.
+
+        Examples
+        =========
+
+        >>> import numpy as np
+        >>> from ommx.v1 import Instance, DecisionVariable, Constraint
+        >>> x = [DecisionVariable.integer(i, lower=0, upper=3) for i in range(3)]
+        >>> instance = Instance.from_components(
+        ...     decision_variables=x,
+        ...     objective=sum(x),
+        ...     constraints=[],
+        ...     sense=Instance.MAXIMIZE,
+        ... )
+
+        Add :math:`x_0 + 2 x_2 \leq 4` and :math:`3 x_1 + x_2 \leq 5`
+
+        >>> instance.add_linear_constraints_csr(
+        ...     indptr=np.array([0, 2, 4]),
+        ...     indices=np.array([0, 2, 1, 2]),
+        ...     data=np.array([1.0, 2.0, 3.0, 1.0]),
+        ...     rhs=np.array([4.0, 5.0]),
+        ...     equality=Constraint.LESS_THAN_OR_EQUAL_TO_ZERO,
+        ... )
+        array([0, 1], dtype=uint64)
+        >>> instance.get_constraints()
+        [Constraint(Function(x0 + 2*x2 - 4) <= 0), Constraint(Function(3*x1 + x2 - 5) <= 0)]
+
+        """
+        return self._rust_instance_mut().add_linear_constraints_csr(
+            np.ascontiguousarray(indptr, dtype=np.uint64),
+            np.ascontiguousarray(indices, dtype=np.uint64),
+            np.ascontiguousarray(data, dtype=np.float64),
+            np.ascontiguousarray(rhs, dtype=np.float64),
+            equality,
+        )
 
     def relax_constraint(self, constraint_id: int, reason: str, **parameters):
         """
@@ -1032,9 +1389,7 @@ class Instance(InstanceBase, UserAnnotationBase):
             False
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        instance.relax_constraint(constraint_id, reason, parameters)
-        self.raw.ParseFromString(instance.to_bytes())
+        self._rust_instance_mut().relax_constraint(constraint_id, reason, parameters)
 
     def restore_constraint(self, constraint_id: int):
         """
@@ -1044,9 +1399,7 @@ class Instance(InstanceBase, UserAnnotationBase):
 
         Note that this drops the removed reason and associated parameters. See :py:meth:`relax_constraint` for details.
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        instance.restore_constraint(constraint_id)
-        self.raw.ParseFromString(instance.to_bytes())
+        self._rust_instance_mut().restore_constraint(constraint_id)
 
     def log_encode(self, decision_variable_ids: set[int] = set({})):
         r"""
@@ -1141,9 +1494,7 @@ class Instance(InstanceBase, UserAnnotationBase):
             if not decision_variable_ids:
                 # No integer variables
                 return
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        instance.log_encode(decision_variable_ids)
-        self.raw.ParseFromString(instance.to_bytes())
+        self._rust_instance_mut().log_encode(decision_variable_ids)
 
     def convert_inequality_to_equality_with_integer_slack(
         self, constraint_id: int, max_integer_range: int
@@ -1207,11 +1558,9 @@ class Instance(InstanceBase, UserAnnotationBase):
         3   integer    0.0    5.0  ommx.slack        [0]
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        instance.convert_inequality_to_equality_with_integer_slack(
+        self._rust_instance_mut().convert_inequality_to_equality_with_integer_slack(
             constraint_id, max_integer_range
         )
-        self.raw.ParseFromString(instance.to_bytes())
 
     def add_integer_slack_to_inequality(
         self, constraint_id: int, slack_upper_bound: int
@@ -1286,10 +1635,9 @@ class Instance(InstanceBase, UserAnnotationBase):
         and thus the residual error is not disappear for :math:`x_0 = x_1 = 1` case :math:`f(x) + b \cdot x = 1 + 2 \cdot 1 + 2 \cdot s - 4 = 2s - 1`.
 
         """
-        instance = _ommx_rust.Instance.from_bytes(self.to_bytes())
-        b = instance.add_integer_slack_to_inequality(constraint_id, slack_upper_bound)
-        self.raw.ParseFromString(instance.to_bytes())
-        return b
+        return self._rust_instance_mut().add_integer_slack_to_inequality(
+            constraint_id, slack_upper_bound
+        )
 
 
 @dataclass
@@ -1467,8 +1815,7 @@ class ParametricInstance(InstanceBase, UserAnnotationBase):
             parameters = Parameters(entries=parameters)
         pi = _ommx_rust.ParametricInstance.from_bytes(self.to_bytes())
         ps = _ommx_rust.Parameters.from_bytes(parameters.SerializeToString())
-        instance = pi.with_parameters(ps)
-        return Instance.from_bytes(instance.to_bytes())
+        return Instance._from_rust(pi.with_parameters(ps))
 
 
 class VariableBase(ABC):
@@ -1698,6 +2045,76 @@ class Solution(UserAnnotationBase):
             df = df.set_index("id")
         return df
 
+    def to_arrow(
+        self,
+        table: Literal["decision_variables", "constraints"] = "decision_variables",
+        layout: Literal["long", "wide"] = "long",
+    ) -> pa.Table:
+        """
+        Decision variables or evaluated constraints as a ``pyarrow.Table`` without pandas.
+
+        - ``layout="long"`` has a row for each decision variable or constraint with its metadata,
+          and ``value`` (and ``dual_variable`` for constraints) columns.
+        - ``layout="wide"`` is a single row which has a column for each decision variable, e.g. ``"3"``,
+          or a ``value.{id}`` column for each constraint, as :meth:`SampleSet.to_arrow`.
+
+        The value of a decision variable missing in :py:attr:`state` is null.
+        """
+        if table == "decision_variables":
+            decision_variables = sorted(self.raw.decision_variables, key=_id)
+            # `entries[id]` of a protobuf map inserts a default value for a missing key
+            values = [self.raw.state.entries.get(v.id) for v in decision_variables]
+            if layout == "long":
+                return _decision_variables_arrow(decision_variables).append_column(
+                    "value", pa.array(values, type=pa.float64())
+                )
+            if layout == "wide":
+                return pa.table(
+                    {
+                        str(v.id): pa.array([value], type=pa.float64())
+                        for v, value in zip(decision_variables, values)
+                    }
+                )
+            raise ValueError(f"Unknown layout: {layout}")
+        if table == "constraints":
+            constraints = sorted(self.raw.evaluated_constraints, key=_id)
+            if layout == "long":
+                return (
+                    _constraints_arrow(constraints)
+                    .append_column(
+                        "value",
+                        pa.array(
+                            [c.evaluated_value for c in constraints], type=pa.float64()
+                        ),
+                    )
+                    .append_column(
+                        "dual_variable",
+                        _optional_column(constraints, "dual_variable", pa.float64()),
+                    )
+                )
+            if layout == "wide":
+                return pa.table(
+                    {
+                        f"value.{c.id}": pa.array(
+                            [c.evaluated_value], type=pa.float64()
+                        )
+                        for c in constraints
+                    }
+                )
+            raise ValueError(f"Unknown layout: {layout}")
+        raise ValueError(f"Unknown table: {table}")
+
+    def write_parquet(
+        self,
+        where,
+        table: Literal["decision_variables", "constraints"] = "decision_variables",
+        layout: Literal["long", "wide"] = "long",
+    ) -> None:
+        """
+        Write the table of :meth:`to_arrow` into a parquet file. ``where`` is a path or a writable file-like object.
+        """
+        _write_parquet(self.to_arrow(table, layout), where)
+
     def extract_decision_variables(self, name: str) -> dict[tuple[int, ...], float]:
         """
         Extract the values of decision variables based on the `name` with `subscripts` key.
@@ -1853,6 +2270,75 @@ def _equality(equality: Equality.ValueType) -> str:
     raise ValueError("Unknown equality")
 
 
+def _id(message) -> int:
+    return message.id
+
+
+def _optional_column(messages: Sequence, name: str, type: pa.DataType) -> pa.Array:
+    return pa.array(
+        [getattr(m, name) if m.HasField(name) else None for m in messages], type=type
+    )
+
+
+def _decision_variables_arrow(
+    decision_variables: Sequence[_DecisionVariable],
+) -> pa.Table:
+    """Metadata of decision variables as an Arrow table. ``parameters`` are not included."""
+    return pa.table(
+        {
+            "id": pa.array([v.id for v in decision_variables], type=pa.uint64()),
+            "kind": pa.array(
+                [_kind(v.kind) for v in decision_variables], type=pa.string()
+            ),
+            "lower": pa.array(
+                [v.bound.lower for v in decision_variables], type=pa.float64()
+            ),
+            "upper": pa.array(
+                [v.bound.upper for v in decision_variables], type=pa.float64()
+            ),
+            "name": _optional_column(decision_variables, "name", pa.string()),
+            "subscripts": pa.array(
+                [list(v.subscripts) for v in decision_variables],
+                type=pa.list_(pa.int64()),
+            ),
+            "description": _optional_column(
+                decision_variables, "description", pa.string()
+            ),
+            "substituted_value": _optional_column(
+                decision_variables, "substituted_value", pa.float64()
+            ),
+        }
+    )
+
+
+def _constraints_arrow(constraints: Sequence) -> pa.Table:
+    """
+    Metadata of constraints as an Arrow table. ``parameters`` are not included.
+
+    ``constraints`` are the messages which have ``id``, ``equality``, ``name``, ``subscripts`` and ``description`` fields,
+    e.g. ``ommx.v1.Constraint``, ``ommx.v1.EvaluatedConstraint`` and ``ommx.v1.SampledConstraint``.
+    """
+    return pa.table(
+        {
+            "id": pa.array([c.id for c in constraints], type=pa.uint64()),
+            "equality": pa.array(
+                [_equality(c.equality) for c in constraints], type=pa.string()
+            ),
+            "name": _optional_column(constraints, "name", pa.string()),
+            "subscripts": pa.array(
+                [list(c.subscripts) for c in constraints], type=pa.list_(pa.int64())
+            ),
+            "description": _optional_column(constraints, "description", pa.string()),
+        }
+    )
+
+
+def _write_parquet(table: pa.Table, where) -> None:
+    import pyarrow.parquet as pq
+
+    pq.write_table(table, where)
+
+
 @dataclass
 class DecisionVariable(VariableBase):
     """
@@ -2105,12 +2591,131 @@ class AsConstraint(ABC):
         return self.__le__(other)
 
 
-@dataclass
-class Linear(AsConstraint):
+_Message = TypeVar("_Message", _Linear, _Quadratic, _Polynomial, _Function)
+_RustExpression = TypeVar(
+    "_RustExpression",
+    _ommx_rust.Linear,
+    _ommx_rust.Quadratic,
+    _ommx_rust.Polynomial,
+    _ommx_rust.Function,
+)
+
+
+class _Expression(AsConstraint, Generic[_Message, _RustExpression]):
+    """
+    Storage shared by :class:`Linear`, :class:`Quadratic`, :class:`Polynomial` and :class:`Function`.
+
+    The expression is held either as a protobuf message (:py:attr:`raw`) or as a Rust-side object of ``_ommx_rust``.
+    Arithmetic operators work on the Rust-side object, and ``+=`` updates it in place without copying the expression.
+    The protobuf message is only created when :py:attr:`raw` is accessed or the expression is stored into an :class:`Instance` or a :class:`Constraint`.
+    Since the message returned by :py:attr:`raw` can be modified in place, accessing it discards the Rust-side object.
+    """
+
+    _message_type: type[_Message]
+    _rust_type: type[_RustExpression]
+
+    _raw: Optional[_Message] = None
+    _rust: Optional[_RustExpression] = None
+
+    @classmethod
+    def _from_rust(cls, rust: _RustExpression) -> Self:
+        new = cls.__new__(cls)
+        new._raw = None
+        new._rust = rust
+        return new
+
+    @classmethod
+    def from_raw(cls, raw: _Message) -> Self:
+        new = cls.__new__(cls)
+        new._raw = raw
+        new._rust = None
+        return new
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        return cls._from_rust(cls._rust_type.decode(data))
+
+    def to_bytes(self) -> bytes:
+        if self._rust is not None:
+            return self._rust.encode()
+        return self._raw_message().SerializeToString()
+
+    @property
+    def raw(self) -> _Message:
+        """The raw protobuf message."""
+        raw = self._raw_message()
+        # The returned message may be modified by the caller
+        self._rust = None
+        return raw
+
+    @raw.setter
+    def raw(self, raw: _Message):
+        self._raw = raw
+        self._rust = None
+
+    def _raw_message(self) -> _Message:
+        """Get the protobuf message for read-only use, keeping the Rust-side object."""
+        if self._raw is None:
+            assert self._rust is not None
+            raw = self._message_type()
+            raw.ParseFromString(self._rust.encode())
+            self._raw = raw
+        return self._raw
+
+    def _rust_expr(self) -> _RustExpression:
+        """Get the Rust-side object for read-only use, keeping the protobuf message."""
+        if self._rust is None:
+            assert self._raw is not None
+            self._rust = self._rust_type.decode(self._raw.SerializeToString())
+        return self._rust
+
+    def _rust_expr_mut(self) -> _RustExpression:
+        """Get the Rust-side object to be modified. The protobuf message is discarded."""
+        rust = self._rust_expr()
+        self._raw = None
+        return rust
+
+    # The Rust-side object cannot be pickled, so both deep copy and pickle go through the serialized form
+    def __reduce__(self):
+        return (type(self).from_bytes, (self.to_bytes(),))
+
+    def __deepcopy__(self, memo) -> Self:
+        return self.from_bytes(self.to_bytes())
+
+    def evaluate_value(self, state: ToState) -> float:
+        """
+        Evaluate the expression with the given state to return only the value.
+
+        This is faster than :meth:`evaluate` since the used decision variable IDs are not collected.
+
+        Examples
+        =========
+
+        .. doctest::
+
+            >>> f = Linear(terms={1: 2, 2: 3}, constant=1)
+            >>> f.evaluate_value({1: 3, 2: 4, 3: 5})
+            19.0
+            >>> (f * f).evaluate_value({1: 3, 2: 4})
+            361.0
+
+        """
+        return self._rust_expr().evaluate_value(to_state(state).SerializeToString())
+
+    def _rust_operand(self, other: _Expression) -> _RustExpression:
+        """Rust-side object of ``other`` to be added into ``self``, copied if it is ``self`` itself."""
+        rust = other._rust_expr()
+        if other is self:
+            return copy.copy(rust)
+        return rust
+
+
+class Linear(_Expression[_Linear, _ommx_rust.Linear]):
     """
     Modeler API for linear function
 
     This is a wrapper of :class:`linear_pb2.Linear` protobuf message.
+    See :class:`_Expression` for how the expression is stored.
 
     Examples
     =========
@@ -2131,24 +2736,50 @@ class Linear(AsConstraint):
         Note that `f == g` becomes an equality `Constraint`
         >>> assert isinstance(f == g, Constraint)
 
+        Use ``+=`` to build a large function term by term, which updates the function in place.
+        ``sum`` or ``+`` creates a new function for each addition.
+        >>> x = [DecisionVariable.binary(i) for i in range(3)]
+        >>> h = Linear(terms={})
+        >>> for i, xi in enumerate(x):
+        ...     h += (i + 1) * xi
+        >>> h
+        Linear(x0 + 2*x1 + 3*x2)
+
     """
 
-    raw: _Linear
+    _message_type = _Linear
+    _rust_type = _ommx_rust.Linear
 
     def __init__(self, *, terms: dict[int, float | int], constant: float | int = 0):
-        self.raw = _Linear(
-            terms=[
-                _Linear.Term(id=id, coefficient=coefficient)
-                for id, coefficient in terms.items()
-            ],
-            constant=constant,
-        )
+        self._raw = None
+        self._rust = _ommx_rust.Linear.new(terms, constant)
 
     @staticmethod
-    def from_raw(raw: _Linear) -> Linear:
-        new = Linear(terms={})
-        new.raw = raw
-        return new
+    def from_arrays(
+        ids: ArrayLike, coefficients: ArrayLike, constant: float | int = 0
+    ) -> Linear:
+        """
+        Create a linear function from arrays of decision variable IDs and coefficients.
+
+        This is built in Rust without creating Python objects for each term. Duplicated IDs are summed up.
+
+        Examples
+        =========
+
+        .. doctest::
+
+            >>> import numpy as np
+            >>> Linear.from_arrays(np.array([1, 2]), np.array([2.0, 3.0]), constant=1)
+            Linear(2*x1 + 3*x2 + 1)
+
+        """
+        return Linear._from_rust(
+            _ommx_rust.Linear.from_arrays(
+                np.ascontiguousarray(ids, dtype=np.uint64),
+                np.ascontiguousarray(coefficients, dtype=np.float64),
+                constant,
+            )
+        )
 
     @property
     def linear_terms(self) -> dict[int, float]:
@@ -2156,7 +2787,7 @@ class Linear(AsConstraint):
         Get the terms of the linear function as a dictionary
         """
         out = {}
-        for term in self.raw.terms:
+        for term in self._raw_message().terms:
             if term.id not in out:
                 out[term.id] = term.coefficient
             else:
@@ -2177,31 +2808,20 @@ class Linear(AsConstraint):
         """
         Get the constant term of the linear function
         """
-        return self.raw.constant
-
-    @staticmethod
-    def from_bytes(data: bytes) -> Linear:
-        new = Linear(terms={})
-        new.raw.ParseFromString(data)
-        return new
-
-    def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
+        return self._raw_message().constant
 
     @deprecated("Use almost_equal method instead.")
     def equals_to(self, other: Linear) -> bool:
         """
         Alternative to ``==`` operator to compare two linear functions.
         """
-        return self.raw == other.raw
+        return self._raw_message() == other._raw_message()
 
     def almost_equal(self, other: Linear, *, atol: float = 1e-10) -> bool:
         """
         Compare two linear functions have almost equal coefficients and constant.
         """
-        lhs = _ommx_rust.Linear.decode(self.raw.SerializeToString())
-        rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-        return lhs.almost_equal(rhs, atol)
+        return self._rust_expr().almost_equal(other._rust_expr(), atol)
 
     def evaluate(self, state: ToState) -> tuple[float, set]:
         """
@@ -2263,22 +2883,31 @@ class Linear(AsConstraint):
         return Linear.from_bytes(new), used_ids
 
     def __repr__(self) -> str:
-        return f"Linear({_ommx_rust.Linear.decode(self.raw.SerializeToString()).__repr__()})"
+        return f"Linear({self._rust_expr().__repr__()})"
 
     def __add__(self, other: int | float | DecisionVariable | Linear) -> Linear:
         if isinstance(other, float) or isinstance(other, int):
-            self.raw.constant += other
-            return self
+            return Linear._from_rust(self._rust_expr().add_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Linear.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Linear.from_bytes((new + rhs).encode())
+            return Linear._from_rust(self._rust_expr() + rhs)
         if isinstance(other, Linear):
-            new = _ommx_rust.Linear.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Linear.from_bytes((new + rhs).encode())
+            return Linear._from_rust(self._rust_expr() + other._rust_expr())
         return NotImplemented
 
+    def __iadd__(self, other: int | float | DecisionVariable | Linear) -> Linear:
+        if isinstance(other, float) or isinstance(other, int):
+            self._rust_expr_mut().add_assign_scalar(other)
+        elif isinstance(other, DecisionVariable):
+            rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
+            self._rust_expr_mut().add_assign(rhs)
+        elif isinstance(other, Linear):
+            rhs = self._rust_operand(other)
+            self._rust_expr_mut().add_assign(rhs)
+        else:
+            return NotImplemented
+        return self
+
     def __radd__(self, other):
         return self + other
 
@@ -2300,16 +2929,12 @@ class Linear(AsConstraint):
         self, other: int | float | DecisionVariable | Linear
     ) -> Linear | Quadratic:
         if isinstance(other, float) or isinstance(other, int):
-            new = _ommx_rust.Linear.decode(self.raw.SerializeToString())
-            return Linear.from_bytes(new.mul_scalar(other).encode())
+            return Linear._from_rust(self._rust_expr().mul_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Linear.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Quadratic.from_bytes((new * rhs).encode())
+            return Quadratic._from_rust(self._rust_expr() * rhs)
         if isinstance(other, Linear):
-            new = _ommx_rust.Linear.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Quadratic.from_bytes((new * rhs).encode())
+            return Quadratic._from_rust(self._rust_expr() * other._rust_expr())
         return NotImplemented
 
     def __rmul__(self, other):
@@ -2324,9 +2949,9 @@ class Linear(AsConstraint):
         )
 
 
-@dataclass
-class Quadratic(AsConstraint):
-    raw: _Quadratic
+class Quadratic(_Expression[_Quadratic, _ommx_rust.Quadratic]):
+    _message_type = _Quadratic
+    _rust_type = _ommx_rust.Quadratic
 
     def __init__(
         self,
@@ -2336,35 +2961,55 @@ class Quadratic(AsConstraint):
         values: Iterable[float | int],
         linear: Optional[Linear] = None,
     ):
-        self.raw = _Quadratic(
-            columns=columns,
-            rows=rows,
-            values=values,
-            linear=linear.raw if linear else None,
+        self._raw = None
+        self._rust = _ommx_rust.Quadratic.new(
+            list(columns),
+            list(rows),
+            list(values),
+            linear._rust_expr() if linear is not None else None,
         )
 
     @staticmethod
-    def from_raw(raw: _Quadratic) -> Quadratic:
-        new = Quadratic(columns=[], rows=[], values=[])
-        new.raw = raw
-        return new
+    def from_coo(
+        rows: ArrayLike,
+        cols: ArrayLike,
+        values: ArrayLike,
+        linear: Optional[Linear] = None,
+    ) -> Quadratic:
+        """
+        Create a quadratic function from the quadratic terms in the COO format, e.g. the attributes of ``scipy.sparse.coo_array``.
 
-    @staticmethod
-    def from_bytes(data: bytes) -> Quadratic:
-        new = Quadratic(columns=[], rows=[], values=[])
-        new.raw.ParseFromString(data)
-        return new
+        This is built in Rust without creating Python objects for each term.
 
-    def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
+        Examples
+        =========
+
+        .. doctest::
+
+            >>> import numpy as np
+            >>> Quadratic.from_coo(
+            ...     rows=np.array([1, 2]),
+            ...     cols=np.array([2, 2]),
+            ...     values=np.array([2.0, 3.0]),
+            ...     linear=Linear(terms={1: 1}, constant=1),
+            ... )
+            Quadratic(2*x1*x2 + 3*x2*x2 + x1 + 1)
+
+        """
+        return Quadratic._from_rust(
+            _ommx_rust.Quadratic.from_coo(
+                np.ascontiguousarray(rows, dtype=np.uint64),
+                np.ascontiguousarray(cols, dtype=np.uint64),
+                np.ascontiguousarray(values, dtype=np.float64),
+                linear._rust_expr() if linear is not None else None,
+            )
+        )
 
     def almost_equal(self, other: Quadratic, *, atol: float = 1e-10) -> bool:
         """
         Compare two quadratic functions have almost equal coefficients
         """
-        lhs = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-        rhs = _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-        return lhs.almost_equal(rhs, atol)
+        return self._rust_expr().almost_equal(other._rust_expr(), atol)
 
     def evaluate(self, state: ToState) -> tuple[float, set]:
         """
@@ -2427,15 +3072,19 @@ class Quadratic(AsConstraint):
 
     @property
     def linear(self) -> Linear | None:
-        if self.raw.HasField("linear"):
-            return Linear.from_raw(self.raw.linear)
+        raw = self._raw_message()
+        if raw.HasField("linear"):
+            linear = _Linear()
+            linear.CopyFrom(raw.linear)
+            return Linear.from_raw(linear)
         return None
 
     @property
     def quad_terms(self) -> dict[tuple[int, int], float]:
-        assert len(self.raw.columns) == len(self.raw.rows) == len(self.raw.values)
+        raw = self._raw_message()
+        assert len(raw.columns) == len(raw.rows) == len(raw.values)
         out = {}
-        for column, row, value in zip(self.raw.columns, self.raw.rows, self.raw.values):
+        for column, row, value in zip(raw.columns, raw.rows, raw.values):
             if (column, row) not in out:
                 out[(column, row)] = value
             else:
@@ -2447,28 +3096,41 @@ class Quadratic(AsConstraint):
         return self.quad_terms | (self.linear.terms if self.linear else {})
 
     def __repr__(self) -> str:
-        return f"Quadratic({_ommx_rust.Quadratic.decode(self.raw.SerializeToString()).__repr__()})"
+        return f"Quadratic({self._rust_expr().__repr__()})"
 
     def __add__(
         self, other: int | float | DecisionVariable | Linear | Quadratic
     ) -> Quadratic:
         if isinstance(other, float) or isinstance(other, int):
-            self.raw.linear.constant += other
-            return self
+            return Quadratic._from_rust(self._rust_expr().add_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Quadratic.from_bytes((new.add_linear(rhs)).encode())
+            return Quadratic._from_rust(self._rust_expr().add_linear(rhs))
         if isinstance(other, Linear):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Quadratic.from_bytes((new.add_linear(rhs)).encode())
+            return Quadratic._from_rust(
+                self._rust_expr().add_linear(other._rust_expr())
+            )
         if isinstance(other, Quadratic):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            return Quadratic.from_bytes((new + rhs).encode())
+            return Quadratic._from_rust(self._rust_expr() + other._rust_expr())
         return NotImplemented
 
+    def __iadd__(
+        self, other: int | float | DecisionVariable | Linear | Quadratic
+    ) -> Quadratic:
+        if isinstance(other, float) or isinstance(other, int):
+            self._rust_expr_mut().add_assign_scalar(other)
+        elif isinstance(other, DecisionVariable):
+            rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
+            self._rust_expr_mut().add_assign_linear(rhs)
+        elif isinstance(other, Linear):
+            self._rust_expr_mut().add_assign_linear(other._rust_expr())
+        elif isinstance(other, Quadratic):
+            rhs = self._rust_operand(other)
+            self._rust_expr_mut().add_assign(rhs)
+        else:
+            return NotImplemented
+        return self
+
     def __radd__(self, other):
         return self + other
 
@@ -2492,20 +3154,16 @@ class Quadratic(AsConstraint):
         self, other: int | float | DecisionVariable | Linear | Quadratic
     ) -> Quadratic | Polynomial:
         if isinstance(other, float) or isinstance(other, int):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-            return Quadratic.from_bytes(new.mul_scalar(other).encode())
+            return Quadratic._from_rust(self._rust_expr().mul_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Polynomial.from_bytes(new.mul_linear(rhs).encode())
+            return Polynomial._from_rust(self._rust_expr().mul_linear(rhs))
         if isinstance(other, Linear):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes((new.mul_linear(rhs)).encode())
+            return Polynomial._from_rust(
+                self._rust_expr().mul_linear(other._rust_expr())
+            )
         if isinstance(other, Quadratic):
-            new = _ommx_rust.Quadratic.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes((new * rhs).encode())
+            return Polynomial._from_rust(self._rust_expr() * other._rust_expr())
         return NotImplemented
 
     def __rmul__(self, other):
@@ -2520,52 +3178,32 @@ class Quadratic(AsConstraint):
         )
 
 
-@dataclass
-class Polynomial(AsConstraint):
-    raw: _Polynomial
+class Polynomial(_Expression[_Polynomial, _ommx_rust.Polynomial]):
+    _message_type = _Polynomial
+    _rust_type = _ommx_rust.Polynomial
 
     def __init__(self, *, terms: dict[Iterable[int], float | int] = {}):
-        self.raw = _Polynomial(
-            terms=[
-                _Monomial(ids=ids, coefficient=coefficient)
-                for ids, coefficient in terms.items()
-            ]
+        self._raw = None
+        self._rust = _ommx_rust.Polynomial.new(
+            [(list(ids), coefficient) for ids, coefficient in terms.items()]
         )
 
-    @staticmethod
-    def from_raw(raw: _Polynomial) -> Polynomial:
-        new = Polynomial()
-        new.raw = raw
-        return new
-
-    @staticmethod
-    def from_bytes(data: bytes) -> Polynomial:
-        new = Polynomial()
-        new.raw.ParseFromString(data)
-        return new
-
     @property
     def terms(self) -> dict[tuple[int, ...], float]:
         out = {}
-        for term in self.raw.terms:
-            term.ids.sort()
-            key = tuple(term.ids)
+        for term in self._raw_message().terms:
+            key = tuple(sorted(term.ids))
             if key in out:
                 out[key] += term.coefficient
             else:
                 out[key] = term.coefficient
         return out
 
-    def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
-
     def almost_equal(self, other: Polynomial, *, atol: float = 1e-10) -> bool:
         """
         Compare two polynomial have almost equal coefficients
         """
-        lhs = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-        rhs = _ommx_rust.Polynomial.decode(other.raw.SerializeToString())
-        return lhs.almost_equal(rhs, atol)
+        return self._rust_expr().almost_equal(other._rust_expr(), atol)
 
     def evaluate(self, state: ToState) -> tuple[float, set]:
         """
@@ -2627,32 +3265,47 @@ class Polynomial(AsConstraint):
         return Polynomial.from_bytes(new), used_ids
 
     def __repr__(self) -> str:
-        return f"Polynomial({_ommx_rust.Polynomial.decode(self.raw.SerializeToString()).__repr__()})"
+        return f"Polynomial({self._rust_expr().__repr__()})"
 
     def __add__(
         self, other: int | float | DecisionVariable | Linear | Quadratic | Polynomial
     ) -> Polynomial:
         if isinstance(other, float) or isinstance(other, int):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            return Polynomial.from_bytes(new.add_scalar(other).encode())
+            return Polynomial._from_rust(self._rust_expr().add_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Polynomial.from_bytes(new.add_linear(rhs).encode())
+            return Polynomial._from_rust(self._rust_expr().add_linear(rhs))
         if isinstance(other, Linear):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes(new.add_linear(rhs).encode())
+            return Polynomial._from_rust(
+                self._rust_expr().add_linear(other._rust_expr())
+            )
         if isinstance(other, Quadratic):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes(new.add_quadratic(rhs).encode())
+            return Polynomial._from_rust(
+                self._rust_expr().add_quadratic(other._rust_expr())
+            )
         if isinstance(other, Polynomial):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Polynomial.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes((new + rhs).encode())
+            return Polynomial._from_rust(self._rust_expr() + other._rust_expr())
         return NotImplemented
 
+    def __iadd__(
+        self, other: int | float | DecisionVariable | Linear | Quadratic | Polynomial
+    ) -> Polynomial:
+        if isinstance(other, float) or isinstance(other, int):
+            self._rust_expr_mut().add_assign_scalar(other)
+        elif isinstance(other, DecisionVariable):
+            rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
+            self._rust_expr_mut().add_assign_linear(rhs)
+        elif isinstance(other, Linear):
+            self._rust_expr_mut().add_assign_linear(other._rust_expr())
+        elif isinstance(other, Quadratic):
+            self._rust_expr_mut().add_assign_quadratic(other._rust_expr())
+        elif isinstance(other, Polynomial):
+            rhs = self._rust_operand(other)
+            self._rust_expr_mut().add_assign(rhs)
+        else:
+            return NotImplemented
+        return self
+
     def __radd__(self, other):
         return self + other
 
@@ -2672,24 +3325,20 @@ class Polynomial(AsConstraint):
         self, other: int | float | DecisionVariable | Linear | Quadratic | Polynomial
     ) -> Polynomial:
         if isinstance(other, float) or isinstance(other, int):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            return Polynomial.from_bytes(new.mul_scalar(other).encode())
+            return Polynomial._from_rust(self._rust_expr().mul_scalar(other))
         if isinstance(other, DecisionVariable):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
             rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
-            return Polynomial.from_bytes(new.mul_linear(rhs).encode())
+            return Polynomial._from_rust(self._rust_expr().mul_linear(rhs))
         if isinstance(other, Linear):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes(new.mul_linear(rhs).encode())
+            return Polynomial._from_rust(
+                self._rust_expr().mul_linear(other._rust_expr())
+            )
         if isinstance(other, Quadratic):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes(new.mul_quadratic(rhs).encode())
+            return Polynomial._from_rust(
+                self._rust_expr().mul_quadratic(other._rust_expr())
+            )
         if isinstance(other, Polynomial):
-            new = _ommx_rust.Polynomial.decode(self.raw.SerializeToString())
-            rhs = _ommx_rust.Polynomial.decode(other.raw.SerializeToString())
-            return Polynomial.from_bytes((new * rhs).encode())
+            return Polynomial._from_rust(self._rust_expr() * other._rust_expr())
         return NotImplemented
 
     def __rmul__(self, other):
@@ -2717,24 +3366,50 @@ def as_function(
     if isinstance(f, (int, float)):
         return _Function(constant=f)
     elif isinstance(f, DecisionVariable):
-        return _Function(linear=Linear(terms={f.raw.id: 1}).raw)
+        return _Function(
+            linear=_Linear(terms=[_Linear.Term(id=f.raw.id, coefficient=1)])
+        )
     elif isinstance(f, Linear):
-        return _Function(linear=f.raw)
+        return _Function(linear=f._raw_message())
     elif isinstance(f, Quadratic):
-        return _Function(quadratic=f.raw)
+        return _Function(quadratic=f._raw_message())
     elif isinstance(f, Polynomial):
-        return _Function(polynomial=f.raw)
+        return _Function(polynomial=f._raw_message())
     elif isinstance(f, _Function):
         return f
     elif isinstance(f, Function):
-        return f.raw
+        return f._raw_message()
     else:
         raise ValueError(f"Unknown function type: {type(f)}")
 
 
-@dataclass
-class Function(AsConstraint):
-    raw: _Function
+def _as_rust_function(
+    f: int | float | DecisionVariable | Linear | Quadratic | Polynomial | Function,
+) -> Optional[_ommx_rust.Function]:
+    """
+    Convert to the Rust-side function, or ``None`` for unsupported types.
+    The Rust-side object of :class:`Function` is returned without copying.
+    """
+    if isinstance(f, float) or isinstance(f, int):
+        return _ommx_rust.Function.from_scalar(f)
+    if isinstance(f, DecisionVariable):
+        return _ommx_rust.Function.from_linear(
+            _ommx_rust.Linear.single_term(f.raw.id, 1)
+        )
+    if isinstance(f, Linear):
+        return _ommx_rust.Function.from_linear(f._rust_expr())
+    if isinstance(f, Quadratic):
+        return _ommx_rust.Function.from_quadratic(f._rust_expr())
+    if isinstance(f, Polynomial):
+        return _ommx_rust.Function.from_polynomial(f._rust_expr())
+    if isinstance(f, Function):
+        return f._rust_expr()
+    return None
+
+
+class Function(_Expression[_Function, _ommx_rust.Function]):
+    _message_type = _Function
+    _rust_type = _ommx_rust.Function
 
     def __init__(
         self,
@@ -2746,36 +3421,35 @@ class Function(AsConstraint):
         | Polynomial
         | _Function,
     ):
-        self.raw = as_function(inner)
+        if isinstance(inner, _Function):
+            self._raw = inner
+            self._rust = None
+            return
+        rust = _as_rust_function(inner)
+        if rust is None:
+            raise ValueError(f"Unknown function type: {type(inner)}")
+        self._raw = None
+        # Do not share the Rust-side object with another `Function` since it may be updated in place
+        self._rust = copy.copy(rust) if isinstance(inner, Function) else rust
 
     @property
     def terms(self) -> dict[tuple[int, ...], float]:
-        if self.raw.HasField("constant"):
-            return {(): self.raw.constant}
-        if self.raw.HasField("linear"):
-            return Linear.from_raw(self.raw.linear).terms
-        if self.raw.HasField("quadratic"):
-            return Quadratic.from_raw(self.raw.quadratic).terms
-        if self.raw.HasField("polynomial"):
-            return Polynomial.from_raw(self.raw.polynomial).terms
+        raw = self._raw_message()
+        if raw.HasField("constant"):
+            return {(): raw.constant}
+        if raw.HasField("linear"):
+            return Linear.from_raw(raw.linear).terms
+        if raw.HasField("quadratic"):
+            return Quadratic.from_raw(raw.quadratic).terms
+        if raw.HasField("polynomial"):
+            return Polynomial.from_raw(raw.polynomial).terms
         raise ValueError("Unknown function type")
 
-    @staticmethod
-    def from_bytes(data: bytes) -> Function:
-        new = Function(0)
-        new.raw.ParseFromString(data)
-        return new
-
-    def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
-
     def almost_equal(self, other: Function, *, atol: float = 1e-10) -> bool:
         """
         Compare two functions have almost equal coefficients as a polynomial
         """
-        lhs = _ommx_rust.Function.decode(self.raw.SerializeToString())
-        rhs = _ommx_rust.Function.decode(other.raw.SerializeToString())
-        return lhs.almost_equal(rhs, atol)
+        return self._rust_expr().almost_equal(other._rust_expr(), atol)
 
     def evaluate(self, state: ToState) -> tuple[float, set]:
         """
@@ -2840,9 +3514,7 @@ class Function(AsConstraint):
         """
         Get the IDs of decision variables used in the function.
         """
-        return _ommx_rust.Function.decode(
-            self.raw.SerializeToString()
-        ).used_decision_variable_ids()
+        return self._rust_expr().used_decision_variable_ids()
 
     def content_factor(self) -> float:
         r"""
@@ -2878,10 +3550,10 @@ class Function(AsConstraint):
         In practice, you must check if the multiplier is enough small.
 
         """
-        return _ommx_rust.Function.decode(self.raw.SerializeToString()).content_factor()
+        return self._rust_expr().content_factor()
 
     def __repr__(self) -> str:
-        return f"Function({_ommx_rust.Function.decode(self.raw.SerializeToString()).__repr__()})"
+        return f"Function({self._rust_expr().__repr__()})"
 
     def __add__(
         self,
@@ -2892,31 +3564,39 @@ class Function(AsConstraint):
         | Quadratic
         | Polynomial
         | Function,
+    ) -> Function:
+        rhs = _as_rust_function(other)
+        if rhs is None:
+            return NotImplemented
+        return Function._from_rust(self._rust_expr() + rhs)
+
+    def __iadd__(
+        self,
+        other: int
+        | float
+        | DecisionVariable
+        | Linear
+        | Quadratic
+        | Polynomial
+        | Function,
     ) -> Function:
         if isinstance(other, float) or isinstance(other, int):
-            rhs = _ommx_rust.Function.from_scalar(other)
+            self._rust_expr_mut().add_assign_scalar(other)
         elif isinstance(other, DecisionVariable):
-            rhs = _ommx_rust.Function.from_linear(
-                _ommx_rust.Linear.single_term(other.raw.id, 1)
-            )
+            rhs = _ommx_rust.Linear.single_term(other.raw.id, 1)
+            self._rust_expr_mut().add_assign_linear(rhs)
         elif isinstance(other, Linear):
-            rhs = _ommx_rust.Function.from_linear(
-                _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            )
+            self._rust_expr_mut().add_assign_linear(other._rust_expr())
         elif isinstance(other, Quadratic):
-            rhs = _ommx_rust.Function.from_quadratic(
-                _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            )
+            self._rust_expr_mut().add_assign_quadratic(other._rust_expr())
         elif isinstance(other, Polynomial):
-            rhs = _ommx_rust.Function.from_polynomial(
-                _ommx_rust.Polynomial.decode(other.raw.SerializeToString())
-            )
+            self._rust_expr_mut().add_assign_polynomial(other._rust_expr())
         elif isinstance(other, Function):
-            rhs = _ommx_rust.Function.decode(other.raw.SerializeToString())
+            rhs = self._rust_operand(other)
+            self._rust_expr_mut().add_assign(rhs)
         else:
             return NotImplemented
-        new = _ommx_rust.Function.decode(self.raw.SerializeToString())
-        return Function.from_bytes((new + rhs).encode())
+        return self
 
     def __radd__(self, other):
         return self + other
@@ -2946,30 +3626,10 @@ class Function(AsConstraint):
         | Polynomial
         | Function,
     ) -> Function:
-        if isinstance(other, float) or isinstance(other, int):
-            rhs = _ommx_rust.Function.from_scalar(other)
-        elif isinstance(other, DecisionVariable):
-            rhs = _ommx_rust.Function.from_linear(
-                _ommx_rust.Linear.single_term(other.raw.id, 1)
-            )
-        elif isinstance(other, Linear):
-            rhs = _ommx_rust.Function.from_linear(
-                _ommx_rust.Linear.decode(other.raw.SerializeToString())
-            )
-        elif isinstance(other, Quadratic):
-            rhs = _ommx_rust.Function.from_quadratic(
-                _ommx_rust.Quadratic.decode(other.raw.SerializeToString())
-            )
-        elif isinstance(other, Polynomial):
-            rhs = _ommx_rust.Function.from_polynomial(
-                _ommx_rust.Polynomial.decode(other.raw.SerializeToString())
-            )
-        elif isinstance(other, Function):
-            rhs = _ommx_rust.Function.decode(other.raw.SerializeToString())
-        else:
+        rhs = _as_rust_function(other)
+        if rhs is None:
             return NotImplemented
-        new = _ommx_rust.Function.decode(self.raw.SerializeToString())
-        return Function.from_bytes((new * rhs).encode())
+        return Function._from_rust(self._rust_expr() * rhs)
 
     def __rmul__(self, other):
         return self * other
@@ -3298,6 +3958,11 @@ class SampleSet(UserAnnotationBase):
 
     Of course, the sample of smallest objective value is returned for minimization problems.
 
+    The lookups by sample ID, e.g. :meth:`get` and :meth:`best_feasible`, use an index from sample IDs to the sampled values,
+    which is built on the first lookup and cached in this object.
+    The cache is rebuilt when another message is assigned to :py:attr:`raw`,
+    but in-place modifications of the message after the first lookup are not reflected to these lookups.
+
     """
 
     raw: _SampleSet
@@ -3315,6 +3980,13 @@ class SampleSet(UserAnnotationBase):
     """When the optimization ended, stored as ``org.ommx.v1.sample-set.end`` annotation in RFC3339 format in OMMX artifact."""
     annotations: dict[str, str] = field(default_factory=dict)
     """Arbitrary annotations stored in OMMX artifact. Use :py:attr:`parameters` or other specific attributes if possible."""
+    _rust: Optional[_ommx_rust.SampleSet] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # The message from which `_rust` is built, to detect assignments to `raw`
+    _rust_raw: Optional[_SampleSet] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @property
     def _annotations(self) -> dict[str, str]:
@@ -3322,12 +3994,69 @@ class SampleSet(UserAnnotationBase):
 
     @staticmethod
     def from_bytes(data: bytes) -> SampleSet:
+        """
+        Deserialize a sample set from the protobuf encoding, or the compact encoding created by :meth:`to_bytes`.
+        """
         new = SampleSet(_SampleSet())
-        new.raw.ParseFromString(data)
+        if _ommx_rust.SampleSet.is_compact_bytes(data):
+            rust = _ommx_rust.SampleSet.from_bytes(data)
+            new.raw.ParseFromString(rust.to_bytes())
+            new._rust = rust
+            new._rust_raw = new.raw
+        else:
+            new.raw.ParseFromString(data)
         return new
 
-    def to_bytes(self) -> bytes:
-        return self.raw.SerializeToString()
+    def _rust_sample_set(self) -> _ommx_rust.SampleSet:
+        """Rust-side sample set which caches the index for the lookups by sample ID."""
+        if self._rust is None or self._rust_raw is not self.raw:
+            self._rust = _ommx_rust.SampleSet.from_bytes(self.to_bytes())
+            self._rust_raw = self.raw
+        return self._rust
+
+    def __getstate__(self) -> dict:
+        # The cached Rust-side sample set cannot be copied or pickled, and is rebuilt on the next lookup
+        state = self.__dict__.copy()
+        state["_rust"] = None
+        state["_rust_raw"] = None
+        return state
+
+    def to_bytes(
+        self,
+        format: Literal["protobuf", "compact"] = "protobuf",
+        zstd_level: Optional[int] = None,
+    ) -> bytes:
+        """
+        Serialize the sample set into the protobuf encoding, or the compact encoding.
+
+        The compact encoding stores the sample IDs only once and the sampled values as columns,
+        where binary columns are bit-packed and columns of a few distinct values, e.g. integer decision variables, are dictionary-encoded.
+        It is compressed further by zstd if ``zstd_level`` is given. This is readable only by :meth:`from_bytes` of this or later versions.
+
+        .. doctest::
+
+            >>> x = [DecisionVariable.binary(i) for i in range(100)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=sum(x),
+            ...     constraints=[],
+            ...     sense=Instance.MINIMIZE,
+            ... )
+            >>> sample_set = instance.evaluate_samples(
+            ...     [{i: (s >> (i % 8)) & 1 for i in range(100)} for s in range(256)]
+            ... )
+            >>> compact = sample_set.to_bytes("compact")
+            >>> len(compact) * 5 < len(sample_set.to_bytes())
+            True
+            >>> SampleSet.from_bytes(compact).objectives == sample_set.objectives
+            True
+
+        """
+        if format == "protobuf":
+            return self.raw.SerializeToString()
+        if format == "compact":
+            return self._rust_sample_set().to_compact_bytes(zstd_level)
+        raise ValueError(f"Unknown format: {format}")
 
     @property
     def summary(self) -> DataFrame:
@@ -3471,8 +4200,11 @@ class SampleSet(UserAnnotationBase):
     ) -> dict[tuple[int, ...], float]:
         """
         Extract sampled decision variable values for a given name and sample ID.
+
+        :raises KeyError: If the sample ID is not found.
         """
         out = {}
+        values: Optional[dict[int, float]] = None
         for sampled_decision_variable in self.raw.decision_variables:
             v = sampled_decision_variable.decision_variable
             if v.name != name:
@@ -3483,10 +4215,9 @@ class SampleSet(UserAnnotationBase):
                     f"Duplicate decision variable subscript: {v.subscripts}"
                 )
 
-            if v.HasField("substituted_value"):
-                out[key] = v.substituted_value
-                continue
-            out[key] = SampledValues(sampled_decision_variable.samples)[sample_id]
+            if values is None:
+                values = self._rust_sample_set().decision_variable_values(sample_id)
+            out[key] = values[v.id]
         return out
 
     def extract_constraints(
@@ -3494,40 +4225,341 @@ class SampleSet(UserAnnotationBase):
     ) -> dict[tuple[int, ...], float]:
         """
         Extract evaluated constraint violations for a given constraint name and sample ID.
+
+        :raises KeyError: If the sample ID is not found.
         """
         out = {}
+        values: Optional[dict[int, float]] = None
         for c in self.raw.constraints:
             if c.name != name:
                 continue
             key = tuple(c.subscripts)
             if key in out:
                 raise ValueError(f"Duplicate constraint subscript: {c.subscripts}")
-            out[key] = SampledValues(c.evaluated_values)[sample_id]
+            if values is None:
+                values = self._rust_sample_set().constraint_values(sample_id)
+            out[key] = values[c.id]
         return out
 
     def get(self, sample_id: int) -> Solution:
         """
         Get a sample for a given ID as a solution format
         """
-        solution = _ommx_rust.SampleSet.from_bytes(self.to_bytes()).get(sample_id)
+        solution = self._rust_sample_set().get(sample_id)
         return Solution.from_bytes(solution.to_bytes())
 
+    def decision_variable_matrix(self) -> _ommx_rust.SampleMatrix:
+        """
+        Dense ``(num_samples, num_decision_variables)`` matrix of sampled decision variable values.
+
+        The rows and columns are sorted by sample ID and decision variable ID, respectively,
+        and exposed as NumPy arrays without copying.
+        Use :py:meth:`_ommx_rust.SampleMatrix.get` for O(1) lookup by sample ID and decision variable ID.
+
+        .. doctest::
+
+            >>> x = [DecisionVariable.binary(i) for i in range(3)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=sum(x),
+            ...     constraints=[],
+            ...     sense=Instance.MINIMIZE,
+            ... )
+            >>> sample_set = instance.evaluate_samples({
+            ...     0: {0: 1, 1: 0, 2: 1},
+            ...     1: {0: 0, 1: 1, 2: 1},
+            ... })
+            >>> matrix = sample_set.decision_variable_matrix()
+            >>> matrix.values
+            array([[1., 0., 1.],
+                   [0., 1., 1.]])
+            >>> matrix.sample_ids
+            array([0, 1], dtype=uint64)
+            >>> matrix.get(1, 1)
+            1.0
+
+        """
+        return self._rust_sample_set().decision_variable_matrix()
+
+    def to_arrow(
+        self,
+        table: Literal["summary", "decision_variables", "constraints"] = "summary",
+        layout: Literal["long", "wide"] = "long",
+    ) -> pa.Table:
+        """
+        Sampled values as a ``pyarrow.Table`` built from the columnar arrays of Rust without pandas.
+
+        - ``table="summary"`` has ``sample_id``, ``objective``, ``feasible`` and ``feasible_relaxed`` columns, and ``layout`` is ignored.
+        - ``table="decision_variables"`` in ``layout="long"`` has ``sample_id``, ``decision_variable_id`` and ``value`` columns,
+          and in ``layout="wide"`` has ``sample_id`` and a column for each decision variable, e.g. ``"3"``.
+        - ``table="constraints"`` in ``layout="long"`` has ``sample_id``, ``constraint_id``, ``value`` and ``feasible`` columns,
+          and in ``layout="wide"`` has ``sample_id``, ``value.{id}`` and ``feasible.{id}`` columns for each constraint.
+
+        The rows are sorted by the IDs. Use :meth:`metadata_to_arrow` for the names, subscripts and so on to join with.
+
+        .. doctest::
+
+            >>> x = [DecisionVariable.binary(i) for i in range(2)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=x[0] + x[1],
+            ...     constraints=[(x[0] + x[1] <= 1).set_id(0)],
+            ...     sense=Instance.MAXIMIZE,
+            ... )
+            >>> sample_set = instance.evaluate_samples({
+            ...     0: {0: 1, 1: 0},
+            ...     1: {0: 1, 1: 1},
+            ... })
+            >>> sample_set.to_arrow("decision_variables").to_pydict()
+            {'sample_id': [0, 0, 1, 1], 'decision_variable_id': [0, 1, 0, 1], 'value': [1.0, 0.0, 1.0, 1.0]}
+            >>> sample_set.to_arrow("constraints", layout="wide").to_pydict()
+            {'sample_id': [0, 1], 'value.0': [0.0, 1.0], 'feasible.0': [True, False]}
+
+        """
+        if table == "summary":
+            objectives = self.objectives
+            feasible = self.feasible
+            feasible_relaxed = self.feasible_relaxed
+            sample_ids = sorted(objectives)
+            return pa.table(
+                {
+                    "sample_id": pa.array(sample_ids, type=pa.uint64()),
+                    "objective": pa.array(
+                        [objectives[id] for id in sample_ids], type=pa.float64()
+                    ),
+                    "feasible": pa.array([feasible[id] for id in sample_ids]),
+                    "feasible_relaxed": pa.array(
+                        [feasible_relaxed[id] for id in sample_ids]
+                    ),
+                }
+            )
+        if table == "decision_variables":
+            matrix = self.decision_variable_matrix()
+            sample_ids = matrix.sample_ids
+            ids = matrix.decision_variable_ids
+            if layout == "long":
+                return pa.table(
+                    {
+                        "sample_id": np.repeat(sample_ids, len(ids)),
+                        "decision_variable_id": np.tile(ids, len(sample_ids)),
+                        "value": matrix.values.ravel(),
+                    }
+                )
+            if layout == "wide":
+                values = np.asfortranarray(matrix.values)
+                return pa.table(
+                    {"sample_id": sample_ids}
+                    | {str(id): values[:, j] for j, id in enumerate(ids)}
+                )
+            raise ValueError(f"Unknown layout: {layout}")
+        if table == "constraints":
+            sample_ids, ids, values, feasible = (
+                self._rust_sample_set().constraint_columns()
+            )
+            if layout == "long":
+                return pa.table(
+                    {
+                        "sample_id": np.tile(sample_ids, len(ids)),
+                        "constraint_id": np.repeat(ids, len(sample_ids)),
+                        "value": values.ravel(),
+                        "feasible": feasible.ravel(),
+                    }
+                )
+            if layout == "wide":
+                return pa.table(
+                    {"sample_id": sample_ids}
+                    | {f"value.{id}": values[j] for j, id in enumerate(ids)}
+                    | {f"feasible.{id}": feasible[j] for j, id in enumerate(ids)}
+                )
+            raise ValueError(f"Unknown layout: {layout}")
+        raise ValueError(f"Unknown table: {table}")
+
+    def metadata_to_arrow(
+        self,
+        table: Literal["decision_variables", "constraints"] = "decision_variables",
+    ) -> pa.Table:
+        """
+        Metadata of the sampled decision variables or constraints as a ``pyarrow.Table`` sorted by ``id`` column,
+        to be joined with the ``decision_variable_id`` or ``constraint_id`` column of :meth:`to_arrow`.
+        """
+        if table == "decision_variables":
+            return _decision_variables_arrow(
+                sorted(
+                    (v.decision_variable for v in self.raw.decision_variables), key=_id
+                )
+            )
+        if table == "constraints":
+            constraints = sorted(self.raw.constraints, key=_id)
+            return _constraints_arrow(constraints).append_column(
+                "removed_reason",
+                _optional_column(constraints, "removed_reason", pa.string()),
+            )
+        raise ValueError(f"Unknown table: {table}")
+
+    def write_parquet(
+        self,
+        where,
+        table: Literal["summary", "decision_variables", "constraints"] = "summary",
+        layout: Literal["long", "wide"] = "long",
+    ) -> None:
+        """
+        Write the table of :meth:`to_arrow` into a parquet file. ``where`` is a path or a writable file-like object.
+        """
+        _write_parquet(self.to_arrow(table, layout), where)
+
     def best_feasible(self) -> Solution:
         """
         Get the best feasible solution
         """
-        solution = _ommx_rust.SampleSet.from_bytes(self.to_bytes()).best_feasible()
+        solution = self._rust_sample_set().best_feasible()
         return Solution.from_bytes(solution.to_bytes())
 
     def best_feasible_unrelaxed(self) -> Solution:
         """
         Get the best feasible solution without relaxation
         """
-        solution = _ommx_rust.SampleSet.from_bytes(
-            self.to_bytes()
-        ).best_feasible_unrelaxed()
+        solution = self._rust_sample_set().best_feasible_unrelaxed()
         return Solution.from_bytes(solution.to_bytes())
 
+    def top_k(
+        self, k: int, feasible_only: bool = True, relaxed: bool = False
+    ) -> list[Solution]:
+        """
+        Get the best ``k`` samples in terms of the objective value as solutions, sorted from the best.
+
+        Only the ``k`` samples are selected and sorted in Rust, and the other samples are never converted into :class:`Solution`.
+
+        :param feasible_only: Rank only the feasible samples.
+        :param relaxed: Use the feasibility for the remaining constraints (:attr:`feasible_relaxed`) instead of the original constraints (:attr:`feasible`).
+
+        .. doctest::
+
+            >>> x = [DecisionVariable.binary(i) for i in range(3)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=x[0] + 2*x[1] + 3*x[2],
+            ...     constraints=[sum(x) <= 1],
+            ...     sense=Instance.MAXIMIZE,
+            ... )
+            >>> sample_set = instance.evaluate_samples({
+            ...     0: {0: 1, 1: 0, 2: 0},
+            ...     1: {0: 0, 1: 1, 2: 0},
+            ...     2: {0: 1, 1: 1, 2: 1},
+            ...     3: {0: 0, 1: 0, 2: 1},
+            ... })
+            >>> [solution.objective for solution in sample_set.top_k(2)]
+            [3.0, 2.0]
+            >>> [solution.objective for solution in sample_set.top_k(2, feasible_only=False)]
+            [6.0, 3.0]
+
+        """
+        rust = self._rust_sample_set()
+        return [
+            Solution.from_bytes(rust.get(sample_id).to_bytes())
+            for sample_id in rust.top_k_ids(k, feasible_only, relaxed)
+        ]
+
+    def iter_solutions(
+        self,
+        order: Literal["objective", "sample_id"] = "objective",
+        feasible_only: bool = False,
+        relaxed: bool = False,
+    ) -> Iterator[Solution]:
+        """
+        Iterate over the samples as solutions one by one, from the best objective value or in ascending order of sample ID.
+
+        Each :class:`Solution` is created only when it is consumed,
+        so that taking the first few items, e.g. by :py:func:`itertools.islice`, does not convert all the samples.
+        See :meth:`top_k` for ``feasible_only`` and ``relaxed``.
+        """
+        rust = self._rust_sample_set()
+        if order == "objective":
+            sample_ids = rust.sorted_ids(feasible_only, relaxed)
+        elif order == "sample_id":
+            if not feasible_only:
+                sample_ids = sorted(rust.sample_ids())
+            elif relaxed:
+                sample_ids = sorted(rust.feasible_ids())
+            else:
+                sample_ids = sorted(rust.feasible_unrelaxed_ids())
+        else:
+            raise ValueError(f"Unknown order: {order}")
+        for sample_id in sample_ids:
+            yield Solution.from_bytes(rust.get(sample_id).to_bytes())
+
+    def statistics(
+        self,
+        quantiles: Sequence[float] = (0.0, 0.25, 0.5, 0.75, 1.0),
+        bins: int = 10,
+    ) -> _ommx_rust.SampleSetStatistics:
+        """
+        Aggregate the feasibility rate, quantiles of the objective values, and histograms of the constraint violations
+        in a single pass over the sampled values in Rust.
+
+        :param quantiles: Probabilities in ``[0, 1]`` at which the quantiles of the objective values are evaluated.
+        :param bins: Number of the equal-width bins of the violation histograms.
+
+        .. doctest::
+
+            >>> x = [DecisionVariable.binary(i) for i in range(3)]
+            >>> instance = Instance.from_components(
+            ...     decision_variables=x,
+            ...     objective=x[0] + 2*x[1] + 3*x[2],
+            ...     constraints=[(sum(x) <= 1).set_id(0)],
+            ...     sense=Instance.MAXIMIZE,
+            ... )
+            >>> sample_set = instance.evaluate_samples({
+            ...     0: {0: 1, 1: 0, 2: 0},
+            ...     1: {0: 0, 1: 1, 2: 0},
+            ...     2: {0: 1, 1: 1, 2: 1},
+            ...     3: {0: 0, 1: 0, 2: 1},
+            ... })
+            >>> stats = sample_set.statistics(quantiles=[0.0, 0.5, 1.0], bins=2)
+            >>> stats.feasibility_rate
+            0.75
+            >>> stats.objective_quantiles
+            [(0.0, 1.0), (0.5, 2.5), (1.0, 6.0)]
+            >>> edges, counts = stats.violation_histograms[0]
+            >>> edges
+            array([0., 1., 2.])
+            >>> counts
+            array([3, 1], dtype=uint64)
+
+        """
+        return self._rust_sample_set().statistics(list(quantiles), bins)
+
+
+@dataclass
+class QuboArrays:
+    r"""
+    QUBO as an upper-triangular matrix :math:`Q` in the coordinate (COO) format, created by :py:meth:`Instance.as_qubo_arrays`.
+
+    The objective function is :math:`x^T Q x + \text{offset}`, where ``Q[rows[k], columns[k]] = values[k]`` with ``rows[k] <= columns[k]``,
+    and ``x[i]`` is the binary decision variable whose ID is ``ids[i]``.
+    """
+
+    ids: NDArray[np.uint64]
+    """Sorted IDs of the decision variables corresponding to the indices of the matrix"""
+    rows: NDArray[np.uint64]
+    columns: NDArray[np.uint64]
+    values: NDArray[np.float64]
+    offset: float
+
+    def to_scipy(self):
+        """
+        Create ``scipy.sparse.coo_array`` of the shape ``(len(ids), len(ids))``. This requires ``scipy``.
+        """
+        from scipy.sparse import coo_array
+
+        n = len(self.ids)
+        return coo_array((self.values, (self.rows, self.columns)), shape=(n, n))
+
+    def to_state(self, x: ArrayLike) -> State:
+        """
+        Convert a binary vector ``x``, e.g. a solution of a sampler, into :class:`State` with the decision variable IDs.
+        """
+        return State(entries=dict(zip(self.ids.tolist(), np.asarray(x).tolist())))
+
 
 @dataclass
 class SampledValues:
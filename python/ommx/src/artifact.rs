@@ -1,72 +1,217 @@
 use crate::PyDescriptor;
-use anyhow::Result;
-use derive_more::{Deref, From};
+use anyhow::{ensure, Context, Result};
 use ocipkg::{
     image::{Image, OciArchive, OciDir},
+    oci_spec::image::{Descriptor, ImageManifest},
     Digest, ImageName,
 };
-use ommx::artifact::{image_dir, Artifact};
-use pyo3::{prelude::*, types::PyBytes};
+use ommx::artifact::{image_dir, ArchiveReader, Artifact};
+use pyo3::{exceptions::PyValueError, prelude::*, types::PyBytes};
 use std::{collections::HashMap, path::PathBuf, sync::Mutex};
 
+/// Manifest of an artifact parsed on the first access, with the indexes of layers by digest and media type.
+///
+/// The manifest of a local artifact never changes, so that it is safe to keep it while the artifact is opened.
+struct ManifestIndex {
+    image_name: Option<String>,
+    annotations: HashMap<String, String>,
+    layers: Vec<Descriptor>,
+    by_digest: HashMap<String, usize>,
+    by_media_type: HashMap<String, Vec<usize>>,
+}
+
+impl ManifestIndex {
+    fn from_artifact<Base: Image>(artifact: &mut Artifact<Base>) -> Result<Self> {
+        let image_name = artifact.get_name().map(|name| name.to_string()).ok();
+        Ok(Self::new(image_name, artifact.get_manifest()?))
+    }
+
+    /// Read `index.json` and the manifest at the offsets indexed by the reader, instead of scanning the archive
+    fn from_reader(reader: &ArchiveReader) -> Result<Self> {
+        let image_name = reader.get_name().map(|name| name.to_string()).ok();
+        Ok(Self::new(image_name, reader.get_manifest()?))
+    }
+
+    fn new(image_name: Option<String>, manifest: ImageManifest) -> Self {
+        let layers = manifest.layers().clone();
+        let mut by_digest = HashMap::new();
+        let mut by_media_type: HashMap<String, Vec<usize>> = HashMap::new();
+        for (i, desc) in layers.iter().enumerate() {
+            by_digest.insert(desc.digest().to_string(), i);
+            by_media_type
+                .entry(desc.media_type().to_string())
+                .or_default()
+                .push(i);
+        }
+        Self {
+            image_name,
+            annotations: manifest.annotations().as_ref().cloned().unwrap_or_default(),
+            layers,
+            by_digest,
+            by_media_type,
+        }
+    }
+
+    fn layers(&self) -> Vec<PyDescriptor> {
+        self.layers
+            .iter()
+            .cloned()
+            .map(PyDescriptor::from)
+            .collect()
+    }
+
+    fn get_layer_descriptor(&self, digest: &str) -> PyResult<PyDescriptor> {
+        let i = self
+            .by_digest
+            .get(digest)
+            .ok_or_else(|| PyValueError::new_err(format!("Layer {digest} not found")))?;
+        Ok(self.layers[*i].clone().into())
+    }
+
+    fn get_layer_descriptors(&self, media_type: &str) -> Vec<PyDescriptor> {
+        self.by_media_type
+            .get(media_type)
+            .into_iter()
+            .flatten()
+            .map(|i| self.layers[*i].clone().into())
+            .collect()
+    }
+}
+
+/// Slice `blob[offset..offset + length]` with bounds check, for the artifacts without random access
+fn blob_range(blob: &[u8], offset: u64, length: Option<u64>) -> Result<&[u8]> {
+    let size = blob.len() as u64;
+    let end = match length {
+        Some(length) => offset
+            .checked_add(length)
+            .context("Range of the blob overflows")?,
+        None => size,
+    };
+    ensure!(
+        offset <= end && end <= size,
+        "Range {offset}..{end} is out of blob of {size} bytes"
+    );
+    Ok(&blob[offset as usize..end as usize])
+}
+
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
 #[pyo3(module = "ommx._ommx_rust")]
-#[derive(From, Deref)]
-pub struct ArtifactArchive(Mutex<Artifact<OciArchive>>);
+pub struct ArtifactArchive {
+    artifact: Mutex<Artifact<OciArchive>>,
+    manifest: Option<ManifestIndex>,
+    /// Random-access reader of the manifest and blobs, available when the path of the archive is known
+    reader: Option<ArchiveReader>,
+}
 
 impl From<Artifact<OciArchive>> for ArtifactArchive {
     fn from(artifact: Artifact<OciArchive>) -> Self {
-        Self(Mutex::new(artifact))
+        Self {
+            artifact: Mutex::new(artifact),
+            manifest: None,
+            reader: None,
+        }
+    }
+}
+
+impl ArtifactArchive {
+    pub(crate) fn with_reader(artifact: Artifact<OciArchive>, reader: ArchiveReader) -> Self {
+        Self {
+            reader: Some(reader),
+            ..artifact.into()
+        }
+    }
+
+    fn manifest(&mut self) -> Result<&ManifestIndex> {
+        if self.manifest.is_none() {
+            let manifest = match &self.reader {
+                Some(reader) => ManifestIndex::from_reader(reader)?,
+                None => ManifestIndex::from_artifact(&mut *self.artifact.lock().unwrap())?,
+            };
+            self.manifest = Some(manifest);
+        }
+        Ok(self.manifest.as_ref().unwrap())
     }
 }
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl ArtifactArchive {
+    /// Open an OCI archive, indexing the offsets of blobs in it
+    ///
+    /// If `persist_index` is true, the index is stored as a sidecar file `<path>.index.json` to skip indexing on the next open.
     #[staticmethod]
-    pub fn from_oci_archive(path: PathBuf) -> Result<Self> {
+    #[pyo3(signature = (path, persist_index=false))]
+    pub fn from_oci_archive(path: PathBuf, persist_index: bool) -> Result<Self> {
         let artifact = Artifact::from_oci_archive(&path)?;
-        Ok(Self(artifact.into()))
+        let reader = ArchiveReader::open(&path, persist_index)?;
+        Ok(Self::with_reader(artifact, reader))
     }
 
     #[getter]
     pub fn image_name(&mut self) -> Option<String> {
-        self.0
-            .lock()
-            .unwrap()
-            .get_name()
-            .map(|name| name.to_string())
-            .ok()
+        self.manifest().ok()?.image_name.clone()
     }
 
     #[getter]
     pub fn annotations(&mut self) -> Result<HashMap<String, String>> {
-        let manifest = self.0.lock().unwrap().get_manifest()?;
-        Ok(manifest.annotations().as_ref().cloned().unwrap_or_default())
+        Ok(self.manifest()?.annotations.clone())
     }
 
     #[getter]
     pub fn layers(&mut self) -> Result<Vec<PyDescriptor>> {
-        let manifest = self.0.lock().unwrap().get_manifest()?;
-        Ok(manifest
-            .layers()
-            .iter()
-            .cloned()
-            .map(PyDescriptor::from)
-            .collect())
+        Ok(self.manifest()?.layers())
+    }
+
+    /// Look up a layer descriptor by digest
+    pub fn get_layer_descriptor(&mut self, digest: &str) -> PyResult<PyDescriptor> {
+        self.manifest()?.get_layer_descriptor(digest)
+    }
+
+    /// Layer descriptors of the media type in the order of the manifest
+    pub fn get_layer_descriptors(&mut self, media_type: &str) -> Result<Vec<PyDescriptor>> {
+        Ok(self.manifest()?.get_layer_descriptors(media_type))
     }
 
     pub fn get_blob<'py>(&mut self, py: Python<'py>, digest: &str) -> Result<Bound<'py, PyBytes>> {
         let digest = Digest::new(digest)?;
-        let blob = self.0.lock().unwrap().get_blob(&digest)?;
+        if let Some(reader) = &self.reader {
+            return Ok(PyBytes::new(py, &reader.get_blob(&digest)?));
+        }
+        let blob = self.artifact.lock().unwrap().get_blob(&digest)?;
         Ok(PyBytes::new(py, blob.as_ref()))
     }
 
+    /// Read `length` bytes of the blob from `offset`, or until the end of the blob if `length` is not given
+    #[pyo3(signature = (digest, offset, length=None))]
+    pub fn get_blob_range<'py>(
+        &mut self,
+        py: Python<'py>,
+        digest: &str,
+        offset: u64,
+        length: Option<u64>,
+    ) -> Result<Bound<'py, PyBytes>> {
+        let digest = Digest::new(digest)?;
+        if let Some(reader) = &self.reader {
+            let end = match length {
+                Some(length) => offset
+                    .checked_add(length)
+                    .context("Range of the blob overflows")?,
+                None => reader.index().get_blob(&digest).map_or(offset, |e| e.size),
+            };
+            return Ok(PyBytes::new(
+                py,
+                &reader.get_blob_range(&digest, offset..end)?,
+            ));
+        }
+        let blob = self.artifact.lock().unwrap().get_blob(&digest)?;
+        Ok(PyBytes::new(py, blob_range(&blob, offset, length)?))
+    }
+
     pub fn push(&mut self) -> Result<()> {
         // Do not expose Artifact<Remote> to Python API for simplicity.
         // In Python API, the `Artifact` class always refers to the local artifact, which may be either an OCI archive or an OCI directory.
-        let _remote = self.0.lock().unwrap().push()?;
+        let _remote = self.artifact.lock().unwrap().push()?;
         Ok(())
     }
 }
@@ -74,8 +219,28 @@ impl ArtifactArchive {
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
 #[pyo3(module = "ommx._ommx_rust")]
-#[derive(From, Deref)]
-pub struct ArtifactDir(Artifact<OciDir>);
+pub struct ArtifactDir {
+    artifact: Artifact<OciDir>,
+    manifest: Option<ManifestIndex>,
+}
+
+impl From<Artifact<OciDir>> for ArtifactDir {
+    fn from(artifact: Artifact<OciDir>) -> Self {
+        Self {
+            artifact,
+            manifest: None,
+        }
+    }
+}
+
+impl ArtifactDir {
+    fn manifest(&mut self) -> Result<&ManifestIndex> {
+        if self.manifest.is_none() {
+            self.manifest = Some(ManifestIndex::from_artifact(&mut self.artifact)?);
+        }
+        Ok(self.manifest.as_ref().unwrap())
+    }
+}
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
@@ -85,50 +250,67 @@ impl ArtifactDir {
         let image_name = ImageName::parse(image_name)?;
         let local_path = image_dir(&image_name)?;
         if local_path.exists() {
-            return Ok(Self(Artifact::from_oci_dir(&local_path)?));
+            return Ok(Artifact::from_oci_dir(&local_path)?.into());
         }
         let mut remote = Artifact::from_remote(image_name)?;
-        Ok(Self(remote.pull()?))
+        Ok(remote.pull()?.into())
     }
 
     #[staticmethod]
     pub fn from_oci_dir(path: PathBuf) -> Result<Self> {
         let artifact = Artifact::from_oci_dir(&path)?;
-        Ok(Self(artifact))
+        Ok(artifact.into())
     }
 
     #[getter]
     pub fn image_name(&mut self) -> Option<String> {
-        self.0.get_name().map(|name| name.to_string()).ok()
+        self.manifest().ok()?.image_name.clone()
     }
 
     #[getter]
     pub fn annotations(&mut self) -> Result<HashMap<String, String>> {
-        let manifest = self.0.get_manifest()?;
-        Ok(manifest.annotations().as_ref().cloned().unwrap_or_default())
+        Ok(self.manifest()?.annotations.clone())
     }
 
     #[getter]
     pub fn layers(&mut self) -> Result<Vec<PyDescriptor>> {
-        let manifest = self.0.get_manifest()?;
-        Ok(manifest
-            .layers()
-            .iter()
-            .cloned()
-            .map(PyDescriptor::from)
-            .collect())
+        Ok(self.manifest()?.layers())
+    }
+
+    /// Look up a layer descriptor by digest
+    pub fn get_layer_descriptor(&mut self, digest: &str) -> PyResult<PyDescriptor> {
+        self.manifest()?.get_layer_descriptor(digest)
+    }
+
+    /// Layer descriptors of the media type in the order of the manifest
+    pub fn get_layer_descriptors(&mut self, media_type: &str) -> Result<Vec<PyDescriptor>> {
+        Ok(self.manifest()?.get_layer_descriptors(media_type))
     }
 
     pub fn get_blob<'py>(&mut self, py: Python<'py>, digest: &str) -> Result<Bound<'py, PyBytes>> {
         let digest = Digest::new(digest)?;
-        let blob = self.0.get_blob(&digest)?;
+        let blob = self.artifact.get_blob(&digest)?;
         Ok(PyBytes::new(py, blob.as_ref()))
     }
 
+    /// Read `length` bytes of the blob from `offset`, or until the end of the blob if `length` is not given
+    #[pyo3(signature = (digest, offset, length=None))]
+    pub fn get_blob_range<'py>(
+        &mut self,
+        py: Python<'py>,
+        digest: &str,
+        offset: u64,
+        length: Option<u64>,
+    ) -> Result<Bound<'py, PyBytes>> {
+        let digest = Digest::new(digest)?;
+        let blob = self.artifact.get_blob(&digest)?;
+        Ok(PyBytes::new(py, blob_range(&blob, offset, length)?))
+    }
+
     pub fn push(&mut self) -> Result<()> {
         // Do not expose Artifact<Remote> to Python API for simplicity.
         // In Python API, the `Artifact` class always refers to the local artifact, which may be either an OCI archive or an OCI directory.
-        let _remote = self.0.push()?;
+        let _remote = self.artifact.push()?;
         Ok(())
     }
 }
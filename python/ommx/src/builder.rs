@@ -1,9 +1,6 @@
 use anyhow::{bail, Result};
-use ocipkg::{
-    image::{OciArchiveBuilder, OciDirBuilder},
-    ImageName,
-};
-use ommx::artifact::Builder;
+use ocipkg::ImageName;
+use ommx::artifact::{temp_archive_path, ArchiveReader, Builder, OciArchiveWriter, OciDirWriter};
 use pyo3::{prelude::*, types::PyBytes};
 use std::{collections::HashMap, path::PathBuf};
 
@@ -12,28 +9,42 @@ use crate::{ArtifactArchive, ArtifactDir, PyDescriptor};
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
 #[pyo3(module = "ommx._ommx_rust")]
-pub struct ArtifactArchiveBuilder(Option<Builder<OciArchiveBuilder>>);
+pub struct ArtifactArchiveBuilder {
+    builder: Option<Builder<OciArchiveWriter>>,
+    /// Path of the archive, read by [`ArchiveReader`] after built
+    path: PathBuf,
+}
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl ArtifactArchiveBuilder {
     #[staticmethod]
     pub fn new_unnamed(path: PathBuf) -> Result<Self> {
-        let builder = Builder::new_archive_unnamed(path)?;
-        Ok(Self(Some(builder)))
+        let builder = Builder::new_archive_unnamed(path.clone())?;
+        Ok(Self {
+            builder: Some(builder),
+            path,
+        })
     }
 
     #[staticmethod]
     pub fn new(path: PathBuf, image_name: &str) -> Result<Self> {
         let image_name = ImageName::parse(image_name)?;
-        let builder = Builder::new_archive(path, image_name)?;
-        Ok(Self(Some(builder)))
+        let builder = Builder::new_archive(path.clone(), image_name)?;
+        Ok(Self {
+            builder: Some(builder),
+            path,
+        })
     }
 
     #[staticmethod]
     pub fn temp() -> Result<Self> {
-        let builder = Builder::temp_archive()?;
-        Ok(Self(Some(builder)))
+        let (path, image_name) = temp_archive_path()?;
+        let builder = Builder::new_archive(path.clone(), image_name)?;
+        Ok(Self {
+            builder: Some(builder),
+            path,
+        })
     }
 
     pub fn add_layer(
@@ -42,7 +53,7 @@ impl ArtifactArchiveBuilder {
         blob: Bound<PyBytes>,
         annotations: HashMap<String, String>,
     ) -> Result<PyDescriptor> {
-        if let Some(builder) = self.0.as_mut() {
+        if let Some(builder) = self.builder.as_mut() {
             let desc = builder.add_layer(media_type.into(), blob.as_bytes(), annotations)?;
             Ok(PyDescriptor::from(desc))
         } else {
@@ -50,8 +61,26 @@ impl ArtifactArchiveBuilder {
         }
     }
 
+    /// Add a layer with the content of the file at `path`, without reading the whole file into memory
+    pub fn add_layer_from_file(
+        &mut self,
+        py: Python<'_>,
+        media_type: &str,
+        path: PathBuf,
+        annotations: HashMap<String, String>,
+    ) -> Result<PyDescriptor> {
+        if let Some(builder) = self.builder.as_mut() {
+            let desc = py.allow_threads(|| {
+                builder.add_layer_from_file(media_type.into(), &path, annotations)
+            })?;
+            Ok(PyDescriptor::from(desc))
+        } else {
+            bail!("Already built artifact")
+        }
+    }
+
     pub fn add_annotation(&mut self, key: &str, value: &str) -> Result<()> {
-        if let Some(builder) = self.0.as_mut() {
+        if let Some(builder) = self.builder.as_mut() {
             builder.add_annotation(key.into(), value.into());
             Ok(())
         } else {
@@ -60,9 +89,10 @@ impl ArtifactArchiveBuilder {
     }
 
     pub fn build(&mut self) -> Result<ArtifactArchive> {
-        if let Some(builder) = self.0.take() {
+        if let Some(builder) = self.builder.take() {
             let artifact = builder.build()?;
-            Ok(ArtifactArchive::from(artifact))
+            let reader = ArchiveReader::open(&self.path, false)?;
+            Ok(ArtifactArchive::with_reader(artifact, reader))
         } else {
             bail!("Already built artifact")
         }
@@ -72,7 +102,7 @@ impl ArtifactArchiveBuilder {
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
 #[pyo3(module = "ommx._ommx_rust")]
-pub struct ArtifactDirBuilder(Option<Builder<OciDirBuilder>>);
+pub struct ArtifactDirBuilder(Option<Builder<OciDirWriter>>);
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
@@ -104,6 +134,24 @@ impl ArtifactDirBuilder {
         }
     }
 
+    /// Add a layer with the content of the file at `path`, without reading the whole file into memory
+    pub fn add_layer_from_file(
+        &mut self,
+        py: Python<'_>,
+        media_type: &str,
+        path: PathBuf,
+        annotations: HashMap<String, String>,
+    ) -> Result<PyDescriptor> {
+        if let Some(builder) = self.0.as_mut() {
+            let desc = py.allow_threads(|| {
+                builder.add_layer_from_file(media_type.into(), &path, annotations)
+            })?;
+            Ok(PyDescriptor::from(desc))
+        } else {
+            bail!("Already built artifact")
+        }
+    }
+
     pub fn add_annotation(&mut self, key: &str, value: &str) -> Result<()> {
         if let Some(builder) = self.0.as_mut() {
             builder.add_annotation(key.into(), value.into());
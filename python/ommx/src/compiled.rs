@@ -0,0 +1,172 @@
+use anyhow::{ensure, Result};
+use numpy::{
+    PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1, PyReadonlyArray2, PyUntypedArrayMethods,
+};
+use pyo3::prelude::*;
+use std::collections::HashMap;
+
+/// An instance compiled into sparse arrays for repeated evaluation on dense NumPy arrays.
+///
+/// The `i`-th value of the input array is for the decision variable `decision_variable_ids[i]`,
+/// and the evaluated constraint values are ordered as `constraint_ids`, where the removed constraints follow the active constraints.
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
+#[pyclass(frozen)]
+pub struct CompiledInstance(pub(crate) ommx::CompiledInstance);
+
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
+#[pymethods]
+impl CompiledInstance {
+    #[getter]
+    pub fn decision_variable_ids<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<u64>> {
+        PyArray1::from_slice(py, self.0.decision_variable_ids())
+    }
+
+    #[getter]
+    pub fn constraint_ids<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<u64>> {
+        PyArray1::from_slice(py, self.0.constraint_ids())
+    }
+
+    #[getter]
+    pub fn num_active_constraints(&self) -> usize {
+        self.0.num_active_constraints()
+    }
+
+    /// Start incremental evaluation from a 1-dimensional float64 array
+    pub fn incremental(&self, x: PyReadonlyArray1<f64>) -> Result<IncrementalEvaluator> {
+        Ok(IncrementalEvaluator(
+            self.0.incremental(x.as_slice()?.to_vec())?,
+        ))
+    }
+
+    /// Evaluate a 1-dimensional float64 array into the objective value, constraint values, and feasibility
+    pub fn evaluate<'py>(
+        &self,
+        py: Python<'py>,
+        x: PyReadonlyArray1<'py, f64>,
+    ) -> Result<(f64, Bound<'py, PyArray1<f64>>, bool)> {
+        let (objective, constraint_values, feasible) = self.0.evaluate(x.as_slice()?)?;
+        Ok((
+            objective,
+            PyArray1::from_vec(py, constraint_values),
+            feasible,
+        ))
+    }
+
+    /// Evaluate a C-contiguous `(num_samples, num_decision_variables)` float64 array in parallel without holding the GIL
+    ///
+    /// Returns objective values of shape `(num_samples,)`, constraint values of shape `(num_samples, num_constraints)`,
+    /// and feasibility of shape `(num_samples,)`.
+    #[allow(clippy::type_complexity)]
+    pub fn evaluate_batch<'py>(
+        &self,
+        py: Python<'py>,
+        xs: PyReadonlyArray2<'py, f64>,
+    ) -> Result<(
+        Bound<'py, PyArray1<f64>>,
+        Bound<'py, PyArray2<f64>>,
+        Bound<'py, PyArray1<bool>>,
+    )> {
+        let [num_samples, num_decision_variables] = xs.shape() else {
+            unreachable!("PyReadonlyArray2 must be 2-dimensional")
+        };
+        let num_samples = *num_samples;
+        ensure!(
+            *num_decision_variables == self.0.num_decision_variables(),
+            "Input has {} columns, but the instance has {} decision variables",
+            num_decision_variables,
+            self.0.num_decision_variables()
+        );
+        let xs = xs.as_slice()?;
+        let inner = &self.0;
+        let (objectives, constraint_values, feasible) =
+            py.allow_threads(|| inner.evaluate_batch(xs, num_samples))?;
+        let constraint_values = PyArray1::from_vec(py, constraint_values)
+            .reshape([num_samples, self.0.num_constraints()])?;
+        Ok((
+            PyArray1::from_vec(py, objectives),
+            constraint_values,
+            PyArray1::from_vec(py, feasible),
+        ))
+    }
+}
+
+/// Incremental evaluator for local search with single-variable moves.
+///
+/// The moves return a tuple of the change of the objective value, the changes of constraint values keyed by constraint ID,
+/// and the feasibility after the move. Constraints not including the variable are not included in the changes.
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
+#[pyclass]
+pub struct IncrementalEvaluator(ommx::IncrementalEvaluator);
+
+impl IncrementalEvaluator {
+    fn to_python(&self, delta: ommx::Delta) -> (f64, HashMap<u64, f64>, bool) {
+        let constraint_ids = self.0.compiled().constraint_ids();
+        let constraints = delta
+            .constraints
+            .into_iter()
+            .map(|(k, d)| (constraint_ids[k], d))
+            .collect();
+        (delta.objective, constraints, delta.feasible)
+    }
+}
+
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
+#[pymethods]
+impl IncrementalEvaluator {
+    #[getter]
+    pub fn objective(&self) -> f64 {
+        self.0.objective()
+    }
+
+    #[getter]
+    pub fn x<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<f64>> {
+        PyArray1::from_slice(py, self.0.x())
+    }
+
+    #[getter]
+    pub fn constraint_values<'py>(&self, py: Python<'py>) -> Bound<'py, PyArray1<f64>> {
+        PyArray1::from_slice(py, self.0.constraint_values())
+    }
+
+    #[getter]
+    pub fn feasible(&self) -> bool {
+        self.0.is_feasible()
+    }
+
+    #[getter]
+    pub fn num_violated(&self) -> usize {
+        self.0.num_violated()
+    }
+
+    /// Change when the binary decision variable is flipped, without updating the state
+    pub fn delta(&self, decision_variable_id: u64) -> Result<(f64, HashMap<u64, f64>, bool)> {
+        let delta = self.0.delta(decision_variable_id)?;
+        Ok(self.to_python(delta))
+    }
+
+    /// Flip the binary decision variable, and return the change
+    pub fn flip(&mut self, decision_variable_id: u64) -> Result<(f64, HashMap<u64, f64>, bool)> {
+        let delta = self.0.flip(decision_variable_id)?;
+        Ok(self.to_python(delta))
+    }
+
+    /// Change when the decision variable is set to `value`, without updating the state
+    pub fn delta_to(
+        &self,
+        decision_variable_id: u64,
+        value: f64,
+    ) -> Result<(f64, HashMap<u64, f64>, bool)> {
+        let delta = self.0.delta_to(decision_variable_id, value)?;
+        Ok(self.to_python(delta))
+    }
+
+    /// Set the decision variable to `value`, and return the change
+    pub fn set(
+        &mut self,
+        decision_variable_id: u64,
+        value: f64,
+    ) -> Result<(f64, HashMap<u64, f64>, bool)> {
+        let delta = self.0.set(decision_variable_id, value)?;
+        Ok(self.to_python(delta))
+    }
+}
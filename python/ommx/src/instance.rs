@@ -1,14 +1,49 @@
-use anyhow::Result;
-use ommx::{Evaluate, Message};
+use crate::CompiledInstance;
+use anyhow::{ensure, Result};
+use numpy::{
+    ndarray::{ArrayView1, ArrayView2},
+    PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1, PyReadonlyArray2, PyUntypedArrayMethods,
+};
+use ommx::{v1::State, Evaluate, Message};
 use pyo3::{
+    exceptions::PyKeyError,
     prelude::*,
     types::{PyBytes, PyDict},
 };
-use std::collections::{BTreeSet, HashMap};
+use std::{
+    collections::{BTreeSet, HashMap},
+    sync::OnceLock,
+};
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
-pub struct Instance(ommx::v1::Instance);
+pub struct Instance {
+    inner: ommx::v1::Instance,
+    /// Computed on the first evaluation, and reused until the instance is modified
+    used_ids: OnceLock<ommx::ConstraintUsedIds>,
+}
+
+impl From<ommx::v1::Instance> for Instance {
+    fn from(inner: ommx::v1::Instance) -> Self {
+        Self {
+            inner,
+            used_ids: OnceLock::new(),
+        }
+    }
+}
+
+impl Instance {
+    fn used_ids(&self) -> &ommx::ConstraintUsedIds {
+        self.used_ids
+            .get_or_init(|| ommx::ConstraintUsedIds::new(&self.inner))
+    }
+
+    /// Get the instance to be modified, discarding the cached used IDs
+    fn inner_mut(&mut self) -> &mut ommx::v1::Instance {
+        self.used_ids.take();
+        &mut self.inner
+    }
+}
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
@@ -17,45 +52,118 @@ impl Instance {
     pub fn from_bytes(bytes: &Bound<PyBytes>) -> Result<Self> {
         let inner = ommx::v1::Instance::decode(bytes.as_bytes())?;
         inner.validate()?;
-        Ok(Self(inner))
+        Ok(inner.into())
     }
 
     pub fn to_bytes<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyBytes>> {
-        Ok(PyBytes::new(py, &self.0.encode_to_vec()))
+        Ok(PyBytes::new(py, &self.inner.encode_to_vec()))
     }
 
     pub fn validate(&self) -> Result<()> {
-        self.0.validate()
+        self.inner.validate()
     }
 
     pub fn used_decision_variable_ids(&self) -> BTreeSet<u64> {
-        self.0.used_decision_variable_ids()
+        self.inner.used_decision_variable_ids()
     }
 
     pub fn as_pubo_format<'py>(&self, py: Python<'py>) -> Result<Bound<'py, PyDict>> {
-        let pubo = self.0.as_pubo_format()?;
+        let pubo = self.inner.as_pubo_format()?;
         Ok(serde_pyobject::to_pyobject(py, &pubo)?.extract()?)
     }
 
     pub fn as_qubo_format<'py>(&self, py: Python<'py>) -> Result<(Bound<'py, PyDict>, f64)> {
-        let (qubo, constant) = self.0.as_qubo_format()?;
+        let (qubo, constant) = self.inner.as_qubo_format()?;
         Ok((serde_pyobject::to_pyobject(py, &qubo)?.extract()?, constant))
     }
 
+    /// Create QUBO as an upper-triangular matrix in the COO format,
+    /// and return `(ids, rows, columns, values, offset)` where `rows` and `columns` are indices of `ids`
+    #[allow(clippy::type_complexity)]
+    pub fn as_qubo_coo<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> Result<(
+        Bound<'py, PyArray1<u64>>,
+        Bound<'py, PyArray1<u64>>,
+        Bound<'py, PyArray1<u64>>,
+        Bound<'py, PyArray1<f64>>,
+        f64,
+    )> {
+        let instance = &self.inner;
+        let (ids, rows, columns, values, offset) = py.allow_threads(|| instance.as_qubo_coo())?;
+        Ok((
+            PyArray1::from_vec(py, ids),
+            PyArray1::from_vec(py, rows),
+            PyArray1::from_vec(py, columns),
+            PyArray1::from_vec(py, values),
+            offset,
+        ))
+    }
+
     pub fn as_parametric_instance(&self) -> ParametricInstance {
-        ParametricInstance(self.0.clone().into())
+        ParametricInstance(self.inner.clone().into())
     }
 
     pub fn penalty_method(&self) -> Result<ParametricInstance> {
-        Ok(ParametricInstance(self.0.clone().penalty_method()?))
+        Ok(ParametricInstance(self.inner.clone().penalty_method()?))
     }
 
     pub fn uniform_penalty_method(&self) -> Result<ParametricInstance> {
-        Ok(ParametricInstance(self.0.clone().uniform_penalty_method()?))
+        Ok(ParametricInstance(
+            self.inner.clone().uniform_penalty_method()?,
+        ))
+    }
+
+    pub fn compile(&self) -> Result<CompiledInstance> {
+        Ok(CompiledInstance(self.inner.compile()?))
+    }
+
+    pub fn as_minimization_problem(&mut self) -> bool {
+        self.inner_mut().as_minimization_problem()
     }
 
-    pub fn evaluate_samples(&self, samples: &Samples) -> Result<SampleSet> {
-        Ok(SampleSet(self.0.evaluate_samples(&samples.0)?.0))
+    pub fn as_maximization_problem(&mut self) -> bool {
+        self.inner_mut().as_maximization_problem()
+    }
+
+    pub fn evaluate(&self, state: &Bound<PyBytes>) -> Result<Solution> {
+        let state = State::decode(state.as_bytes())?;
+        Ok(Solution(
+            self.inner.evaluate_with_used_ids(&state, self.used_ids())?,
+        ))
+    }
+
+    pub fn partial_evaluate(&self, state: &Bound<PyBytes>) -> Result<Instance> {
+        let state = State::decode(state.as_bytes())?;
+        let mut instance = self.inner.clone();
+        instance.partial_evaluate(&state)?;
+        Ok(instance.into())
+    }
+
+    /// Evaluate the instance for each sample in parallel.
+    ///
+    /// The GIL is released during the evaluation. `num_threads` limits the number of threads,
+    /// and the global rayon thread pool is used if it is not specified.
+    #[pyo3(signature = (samples, num_threads=None))]
+    pub fn evaluate_samples(
+        &self,
+        py: Python<'_>,
+        samples: &Samples,
+        num_threads: Option<usize>,
+    ) -> Result<SampleSet> {
+        let instance = &self.inner;
+        let samples = &samples.0;
+        let (sample_set, _) = py.allow_threads(|| -> Result<_> {
+            match num_threads {
+                Some(num_threads) => rayon::ThreadPoolBuilder::new()
+                    .num_threads(num_threads)
+                    .build()?
+                    .install(|| instance.evaluate_samples(samples)),
+                None => instance.evaluate_samples(samples),
+            }
+        })?;
+        Ok(sample_set.into())
     }
 
     pub fn relax_constraint(
@@ -64,20 +172,41 @@ impl Instance {
         removed_reason: String,
         removed_reason_parameters: HashMap<String, String>,
     ) -> Result<()> {
-        self.0
+        self.inner_mut()
             .relax_constraint(constraint_id, removed_reason, removed_reason_parameters)
     }
 
     pub fn restore_constraint(&mut self, constraint_id: u64) -> Result<()> {
-        self.0.restore_constraint(constraint_id)
+        self.inner_mut().restore_constraint(constraint_id)
+    }
+
+    /// Add linear constraints `A x = b` or `A x <= b` with `A` given in the CSR format,
+    /// and return the IDs of the new constraints
+    pub fn add_linear_constraints_csr<'py>(
+        &mut self,
+        py: Python<'py>,
+        indptr: PyReadonlyArray1<u64>,
+        indices: PyReadonlyArray1<u64>,
+        data: PyReadonlyArray1<f64>,
+        rhs: PyReadonlyArray1<f64>,
+        equality: i32,
+    ) -> Result<Bound<'py, PyArray1<u64>>> {
+        let ids = self.inner_mut().add_linear_constraints_csr(
+            indptr.as_slice()?,
+            indices.as_slice()?,
+            data.as_slice()?,
+            rhs.as_slice()?,
+            ommx::v1::Equality::try_from(equality)?,
+        )?;
+        Ok(PyArray1::from_vec(py, ids))
     }
 
     pub fn log_encode(&mut self, integer_variable_ids: BTreeSet<u64>) -> Result<()> {
         let replacements = integer_variable_ids
             .iter()
-            .map(|&id| Ok((id, self.0.log_encode(id)?.into())))
+            .map(|&id| Ok((id, self.inner_mut().log_encode(id)?.into())))
             .collect::<Result<_>>()?;
-        self.0.substitute(replacements)?;
+        self.inner_mut().substitute(replacements)?;
         Ok(())
     }
 
@@ -86,7 +215,7 @@ impl Instance {
         constraint_id: u64,
         max_integer_range: u64,
     ) -> Result<()> {
-        self.0
+        self.inner_mut()
             .convert_inequality_to_equality_with_integer_slack(constraint_id, max_integer_range)
     }
 
@@ -95,7 +224,7 @@ impl Instance {
         constraint_id: u64,
         slack_upper_bound: u64,
     ) -> Result<Option<f64>> {
-        self.0
+        self.inner_mut()
             .add_integer_slack_to_inequality(constraint_id, slack_upper_bound)
     }
 }
@@ -124,7 +253,7 @@ impl ParametricInstance {
 
     pub fn with_parameters(&self, parameters: &Parameters) -> Result<Instance> {
         let instance = self.0.clone().with_parameters(parameters.0.clone())?;
-        Ok(Instance(instance))
+        Ok(instance.into())
     }
 }
 
@@ -177,6 +306,35 @@ impl Samples {
         Ok(Self(inner))
     }
 
+    /// Create samples from a `(num_rows, len(variable_ids))` matrix, merging identical rows into one entry
+    #[staticmethod]
+    #[pyo3(signature = (xs, variable_ids, sample_ids=None, occurrences=None))]
+    pub fn from_array(
+        py: Python<'_>,
+        xs: PyReadonlyArray2<f64>,
+        variable_ids: PyReadonlyArray1<u64>,
+        sample_ids: Option<PyReadonlyArray1<u64>>,
+        occurrences: Option<PyReadonlyArray1<u64>>,
+    ) -> Result<Self> {
+        let [_, num_columns] = xs.shape() else {
+            unreachable!("PyReadonlyArray2 must be 2-dimensional")
+        };
+        let variable_ids = variable_ids.as_slice()?;
+        ensure!(
+            *num_columns == variable_ids.len(),
+            "Input has {} columns, but {} decision variable IDs are given",
+            num_columns,
+            variable_ids.len()
+        );
+        let xs = xs.as_slice()?;
+        let sample_ids = sample_ids.as_ref().map(|a| a.as_slice()).transpose()?;
+        let occurrences = occurrences.as_ref().map(|a| a.as_slice()).transpose()?;
+        let inner = py.allow_threads(|| {
+            ommx::v1::Samples::from_array(xs, variable_ids, sample_ids, occurrences)
+        })?;
+        Ok(Self(inner))
+    }
+
     pub fn to_bytes<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyBytes>> {
         Ok(PyBytes::new(py, &self.0.encode_to_vec()))
     }
@@ -184,46 +342,305 @@ impl Samples {
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
 #[pyclass]
-pub struct SampleSet(ommx::v1::SampleSet);
+pub struct SampleSet {
+    inner: ommx::v1::SampleSet,
+    /// Built on the first lookup by sample ID, and reused for the subsequent lookups
+    index: OnceLock<ommx::SampleSetIndex>,
+}
+
+impl From<ommx::v1::SampleSet> for SampleSet {
+    fn from(inner: ommx::v1::SampleSet) -> Self {
+        Self {
+            inner,
+            index: OnceLock::new(),
+        }
+    }
+}
+
+impl SampleSet {
+    fn index(&self) -> Result<&ommx::SampleSetIndex> {
+        if let Some(index) = self.index.get() {
+            return Ok(index);
+        }
+        let index = self.inner.index()?;
+        Ok(self.index.get_or_init(|| index))
+    }
+
+    fn ensure_contains(&self, sample_id: u64) -> PyResult<&ommx::SampleSetIndex> {
+        let index = self.index()?;
+        if !index.contains(sample_id) {
+            return Err(PyKeyError::new_err(format!(
+                "Sample ID {sample_id} not found"
+            )));
+        }
+        Ok(index)
+    }
+}
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl SampleSet {
+    /// Decode the protobuf encoding, or the compact encoding created by :py:meth:`to_compact_bytes`.
     #[staticmethod]
     pub fn from_bytes(bytes: &Bound<PyBytes>) -> Result<Self> {
-        let inner = ommx::v1::SampleSet::decode(bytes.as_bytes())?;
-        Ok(Self(inner))
+        let bytes = bytes.as_bytes();
+        let inner = if ommx::v1::SampleSet::is_compact_bytes(bytes) {
+            ommx::v1::SampleSet::from_compact_bytes(bytes)?
+        } else {
+            ommx::v1::SampleSet::decode(bytes)?
+        };
+        Ok(inner.into())
+    }
+
+    /// Check if the bytes are the compact encoding created by :py:meth:`to_compact_bytes`.
+    #[staticmethod]
+    pub fn is_compact_bytes(bytes: &Bound<PyBytes>) -> bool {
+        ommx::v1::SampleSet::is_compact_bytes(bytes.as_bytes())
     }
 
     pub fn to_bytes<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyBytes>> {
-        Ok(PyBytes::new(py, &self.0.encode_to_vec()))
+        Ok(PyBytes::new(py, &self.inner.encode_to_vec()))
+    }
+
+    /// Encode into the compact columnar encoding, compressed by zstd if `zstd_level` is given.
+    ///
+    /// The sample IDs are stored only once, and the sampled values of each decision variable or constraint
+    /// are bit-packed if binary, dictionary-encoded if they have a few distinct values, or stored as is.
+    #[pyo3(signature = (zstd_level=None))]
+    pub fn to_compact_bytes<'py>(
+        &self,
+        py: Python<'py>,
+        zstd_level: Option<i32>,
+    ) -> Result<Bound<'py, PyBytes>> {
+        let inner = &self.inner;
+        let bytes = py.allow_threads(|| inner.to_compact_bytes(zstd_level))?;
+        Ok(PyBytes::new(py, &bytes))
     }
 
     pub fn get(&self, sample_id: u64) -> PyResult<Solution> {
-        Ok(self.0.get(sample_id).map(Solution)?)
+        let index = self.index()?;
+        Ok(self.inner.get_indexed(index, sample_id).map(Solution)?)
     }
 
     pub fn num_samples(&self) -> PyResult<usize> {
-        Ok(self.0.num_samples()?)
+        Ok(self.inner.num_samples()?)
     }
 
     pub fn sample_ids(&self) -> BTreeSet<u64> {
-        self.0.sample_ids()
+        self.inner.sample_ids()
     }
 
     pub fn feasible_ids(&self) -> BTreeSet<u64> {
-        self.0.feasible_ids()
+        self.inner.feasible_ids()
     }
 
     pub fn feasible_unrelaxed_ids(&self) -> BTreeSet<u64> {
-        self.0.feasible_unrelaxed_ids()
+        self.inner.feasible_unrelaxed_ids()
     }
 
     pub fn best_feasible(&self) -> PyResult<Solution> {
-        Ok(self.0.best_feasible().map(Solution)?)
+        self.get(self.inner.best_feasible_id()?)
     }
 
     pub fn best_feasible_unrelaxed(&self) -> PyResult<Solution> {
-        Ok(self.0.best_feasible_unrelaxed().map(Solution)?)
+        self.get(self.inner.best_feasible_unrelaxed_id()?)
+    }
+
+    /// Values of the decision variables including the substituted ones for a sample, keyed by the decision variable IDs.
+    ///
+    /// Raises `KeyError` if the sample ID is not found.
+    pub fn decision_variable_values(&self, sample_id: u64) -> PyResult<HashMap<u64, f64>> {
+        let index = self.ensure_contains(sample_id)?;
+        Ok(self.inner.decision_variable_values(index, sample_id)?)
+    }
+
+    /// Evaluated values of the constraints for a sample, keyed by the constraint IDs.
+    ///
+    /// Raises `KeyError` if the sample ID is not found.
+    pub fn constraint_values(&self, sample_id: u64) -> PyResult<HashMap<u64, f64>> {
+        let index = self.ensure_contains(sample_id)?;
+        Ok(self.inner.constraint_values(index, sample_id)?)
+    }
+
+    /// IDs of the best `k` samples in terms of the objective value, sorted from the best.
+    ///
+    /// If `feasible_only`, only the feasible samples are ranked, where the feasibility is
+    /// for the remaining constraints if `relaxed`, and for the original constraints otherwise.
+    #[pyo3(signature = (k, feasible_only = true, relaxed = false))]
+    pub fn top_k_ids(&self, k: usize, feasible_only: bool, relaxed: bool) -> PyResult<Vec<u64>> {
+        Ok(self.inner.top_k_ids(k, feasible_only, relaxed)?)
+    }
+
+    /// IDs of the samples sorted by the objective value from the best, see :py:meth:`top_k_ids`
+    #[pyo3(signature = (feasible_only = false, relaxed = false))]
+    pub fn sorted_ids(&self, feasible_only: bool, relaxed: bool) -> PyResult<Vec<u64>> {
+        Ok(self.inner.sorted_ids(feasible_only, relaxed)?)
+    }
+
+    /// Aggregate the feasibility, objective quantiles and constraint violation histograms of all samples
+    pub fn statistics(
+        &self,
+        py: Python<'_>,
+        quantiles: Vec<f64>,
+        bins: usize,
+    ) -> PyResult<SampleSetStatistics> {
+        let inner = &self.inner;
+        let statistics = py.allow_threads(|| inner.statistics(&quantiles, bins))?;
+        Ok(SampleSetStatistics(statistics))
+    }
+
+    pub fn decision_variable_matrix(&self) -> PyResult<SampleMatrix> {
+        Ok(self.inner.decision_variable_matrix().map(SampleMatrix)?)
+    }
+
+    /// Evaluated values and feasibility of the constraints as `(sample_ids, constraint_ids, values, feasible)`.
+    ///
+    /// `values` and `feasible` are `(len(constraint_ids), len(sample_ids))` arrays,
+    /// i.e. the values of a constraint are contiguous. The IDs are sorted in ascending order.
+    #[allow(clippy::type_complexity)]
+    pub fn constraint_columns<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> Result<(
+        Bound<'py, PyArray1<u64>>,
+        Bound<'py, PyArray1<u64>>,
+        Bound<'py, PyArray2<f64>>,
+        Bound<'py, PyArray2<bool>>,
+    )> {
+        let inner = &self.inner;
+        let columns = py.allow_threads(|| inner.constraint_columns())?;
+        let shape = [columns.constraint_ids.len(), columns.sample_ids.len()];
+        Ok((
+            PyArray1::from_vec(py, columns.sample_ids),
+            PyArray1::from_vec(py, columns.constraint_ids),
+            PyArray1::from_vec(py, columns.values).reshape(shape)?,
+            PyArray1::from_vec(py, columns.feasible).reshape(shape)?,
+        ))
+    }
+}
+
+/// Aggregate statistics of a sample set, created by :py:meth:`SampleSet.statistics`
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
+#[pyclass(frozen)]
+pub struct SampleSetStatistics(ommx::SampleSetStatistics);
+
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
+#[pymethods]
+impl SampleSetStatistics {
+    #[getter]
+    pub fn num_samples(&self) -> usize {
+        self.0.num_samples
+    }
+
+    /// Number of samples feasible for the original constraints
+    #[getter]
+    pub fn num_feasible(&self) -> usize {
+        self.0.num_feasible
+    }
+
+    /// Number of samples feasible for the remaining (non-removed) constraints
+    #[getter]
+    pub fn num_feasible_relaxed(&self) -> usize {
+        self.0.num_feasible_relaxed
+    }
+
+    /// Ratio of the samples feasible for the original constraints, or NaN if there is no sample
+    #[getter]
+    pub fn feasibility_rate(&self) -> f64 {
+        self.0.feasibility_rate()
+    }
+
+    /// Ratio of the samples feasible for the remaining constraints, or NaN if there is no sample
+    #[getter]
+    pub fn feasibility_rate_relaxed(&self) -> f64 {
+        self.0.feasibility_rate_relaxed()
+    }
+
+    /// Pairs of probability and the quantile of the objective values, interpolated linearly as `numpy.quantile`
+    #[getter]
+    pub fn objective_quantiles(&self) -> Vec<(f64, f64)> {
+        self.0.objective_quantiles.clone()
+    }
+
+    /// Histograms of the constraint violations as `{constraint_id: (edges, counts)}`.
+    ///
+    /// The violation is `|f(x)|` for equality constraints and `max(f(x), 0)` for inequality constraints.
+    /// `edges` are the `bins + 1` edges of the equal-width bins from zero to the largest violation,
+    /// and `counts` are the numbers of samples in the bins, where the last bin includes its right edge.
+    #[getter]
+    pub fn violation_histograms<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> HashMap<u64, (Bound<'py, PyArray1<f64>>, Bound<'py, PyArray1<u64>>)> {
+        self.0
+            .violation_histograms
+            .iter()
+            .map(|h| {
+                (
+                    h.constraint_id,
+                    (
+                        PyArray1::from_slice(py, &h.edges),
+                        PyArray1::from_slice(py, &h.counts),
+                    ),
+                )
+            })
+            .collect()
+    }
+}
+
+/// Dense matrix of sampled decision variable values.
+///
+/// The arrays returned by the getters share the memory with this object without copying, and are read-only.
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
+#[pyclass(frozen)]
+pub struct SampleMatrix(ommx::SampleMatrix);
+
+/// Mark a NumPy array borrowing the memory of [`SampleMatrix`] as read-only
+fn read_only<'py, T>(array: Bound<'py, T>) -> PyResult<Bound<'py, T>> {
+    array.getattr("flags")?.setattr("writeable", false)?;
+    Ok(array)
+}
+
+#[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
+#[pymethods]
+impl SampleMatrix {
+    /// Values as a `(num_samples, num_decision_variables)` array in row-major order
+    #[getter]
+    pub fn values<'py>(this: Bound<'py, Self>) -> Result<Bound<'py, PyArray2<f64>>> {
+        let inner = &this.get().0;
+        let view = ArrayView2::from_shape(inner.shape(), inner.values())?;
+        // SAFETY: `SampleMatrix` is frozen, and the array keeps `this` alive as its base object
+        let array = unsafe { PyArray2::borrow_from_array(&view, this.clone().into_any()) };
+        Ok(read_only(array)?)
+    }
+
+    /// Sample IDs corresponding to the rows of :py:attr:`values`
+    #[getter]
+    pub fn sample_ids<'py>(this: Bound<'py, Self>) -> PyResult<Bound<'py, PyArray1<u64>>> {
+        let view = ArrayView1::from(this.get().0.sample_ids());
+        // SAFETY: same as `values`
+        let array = unsafe { PyArray1::borrow_from_array(&view, this.clone().into_any()) };
+        read_only(array)
+    }
+
+    /// Decision variable IDs corresponding to the columns of :py:attr:`values`
+    #[getter]
+    pub fn decision_variable_ids<'py>(
+        this: Bound<'py, Self>,
+    ) -> PyResult<Bound<'py, PyArray1<u64>>> {
+        let view = ArrayView1::from(this.get().0.decision_variable_ids());
+        // SAFETY: same as `values`
+        let array = unsafe { PyArray1::borrow_from_array(&view, this.clone().into_any()) };
+        read_only(array)
+    }
+
+    #[getter]
+    pub fn shape(&self) -> (usize, usize) {
+        self.0.shape()
+    }
+
+    /// Get the value of a decision variable in a sample in O(1), or `None` if not found
+    pub fn get(&self, sample_id: u64, decision_variable_id: u64) -> Option<f64> {
+        self.0.get(sample_id, decision_variable_id)
     }
 }
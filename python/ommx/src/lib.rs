@@ -1,5 +1,6 @@
 mod artifact;
 mod builder;
+mod compiled;
 mod dataset;
 mod descriptor;
 mod evaluate;
@@ -10,6 +11,7 @@ mod qplib;
 
 pub use artifact::*;
 pub use builder::*;
+pub use compiled::*;
 pub use dataset::*;
 pub use descriptor::*;
 pub use evaluate::*;
@@ -39,11 +41,15 @@ fn _ommx_rust(_py: Python, m: &Bound<PyModule>) -> PyResult<()> {
     m.add_class::<Polynomial>()?;
     m.add_class::<Function>()?;
     m.add_class::<Instance>()?;
+    m.add_class::<CompiledInstance>()?;
+    m.add_class::<IncrementalEvaluator>()?;
     m.add_class::<ParametricInstance>()?;
     m.add_class::<Parameters>()?;
     m.add_class::<Solution>()?;
     m.add_class::<SampleSet>()?;
     m.add_class::<Samples>()?;
+    m.add_class::<SampleMatrix>()?;
+    m.add_class::<SampleSetStatistics>()?;
 
     // Evaluate
     m.add_function(wrap_pyfunction!(evaluate_function, m)?)?;
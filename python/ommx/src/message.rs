@@ -1,8 +1,9 @@
-use std::collections::BTreeSet;
+use std::collections::{BTreeMap, BTreeSet};
 
-use anyhow::Result;
+use anyhow::{ensure, Result};
 use approx::AbsDiffEq;
-use ommx::{v1, Message};
+use numpy::PyReadonlyArray1;
+use ommx::{v1, Evaluate, Message};
 use pyo3::{exceptions::PyRuntimeError, prelude::*, types::PyBytes};
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
@@ -12,6 +13,32 @@ pub struct Linear(v1::Linear);
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl Linear {
+    /// Create a linear function from the coefficients of each ID, sorted by ID
+    #[staticmethod]
+    pub fn new(terms: BTreeMap<u64, f64>, constant: f64) -> Self {
+        Self(v1::Linear {
+            terms: terms
+                .into_iter()
+                .map(|(id, coefficient)| v1::linear::Term { id, coefficient })
+                .collect(),
+            constant,
+        })
+    }
+
+    /// Create a linear function from arrays of IDs and coefficients
+    #[staticmethod]
+    pub fn from_arrays(
+        ids: PyReadonlyArray1<u64>,
+        coefficients: PyReadonlyArray1<f64>,
+        constant: f64,
+    ) -> Result<Self> {
+        Ok(Self(v1::Linear::from_slices(
+            ids.as_slice()?,
+            coefficients.as_slice()?,
+            constant,
+        )?))
+    }
+
     #[staticmethod]
     pub fn single_term(id: u64, coefficient: f64) -> Self {
         Self(v1::Linear::single_term(id, coefficient))
@@ -33,12 +60,25 @@ impl Linear {
         self.0.abs_diff_eq(&other.0, atol)
     }
 
+    /// Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+    /// Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+    pub fn evaluate_value(&self, state: &Bound<PyBytes>) -> Result<f64> {
+        let state = v1::State::decode(state.as_bytes())?;
+        self.0.evaluate_value(&state)
+    }
+
     pub fn __repr__(&self) -> String {
         self.0.to_string()
     }
 
     pub fn __add__(&self, rhs: &Linear) -> Linear {
-        Linear(self.0.clone() + rhs.0.clone())
+        let mut out = self.0.clone();
+        out += rhs.0.clone();
+        Linear(out)
+    }
+
+    pub fn __copy__(&self) -> Linear {
+        Linear(self.0.clone())
     }
 
     pub fn __sub__(&self, rhs: &Linear) -> Linear {
@@ -56,6 +96,14 @@ impl Linear {
     pub fn mul_scalar(&self, scalar: f64) -> Linear {
         Linear(self.0.clone() * scalar)
     }
+
+    pub fn add_assign(&mut self, rhs: &Linear) {
+        self.0 += rhs.0.clone();
+    }
+
+    pub fn add_assign_scalar(&mut self, scalar: f64) {
+        self.0 += scalar;
+    }
 }
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
@@ -65,6 +113,47 @@ pub struct Quadratic(v1::Quadratic);
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl Quadratic {
+    #[staticmethod]
+    #[pyo3(signature = (columns, rows, values, linear = None))]
+    pub fn new(
+        columns: Vec<u64>,
+        rows: Vec<u64>,
+        values: Vec<f64>,
+        linear: Option<&Linear>,
+    ) -> Self {
+        Self(v1::Quadratic {
+            columns,
+            rows,
+            values,
+            linear: linear.map(|linear| linear.0.clone()),
+        })
+    }
+
+    /// Create a quadratic function from the quadratic terms in the COO format
+    #[staticmethod]
+    #[pyo3(signature = (rows, columns, values, linear = None))]
+    pub fn from_coo(
+        rows: PyReadonlyArray1<u64>,
+        columns: PyReadonlyArray1<u64>,
+        values: PyReadonlyArray1<f64>,
+        linear: Option<&Linear>,
+    ) -> Result<Self> {
+        let (rows, columns, values) = (rows.as_slice()?, columns.as_slice()?, values.as_slice()?);
+        ensure!(
+            rows.len() == columns.len() && rows.len() == values.len(),
+            "Length of rows ({}), columns ({}) and values ({}) mismatch",
+            rows.len(),
+            columns.len(),
+            values.len()
+        );
+        Ok(Self(v1::Quadratic {
+            columns: columns.to_vec(),
+            rows: rows.to_vec(),
+            values: values.to_vec(),
+            linear: linear.map(|linear| linear.0.clone()),
+        }))
+    }
+
     #[staticmethod]
     pub fn decode(bytes: &Bound<PyBytes>) -> PyResult<Self> {
         let inner = v1::Quadratic::decode(bytes.as_bytes())
@@ -81,6 +170,13 @@ impl Quadratic {
         self.0.abs_diff_eq(&other.0, atol)
     }
 
+    /// Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+    /// Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+    pub fn evaluate_value(&self, state: &Bound<PyBytes>) -> Result<f64> {
+        let state = v1::State::decode(state.as_bytes())?;
+        self.0.evaluate_value(&state)
+    }
+
     pub fn __repr__(&self) -> String {
         self.0.to_string()
     }
@@ -89,6 +185,10 @@ impl Quadratic {
         Quadratic(self.0.clone() + rhs.0.clone())
     }
 
+    pub fn __copy__(&self) -> Quadratic {
+        Quadratic(self.0.clone())
+    }
+
     pub fn __sub__(&self, rhs: &Quadratic) -> Quadratic {
         Quadratic(self.0.clone() - rhs.0.clone())
     }
@@ -102,7 +202,9 @@ impl Quadratic {
     }
 
     pub fn add_linear(&self, linear: &Linear) -> Quadratic {
-        Quadratic(self.0.clone() + linear.0.clone())
+        let mut out = self.0.clone();
+        out += linear.0.clone();
+        Quadratic(out)
     }
 
     pub fn mul_scalar(&self, scalar: f64) -> Quadratic {
@@ -112,6 +214,18 @@ impl Quadratic {
     pub fn mul_linear(&self, linear: &Linear) -> Polynomial {
         Polynomial(self.0.clone() * linear.0.clone())
     }
+
+    pub fn add_assign(&mut self, rhs: &Quadratic) {
+        self.0 += rhs.0.clone();
+    }
+
+    pub fn add_assign_scalar(&mut self, scalar: f64) {
+        self.0 += scalar;
+    }
+
+    pub fn add_assign_linear(&mut self, linear: &Linear) {
+        self.0 += linear.0.clone();
+    }
 }
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
@@ -121,6 +235,17 @@ pub struct Polynomial(v1::Polynomial);
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pymethods)]
 #[pymethods]
 impl Polynomial {
+    /// Create a polynomial from pairs of IDs and coefficient of each monomial
+    #[staticmethod]
+    pub fn new(terms: Vec<(Vec<u64>, f64)>) -> Self {
+        Self(v1::Polynomial {
+            terms: terms
+                .into_iter()
+                .map(|(ids, coefficient)| v1::Monomial { ids, coefficient })
+                .collect(),
+        })
+    }
+
     #[staticmethod]
     pub fn decode(bytes: &Bound<PyBytes>) -> PyResult<Self> {
         let inner = v1::Polynomial::decode(bytes.as_bytes())
@@ -137,6 +262,13 @@ impl Polynomial {
         self.0.abs_diff_eq(&other.0, atol)
     }
 
+    /// Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+    /// Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+    pub fn evaluate_value(&self, state: &Bound<PyBytes>) -> Result<f64> {
+        let state = v1::State::decode(state.as_bytes())?;
+        self.0.evaluate_value(&state)
+    }
+
     pub fn __repr__(&self) -> String {
         self.0.to_string()
     }
@@ -145,6 +277,10 @@ impl Polynomial {
         Polynomial(self.0.clone() + rhs.0.clone())
     }
 
+    pub fn __copy__(&self) -> Polynomial {
+        Polynomial(self.0.clone())
+    }
+
     pub fn __sub__(&self, rhs: &Polynomial) -> Polynomial {
         Polynomial(self.0.clone() - rhs.0.clone())
     }
@@ -176,6 +312,22 @@ impl Polynomial {
     pub fn mul_quadratic(&self, quadratic: &Quadratic) -> Polynomial {
         Polynomial(self.0.clone() * quadratic.0.clone())
     }
+
+    pub fn add_assign(&mut self, rhs: &Polynomial) {
+        self.0 += rhs.0.clone();
+    }
+
+    pub fn add_assign_scalar(&mut self, scalar: f64) {
+        self.0 += v1::Polynomial::from(scalar);
+    }
+
+    pub fn add_assign_linear(&mut self, linear: &Linear) {
+        self.0 += v1::Polynomial::from(linear.0.clone());
+    }
+
+    pub fn add_assign_quadratic(&mut self, quadratic: &Quadratic) {
+        self.0 += v1::Polynomial::from(quadratic.0.clone());
+    }
 }
 
 #[cfg_attr(feature = "stub_gen", pyo3_stub_gen::derive::gen_stub_pyclass)]
@@ -221,12 +373,25 @@ impl Function {
         self.0.abs_diff_eq(&other.0, atol)
     }
 
+    /// Evaluate with the state given as serialized `ommx.v1.State` to return only the value.
+    /// Unlike `evaluate_*` functions, used decision variable IDs are not collected.
+    pub fn evaluate_value(&self, state: &Bound<PyBytes>) -> Result<f64> {
+        let state = v1::State::decode(state.as_bytes())?;
+        self.0.evaluate_value(&state)
+    }
+
     pub fn __repr__(&self) -> String {
         self.0.to_string()
     }
 
     pub fn __add__(&self, rhs: &Function) -> Function {
-        Function(self.0.clone() + rhs.0.clone())
+        let mut out = self.0.clone();
+        out += rhs.0.clone();
+        Function(out)
+    }
+
+    pub fn __copy__(&self) -> Function {
+        Function(self.0.clone())
     }
 
     pub fn __sub__(&self, rhs: &Function) -> Function {
@@ -269,6 +434,26 @@ impl Function {
         Function(self.0.clone() * polynomial.0.clone())
     }
 
+    pub fn add_assign(&mut self, rhs: &Function) {
+        self.0 += rhs.0.clone();
+    }
+
+    pub fn add_assign_scalar(&mut self, scalar: f64) {
+        self.0 += v1::Function::from(scalar);
+    }
+
+    pub fn add_assign_linear(&mut self, linear: &Linear) {
+        self.0 += v1::Function::from(linear.0.clone());
+    }
+
+    pub fn add_assign_quadratic(&mut self, quadratic: &Quadratic) {
+        self.0 += v1::Function::from(quadratic.0.clone());
+    }
+
+    pub fn add_assign_polynomial(&mut self, polynomial: &Polynomial) {
+        self.0 += v1::Function::from(polynomial.0.clone());
+    }
+
     pub fn content_factor(&self) -> Result<f64> {
         self.0.content_factor()
     }
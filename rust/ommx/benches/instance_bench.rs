@@ -0,0 +1,405 @@
+use criterion::{
+    criterion_group, criterion_main, AxisScale, BatchSize, Bencher, BenchmarkId, Criterion,
+    PlotConfiguration,
+};
+
+use ommx::{
+    mps,
+    qplib::QplibFile,
+    random::{
+        arbitrary_state, random_deterministic, sample_deterministic, FunctionParameters,
+        InstanceParameters,
+    },
+    v1::{
+        decision_variable::Kind, instance::Sense, Bound, DecisionVariable, Equality, Function,
+        Instance, Linear, Polynomial, Quadratic, Samples, State,
+    },
+    Evaluate,
+};
+use prost::Message;
+use std::{collections::HashMap, fmt::Write};
+
+/// Total number of terms in the random instances
+const NUM_TERMS: [usize; 5] = [100, 1_000, 10_000, 100_000, 1_000_000];
+
+/// Number of terms in the objective and each constraint of the random instances
+const TERMS_PER_FUNCTION: usize = 100;
+
+const NUM_SAMPLES: u64 = 10;
+
+/// Number of decision variables encoded in a `log-encode` iteration
+const NUM_LOG_ENCODE: usize = 10;
+
+/// Run `f` for the input of each scale as a benchmark group `name`
+fn bench_scales<T>(
+    c: &mut Criterion,
+    name: &str,
+    inputs: &[(usize, T)],
+    mut f: impl FnMut(&mut Bencher, &T),
+) {
+    let mut group = c.benchmark_group(name);
+    group.plot_config(PlotConfiguration::default().summary_scale(AxisScale::Logarithmic));
+    // The largest instances take seconds per iteration
+    group.sample_size(10);
+    for (num_terms, input) in inputs {
+        group.bench_with_input(BenchmarkId::new(name, num_terms.to_string()), input, &mut f);
+    }
+    group.finish();
+}
+
+/// Linear instance with about `num_terms` terms split into the objective and constraints
+fn linear_instance(num_terms: usize, kinds: Vec<Kind>) -> Instance {
+    let function = FunctionParameters {
+        num_terms: TERMS_PER_FUNCTION,
+        max_degree: 1,
+        max_id: num_terms as u64,
+    };
+    random_deterministic(InstanceParameters {
+        num_constraints: num_terms / TERMS_PER_FUNCTION,
+        objective: function,
+        constraint: function,
+        kinds,
+    })
+}
+
+/// Unconstrained minimization of `objective` over binary variables
+fn binary_instance(objective: Function) -> Instance {
+    let decision_variables = objective
+        .used_decision_variable_ids()
+        .into_iter()
+        .map(|id| DecisionVariable {
+            id,
+            kind: Kind::Binary as i32,
+            bound: Some(Bound {
+                lower: 0.0,
+                upper: 1.0,
+            }),
+            ..Default::default()
+        })
+        .collect();
+    Instance {
+        objective: Some(objective),
+        decision_variables,
+        sense: Sense::Minimize as i32,
+        ..Default::default()
+    }
+}
+
+/// Samples of distinct states shifted from `state`
+fn samples(state: &State) -> Samples {
+    let mut samples = Samples::default();
+    for sample_id in 0..NUM_SAMPLES {
+        let mut state = state.clone();
+        for value in state.entries.values_mut() {
+            *value += sample_id as f64;
+        }
+        samples.add_sample(sample_id, state);
+    }
+    samples
+}
+
+/// Write a linear instance of continuous variables in QPLIB format as a `LCL` problem
+fn qplib_input(instance: &Instance) -> String {
+    const INFINITY: f64 = 1e20;
+    let clamp = |value: f64| value.clamp(-INFINITY, INFINITY);
+    let index: HashMap<u64, usize> = instance
+        .decision_variables
+        .iter()
+        .enumerate()
+        .map(|(i, dv)| (dv.id, i + 1))
+        .collect();
+
+    let mut out = String::new();
+    writeln!(out, "BENCH").unwrap();
+    writeln!(out, "LCL").unwrap();
+    writeln!(out, "Minimize").unwrap();
+    writeln!(out, "{}", index.len()).unwrap();
+    writeln!(out, "{}", instance.constraints.len()).unwrap();
+
+    let mut b0 = Vec::new();
+    let mut q0 = 0.0;
+    for (ids, coefficient) in instance.objective().into_iter() {
+        match &*ids {
+            [] => q0 = coefficient,
+            [id] => b0.push((index[id], coefficient)),
+            _ => unreachable!("Objective must be linear"),
+        }
+    }
+    writeln!(out, "0.0\n{}", b0.len()).unwrap();
+    for (i, coefficient) in b0 {
+        writeln!(out, "{i} {coefficient}").unwrap();
+    }
+    writeln!(out, "{q0}").unwrap();
+
+    let mut b = Vec::new();
+    let mut lower = Vec::new();
+    let mut upper = Vec::new();
+    for (k, c) in instance.constraints.iter().enumerate() {
+        let mut constant = 0.0;
+        for (ids, coefficient) in c.function().into_iter() {
+            match &*ids {
+                [] => constant = coefficient,
+                [id] => b.push((k + 1, index[id], coefficient)),
+                _ => unreachable!("Constraints must be linear"),
+            }
+        }
+        if c.equality() == Equality::EqualToZero {
+            lower.push((k + 1, -constant));
+        }
+        upper.push((k + 1, -constant));
+    }
+    writeln!(out, "{}", b.len()).unwrap();
+    for (k, i, coefficient) in b {
+        writeln!(out, "{k} {i} {coefficient}").unwrap();
+    }
+    writeln!(out, "{INFINITY:e}").unwrap();
+    for (default, entries) in [(-INFINITY, lower), (INFINITY, upper)] {
+        writeln!(out, "{default:e}\n{}", entries.len()).unwrap();
+        for (k, value) in entries {
+            writeln!(out, "{k} {value}").unwrap();
+        }
+    }
+
+    let (lower, upper): (Vec<_>, Vec<_>) = instance
+        .decision_variables
+        .iter()
+        .map(|dv| {
+            dv.bound
+                .as_ref()
+                .map_or((f64::NEG_INFINITY, f64::INFINITY), |b| (b.lower, b.upper))
+        })
+        .unzip();
+    for values in [lower, upper] {
+        writeln!(out, "0.0\n{}", values.len()).unwrap();
+        for (i, value) in values.into_iter().enumerate() {
+            writeln!(out, "{} {:e}", i + 1, clamp(value)).unwrap();
+        }
+    }
+
+    // Starting points of x, y, z, and names of variables and constraints
+    for _ in 0..3 {
+        writeln!(out, "0.0\n0").unwrap();
+    }
+    writeln!(out, "0\n0").unwrap();
+    out
+}
+
+fn evaluate(c: &mut Criterion) {
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let instance = linear_instance(
+                num_terms,
+                vec![Kind::Continuous, Kind::Integer, Kind::Binary],
+            );
+            let state =
+                sample_deterministic(arbitrary_state(instance.used_decision_variable_ids()));
+            let samples = samples(&state);
+            let partial = State {
+                entries: state
+                    .entries
+                    .iter()
+                    .filter(|(id, _)| *id % 2 == 0)
+                    .map(|(id, value)| (*id, *value))
+                    .collect(),
+            };
+            (num_terms, (instance, state, samples, partial))
+        })
+        .collect();
+
+    bench_scales(
+        c,
+        "instance-evaluate",
+        &inputs,
+        |b, (instance, state, _, _)| b.iter(|| instance.evaluate(state).unwrap()),
+    );
+    bench_scales(
+        c,
+        "instance-evaluate-samples",
+        &inputs,
+        |b, (instance, _, samples, _)| b.iter(|| instance.evaluate_samples(samples).unwrap()),
+    );
+    bench_scales(
+        c,
+        "instance-partial-evaluate",
+        &inputs,
+        |b, (instance, _, _, partial)| {
+            b.iter_batched_ref(
+                || instance.clone(),
+                |instance| instance.partial_evaluate(partial).unwrap(),
+                BatchSize::LargeInput,
+            )
+        },
+    );
+}
+
+fn convert(c: &mut Criterion) {
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let instance = linear_instance(
+                num_terms,
+                vec![Kind::Continuous, Kind::Integer, Kind::Binary],
+            );
+            (num_terms, instance)
+        })
+        .collect();
+    bench_scales(c, "instance-penalty-method", &inputs, |b, instance| {
+        b.iter_batched(
+            || instance.clone(),
+            |instance| instance.penalty_method().unwrap(),
+            BatchSize::LargeInput,
+        )
+    });
+    bench_scales(
+        c,
+        "instance-uniform-penalty-method",
+        &inputs,
+        |b, instance| {
+            b.iter_batched(
+                || instance.clone(),
+                |instance| instance.uniform_penalty_method().unwrap(),
+                BatchSize::LargeInput,
+            )
+        },
+    );
+
+    let inputs: Vec<_> = inputs
+        .into_iter()
+        .map(|(num_terms, instance)| {
+            // Replace every 10th variable by a fresh one, `x_i -> 2 x_j + 1`
+            let ids = instance.used_decision_variable_ids();
+            let id_base = ids.last().map_or(0, |id| id + 1);
+            let replacement: HashMap<u64, Function> = ids
+                .into_iter()
+                .step_by(10)
+                .map(|id| {
+                    let linear = Linear::new([(id_base + id, 2.0)].into_iter(), 1.0);
+                    (id, linear.into())
+                })
+                .collect();
+            (num_terms, (instance, replacement))
+        })
+        .collect();
+    bench_scales(
+        c,
+        "instance-substitute",
+        &inputs,
+        |b, (instance, replacement)| {
+            b.iter_batched(
+                || (instance.clone(), replacement.clone()),
+                |(mut instance, replacement)| {
+                    instance.substitute(replacement).unwrap();
+                    instance
+                },
+                BatchSize::LargeInput,
+            )
+        },
+    );
+
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let mut instance = linear_instance(num_terms, vec![Kind::Integer]);
+            for dv in &mut instance.decision_variables {
+                dv.bound = Some(Bound {
+                    lower: 0.0,
+                    upper: 100.0,
+                });
+            }
+            let ids: Vec<u64> = instance
+                .decision_variables
+                .iter()
+                .map(|dv| dv.id)
+                .take(NUM_LOG_ENCODE)
+                .collect();
+            (num_terms, (instance, ids))
+        })
+        .collect();
+    bench_scales(c, "instance-log-encode", &inputs, |b, (instance, ids)| {
+        b.iter_batched_ref(
+            || instance.clone(),
+            |instance| {
+                for id in ids {
+                    instance.log_encode(*id).unwrap();
+                }
+            },
+            BatchSize::LargeInput,
+        )
+    });
+}
+
+fn qubo(c: &mut Criterion) {
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let quad: Quadratic = random_deterministic(FunctionParameters {
+                num_terms,
+                max_degree: 2,
+                max_id: num_terms as u64,
+            });
+            (num_terms, binary_instance(quad.into()))
+        })
+        .collect();
+    bench_scales(c, "instance-as-qubo-format", &inputs, |b, instance| {
+        b.iter(|| instance.as_qubo_format().unwrap())
+    });
+
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let poly: Polynomial = random_deterministic(FunctionParameters {
+                num_terms,
+                max_degree: 3,
+                max_id: num_terms as u64,
+            });
+            (num_terms, binary_instance(poly.into()))
+        })
+        .collect();
+    bench_scales(c, "instance-as-pubo-format", &inputs, |b, instance| {
+        b.iter(|| instance.as_pubo_format().unwrap())
+    });
+}
+
+fn serialize(c: &mut Criterion) {
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let instance = linear_instance(num_terms, vec![Kind::Continuous, Kind::Integer]);
+            let mut mps = Vec::new();
+            mps::write_mps(&instance, &mut mps).unwrap();
+            let protobuf = instance.encode_to_vec();
+            (num_terms, (instance, mps, protobuf))
+        })
+        .collect();
+    bench_scales(c, "instance-mps-write", &inputs, |b, (instance, _, _)| {
+        let mut buffer = Vec::new();
+        b.iter(|| {
+            buffer.clear();
+            mps::write_mps(instance, &mut buffer).unwrap();
+        })
+    });
+    bench_scales(c, "instance-mps-load", &inputs, |b, (_, mps, _)| {
+        b.iter(|| mps::load_raw_bytes(mps).unwrap())
+    });
+    bench_scales(c, "instance-encode", &inputs, |b, (instance, _, _)| {
+        b.iter(|| instance.encode_to_vec())
+    });
+    bench_scales(c, "instance-decode", &inputs, |b, (_, _, protobuf)| {
+        b.iter(|| Instance::decode(protobuf.as_slice()).unwrap())
+    });
+
+    let inputs: Vec<_> = NUM_TERMS
+        .into_iter()
+        .map(|num_terms| {
+            let instance = linear_instance(num_terms, vec![Kind::Continuous]);
+            (num_terms, qplib_input(&instance))
+        })
+        .collect();
+    bench_scales(c, "instance-qplib-load", &inputs, |b, input| {
+        b.iter(|| QplibFile::from_reader(input.as_bytes()).unwrap())
+    });
+}
+
+criterion_group!(instance_benches, evaluate, convert, qubo, serialize);
+criterion_main!(instance_benches);
@@ -0,0 +1,132 @@
+use criterion::{criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+
+use ommx::{
+    mps,
+    random::{random_deterministic, FunctionParameters, InstanceParameters},
+    v1::{decision_variable::Kind, Instance},
+};
+use std::{
+    alloc::{GlobalAlloc, Layout, System},
+    sync::atomic::{AtomicUsize, Ordering},
+};
+
+/// Allocator tracking the current and peak size of the heap to report the memory footprint of the loader
+struct PeakAllocator;
+
+static CURRENT: AtomicUsize = AtomicUsize::new(0);
+static PEAK: AtomicUsize = AtomicUsize::new(0);
+
+fn track(size: usize) {
+    let current = CURRENT.fetch_add(size, Ordering::Relaxed) + size;
+    PEAK.fetch_max(current, Ordering::Relaxed);
+}
+
+unsafe impl GlobalAlloc for PeakAllocator {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        let ptr = System.alloc(layout);
+        if !ptr.is_null() {
+            track(layout.size());
+        }
+        ptr
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        System.dealloc(ptr, layout);
+        CURRENT.fetch_sub(layout.size(), Ordering::Relaxed);
+    }
+
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        let new_ptr = System.realloc(ptr, layout, new_size);
+        if !new_ptr.is_null() {
+            if new_size > layout.size() {
+                track(new_size - layout.size());
+            } else {
+                CURRENT.fetch_sub(layout.size() - new_size, Ordering::Relaxed);
+            }
+        }
+        new_ptr
+    }
+}
+
+#[global_allocator]
+static ALLOCATOR: PeakAllocator = PeakAllocator;
+
+/// Peak heap usage during `f` in bytes, relative to the heap size at the start
+fn peak_memory<T>(f: impl FnOnce() -> T) -> (T, usize) {
+    let base = CURRENT.load(Ordering::Relaxed);
+    PEAK.store(base, Ordering::Relaxed);
+    let out = f();
+    (out, PEAK.load(Ordering::Relaxed) - base)
+}
+
+fn random_instance(num_constraints: usize) -> Instance {
+    let num_terms = 10;
+    random_deterministic(InstanceParameters {
+        num_constraints,
+        objective: FunctionParameters {
+            num_terms,
+            max_degree: 1,
+            max_id: num_constraints as u64,
+        },
+        constraint: FunctionParameters {
+            num_terms,
+            max_degree: 1,
+            max_id: num_constraints as u64,
+        },
+        kinds: vec![Kind::Continuous, Kind::Integer],
+    })
+}
+
+fn mps_input(num_constraints: usize) -> Vec<u8> {
+    let mut buffer = Vec::new();
+    mps::write_mps(&random_instance(num_constraints), &mut buffer).unwrap();
+    buffer
+}
+
+fn load(c: &mut Criterion) {
+    let mut group = c.benchmark_group("mps-load");
+    for num_constraints in [100, 1000, 10_000] {
+        let input = mps_input(num_constraints);
+        let (instance, peak) = peak_memory(|| mps::load_raw_reader(input.as_slice()).unwrap());
+        println!(
+            "mps-load/{num_constraints}: input {} bytes, peak heap {} bytes ({:.2}x input)",
+            input.len(),
+            peak,
+            peak as f64 / input.len() as f64
+        );
+        drop(instance);
+
+        group.throughput(Throughput::Bytes(input.len() as u64));
+        group.bench_with_input(
+            BenchmarkId::new("mps-load", num_constraints.to_string()),
+            &input,
+            |b, input| b.iter(|| mps::load_raw_reader(input.as_slice()).unwrap()),
+        );
+    }
+    group.finish();
+}
+
+fn write(c: &mut Criterion) {
+    let mut group = c.benchmark_group("mps-write");
+    for num_constraints in [100, 1000, 10_000] {
+        let instance = random_instance(num_constraints);
+        let mut buffer = Vec::new();
+        mps::write_mps(&instance, &mut buffer).unwrap();
+
+        group.throughput(Throughput::Bytes(buffer.len() as u64));
+        group.bench_with_input(
+            BenchmarkId::new("mps-write", num_constraints.to_string()),
+            &instance,
+            |b, instance| {
+                b.iter(|| {
+                    buffer.clear();
+                    mps::write_mps(instance, &mut buffer).unwrap();
+                })
+            },
+        );
+    }
+    group.finish();
+}
+
+criterion_group!(mps_benches, load, write);
+criterion_main!(mps_benches);
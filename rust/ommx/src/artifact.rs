@@ -2,20 +2,29 @@
 //!
 
 mod annotations;
+mod archive;
+mod blob_store;
 mod builder;
 mod config;
+mod layout;
 pub mod media_types;
+mod transfer;
 pub use annotations::*;
+pub use archive::*;
+pub use blob_store::*;
 pub use builder::*;
 pub use config::*;
+pub use layout::*;
+pub use transfer::*;
 
 use crate::v1;
 use anyhow::{bail, ensure, Context, Result};
+use blob_store::blob_path_in;
 use ocipkg::{
     distribution::MediaType,
     image::{
-        Image, OciArchive, OciArchiveBuilder, OciArtifact, OciDir, OciDirBuilder, Remote,
-        RemoteBuilder,
+        Image, ImageBuilder, OciArchive, OciArchiveBuilder, OciArtifact, OciDir, OciDirBuilder,
+        Remote,
     },
     oci_spec::image::{Descriptor, ImageManifest},
     Digest, ImageName,
@@ -54,6 +63,10 @@ fn gather_oci_dirs(dir: &Path) -> Result<Vec<PathBuf>> {
     for entry in std::fs::read_dir(dir)? {
         let entry = entry?;
         let path = entry.path();
+        // Skip the internal directories of the local registry, e.g. the shared blob store
+        if entry.file_name().to_string_lossy().starts_with('.') {
+            continue;
+        }
         if path.is_dir() {
             if path.join("oci-layout").exists() {
                 images.push(path);
@@ -80,6 +93,25 @@ fn auth_from_env() -> Result<(String, String, String)> {
     bail!("No authentication information found in environment variables");
 }
 
+/// OCI directories of the images in the local registry
+pub fn get_image_dirs() -> Result<Vec<PathBuf>> {
+    let root = data_dir()?;
+    if !root.exists() {
+        return Ok(Vec::new());
+    }
+    gather_oci_dirs(&root)
+}
+
+/// Share the blobs of an image in the local registry through [`SharedBlobStore`]
+///
+/// This only saves disk space, and a failure is logged instead of failing the caller.
+fn share_blobs(image_dir: &Path) {
+    match SharedBlobStore::open().and_then(|store| store.link_image(image_dir)) {
+        Ok(stats) => log::debug!("Shared blobs of {}: {stats:?}", image_dir.display()),
+        Err(e) => log::warn!("Failed to share blobs of {}: {e:#}", image_dir.display()),
+    }
+}
+
 pub fn get_images() -> Result<Vec<ImageName>> {
     let root = data_dir()?;
     let dirs = gather_oci_dirs(&root)?;
@@ -116,14 +148,14 @@ impl Artifact<OciArchive> {
     }
 
     pub fn push(&mut self) -> Result<Artifact<Remote>> {
-        let name = self.get_name()?;
-        log::info!("Pushing: {}", name);
-        let mut remote = RemoteBuilder::new(name)?;
-        if let Ok((domain, username, password)) = auth_from_env() {
-            remote.add_basic_auth(&domain, &username, &password);
-        }
-        let out = ocipkg::image::copy(self.0.deref_mut(), remote)?;
-        Ok(Artifact(OciArtifact::new(out)))
+        self.push_with(&TransferOptions::default())
+    }
+
+    /// Push to the remote registry, uploading `options.concurrency` blobs in parallel
+    ///
+    /// Blobs uploaded before an interruption are skipped when the push is retried.
+    pub fn push_with(&mut self, options: &TransferOptions) -> Result<Artifact<Remote>> {
+        transfer::push(self.0.deref_mut(), options)
     }
 
     pub fn load(&mut self) -> Result<()> {
@@ -134,7 +166,19 @@ impl Artifact<OciArchive> {
             return Ok(());
         }
         log::info!("Loading: {}", image_name);
-        ocipkg::image::copy(self.0.deref_mut(), OciDirBuilder::new(path, image_name)?)?;
+        let manifest = self.get_manifest()?;
+        let store = SharedBlobStore::open()?;
+        let mut builder = OciDirBuilder::new(path.clone(), image_name)?;
+        // Blobs already in the shared blob store are linked instead of being copied from the archive.
+        // The builder must not write them, since it would overwrite the file shared with other images through the link.
+        for desc in manifest_blobs(&manifest) {
+            let digest = Digest::new(desc.digest())?;
+            if !store.link_to(&digest, &blob_path_in(&path.join("blobs"), &digest))? {
+                builder.add_blob(&self.0.get_blob(&digest)?)?;
+            }
+        }
+        builder.build(manifest)?;
+        share_blobs(&path);
         Ok(())
     }
 }
@@ -146,14 +190,14 @@ impl Artifact<OciDir> {
     }
 
     pub fn push(&mut self) -> Result<Artifact<Remote>> {
-        let name = self.get_name()?;
-        log::info!("Pushing: {}", name);
-        let mut remote = RemoteBuilder::new(name)?;
-        if let Ok((domain, username, password)) = auth_from_env() {
-            remote.add_basic_auth(&domain, &username, &password);
-        }
-        let out = ocipkg::image::copy(self.0.deref_mut(), remote)?;
-        Ok(Artifact(OciArtifact::new(out)))
+        self.push_with(&TransferOptions::default())
+    }
+
+    /// Push to the remote registry, uploading `options.concurrency` blobs in parallel
+    ///
+    /// Blobs uploaded before an interruption are skipped when the push is retried.
+    pub fn push_with(&mut self, options: &TransferOptions) -> Result<Artifact<Remote>> {
+        transfer::push(self.0.deref_mut(), options)
     }
 
     pub fn save(&mut self, output: &Path) -> Result<()> {
@@ -177,6 +221,13 @@ impl Artifact<Remote> {
     }
 
     pub fn pull(&mut self) -> Result<Artifact<OciDir>> {
+        self.pull_with(&TransferOptions::default())
+    }
+
+    /// Pull into the local registry, downloading `options.concurrency` blobs in parallel
+    ///
+    /// Blobs downloaded before an interruption are reused when the pull is retried.
+    pub fn pull_with(&mut self, options: &TransferOptions) -> Result<Artifact<OciDir>> {
         let image_name = self.get_name()?;
         let path = image_dir(&image_name)?;
         if path.exists() {
@@ -187,11 +238,24 @@ impl Artifact<Remote> {
         if let Ok((domain, username, password)) = auth_from_env() {
             self.0.add_basic_auth(&domain, &username, &password);
         }
-        let out = ocipkg::image::copy(self.0.deref_mut(), OciDirBuilder::new(path, image_name)?)?;
-        Ok(Artifact(OciArtifact::new(out)))
+        let manifest = self.0.get_manifest()?;
+        transfer::pull(&image_name, manifest, &path, options)
     }
 }
 
+fn ensure_ommx_artifact(manifest: &ImageManifest) -> Result<()> {
+    let ty = manifest
+        .artifact_type()
+        .as_ref()
+        .context("Not an OMMX Artifact")?;
+    ensure!(
+        *ty == media_types::v1_artifact(),
+        "Not an OMMX Artifact: {}",
+        ty
+    );
+    Ok(())
+}
+
 impl<Base: Image> Artifact<Base> {
     pub fn new(artifact: OciArtifact<Base>) -> Result<Self> {
         Ok(Self(artifact))
@@ -199,15 +263,7 @@ impl<Base: Image> Artifact<Base> {
 
     pub fn get_manifest(&mut self) -> Result<ImageManifest> {
         let manifest = self.0.get_manifest()?;
-        let ty = manifest
-            .artifact_type()
-            .as_ref()
-            .context("Not an OMMX Artifact")?;
-        ensure!(
-            *ty == media_types::v1_artifact(),
-            "Not an OMMX Artifact: {}",
-            ty
-        );
+        ensure_ommx_artifact(&manifest)?;
         Ok(manifest)
     }
 
@@ -228,12 +284,15 @@ impl<Base: Image> Artifact<Base> {
     }
 
     pub fn get_layer(&mut self, digest: &Digest) -> Result<(Descriptor, Vec<u8>)> {
-        for (desc, blob) in self.0.get_layers()? {
-            if desc.digest() == &digest.to_string() {
-                return Ok((desc, blob));
-            }
-        }
-        bail!("Layer of digest {} not found", digest)
+        let manifest = self.get_manifest()?;
+        let desc = manifest
+            .layers()
+            .iter()
+            .find(|desc| desc.digest() == &digest.to_string())
+            .with_context(|| format!("Layer of digest {} not found", digest))?
+            .clone();
+        let blob = self.0.get_blob(digest)?;
+        Ok((desc, blob))
     }
 
     pub fn get_solution(&mut self, digest: &Digest) -> Result<(v1::State, SolutionAnnotations)> {
@@ -254,15 +313,17 @@ impl<Base: Image> Artifact<Base> {
         digest: &Digest,
     ) -> Result<(v1::SampleSet, SampleSetAnnotations)> {
         let (desc, blob) = self.get_layer(digest)?;
-        ensure!(
-            desc.media_type() == &media_types::v1_sample_set(),
-            "Layer {digest} is not an ommx.v1.SampleSet: {}",
-            desc.media_type()
-        );
-        Ok((
-            v1::SampleSet::decode(blob.as_slice())?,
-            SampleSetAnnotations::from_descriptor(&desc),
-        ))
+        let sample_set = if desc.media_type() == &media_types::v1_sample_set() {
+            v1::SampleSet::decode(blob.as_slice())?
+        } else if desc.media_type() == &media_types::v1_compact_sample_set() {
+            v1::SampleSet::from_compact_bytes(&blob)?
+        } else {
+            bail!(
+                "Layer {digest} is not an ommx.v1.SampleSet: {}",
+                desc.media_type()
+            )
+        };
+        Ok((sample_set, SampleSetAnnotations::from_descriptor(&desc)))
     }
 
     pub fn get_instance(&mut self, digest: &Digest) -> Result<(v1::Instance, InstanceAnnotations)> {
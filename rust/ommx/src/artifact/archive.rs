@@ -0,0 +1,320 @@
+use super::ensure_ommx_artifact;
+use anyhow::{ensure, Context, Result};
+use ocipkg::{
+    oci_spec::image::{ImageIndex, ImageManifest, ANNOTATION_REF_NAME},
+    Digest, ImageName,
+};
+use serde::{Deserialize, Serialize};
+use std::{
+    collections::BTreeMap,
+    fs::{File, Metadata},
+    io::{Read, Seek, SeekFrom},
+    ops::Range,
+    path::{Path, PathBuf},
+    time::UNIX_EPOCH,
+};
+
+/// Position of a regular file entry in a tar archive
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+pub struct ArchiveEntry {
+    /// Offset of the content from the beginning of the archive in bytes
+    pub offset: u64,
+    /// Size of the content in bytes
+    pub size: u64,
+}
+
+/// Offset index of the entries in an OCI archive
+///
+/// Building the index reads only the tar headers, seeking over the contents.
+/// The index can be persisted as a sidecar file next to the archive, see [`ArchiveIndex::sidecar_path`].
+/// It records the size and modification time of the archive, and a sidecar not matching them is discarded.
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+pub struct ArchiveIndex {
+    archive_size: u64,
+    modified: Option<u64>,
+    entries: BTreeMap<String, ArchiveEntry>,
+}
+
+/// Modification time in nanoseconds since UNIX epoch, if the platform supports it
+fn modified(metadata: &Metadata) -> Option<u64> {
+    let modified = metadata.modified().ok()?;
+    Some(modified.duration_since(UNIX_EPOCH).ok()?.as_nanos() as u64)
+}
+
+impl ArchiveIndex {
+    /// Build the index by scanning the tar headers of the archive
+    pub fn build(path: &Path) -> Result<Self> {
+        let file = File::open(path)
+            .with_context(|| format!("Failed to open OCI archive: {}", path.display()))?;
+        let metadata = file.metadata()?;
+        let mut archive = tar::Archive::new(file);
+        let mut entries = BTreeMap::new();
+        for entry in archive.entries_with_seek()? {
+            let entry = entry?;
+            if !entry.header().entry_type().is_file() {
+                continue;
+            }
+            let name = entry.path()?.to_string_lossy().to_string();
+            let name = name.trim_start_matches("./").to_string();
+            entries.insert(
+                name,
+                ArchiveEntry {
+                    offset: entry.raw_file_position(),
+                    size: entry.size(),
+                },
+            );
+        }
+        Ok(Self {
+            archive_size: metadata.len(),
+            modified: modified(&metadata),
+            entries,
+        })
+    }
+
+    /// Path of the sidecar file for the archive, i.e. `<archive>.index.json`
+    pub fn sidecar_path(archive: &Path) -> PathBuf {
+        let mut name = archive.as_os_str().to_owned();
+        name.push(".index.json");
+        PathBuf::from(name)
+    }
+
+    /// Load the index from the sidecar file of the archive
+    ///
+    /// Returns `None` if the sidecar does not exist, cannot be parsed, or is outdated.
+    pub fn load(archive: &Path) -> Result<Option<Self>> {
+        let sidecar = Self::sidecar_path(archive);
+        if !sidecar.exists() {
+            return Ok(None);
+        }
+        let metadata = std::fs::metadata(archive)?;
+        let index: Self = match serde_json::from_slice(&std::fs::read(&sidecar)?) {
+            Ok(index) => index,
+            Err(e) => {
+                log::warn!("Ignore broken archive index {}: {e}", sidecar.display());
+                return Ok(None);
+            }
+        };
+        if index.archive_size != metadata.len() || index.modified != modified(&metadata) {
+            log::info!("Ignore outdated archive index: {}", sidecar.display());
+            return Ok(None);
+        }
+        Ok(Some(index))
+    }
+
+    /// Write the index as the sidecar file of the archive
+    pub fn save(&self, archive: &Path) -> Result<()> {
+        let sidecar = Self::sidecar_path(archive);
+        std::fs::write(&sidecar, serde_json::to_vec(self)?)
+            .with_context(|| format!("Failed to write archive index: {}", sidecar.display()))
+    }
+
+    /// Load the index from the sidecar if it is up to date, otherwise build it.
+    ///
+    /// If `persist` is true, a newly built index is written as the sidecar.
+    /// Failing to write the sidecar is not an error since the index is only a cache.
+    pub fn load_or_build(archive: &Path, persist: bool) -> Result<Self> {
+        if let Some(index) = Self::load(archive)? {
+            return Ok(index);
+        }
+        let index = Self::build(archive)?;
+        if persist {
+            if let Err(e) = index.save(archive) {
+                log::warn!("{e:#}");
+            }
+        }
+        Ok(index)
+    }
+
+    /// Entry of the file at `path` in the archive, e.g. `index.json`
+    pub fn get(&self, path: &str) -> Option<&ArchiveEntry> {
+        self.entries.get(path)
+    }
+
+    /// Entry of the blob in the archive
+    pub fn get_blob(&self, digest: &Digest) -> Option<&ArchiveEntry> {
+        let digest = digest.to_string();
+        let (algorithm, encoded) = digest.split_once(':')?;
+        self.get(&format!("blobs/{algorithm}/{encoded}"))
+    }
+}
+
+/// Random-access reader of blobs in an OCI archive
+///
+/// Blobs, `index.json` and the manifest are located by [`ArchiveIndex`] and read by seeking to them,
+/// instead of scanning the archive for each of them as [`ocipkg::image::OciArchive`] does.
+///
+/// The archive is opened for each read rather than memory-mapped for the lifetime of the reader,
+/// so that overwriting the archive while the reader is alive does not crash the process.
+/// A read fails if the size or modification time of the archive differs from the index.
+pub struct ArchiveReader {
+    path: PathBuf,
+    index: ArchiveIndex,
+}
+
+impl ArchiveReader {
+    /// Open the archive, using the sidecar index if it is up to date.
+    ///
+    /// See [`ArchiveIndex::load_or_build`] for `persist_index`.
+    pub fn open(path: &Path, persist_index: bool) -> Result<Self> {
+        let index = ArchiveIndex::load_or_build(path, persist_index)?;
+        Ok(Self {
+            path: path.to_path_buf(),
+            index,
+        })
+    }
+
+    pub fn path(&self) -> &Path {
+        &self.path
+    }
+
+    pub fn index(&self) -> &ArchiveIndex {
+        &self.index
+    }
+
+    fn entry(&self, digest: &Digest) -> Result<&ArchiveEntry> {
+        let entry = self.index.get_blob(digest).with_context(|| {
+            format!(
+                "Blob {digest} not found in OCI archive {}",
+                self.path.display()
+            )
+        })?;
+        self.check_entry(entry, &digest.to_string())
+    }
+
+    /// Check that the entry of `name` lies within the archive
+    fn check_entry<'e>(&self, entry: &'e ArchiveEntry, name: &str) -> Result<&'e ArchiveEntry> {
+        ensure!(
+            entry
+                .offset
+                .checked_add(entry.size)
+                .is_some_and(|end| end <= self.index.archive_size),
+            "Broken index of OCI archive {}: {name} exceeds the archive",
+            self.path.display()
+        );
+        Ok(entry)
+    }
+
+    /// Read `len` bytes from `offset` of the archive, checking that the archive is not modified since indexed
+    fn read(&self, offset: u64, len: u64) -> Result<Vec<u8>> {
+        let mut file = File::open(&self.path)
+            .with_context(|| format!("Failed to open OCI archive: {}", self.path.display()))?;
+        let metadata = file.metadata()?;
+        ensure!(
+            metadata.len() == self.index.archive_size && modified(&metadata) == self.index.modified,
+            "OCI archive {} has been modified since it was opened",
+            self.path.display()
+        );
+        file.seek(SeekFrom::Start(offset))?;
+        let mut buf = vec![0; len as usize];
+        file.read_exact(&mut buf)?;
+        Ok(buf)
+    }
+
+    /// Read the content of the blob
+    pub fn get_blob(&self, digest: &Digest) -> Result<Vec<u8>> {
+        let entry = self.entry(digest)?;
+        self.read(entry.offset, entry.size)
+    }
+
+    /// Read the file at `path` in the archive, e.g. `index.json`
+    pub fn get_file(&self, path: &str) -> Result<Vec<u8>> {
+        let entry = self
+            .index
+            .get(path)
+            .with_context(|| format!("{path} not found in OCI archive {}", self.path.display()))?;
+        let entry = self.check_entry(entry, path)?;
+        self.read(entry.offset, entry.size)
+    }
+
+    /// The image index at `index.json`
+    pub fn get_index(&self) -> Result<ImageIndex> {
+        Ok(serde_json::from_slice(&self.get_file("index.json")?)?)
+    }
+
+    /// Name of the image recorded in `index.json`
+    pub fn get_name(&self) -> Result<ImageName> {
+        let index = self.get_index()?;
+        let name = index
+            .manifests()
+            .first()
+            .and_then(|desc| desc.annotations().as_ref()?.get(ANNOTATION_REF_NAME))
+            .with_context(|| format!("OCI archive {} is unnamed", self.path.display()))?;
+        ImageName::parse(name)
+    }
+
+    /// The manifest of the OMMX artifact referenced from `index.json`, read without scanning the archive
+    pub fn get_manifest(&self) -> Result<ImageManifest> {
+        let index = self.get_index()?;
+        let desc = index
+            .manifests()
+            .first()
+            .with_context(|| format!("No manifest in OCI archive {}", self.path.display()))?;
+        let digest = Digest::new(desc.digest())?;
+        let manifest = serde_json::from_slice(&self.get_blob(&digest)?)?;
+        ensure_ommx_artifact(&manifest)?;
+        Ok(manifest)
+    }
+
+    /// Read the part of the blob in the byte `range` relative to the beginning of the blob
+    pub fn get_blob_range(&self, digest: &Digest, range: Range<u64>) -> Result<Vec<u8>> {
+        let entry = self.entry(digest)?;
+        ensure!(
+            range.start <= range.end && range.end <= entry.size,
+            "Range {range:?} is out of blob {digest} of {} bytes",
+            entry.size
+        );
+        self.read(entry.offset + range.start, range.end - range.start)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::artifact::Builder;
+    use ocipkg::image::Image;
+    use uuid::Uuid;
+
+    #[test]
+    fn read_blobs() -> Result<()> {
+        let path = std::env::temp_dir().join(format!("ommx-{}", Uuid::new_v4()));
+        let name = ImageName::parse("ttl.sh/ommx-archive-reader:1h")?;
+        let mut builder = Builder::new_archive(path.clone(), name.clone())?;
+        let blobs: Vec<Vec<u8>> = (0..3u8).map(|i| vec![i; 1000 * i as usize]).collect();
+        let mut digests = Vec::new();
+        for blob in &blobs {
+            let desc =
+                builder.add_layer("application/octet-stream".into(), blob, Default::default())?;
+            digests.push(Digest::new(desc.digest())?);
+        }
+        let mut artifact = builder.build()?;
+
+        let reader = ArchiveReader::open(&path, true)?;
+        for (digest, blob) in digests.iter().zip(&blobs) {
+            assert_eq!(&reader.get_blob(digest)?, blob);
+            assert_eq!(reader.get_blob(digest)?, artifact.get_blob(digest)?);
+        }
+        assert_eq!(
+            reader.get_blob_range(&digests[2], 10..20)?,
+            &blobs[2][10..20]
+        );
+        assert!(reader.get_blob_range(&digests[2], 10..2001).is_err());
+        assert!(reader.index().get("index.json").is_some());
+        assert_eq!(reader.get_manifest()?, artifact.get_manifest()?);
+        assert_eq!(reader.get_name()?.to_string(), name.to_string());
+
+        // The persisted sidecar is loaded while it is up to date, and discarded after the archive is modified
+        let sidecar = ArchiveIndex::sidecar_path(&path);
+        assert_eq!(ArchiveIndex::load(&path)?.as_ref(), Some(reader.index()));
+        std::fs::OpenOptions::new()
+            .append(true)
+            .open(&path)?
+            .set_len(reader.index().archive_size + 512)?;
+        assert_eq!(ArchiveIndex::load(&path)?, None);
+        // Reading from the modified archive fails instead of returning a wrong content
+        assert!(reader.get_blob(&digests[1]).is_err());
+
+        std::fs::remove_file(&path)?;
+        std::fs::remove_file(&sidecar)?;
+        Ok(())
+    }
+}
@@ -0,0 +1,336 @@
+use super::data_dir;
+use anyhow::{bail, Context, Result};
+use ocipkg::Digest;
+use sha2::{Digest as _, Sha256};
+use std::{
+    collections::BTreeMap,
+    fs::{self, File},
+    io,
+    path::{Path, PathBuf},
+};
+use uuid::Uuid;
+
+/// Summary of [`SharedBlobStore::link_image`]
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct LinkStats {
+    /// Number of blobs in the image replaced by a link to the blob in the store
+    pub linked: usize,
+    /// Number of blobs in the image newly added to the store
+    pub added: usize,
+    /// Number of blobs kept as separate copies since hard links are not available
+    pub copied: usize,
+    /// Number of blobs in the image not matching their digests, which are not shared
+    pub corrupted: usize,
+}
+
+/// Summary of [`SharedBlobStore::gc`]
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct GcStats {
+    /// Number of blobs referenced by at least one image
+    pub kept: usize,
+    /// Number of removed blobs
+    pub removed: usize,
+    /// Total size of the removed blobs in bytes
+    pub removed_bytes: u64,
+}
+
+/// Content-addressed store of blobs shared by the images in the local registry
+///
+/// The store keeps each blob once as `<root>/<algorithm>/<encoded>`, and the blobs in the OCI directory of each image
+/// are hard links to them, so that a layer shared by many images occupies the disk only once.
+/// A blob is referenced by an image if the OCI directory of the image contains the blob of the same digest,
+/// and [`SharedBlobStore::gc`] removes the blobs referenced by no image.
+///
+/// Where hard links are not available, e.g. the image directory is on another file system,
+/// the image keeps its own copy of the blob as a plain OCI directory does.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct SharedBlobStore {
+    root: PathBuf,
+}
+
+/// Paths of the blobs in `dir` laid out as `<algorithm>/<encoded>`, with their digests
+fn list_blobs(dir: &Path) -> Result<Vec<(Digest, PathBuf)>> {
+    let mut blobs = Vec::new();
+    if !dir.exists() {
+        return Ok(blobs);
+    }
+    for algorithm in fs::read_dir(dir)? {
+        let algorithm = algorithm?;
+        if !algorithm.file_type()?.is_dir() {
+            continue;
+        }
+        for blob in fs::read_dir(algorithm.path())? {
+            let blob = blob?;
+            let encoded = blob.file_name().to_string_lossy().to_string();
+            // Skip temporary files of links being created
+            if encoded.contains(".tmp-") {
+                continue;
+            }
+            let algorithm = algorithm.file_name().to_string_lossy().to_string();
+            let Ok(digest) = Digest::new(&format!("{algorithm}:{encoded}")) else {
+                continue;
+            };
+            blobs.push((digest, blob.path()));
+        }
+    }
+    Ok(blobs)
+}
+
+/// Path of the blob laid out as `<dir>/<algorithm>/<encoded>`
+pub(super) fn blob_path_in(dir: &Path, digest: &Digest) -> PathBuf {
+    let digest = digest.to_string();
+    let (algorithm, encoded) = digest.split_once(':').unwrap_or(("", &digest));
+    dir.join(algorithm).join(encoded)
+}
+
+/// Hex-encoded hash of the digest, which must be of sha256
+fn sha256_encoded(digest: &Digest) -> Result<String> {
+    let digest = digest.to_string();
+    let Some(("sha256", encoded)) = digest.split_once(':') else {
+        bail!("Unsupported digest algorithm: {digest}");
+    };
+    Ok(encoded.to_string())
+}
+
+/// Whether the content of the file at `path` matches the digest
+pub(super) fn verify(digest: &Digest, path: &Path) -> Result<bool> {
+    let encoded = sha256_encoded(digest)?;
+    let mut hasher = Sha256::new();
+    io::copy(&mut File::open(path)?, &mut hasher)?;
+    Ok(format!("{:x}", hasher.finalize()) == encoded)
+}
+
+/// Whether the blob matches the digest
+pub(super) fn verify_blob(digest: &Digest, blob: &[u8]) -> Result<bool> {
+    Ok(format!("{:x}", Sha256::digest(blob)) == sha256_encoded(digest)?)
+}
+
+impl SharedBlobStore {
+    pub fn new(root: PathBuf) -> Self {
+        Self { root }
+    }
+
+    /// The store of the local registry at `<data_dir>/.blobs`
+    pub fn open() -> Result<Self> {
+        Ok(Self::new(data_dir()?.join(".blobs")))
+    }
+
+    pub fn root(&self) -> &Path {
+        &self.root
+    }
+
+    fn blob_path(&self, digest: &Digest) -> PathBuf {
+        blob_path_in(&self.root, digest)
+    }
+
+    pub fn contains(&self, digest: &Digest) -> bool {
+        self.blob_path(digest).exists()
+    }
+
+    /// Create a hard link of `src` at `dest` atomically, replacing `dest` if exists
+    fn link(src: &Path, dest: &Path) -> std::io::Result<()> {
+        let mut tmp = dest.as_os_str().to_owned();
+        tmp.push(format!(".tmp-{}", Uuid::new_v4()));
+        fs::hard_link(src, &tmp)?;
+        fs::rename(&tmp, dest).inspect_err(|_| {
+            fs::remove_file(&tmp).ok();
+        })
+    }
+
+    /// Create a hard link of the blob in the store at `dest`
+    ///
+    /// Returns `false` if the store does not have the blob, the blob in the store does not match its digest,
+    /// or hard links are not available.
+    pub fn link_to(&self, digest: &Digest, dest: &Path) -> Result<bool> {
+        let path = self.blob_path(digest);
+        if !path.exists() {
+            return Ok(false);
+        }
+        match verify(digest, &path) {
+            Ok(true) => {}
+            Ok(false) => {
+                log::warn!(
+                    "Corrupted blob in the shared blob store: {}",
+                    path.display()
+                );
+                return Ok(false);
+            }
+            Err(e) => {
+                log::debug!("Cannot verify blob {digest} in the shared blob store: {e:#}");
+                return Ok(false);
+            }
+        }
+        if let Some(parent) = dest.parent() {
+            fs::create_dir_all(parent)?;
+        }
+        match Self::link(&path, dest) {
+            Ok(()) => Ok(true),
+            Err(e) => {
+                log::debug!("Cannot link blob {digest} to {}: {e}", dest.display());
+                Ok(false)
+            }
+        }
+    }
+
+    /// Share the blobs of the OCI directory `image_dir` through the store
+    ///
+    /// Each blob of the image is replaced by a hard link to the blob of the same digest in the store,
+    /// or added to the store if the store does not have it.
+    /// Blobs are verified against their digests before being shared, so that a corrupted blob does not spread to other images.
+    /// A corrupted blob of the image is logged and skipped, and a corrupted blob in the store is replaced by the one of the image.
+    pub fn link_image(&self, image_dir: &Path) -> Result<LinkStats> {
+        let mut stats = LinkStats::default();
+        for (digest, path) in list_blobs(&image_dir.join("blobs"))? {
+            let shared = self.blob_path(&digest);
+            // Hard links of each other, compared by the device and inode on Unix, or the volume and file index on Windows
+            if shared.exists() && same_file::is_same_file(&shared, &path)? {
+                continue;
+            }
+            if !verify(&digest, &path)? {
+                log::warn!(
+                    "Blob {digest} does not match its digest: {}",
+                    path.display()
+                );
+                stats.corrupted += 1;
+                continue;
+            }
+            if shared.exists() && !verify(&digest, &shared)? {
+                log::warn!(
+                    "Replace corrupted blob in the shared blob store: {}",
+                    shared.display()
+                );
+                fs::remove_file(&shared)?;
+            }
+            if shared.exists() {
+                match Self::link(&shared, &path) {
+                    Ok(()) => stats.linked += 1,
+                    Err(e) => {
+                        log::debug!("Cannot link blob {digest} to {}: {e}", path.display());
+                        stats.copied += 1;
+                    }
+                }
+            } else {
+                fs::create_dir_all(shared.parent().context("Invalid blob path")?)?;
+                match Self::link(&path, &shared) {
+                    Ok(()) => stats.added += 1,
+                    Err(e) => {
+                        log::debug!("Cannot add blob {digest} to the shared blob store: {e}");
+                        stats.copied += 1;
+                    }
+                }
+            }
+        }
+        Ok(stats)
+    }
+
+    /// Number of images in `image_dirs` referencing each blob in the store
+    pub fn reference_counts(&self, image_dirs: &[PathBuf]) -> Result<BTreeMap<String, usize>> {
+        let mut counts: BTreeMap<String, usize> = list_blobs(&self.root)?
+            .into_iter()
+            .map(|(digest, _)| (digest.to_string(), 0))
+            .collect();
+        for dir in image_dirs {
+            for (digest, _) in list_blobs(&dir.join("blobs"))? {
+                if let Some(count) = counts.get_mut(&digest.to_string()) {
+                    *count += 1;
+                }
+            }
+        }
+        Ok(counts)
+    }
+
+    /// Remove the blobs in the store not referenced by any image in `image_dirs`
+    pub fn gc(&self, image_dirs: &[PathBuf]) -> Result<GcStats> {
+        let mut stats = GcStats::default();
+        for (digest, count) in self.reference_counts(image_dirs)? {
+            if count > 0 {
+                stats.kept += 1;
+                continue;
+            }
+            let path = self.blob_path(&Digest::new(&digest)?);
+            stats.removed_bytes += fs::metadata(&path)?.len();
+            fs::remove_file(&path)?;
+            stats.removed += 1;
+            log::debug!("Removed unreferenced blob: {digest}");
+        }
+        Ok(stats)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn digest(blob: &[u8]) -> Digest {
+        Digest::new(&format!("sha256:{:x}", Sha256::digest(blob))).unwrap()
+    }
+
+    fn image(root: &Path, name: &str, blobs: &[&[u8]]) -> Result<PathBuf> {
+        let dir = root.join(name);
+        for blob in blobs {
+            let path = blob_path_in(&dir.join("blobs"), &digest(blob));
+            fs::create_dir_all(path.parent().unwrap())?;
+            fs::write(path, blob)?;
+        }
+        Ok(dir)
+    }
+
+    #[test]
+    fn link_and_gc() -> Result<()> {
+        let root = std::env::temp_dir().join(format!("ommx-{}", Uuid::new_v4()));
+        let store = SharedBlobStore::new(root.join(".blobs"));
+        let a = image(&root, "a", &[b"x", b"y"])?;
+        let b = image(&root, "b", &[b"x", b"z"])?;
+
+        let stats = store.link_image(&a)?;
+        assert_eq!(stats.added, 2);
+        let stats = store.link_image(&b)?;
+        assert_eq!((stats.added, stats.linked), (1, 1));
+        // Linking again is no-op
+        assert_eq!(store.link_image(&b)?, LinkStats::default());
+
+        let counts = store.reference_counts(&[a.clone(), b.clone()])?;
+        let count = |blob: &[u8]| counts[&digest(blob).to_string()];
+        assert_eq!((count(b"x"), count(b"y"), count(b"z")), (2, 1, 1));
+
+        // The blob only referenced by the removed image is pruned
+        fs::remove_dir_all(&a)?;
+        let stats = store.gc(&[b.clone()])?;
+        assert_eq!((stats.kept, stats.removed, stats.removed_bytes), (2, 1, 1));
+        assert!(!store.contains(&digest(b"y")));
+        assert_eq!(
+            fs::read(blob_path_in(&b.join("blobs"), &digest(b"x")))?,
+            b"x"
+        );
+
+        fs::remove_dir_all(&root)?;
+        Ok(())
+    }
+
+    #[test]
+    fn corrupted_blobs() -> Result<()> {
+        let root = std::env::temp_dir().join(format!("ommx-{}", Uuid::new_v4()));
+        let store = SharedBlobStore::new(root.join(".blobs"));
+        let x = digest(b"x");
+
+        // A blob not matching its digest is not added to the store
+        let a = image(&root, "a", &[b"x"])?;
+        let a_x = blob_path_in(&a.join("blobs"), &x);
+        fs::write(&a_x, b"w")?;
+        assert_eq!(store.link_image(&a)?.corrupted, 1);
+        assert!(!store.contains(&x));
+
+        // A corrupted blob in the store is neither linked nor kept
+        fs::write(&a_x, b"x")?;
+        let shared = store.blob_path(&x);
+        fs::create_dir_all(shared.parent().unwrap())?;
+        fs::write(&shared, b"w")?;
+        assert!(!store.link_to(&x, &root.join("dest"))?);
+        assert_eq!(store.link_image(&a)?.added, 1);
+        assert_eq!(fs::read(&shared)?, b"x");
+        assert!(store.link_to(&x, &root.join("dest"))?);
+
+        fs::remove_dir_all(&root)?;
+        Ok(())
+    }
+}
@@ -1,19 +1,24 @@
 use crate::{
     artifact::{
-        data_dir, ghcr, media_types, Artifact, Config, InstanceAnnotations, SolutionAnnotations,
+        data_dir, ghcr, media_types, Artifact, Config, InstanceAnnotations, LayoutWriter,
+        OciArchiveWriter, OciDirWriter, SolutionAnnotations,
     },
     v1,
 };
 use anyhow::Result;
 use ocipkg::{
-    image::{ImageBuilder, OciArchiveBuilder, OciArtifactBuilder, OciDirBuilder},
+    oci_spec::image::{
+        Descriptor, DescriptorBuilder, ImageManifestBuilder, MediaType, ANNOTATION_DESCRIPTION,
+        ANNOTATION_SOURCE, SCHEMA_VERSION,
+    },
     ImageName,
 };
 use prost::Message;
 use std::{
     collections::HashMap,
-    ops::{Deref, DerefMut},
-    path::PathBuf,
+    fs::File,
+    io::{BufReader, Read},
+    path::{Path, PathBuf},
 };
 use url::Url;
 use uuid::Uuid;
@@ -21,56 +26,44 @@ use uuid::Uuid;
 use super::{ParametricInstanceAnnotations, SampleSetAnnotations};
 
 /// Build [Artifact]
-pub struct Builder<Base: ImageBuilder>(OciArtifactBuilder<Base>);
-
-impl<Base: ImageBuilder> Deref for Builder<Base> {
-    type Target = OciArtifactBuilder<Base>;
-    fn deref(&self) -> &Self::Target {
-        &self.0
-    }
+///
+/// Blobs are written into the archive or directory as soon as they are added, and the manifest on [`Builder::build`].
+pub struct Builder<Base: LayoutWriter> {
+    layout: Base,
+    config: Descriptor,
+    layers: Vec<Descriptor>,
+    annotations: HashMap<String, String>,
 }
 
-impl<Base: ImageBuilder> DerefMut for Builder<Base> {
-    fn deref_mut(&mut self) -> &mut Self::Target {
-        &mut self.0
-    }
+/// Path and image name of a new temporary archive used by [`Builder::temp_archive`]
+pub fn temp_archive_path() -> Result<(PathBuf, ImageName)> {
+    let id = Uuid::new_v4();
+    Ok((
+        std::env::temp_dir().join(format!("ommx-{}", id)),
+        ImageName::parse(&format!("ttl.sh/{}:1h", id))?,
+    ))
 }
 
-impl Builder<OciArchiveBuilder> {
+impl Builder<OciArchiveWriter> {
     pub fn new_archive_unnamed(path: PathBuf) -> Result<Self> {
-        let archive = OciArchiveBuilder::new_unnamed(path)?;
-        Ok(Self(OciArtifactBuilder::new(
-            archive,
-            media_types::v1_artifact(),
-        )?))
+        Self::with_layout(OciArchiveWriter::new(path, None)?)
     }
 
     pub fn new_archive(path: PathBuf, image_name: ImageName) -> Result<Self> {
-        let archive = OciArchiveBuilder::new(path, image_name)?;
-        Ok(Self(OciArtifactBuilder::new(
-            archive,
-            media_types::v1_artifact(),
-        )?))
+        Self::with_layout(OciArchiveWriter::new(path, Some(image_name))?)
     }
 
     /// Create a new artifact builder for a temporary file. This is insecure and should only be used in tests.
     pub fn temp_archive() -> Result<Self> {
-        let id = Uuid::new_v4();
-        Self::new_archive(
-            std::env::temp_dir().join(format!("ommx-{}", id)),
-            ImageName::parse(&format!("ttl.sh/{}:1h", id))?,
-        )
+        let (path, image_name) = temp_archive_path()?;
+        Self::new_archive(path, image_name)
     }
 }
 
-impl Builder<OciDirBuilder> {
+impl Builder<OciDirWriter> {
     pub fn new(image_name: ImageName) -> Result<Self> {
         let dir = data_dir()?.join(image_name.as_path());
-        let layout = OciDirBuilder::new(dir, image_name)?;
-        Ok(Self(OciArtifactBuilder::new(
-            layout,
-            media_types::v1_artifact(),
-        )?))
+        Self::with_layout(OciDirWriter::new(dir, image_name)?)
     }
 
     /// Create a new artifact builder for a GitHub container registry image
@@ -85,15 +78,97 @@ impl Builder<OciDirBuilder> {
     }
 }
 
-impl<Base: ImageBuilder> Builder<Base> {
+impl<Base: LayoutWriter> Builder<Base> {
+    /// Start an artifact with the empty config `{}`
+    fn with_layout(mut layout: Base) -> Result<Self> {
+        let config = Self::write(
+            &mut layout,
+            "application/vnd.oci.empty.v1+json".into(),
+            &mut b"{}".as_slice(),
+            HashMap::new(),
+        )?;
+        Ok(Self {
+            layout,
+            config,
+            layers: Vec::new(),
+            annotations: HashMap::new(),
+        })
+    }
+
+    fn write(
+        layout: &mut Base,
+        media_type: MediaType,
+        reader: &mut dyn Read,
+        annotations: HashMap<String, String>,
+    ) -> Result<Descriptor> {
+        let (digest, size) = layout.write_blob(reader)?;
+        let mut desc = DescriptorBuilder::default()
+            .media_type(media_type)
+            .digest(digest.to_string())
+            .size(size as i64);
+        if !annotations.is_empty() {
+            desc = desc.annotations(annotations);
+        }
+        Ok(desc.build()?)
+    }
+
+    pub fn add_layer(
+        &mut self,
+        media_type: MediaType,
+        blob: &[u8],
+        annotations: HashMap<String, String>,
+    ) -> Result<Descriptor> {
+        let mut reader = blob;
+        self.add_layer_from_reader(media_type, &mut reader, annotations)
+    }
+
+    /// Add a layer with the content read from `reader`, which is written into the artifact as it is read
+    pub fn add_layer_from_reader(
+        &mut self,
+        media_type: MediaType,
+        reader: &mut dyn Read,
+        annotations: HashMap<String, String>,
+    ) -> Result<Descriptor> {
+        let desc = Self::write(&mut self.layout, media_type, reader, annotations)?;
+        self.layers.push(desc.clone());
+        Ok(desc)
+    }
+
+    /// Add a layer with the content of the file at `path`
+    ///
+    /// The file is read through a buffer and written into the artifact while its digest is computed,
+    /// so that a layer larger than the available memory can be added.
+    pub fn add_layer_from_file(
+        &mut self,
+        media_type: MediaType,
+        path: &Path,
+        annotations: HashMap<String, String>,
+    ) -> Result<Descriptor> {
+        let mut reader = BufReader::new(File::open(path)?);
+        self.add_layer_from_reader(media_type, &mut reader, annotations)
+    }
+
+    pub fn add_annotation(&mut self, key: String, value: String) {
+        self.annotations.insert(key, value);
+    }
+
+    /// Add `org.opencontainers.image.source` annotation
+    pub fn add_source(&mut self, url: &Url) {
+        self.add_annotation(ANNOTATION_SOURCE.to_string(), url.to_string());
+    }
+
+    /// Add `org.opencontainers.image.description` annotation
+    pub fn add_description(&mut self, description: String) {
+        self.add_annotation(ANNOTATION_DESCRIPTION.to_string(), description);
+    }
+
     pub fn add_instance(
         &mut self,
         instance: v1::Instance,
         annotations: InstanceAnnotations,
     ) -> Result<()> {
         let blob = instance.encode_to_vec();
-        self.0
-            .add_layer(media_types::v1_instance(), &blob, annotations.into())?;
+        self.add_layer(media_types::v1_instance(), &blob, annotations.into())?;
         Ok(())
     }
 
@@ -103,8 +178,7 @@ impl<Base: ImageBuilder> Builder<Base> {
         annotations: SolutionAnnotations,
     ) -> Result<()> {
         let blob = solution.encode_to_vec();
-        self.0
-            .add_layer(media_types::v1_solution(), &blob, annotations.into())?;
+        self.add_layer(media_types::v1_solution(), &blob, annotations.into())?;
         Ok(())
     }
 
@@ -114,7 +188,7 @@ impl<Base: ImageBuilder> Builder<Base> {
         annotations: ParametricInstanceAnnotations,
     ) -> Result<()> {
         let blob = instance.encode_to_vec();
-        self.0.add_layer(
+        self.add_layer(
             media_types::v1_parametric_instance(),
             &blob,
             annotations.into(),
@@ -128,19 +202,48 @@ impl<Base: ImageBuilder> Builder<Base> {
         annotations: SampleSetAnnotations,
     ) -> Result<()> {
         let blob = sample_set.encode_to_vec();
-        self.0
-            .add_layer(media_types::v1_sample_set(), &blob, annotations.into())?;
+        self.add_layer(media_types::v1_sample_set(), &blob, annotations.into())?;
+        Ok(())
+    }
+
+    /// Add a sample set in the compact encoding, compressed by zstd if `zstd_level` is given.
+    /// See [`v1::SampleSet::to_compact_bytes`].
+    pub fn add_compact_sample_set(
+        &mut self,
+        sample_set: v1::SampleSet,
+        annotations: SampleSetAnnotations,
+        zstd_level: Option<i32>,
+    ) -> Result<()> {
+        let blob = sample_set.to_compact_bytes(zstd_level)?;
+        self.add_layer(
+            media_types::v1_compact_sample_set(),
+            &blob,
+            annotations.into(),
+        )?;
         Ok(())
     }
 
     pub fn add_config(&mut self, config: Config) -> Result<()> {
         let blob = serde_json::to_string_pretty(&config)?;
-        self.0
-            .add_config(media_types::v1_config(), blob.as_bytes(), HashMap::new())?;
+        self.config = Self::write(
+            &mut self.layout,
+            media_types::v1_config(),
+            &mut blob.as_bytes(),
+            HashMap::new(),
+        )?;
         Ok(())
     }
 
     pub fn build(self) -> Result<Artifact<Base::Image>> {
-        Artifact::new(self.0.build()?)
+        let mut manifest = ImageManifestBuilder::default()
+            .schema_version(SCHEMA_VERSION)
+            .media_type(MediaType::ImageManifest)
+            .artifact_type(media_types::v1_artifact())
+            .config(self.config)
+            .layers(self.layers);
+        if !self.annotations.is_empty() {
+            manifest = manifest.annotations(self.annotations);
+        }
+        self.layout.finish(manifest.build()?)
     }
 }
@@ -0,0 +1,251 @@
+use super::{blob_path_in, Artifact};
+use anyhow::{Context, Result};
+use ocipkg::{
+    image::{Image, ImageBuilder, OciArchive, OciArtifact, OciDir, OciDirBuilder},
+    oci_spec::image::{
+        DescriptorBuilder, ImageIndexBuilder, ImageManifest, MediaType, ANNOTATION_REF_NAME,
+        SCHEMA_VERSION,
+    },
+    Digest, ImageName,
+};
+use sha2::{Digest as _, Sha256};
+use std::{
+    collections::{HashMap, HashSet},
+    fs::{self, File},
+    io::{self, BufWriter, Read, Seek, SeekFrom, Write},
+    path::PathBuf,
+    time::{SystemTime, UNIX_EPOCH},
+};
+use uuid::Uuid;
+
+/// Destination of the blobs and the manifest of an artifact being built by [`super::Builder`]
+///
+/// Blobs are written as they are read, so that a blob larger than the available memory can be added.
+pub trait LayoutWriter {
+    type Image: Image;
+
+    /// Write the blob read from `reader`, and return its sha256 digest and size
+    fn write_blob(&mut self, reader: &mut dyn Read) -> Result<(Digest, u64)>;
+
+    /// Write the manifest and finish the image
+    fn finish(self, manifest: ImageManifest) -> Result<Artifact<Self::Image>>;
+}
+
+/// Writer computing the sha256 digest and the size of the content written through it
+struct HashingWriter<W> {
+    inner: W,
+    hasher: Sha256,
+    size: u64,
+}
+
+impl<W: Write> HashingWriter<W> {
+    fn new(inner: W) -> Self {
+        Self {
+            inner,
+            hasher: Sha256::new(),
+            size: 0,
+        }
+    }
+
+    /// Copy all of `reader` through the writer, and return the inner writer with the digest and size of the content
+    fn copy(mut self, reader: &mut dyn Read) -> Result<(W, Digest, u64)> {
+        io::copy(reader, &mut self)?;
+        let digest = Digest::new(&format!("sha256:{:x}", self.hasher.finalize()))?;
+        Ok((self.inner, digest, self.size))
+    }
+}
+
+impl<W: Write> Write for HashingWriter<W> {
+    fn write(&mut self, buf: &[u8]) -> io::Result<usize> {
+        let n = self.inner.write(buf)?;
+        self.hasher.update(&buf[..n]);
+        self.size += n as u64;
+        Ok(n)
+    }
+
+    fn flush(&mut self) -> io::Result<()> {
+        self.inner.flush()
+    }
+}
+
+const TAR_BLOCK_SIZE: u64 = 512;
+
+/// OCI archive written entry by entry, in the same layout as [`ocipkg::image::OciArchiveBuilder`]
+///
+/// The tar header of a blob is written after its content, since the path of the blob is its digest.
+/// A blob of the digest already in the archive is truncated instead of being stored twice.
+pub struct OciArchiveWriter {
+    path: PathBuf,
+    image_name: Option<ImageName>,
+    file: BufWriter<File>,
+    blobs: HashSet<String>,
+}
+
+impl OciArchiveWriter {
+    pub fn new(path: PathBuf, image_name: Option<ImageName>) -> Result<Self> {
+        let file = File::options()
+            .write(true)
+            .create_new(true)
+            .open(&path)
+            .with_context(|| format!("Failed to create OCI archive: {}", path.display()))?;
+        Ok(Self {
+            path,
+            image_name,
+            file: BufWriter::new(file),
+            blobs: HashSet::new(),
+        })
+    }
+
+    fn header(path: &str, size: u64) -> Result<tar::Header> {
+        let mut header = tar::Header::new_gnu();
+        header.set_path(path)?;
+        header.set_size(size);
+        header.set_mode(0o644);
+        header.set_entry_type(tar::EntryType::Regular);
+        header.set_mtime(SystemTime::now().duration_since(UNIX_EPOCH)?.as_secs());
+        header.set_cksum();
+        Ok(header)
+    }
+
+    fn pad(&mut self, size: u64) -> Result<()> {
+        let padding = (TAR_BLOCK_SIZE - size % TAR_BLOCK_SIZE) % TAR_BLOCK_SIZE;
+        self.file.write_all(&vec![0; padding as usize])?;
+        Ok(())
+    }
+
+    fn append_file(&mut self, path: &str, content: &[u8]) -> Result<()> {
+        let header = Self::header(path, content.len() as u64)?;
+        self.file.write_all(header.as_bytes())?;
+        self.file.write_all(content)?;
+        self.pad(content.len() as u64)
+    }
+}
+
+impl LayoutWriter for OciArchiveWriter {
+    type Image = OciArchive;
+
+    fn write_blob(&mut self, reader: &mut dyn Read) -> Result<(Digest, u64)> {
+        let start = self.file.stream_position()?;
+        // Placeholder of the header rewritten after the digest is known
+        self.file.write_all(&[0; TAR_BLOCK_SIZE as usize])?;
+        let (_, digest, size) = HashingWriter::new(&mut self.file).copy(reader)?;
+        if !self.blobs.insert(digest.to_string()) {
+            self.file.flush()?;
+            self.file.get_ref().set_len(start)?;
+            self.file.seek(SeekFrom::Start(start))?;
+            return Ok((digest, size));
+        }
+        self.pad(size)?;
+        let header = Self::header(
+            &format!("blobs/{}", digest.to_string().replacen(':', "/", 1)),
+            size,
+        )?;
+        self.file.seek(SeekFrom::Start(start))?;
+        self.file.write_all(header.as_bytes())?;
+        self.file.seek(SeekFrom::End(0))?;
+        Ok((digest, size))
+    }
+
+    fn finish(mut self, manifest: ImageManifest) -> Result<Artifact<OciArchive>> {
+        let (digest, size) = self.write_blob(&mut serde_json::to_vec(&manifest)?.as_slice())?;
+        let mut desc = DescriptorBuilder::default()
+            .media_type(MediaType::ImageManifest)
+            .digest(digest.to_string())
+            .size(size as i64);
+        if let Some(name) = &self.image_name {
+            desc = desc.annotations(HashMap::from([(
+                ANNOTATION_REF_NAME.to_string(),
+                name.to_string(),
+            )]));
+        }
+        let index = ImageIndexBuilder::default()
+            .schema_version(SCHEMA_VERSION)
+            .manifests(vec![desc.build()?])
+            .build()?;
+        self.append_file("index.json", &serde_json::to_vec(&index)?)?;
+        self.append_file("oci-layout", br#"{"imageLayoutVersion":"1.0.0"}"#)?;
+        // End of the archive
+        self.file.write_all(&[0; 2 * TAR_BLOCK_SIZE as usize])?;
+        self.file.flush()?;
+        drop(self.file);
+        Artifact::from_oci_archive(&self.path)
+    }
+}
+
+/// OCI directory whose blobs are written into `<root>/blobs` directly,
+/// and whose manifest, `index.json` and `oci-layout` are written by [`OciDirBuilder`]
+pub struct OciDirWriter {
+    root: PathBuf,
+    builder: OciDirBuilder,
+}
+
+impl OciDirWriter {
+    pub fn new(root: PathBuf, image_name: ImageName) -> Result<Self> {
+        let builder = OciDirBuilder::new(root.clone(), image_name)?;
+        Ok(Self { root, builder })
+    }
+}
+
+impl LayoutWriter for OciDirWriter {
+    type Image = OciDir;
+
+    fn write_blob(&mut self, reader: &mut dyn Read) -> Result<(Digest, u64)> {
+        let blobs = self.root.join("blobs");
+        fs::create_dir_all(&blobs)?;
+        let tmp = blobs.join(format!(".tmp-{}", Uuid::new_v4()));
+        let file = BufWriter::new(File::create(&tmp)?);
+        let result = HashingWriter::new(file)
+            .copy(reader)
+            .and_then(|(file, digest, size)| {
+                file.into_inner().map_err(|e| e.into_error())?;
+                let path = blob_path_in(&blobs, &digest);
+                fs::create_dir_all(path.parent().context("Invalid blob path")?)?;
+                fs::rename(&tmp, &path)?;
+                Ok((digest, size))
+            });
+        if result.is_err() {
+            fs::remove_file(&tmp).ok();
+        }
+        result
+    }
+
+    fn finish(self, manifest: ImageManifest) -> Result<Artifact<OciDir>> {
+        Artifact::new(OciArtifact::new(self.builder.build(manifest)?))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::artifact::{ArchiveReader, Builder};
+
+    #[test]
+    fn archive_from_file() -> Result<()> {
+        let root = std::env::temp_dir().join(format!("ommx-{}", Uuid::new_v4()));
+        fs::create_dir_all(&root)?;
+        let file = root.join("layer");
+        let blob: Vec<u8> = (0..100_000_u32).map(|i| (i % 251) as u8).collect();
+        fs::write(&file, &blob)?;
+
+        let path = root.join("artifact.ommx");
+        let mut builder = Builder::new_archive_unnamed(path.clone())?;
+        let media_type = || MediaType::from("application/octet-stream");
+        let layer = builder.add_layer_from_file(media_type(), &file, HashMap::new())?;
+        // The same blob is stored only once
+        let copy = builder.add_layer(media_type(), &blob, HashMap::new())?;
+        assert_eq!(layer.digest(), copy.digest());
+        let empty = builder.add_layer(media_type(), &[], HashMap::new())?;
+        let mut artifact = builder.build()?;
+        assert_eq!(artifact.get_manifest()?.layers().len(), 3);
+
+        let digest = Digest::new(layer.digest())?;
+        assert_eq!(layer.size(), blob.len() as i64);
+        assert_eq!(artifact.get_blob(&digest)?, blob);
+        let reader = ArchiveReader::open(&path, false)?;
+        assert_eq!(reader.get_blob(&digest)?, blob);
+        assert!(reader.get_blob(&Digest::new(empty.digest())?)?.is_empty());
+
+        fs::remove_dir_all(&root)?;
+        Ok(())
+    }
+}
@@ -29,3 +29,10 @@ pub fn v1_solution() -> MediaType {
 pub fn v1_sample_set() -> MediaType {
     MediaType::Other("application/org.ommx.v1.sample-set".to_string())
 }
+
+/// Media type of the layer storing [crate::v1::SampleSet] in the compact encoding of [crate::v1::SampleSet::to_compact_bytes], `application/org.ommx.v1.compact-sample-set`
+///
+/// This is distinct from [v1_sample_set] so that the clients which do not support this encoding do not try to decode it as protobuf.
+pub fn v1_compact_sample_set() -> MediaType {
+    MediaType::Other("application/org.ommx.v1.compact-sample-set".to_string())
+}
@@ -0,0 +1,643 @@
+use super::{
+    auth_from_env, blob_path_in,
+    blob_store::{verify, verify_blob},
+    data_dir, share_blobs, Artifact, SharedBlobStore,
+};
+use anyhow::{bail, ensure, Context, Result};
+use ocipkg::{
+    image::{Image, ImageBuilder, OciArtifact, OciDir, OciDirBuilder, Remote, RemoteBuilder},
+    oci_spec::image::{Descriptor, ImageManifest},
+    Digest, ImageName,
+};
+use rayon::prelude::*;
+use std::{
+    collections::HashSet,
+    env,
+    fs::{self, File},
+    io::Write,
+    path::{Path, PathBuf},
+    sync::Mutex,
+    time::Duration,
+};
+
+/// Number of blobs transferred in parallel if `OMMX_TRANSFER_CONCURRENCY` is not set
+pub const DEFAULT_TRANSFER_CONCURRENCY: usize = 8;
+
+/// Options of pushing and pulling artifacts
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct TransferOptions {
+    /// Number of blobs transferred in parallel
+    pub concurrency: usize,
+}
+
+impl Default for TransferOptions {
+    /// Read the concurrency from `OMMX_TRANSFER_CONCURRENCY`, or use [`DEFAULT_TRANSFER_CONCURRENCY`]
+    fn default() -> Self {
+        let concurrency = env::var("OMMX_TRANSFER_CONCURRENCY")
+            .ok()
+            .and_then(|n| n.parse().ok())
+            .filter(|n| *n > 0)
+            .unwrap_or(DEFAULT_TRANSFER_CONCURRENCY);
+        Self { concurrency }
+    }
+}
+
+/// Summary of [`transfer_blobs`]
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct TransferStats {
+    /// Number of blobs copied
+    pub transferred: usize,
+    /// Number of blobs skipped since the target already has them
+    pub skipped: usize,
+    /// Total size of the copied blobs in bytes
+    pub bytes: u64,
+}
+
+/// Storage of blobs shared by the workers of [`transfer_blobs`]
+pub trait BlobStore: Sync {
+    /// Whether the blob is already stored, i.e. copying it can be skipped
+    fn contains(&self, desc: &Descriptor) -> Result<bool>;
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>>;
+    fn put(&self, digest: &Digest, blob: &[u8]) -> Result<()>;
+}
+
+/// Config and layers of the manifest without duplicated digests
+pub fn manifest_blobs(manifest: &ImageManifest) -> Vec<Descriptor> {
+    let mut seen = HashSet::new();
+    std::iter::once(manifest.config())
+        .chain(manifest.layers())
+        .filter(|desc| seen.insert(desc.digest().to_string()))
+        .cloned()
+        .collect()
+}
+
+/// Copy blobs not contained in `to` from `from`, with `options.concurrency` workers
+///
+/// Each blob is checked against the size and sha256 digest of its descriptor,
+/// and put into `to` as soon as it is downloaded, so that an interrupted transfer is resumed
+/// by calling this again, which skips the blobs already stored.
+pub fn transfer_blobs(
+    from: &impl BlobStore,
+    to: &impl BlobStore,
+    blobs: &[Descriptor],
+    options: &TransferOptions,
+) -> Result<TransferStats> {
+    ensure!(options.concurrency > 0, "Concurrency must be positive");
+    let pool = rayon::ThreadPoolBuilder::new()
+        .num_threads(options.concurrency)
+        .build()?;
+    let sizes = pool.install(|| {
+        blobs
+            .par_iter()
+            .map(|desc| -> Result<Option<u64>> {
+                if to.contains(desc)? {
+                    log::debug!("Skip existing blob: {}", desc.digest());
+                    return Ok(None);
+                }
+                let digest = Digest::new(desc.digest())?;
+                let blob = from.get(&digest)?;
+                ensure!(
+                    blob.len() as u64 == desc.size() as u64,
+                    "Size mismatch of blob {digest}: expected {}, got {}",
+                    desc.size(),
+                    blob.len()
+                );
+                ensure!(
+                    verify_blob(&digest, &blob)?,
+                    "Blob {digest} does not match its digest"
+                );
+                to.put(&digest, &blob)?;
+                log::debug!("Copied blob: {digest}");
+                Ok(Some(blob.len() as u64))
+            })
+            .collect::<Result<Vec<_>>>()
+    })?;
+    let mut stats = TransferStats::default();
+    for size in sizes {
+        match size {
+            Some(size) => {
+                stats.transferred += 1;
+                stats.bytes += size;
+            }
+            None => stats.skipped += 1,
+        }
+    }
+    Ok(stats)
+}
+
+/// Blobs of a local image read one by one
+struct LocalBlobs<'a, Base: Image>(Mutex<&'a mut Base>);
+
+impl<Base: Image + Send> BlobStore for LocalBlobs<'_, Base> {
+    fn contains(&self, _desc: &Descriptor) -> Result<bool> {
+        Ok(false)
+    }
+
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+        self.0.lock().unwrap().get_blob(digest)
+    }
+
+    fn put(&self, digest: &Digest, _blob: &[u8]) -> Result<()> {
+        bail!("Cannot write blob {digest} to the source image")
+    }
+}
+
+/// Blobs of a remote image, downloaded through a pool of connections
+struct RemoteBlobs {
+    image_name: ImageName,
+    idle: Mutex<Vec<Artifact<Remote>>>,
+}
+
+impl RemoteBlobs {
+    fn new(image_name: ImageName) -> Self {
+        Self {
+            image_name,
+            idle: Mutex::new(Vec::new()),
+        }
+    }
+
+    fn connect(&self) -> Result<Artifact<Remote>> {
+        if let Some(remote) = self.idle.lock().unwrap().pop() {
+            return Ok(remote);
+        }
+        let mut remote = Artifact::from_remote(self.image_name.clone())?;
+        if let Ok((domain, username, password)) = auth_from_env() {
+            remote.0.add_basic_auth(&domain, &username, &password);
+        }
+        Ok(remote)
+    }
+}
+
+impl BlobStore for RemoteBlobs {
+    fn contains(&self, _desc: &Descriptor) -> Result<bool> {
+        Ok(false)
+    }
+
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+        let mut remote = self.connect()?;
+        let blob = remote.get_blob(digest)?;
+        self.idle.lock().unwrap().push(remote);
+        Ok(blob)
+    }
+
+    fn put(&self, digest: &Digest, _blob: &[u8]) -> Result<()> {
+        bail!("Cannot write blob {digest} to the source image")
+    }
+}
+
+/// Push journals older than this are discarded,
+/// since the registry may have removed the uploaded blobs not referenced by any manifest
+pub const PUSH_JOURNAL_EXPIRY: Duration = Duration::from_secs(24 * 60 * 60);
+
+/// Journal of the blobs uploaded by a push
+///
+/// The digests of uploaded blobs are appended to the journal file,
+/// and the blobs in the journal are skipped when an interrupted push is retried.
+/// The journal is removed when the push finishes, whether the manifest is pushed or not,
+/// and discarded on opening if it has not been updated for [`PUSH_JOURNAL_EXPIRY`].
+struct PushJournal {
+    path: PathBuf,
+    file: Mutex<File>,
+    uploaded: HashSet<String>,
+}
+
+impl PushJournal {
+    fn open(path: PathBuf) -> Result<Self> {
+        if let Some(parent) = path.parent() {
+            fs::create_dir_all(parent)?;
+        }
+        let expired = fs::metadata(&path)
+            .and_then(|meta| meta.modified())
+            .is_ok_and(|modified| {
+                modified
+                    .elapsed()
+                    .is_ok_and(|elapsed| elapsed > PUSH_JOURNAL_EXPIRY)
+            });
+        if expired {
+            log::info!("Discard expired push journal: {}", path.display());
+            fs::remove_file(&path)?;
+        }
+        let uploaded: HashSet<String> = match fs::read_to_string(&path) {
+            Ok(journal) => journal.lines().map(str::to_string).collect(),
+            Err(_) => HashSet::new(),
+        };
+        if !uploaded.is_empty() {
+            log::info!(
+                "Resume pushing with {} blobs already uploaded: {}",
+                uploaded.len(),
+                path.display()
+            );
+        }
+        let file = File::options()
+            .create(true)
+            .append(true)
+            .open(&path)
+            .with_context(|| format!("Failed to open push journal: {}", path.display()))?;
+        Ok(Self {
+            path,
+            file: Mutex::new(file),
+            uploaded,
+        })
+    }
+
+    fn contains(&self, digest: &str) -> bool {
+        self.uploaded.contains(digest)
+    }
+
+    fn record(&self, digest: &Digest) -> Result<()> {
+        writeln!(self.file.lock().unwrap(), "{digest}")?;
+        Ok(())
+    }
+
+    fn remove(self) -> Result<()> {
+        drop(self.file);
+        fs::remove_file(&self.path)
+            .with_context(|| format!("Failed to remove push journal: {}", self.path.display()))
+    }
+}
+
+/// Target of [`transfer_blobs`] recording the stored blobs in a [`PushJournal`]
+struct Journaled<S> {
+    store: S,
+    journal: PushJournal,
+}
+
+impl<S: BlobStore> BlobStore for Journaled<S> {
+    fn contains(&self, desc: &Descriptor) -> Result<bool> {
+        Ok(self.journal.contains(desc.digest()) || self.store.contains(desc)?)
+    }
+
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+        self.store.get(digest)
+    }
+
+    fn put(&self, digest: &Digest, blob: &[u8]) -> Result<()> {
+        self.store.put(digest, blob)?;
+        self.journal.record(digest)
+    }
+}
+
+/// Remote image being pushed, uploading blobs through a pool of connections
+struct RemoteUpload {
+    image_name: ImageName,
+    idle: Mutex<Vec<RemoteBuilder>>,
+}
+
+impl RemoteUpload {
+    fn new(image_name: ImageName) -> Self {
+        Self {
+            image_name,
+            idle: Mutex::new(Vec::new()),
+        }
+    }
+
+    fn connect(&self) -> Result<RemoteBuilder> {
+        if let Some(remote) = self.idle.lock().unwrap().pop() {
+            return Ok(remote);
+        }
+        let mut remote = RemoteBuilder::new(self.image_name.clone())?;
+        if let Ok((domain, username, password)) = auth_from_env() {
+            remote.add_basic_auth(&domain, &username, &password);
+        }
+        Ok(remote)
+    }
+
+    /// Push the manifest after all blobs are uploaded
+    fn finish(&self, manifest: ImageManifest) -> Result<Remote> {
+        self.connect()?.build(manifest)
+    }
+}
+
+impl BlobStore for RemoteUpload {
+    fn contains(&self, _desc: &Descriptor) -> Result<bool> {
+        Ok(false)
+    }
+
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+        bail!("Cannot read blob {digest} from the image being pushed")
+    }
+
+    fn put(&self, _digest: &Digest, blob: &[u8]) -> Result<()> {
+        let mut remote = self.connect()?;
+        remote.add_blob(blob)?;
+        self.idle.lock().unwrap().push(remote);
+        Ok(())
+    }
+}
+
+/// Directory keeping downloaded blobs until all blobs of the image are pulled
+///
+/// Each blob is written to a temporary file and renamed, so that a file in the directory is always complete.
+/// A blob left by an interrupted pull is reused only if it matches its digest.
+struct StagingDir(PathBuf);
+
+impl StagingDir {
+    fn blob_path(&self, digest: &Digest) -> PathBuf {
+        let digest = digest.to_string();
+        self.0.join(digest.replacen(':', "-", 1))
+    }
+}
+
+impl BlobStore for StagingDir {
+    fn contains(&self, desc: &Descriptor) -> Result<bool> {
+        let digest = Digest::new(desc.digest())?;
+        let path = self.blob_path(&digest);
+        if !fs::metadata(&path).is_ok_and(|meta| meta.len() == desc.size() as u64) {
+            return Ok(false);
+        }
+        if !verify(&digest, &path)? {
+            log::warn!("Download again corrupted blob: {}", path.display());
+            return Ok(false);
+        }
+        Ok(true)
+    }
+
+    fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+        Ok(fs::read(self.blob_path(digest))?)
+    }
+
+    fn put(&self, digest: &Digest, blob: &[u8]) -> Result<()> {
+        let path = self.blob_path(digest);
+        let mut tmp = path.clone().into_os_string();
+        tmp.push(".tmp");
+        fs::write(&tmp, blob)?;
+        fs::rename(&tmp, &path)?;
+        Ok(())
+    }
+}
+
+/// Push the blobs of a local image in parallel, and then its manifest
+pub(super) fn push<Base: Image + Send>(
+    image: &mut Base,
+    options: &TransferOptions,
+) -> Result<Artifact<Remote>> {
+    let name = image.get_name()?;
+    log::info!("Pushing: {}", name);
+    let manifest = image.get_manifest()?;
+    let blobs = manifest_blobs(&manifest);
+    let journal = PushJournal::open(data_dir()?.join(".push-journal").join(name.as_path()))?;
+    let upload = Journaled {
+        store: RemoteUpload::new(name),
+        journal,
+    };
+    let stats = transfer_blobs(&LocalBlobs(Mutex::new(image)), &upload, &blobs, options)?;
+    log::info!(
+        "Uploaded {} blobs ({} bytes), skipped {} blobs",
+        stats.transferred,
+        stats.bytes,
+        stats.skipped
+    );
+    // The journal is removed even if pushing the manifest fails,
+    // since the failure may be caused by a blob in the journal missing in the registry.
+    // The next push uploads all blobs again in that case.
+    let out = upload.store.finish(manifest);
+    if let Err(e) = upload.journal.remove() {
+        log::warn!("{e:#}");
+    }
+    Ok(Artifact(OciArtifact::new(out?)))
+}
+
+/// Pull the blobs of a remote image in parallel into `<path>.partial`, and then create the OCI directory at `path`
+///
+/// The blobs already in `<path>.partial` are reused, so that an interrupted pull is resumed.
+pub(super) fn pull(
+    image_name: &ImageName,
+    manifest: ImageManifest,
+    path: &Path,
+    options: &TransferOptions,
+) -> Result<Artifact<OciDir>> {
+    let mut staging = path.as_os_str().to_owned();
+    staging.push(".partial");
+    let staging = StagingDir(PathBuf::from(staging));
+    fs::create_dir_all(&staging.0)?;
+
+    let blobs = manifest_blobs(&manifest);
+    // Blobs already in the shared blob store are not downloaded again
+    let store = SharedBlobStore::open()?;
+    for desc in &blobs {
+        let digest = Digest::new(desc.digest())?;
+        store.link_to(&digest, &staging.blob_path(&digest))?;
+    }
+    let stats = transfer_blobs(
+        &RemoteBlobs::new(image_name.clone()),
+        &staging,
+        &blobs,
+        options,
+    )?;
+    log::info!(
+        "Downloaded {} blobs ({} bytes), reused {} blobs",
+        stats.transferred,
+        stats.bytes,
+        stats.skipped
+    );
+
+    // The staged blobs are moved into the OCI directory instead of being copied by `OciDirBuilder::add_blob`,
+    // and the builder writes only the manifest, `index.json` and `oci-layout`
+    let builder = OciDirBuilder::new(path.to_path_buf(), image_name.clone())?;
+    for desc in &blobs {
+        let digest = Digest::new(desc.digest())?;
+        let dest = blob_path_in(&path.join("blobs"), &digest);
+        fs::create_dir_all(dest.parent().context("Invalid blob path")?)?;
+        fs::rename(staging.blob_path(&digest), &dest)?;
+    }
+    let out = builder.build(manifest)?;
+    fs::remove_dir_all(&staging.0)?;
+    share_blobs(path);
+    Ok(Artifact(OciArtifact::new(out)))
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use ocipkg::oci_spec::image::DescriptorBuilder;
+    use sha2::{Digest as _, Sha256};
+    use std::{collections::HashMap, time::SystemTime};
+    use uuid::Uuid;
+
+    /// Stand-in of a registry keeping blobs in memory, which fails after `capacity` blobs are put
+    #[derive(Default)]
+    struct MemoryStore {
+        blobs: Mutex<HashMap<String, Vec<u8>>>,
+        capacity: Option<usize>,
+    }
+
+    impl BlobStore for MemoryStore {
+        fn contains(&self, desc: &Descriptor) -> Result<bool> {
+            Ok(self
+                .blobs
+                .lock()
+                .unwrap()
+                .contains_key(desc.digest().as_str()))
+        }
+
+        fn get(&self, digest: &Digest) -> Result<Vec<u8>> {
+            let blobs = self.blobs.lock().unwrap();
+            Ok(blobs.get(&digest.to_string()).context("Not found")?.clone())
+        }
+
+        fn put(&self, digest: &Digest, blob: &[u8]) -> Result<()> {
+            let mut blobs = self.blobs.lock().unwrap();
+            ensure!(
+                self.capacity
+                    .map_or(true, |capacity| blobs.len() < capacity),
+                "Connection lost"
+            );
+            blobs.insert(digest.to_string(), blob.to_vec());
+            Ok(())
+        }
+    }
+
+    fn descriptor(digest: &str, size: i64) -> Descriptor {
+        DescriptorBuilder::default()
+            .media_type("application/octet-stream")
+            .digest(digest)
+            .size(size)
+            .build()
+            .unwrap()
+    }
+
+    fn blobs(n: usize) -> (MemoryStore, Vec<Descriptor>) {
+        let source = MemoryStore::default();
+        let mut descriptors = Vec::new();
+        for i in 0..n {
+            let blob = vec![i as u8; i + 1];
+            let digest = format!("sha256:{:x}", Sha256::digest(&blob));
+            descriptors.push(descriptor(&digest, blob.len() as i64));
+            source.blobs.lock().unwrap().insert(digest, blob);
+        }
+        (source, descriptors)
+    }
+
+    #[test]
+    fn resume() -> Result<()> {
+        let (source, descriptors) = blobs(20);
+        let options = TransferOptions { concurrency: 4 };
+
+        // Interrupted after 5 blobs are stored
+        let mut target = MemoryStore {
+            capacity: Some(5),
+            ..Default::default()
+        };
+        assert!(transfer_blobs(&source, &target, &descriptors, &options).is_err());
+        assert_eq!(target.blobs.lock().unwrap().len(), 5);
+
+        target.capacity = None;
+        let stats = transfer_blobs(&source, &target, &descriptors, &options)?;
+        assert_eq!(stats.transferred, 15);
+        assert_eq!(stats.skipped, 5);
+        assert_eq!(*target.blobs.lock().unwrap(), *source.blobs.lock().unwrap());
+
+        let stats = transfer_blobs(&source, &target, &descriptors, &options)?;
+        assert_eq!(stats.transferred, 0);
+        assert_eq!(stats.skipped, 20);
+        Ok(())
+    }
+
+    #[test]
+    fn size_mismatch() {
+        let (source, mut descriptors) = blobs(3);
+        descriptors[1] = descriptor(descriptors[1].digest(), 100);
+        let target = MemoryStore::default();
+        let options = TransferOptions { concurrency: 2 };
+        assert!(transfer_blobs(&source, &target, &descriptors, &options).is_err());
+        assert!(!target
+            .blobs
+            .lock()
+            .unwrap()
+            .contains_key(descriptors[1].digest().as_str()));
+    }
+
+    #[test]
+    fn digest_mismatch() {
+        let (source, descriptors) = blobs(3);
+        // Same size but different content
+        source
+            .blobs
+            .lock()
+            .unwrap()
+            .insert(descriptors[1].digest().to_string(), vec![0xff; 2]);
+        let target = MemoryStore::default();
+        let options = TransferOptions { concurrency: 2 };
+        assert!(transfer_blobs(&source, &target, &descriptors, &options).is_err());
+        assert!(!target
+            .blobs
+            .lock()
+            .unwrap()
+            .contains_key(descriptors[1].digest().as_str()));
+    }
+
+    fn temp_dir() -> PathBuf {
+        std::env::temp_dir().join(format!("ommx-{}", Uuid::new_v4()))
+    }
+
+    #[test]
+    fn push_journal() -> Result<()> {
+        let (source, descriptors) = blobs(20);
+        let options = TransferOptions { concurrency: 4 };
+        let root = temp_dir();
+        let path = root.join("journal");
+
+        // Interrupted after 5 blobs are uploaded
+        let target = Journaled {
+            store: MemoryStore {
+                capacity: Some(5),
+                ..Default::default()
+            },
+            journal: PushJournal::open(path.clone())?,
+        };
+        assert!(transfer_blobs(&source, &target, &descriptors, &options).is_err());
+        drop(target);
+        assert_eq!(fs::read_to_string(&path)?.lines().count(), 5);
+
+        // The blobs are skipped by the journal, not by the registry
+        let target = Journaled {
+            store: MemoryStore::default(),
+            journal: PushJournal::open(path.clone())?,
+        };
+        let stats = transfer_blobs(&source, &target, &descriptors, &options)?;
+        assert_eq!((stats.transferred, stats.skipped), (15, 5));
+        drop(target);
+
+        // An expired journal is discarded
+        File::options()
+            .append(true)
+            .open(&path)?
+            .set_modified(SystemTime::now() - PUSH_JOURNAL_EXPIRY - Duration::from_secs(60))?;
+        let journal = PushJournal::open(path.clone())?;
+        assert!(journal.uploaded.is_empty());
+        journal.remove()?;
+        assert!(!path.exists());
+
+        fs::remove_dir_all(&root)?;
+        Ok(())
+    }
+
+    #[test]
+    fn staging_dir() -> Result<()> {
+        let (source, descriptors) = blobs(10);
+        let options = TransferOptions { concurrency: 4 };
+        let staging = StagingDir(temp_dir());
+        fs::create_dir_all(&staging.0)?;
+        let digest = |i: usize| Digest::new(descriptors[i].digest()).unwrap();
+
+        // Left by an interrupted pull: a complete blob, a truncated blob, a corrupted blob of the same size,
+        // and a temporary file of an unfinished put
+        fs::write(staging.blob_path(&digest(0)), source.get(&digest(0))?)?;
+        fs::write(staging.blob_path(&digest(1)), b"")?;
+        fs::write(staging.blob_path(&digest(3)), vec![0xff; 4])?;
+        let mut tmp = staging.blob_path(&digest(2)).into_os_string();
+        tmp.push(".tmp");
+        fs::write(&tmp, b"broken")?;
+
+        let stats = transfer_blobs(&source, &staging, &descriptors, &options)?;
+        assert_eq!((stats.transferred, stats.skipped), (9, 1));
+        for i in 0..descriptors.len() {
+            assert_eq!(staging.get(&digest(i))?, source.get(&digest(i))?);
+        }
+        // Every blob is renamed from its temporary file
+        assert_eq!(fs::read_dir(&staging.0)?.count(), descriptors.len());
+
+        fs::remove_dir_all(&staging.0)?;
+        Ok(())
+    }
+}
@@ -2,7 +2,7 @@ use anyhow::{bail, Result};
 use clap::Parser;
 use colored::Colorize;
 use ocipkg::{oci_spec::image::ImageManifest, ImageName};
-use ommx::artifact::{image_dir, Artifact};
+use ommx::artifact::{get_image_dirs, image_dir, Artifact, SharedBlobStore};
 use std::path::{Path, PathBuf};
 
 mod built_info {
@@ -62,6 +62,9 @@ enum Command {
     /// List the images in the local registry
     List,
 
+    /// Share identical blobs among the images in the local registry, and remove the blobs no image uses
+    Gc,
+
     /// Get the directory where the image is stored
     ImageDirectory {
         /// Container image name
@@ -206,6 +209,25 @@ fn main() -> Result<()> {
                 println!("{}", image_name);
             }
         }
+
+        Command::Gc => {
+            let store = SharedBlobStore::open()?;
+            let image_dirs = get_image_dirs()?;
+            for dir in &image_dirs {
+                // A broken image should not prevent collecting the others
+                if let Err(e) = store.link_image(dir) {
+                    log::warn!("Failed to share blobs of {}: {e:#}", dir.display());
+                }
+            }
+            let stats = store.gc(&image_dirs)?;
+            println!(
+                "{:>12} {} blobs ({} bytes)",
+                "Removed".blue().bold(),
+                stats.removed,
+                stats.removed_bytes
+            );
+            println!("{:>12} {} blobs", "Kept".blue().bold(), stats.kept);
+        }
     }
     Ok(())
 }
@@ -0,0 +1,670 @@
+use crate::v1::{Equality, Function, Instance};
+use anyhow::{bail, ensure, Context, Result};
+use rayon::prelude::*;
+use std::collections::HashMap;
+
+/// Tolerance used for feasibility check, same as [`crate::Evaluate`] for [`Instance`]
+const FEASIBILITY_TOLERANCE: f64 = 1e-6;
+
+fn is_satisfied(equality: Equality, value: f64) -> bool {
+    match equality {
+        Equality::EqualToZero => value.abs() < FEASIBILITY_TOLERANCE,
+        _ => value < FEASIBILITY_TOLERANCE,
+    }
+}
+
+/// Rows of polynomials whose variables are referred by dense positions
+///
+/// - Constant terms are stored for each row
+/// - Linear terms are stored in CSR format
+/// - Quadratic terms are stored in COO format
+/// - Higher-degree terms are stored in COO format with CSR-like index lists
+///
+#[derive(Debug, Clone, Default, PartialEq)]
+struct SparseFunctions {
+    constants: Vec<f64>,
+
+    linear_indptr: Vec<usize>,
+    linear_indices: Vec<usize>,
+    linear_values: Vec<f64>,
+
+    quadratic_rows: Vec<usize>,
+    quadratic_columns: Vec<(usize, usize)>,
+    quadratic_values: Vec<f64>,
+
+    higher_rows: Vec<usize>,
+    higher_indptr: Vec<usize>,
+    higher_indices: Vec<usize>,
+    higher_values: Vec<f64>,
+}
+
+impl SparseFunctions {
+    fn new<'a>(
+        index: &HashMap<u64, usize>,
+        functions: impl IntoIterator<Item = &'a Function>,
+    ) -> Result<Self> {
+        let mut out = Self {
+            linear_indptr: vec![0],
+            higher_indptr: vec![0],
+            ..Default::default()
+        };
+        let position = |id: &u64| -> Result<usize> {
+            index.get(id).copied().with_context(|| {
+                format!("Decision variable ID={id} is used in a function but not defined")
+            })
+        };
+        for (row, function) in functions.into_iter().enumerate() {
+            let mut constant = 0.0;
+            for (ids, coefficient) in function {
+                if coefficient == 0.0 {
+                    continue;
+                }
+                match &ids[..] {
+                    [] => constant += coefficient,
+                    [i] => {
+                        out.linear_indices.push(position(i)?);
+                        out.linear_values.push(coefficient);
+                    }
+                    [i, j] => {
+                        out.quadratic_rows.push(row);
+                        out.quadratic_columns.push((position(i)?, position(j)?));
+                        out.quadratic_values.push(coefficient);
+                    }
+                    ids => {
+                        for id in ids {
+                            out.higher_indices.push(position(id)?);
+                        }
+                        out.higher_rows.push(row);
+                        out.higher_indptr.push(out.higher_indices.len());
+                        out.higher_values.push(coefficient);
+                    }
+                }
+            }
+            out.constants.push(constant);
+            out.linear_indptr.push(out.linear_indices.len());
+        }
+        Ok(out)
+    }
+
+    fn len(&self) -> usize {
+        self.constants.len()
+    }
+
+    /// Append the terms of each variable into `adjacency` with row index shifted by `offset`
+    fn collect_adjacency(&self, offset: usize, adjacency: &mut [Vec<Adjacent>]) {
+        for row in 0..self.len() {
+            for k in self.linear_indptr[row]..self.linear_indptr[row + 1] {
+                adjacency[self.linear_indices[k]].push(Adjacent::Linear {
+                    row: row + offset,
+                    coefficient: self.linear_values[k],
+                });
+            }
+        }
+        for ((row, (i, j)), coefficient) in self
+            .quadratic_rows
+            .iter()
+            .zip(&self.quadratic_columns)
+            .zip(&self.quadratic_values)
+        {
+            adjacency[*i].push(Adjacent::Quadratic {
+                row: row + offset,
+                other: *j,
+                coefficient: *coefficient,
+            });
+            if i != j {
+                adjacency[*j].push(Adjacent::Quadratic {
+                    row: row + offset,
+                    other: *i,
+                    coefficient: *coefficient,
+                });
+            }
+        }
+        for (k, row) in self.higher_rows.iter().enumerate() {
+            let mut indices =
+                self.higher_indices[self.higher_indptr[k]..self.higher_indptr[k + 1]].to_vec();
+            indices.dedup(); // indices are sorted since IDs are sorted
+            for i in indices {
+                adjacency[i].push(Adjacent::Higher {
+                    row: row + offset,
+                    term: k,
+                    offset,
+                });
+            }
+        }
+    }
+
+    /// Change of a higher-degree term when `x[i]` is replaced by `value`
+    fn higher_term_delta(&self, term: usize, x: &[f64], i: usize, value: f64) -> f64 {
+        let mut before = self.higher_values[term];
+        let mut after = before;
+        for j in &self.higher_indices[self.higher_indptr[term]..self.higher_indptr[term + 1]] {
+            before *= x[*j];
+            after *= if *j == i { value } else { x[*j] };
+        }
+        after - before
+    }
+
+    /// Evaluate all rows into `out`. The length of `x` and `out` must be checked by the caller.
+    fn evaluate_into(&self, x: &[f64], out: &mut [f64]) {
+        debug_assert_eq!(out.len(), self.len());
+        out.copy_from_slice(&self.constants);
+        for (row, value) in out.iter_mut().enumerate() {
+            for k in self.linear_indptr[row]..self.linear_indptr[row + 1] {
+                *value += self.linear_values[k] * x[self.linear_indices[k]];
+            }
+        }
+        for ((row, (i, j)), coefficient) in self
+            .quadratic_rows
+            .iter()
+            .zip(&self.quadratic_columns)
+            .zip(&self.quadratic_values)
+        {
+            out[*row] += coefficient * x[*i] * x[*j];
+        }
+        for (k, (row, coefficient)) in self.higher_rows.iter().zip(&self.higher_values).enumerate()
+        {
+            let mut value = *coefficient;
+            for i in &self.higher_indices[self.higher_indptr[k]..self.higher_indptr[k + 1]] {
+                value *= x[*i];
+            }
+            out[*row] += value;
+        }
+    }
+}
+
+/// An [`Instance`] compiled into sparse arrays for repeated evaluation on dense arrays.
+///
+/// Decision variables are remapped to dense positions once in [`CompiledInstance::new`],
+/// so that evaluation does not look up the [`crate::v1::State`] hash map nor collect used IDs.
+/// The input `x` is a slice whose `i`-th value is for the decision variable `decision_variable_ids()[i]`.
+///
+/// Constraint values are ordered as [`CompiledInstance::constraint_ids`],
+/// where the removed constraints follow the active constraints.
+///
+#[derive(Debug, Clone, PartialEq)]
+pub struct CompiledInstance {
+    decision_variable_ids: Vec<u64>,
+    decision_variable_index: HashMap<u64, usize>,
+    constraint_ids: Vec<u64>,
+    equalities: Vec<Equality>,
+    num_active_constraints: usize,
+    objective: SparseFunctions,
+    constraints: SparseFunctions,
+}
+
+impl CompiledInstance {
+    pub fn new(instance: &Instance) -> Result<Self> {
+        let mut decision_variable_ids: Vec<u64> =
+            instance.decision_variables.iter().map(|v| v.id).collect();
+        decision_variable_ids.sort_unstable();
+        let decision_variable_index: HashMap<u64, usize> = decision_variable_ids
+            .iter()
+            .enumerate()
+            .map(|(i, id)| (*id, i))
+            .collect();
+        ensure!(
+            decision_variable_index.len() == decision_variable_ids.len(),
+            "Instance has duplicated decision variable IDs"
+        );
+
+        let mut constraints = instance.constraints.iter().collect::<Vec<_>>();
+        for removed in &instance.removed_constraints {
+            constraints.push(
+                removed
+                    .constraint
+                    .as_ref()
+                    .context("RemovedConstraint does not contain constraint")?,
+            );
+        }
+        let mut equalities = Vec::with_capacity(constraints.len());
+        for c in &constraints {
+            match c.equality() {
+                equality @ (Equality::EqualToZero | Equality::LessThanOrEqualToZero) => {
+                    equalities.push(equality)
+                }
+                equality => bail!("Unsupported equality: {:?}", equality),
+            }
+        }
+        let objective = instance.objective();
+        let constraint_functions = constraints.iter().map(|c| c.function()).collect::<Vec<_>>();
+
+        Ok(Self {
+            constraint_ids: constraints.iter().map(|c| c.id).collect(),
+            equalities,
+            num_active_constraints: instance.constraints.len(),
+            objective: SparseFunctions::new(&decision_variable_index, [objective.as_ref()])?,
+            constraints: SparseFunctions::new(
+                &decision_variable_index,
+                constraint_functions.iter().map(|f| f.as_ref()),
+            )?,
+            decision_variable_ids,
+            decision_variable_index,
+        })
+    }
+
+    /// Decision variable IDs in the order of the input array, sorted in ascending order
+    pub fn decision_variable_ids(&self) -> &[u64] {
+        &self.decision_variable_ids
+    }
+
+    /// Position of the decision variable in the input array
+    pub fn decision_variable_position(&self, id: u64) -> Option<usize> {
+        self.decision_variable_index.get(&id).copied()
+    }
+
+    /// Constraint IDs in the order of the evaluated constraint values
+    pub fn constraint_ids(&self) -> &[u64] {
+        &self.constraint_ids
+    }
+
+    pub fn num_decision_variables(&self) -> usize {
+        self.decision_variable_ids.len()
+    }
+
+    /// Number of constraints including the removed constraints
+    pub fn num_constraints(&self) -> usize {
+        self.constraint_ids.len()
+    }
+
+    /// Number of active (not removed) constraints, which come first in the constraint values
+    pub fn num_active_constraints(&self) -> usize {
+        self.num_active_constraints
+    }
+
+    /// Check feasibility of the constraint values including removed constraints
+    pub fn is_feasible(&self, constraint_values: &[f64]) -> bool {
+        self.equalities
+            .iter()
+            .zip(constraint_values)
+            .all(|(equality, value)| is_satisfied(*equality, *value))
+    }
+
+    /// Check feasibility of the constraint values only for the active constraints
+    pub fn is_feasible_relaxed(&self, constraint_values: &[f64]) -> bool {
+        self.is_feasible(&constraint_values[..self.num_active_constraints])
+    }
+
+    /// Evaluate the objective, and write constraint values into `constraint_values` without allocation
+    pub fn evaluate_into(&self, x: &[f64], constraint_values: &mut [f64]) -> Result<f64> {
+        ensure!(
+            x.len() == self.num_decision_variables(),
+            "Input has {} values, but the instance has {} decision variables",
+            x.len(),
+            self.num_decision_variables()
+        );
+        ensure!(
+            constraint_values.len() == self.num_constraints(),
+            "Output has {} values, but the instance has {} constraints",
+            constraint_values.len(),
+            self.num_constraints()
+        );
+        let mut objective = [0.0];
+        self.objective.evaluate_into(x, &mut objective);
+        self.constraints.evaluate_into(x, constraint_values);
+        Ok(objective[0])
+    }
+
+    /// Evaluate into the objective value, constraint values, and feasibility
+    pub fn evaluate(&self, x: &[f64]) -> Result<(f64, Vec<f64>, bool)> {
+        let mut constraint_values = vec![0.0; self.num_constraints()];
+        let objective = self.evaluate_into(x, &mut constraint_values)?;
+        let feasible = self.is_feasible(&constraint_values);
+        Ok((objective, constraint_values, feasible))
+    }
+
+    /// Evaluate a row-major `(num_samples, num_decision_variables)` matrix in parallel
+    ///
+    /// Returns objective values, a row-major `(num_samples, num_constraints)` matrix of constraint values, and feasibility.
+    /// `num_samples` is given explicitly since it cannot be inferred from `xs` when the instance has no decision variables.
+    pub fn evaluate_batch(
+        &self,
+        xs: &[f64],
+        num_samples: usize,
+    ) -> Result<(Vec<f64>, Vec<f64>, Vec<bool>)> {
+        let n = self.num_decision_variables();
+        let m = self.num_constraints();
+        ensure!(
+            xs.len() == num_samples * n,
+            "Input has {} values, but {} samples of {} decision variables are expected",
+            xs.len(),
+            num_samples,
+            n
+        );
+        if n == 0 {
+            // The objective and constraints are constant, and the same for all samples
+            let mut values = vec![0.0; m];
+            let objective = self.evaluate_into(&[], &mut values)?;
+            let feasible = self.is_feasible(&values);
+            return Ok((
+                vec![objective; num_samples],
+                values.repeat(num_samples),
+                vec![feasible; num_samples],
+            ));
+        }
+        if m == 0 {
+            let objectives = xs
+                .par_chunks(n)
+                .map(|x| self.evaluate_into(x, &mut []))
+                .collect::<Result<Vec<_>>>()?;
+            let feasible = vec![true; objectives.len()];
+            return Ok((objectives, Vec::new(), feasible));
+        }
+
+        let mut objectives = vec![0.0; num_samples];
+        let mut constraint_values = vec![0.0; num_samples * m];
+        let mut feasible = vec![false; num_samples];
+        objectives
+            .par_iter_mut()
+            .zip(feasible.par_iter_mut())
+            .zip(constraint_values.par_chunks_mut(m))
+            .zip(xs.par_chunks(n))
+            .try_for_each(|(((objective, feasible), values), x)| -> Result<()> {
+                *objective = self.evaluate_into(x, values)?;
+                *feasible = self.is_feasible(values);
+                Ok(())
+            })?;
+        Ok((objectives, constraint_values, feasible))
+    }
+}
+
+/// A term including a decision variable, used by [`IncrementalEvaluator`]
+///
+/// `row` is `0` for the objective, and `k + 1` for the `k`-th constraint.
+#[derive(Debug, Clone, Copy, PartialEq)]
+enum Adjacent {
+    Linear {
+        row: usize,
+        coefficient: f64,
+    },
+    /// `coefficient * x[i] * x[other]` where `i` is the variable of this adjacency list
+    Quadratic {
+        row: usize,
+        other: usize,
+        coefficient: f64,
+    },
+    /// `term`-th higher-degree term of the objective if `offset == 0`, or of the constraints otherwise
+    Higher {
+        row: usize,
+        term: usize,
+        offset: usize,
+    },
+}
+
+/// Change of the objective and constraint values by a move of [`IncrementalEvaluator`]
+#[derive(Debug, Clone, PartialEq)]
+pub struct Delta {
+    /// Change of the objective value
+    pub objective: f64,
+    /// Changes of the constraint values as pairs of the position in [`CompiledInstance::constraint_ids`] and the change.
+    /// Constraints not including the variable are not listed.
+    pub constraints: Vec<(usize, f64)>,
+    /// Change of the number of violated constraints
+    pub num_violated: i64,
+    /// Feasibility after the move, including the removed constraints
+    pub feasible: bool,
+}
+
+/// Incremental evaluator of a [`CompiledInstance`] for local search with single-variable moves
+///
+/// This keeps the current input, objective value, and constraint values,
+/// and updates them in O(number of terms including the variable) for a move of a single variable,
+/// using the adjacency lists from each variable to the terms including it.
+///
+#[derive(Debug, Clone, PartialEq)]
+pub struct IncrementalEvaluator {
+    compiled: CompiledInstance,
+    adjacency: Vec<Vec<Adjacent>>,
+    x: Vec<f64>,
+    objective: f64,
+    constraint_values: Vec<f64>,
+    num_violated: usize,
+}
+
+impl IncrementalEvaluator {
+    pub fn new(compiled: CompiledInstance, x: Vec<f64>) -> Result<Self> {
+        let mut constraint_values = vec![0.0; compiled.num_constraints()];
+        let objective = compiled.evaluate_into(&x, &mut constraint_values)?;
+        let num_violated = compiled
+            .equalities
+            .iter()
+            .zip(&constraint_values)
+            .filter(|(equality, value)| !is_satisfied(**equality, **value))
+            .count();
+        let mut adjacency = vec![Vec::new(); compiled.num_decision_variables()];
+        compiled.objective.collect_adjacency(0, &mut adjacency);
+        compiled.constraints.collect_adjacency(1, &mut adjacency);
+        Ok(Self {
+            compiled,
+            adjacency,
+            x,
+            objective,
+            constraint_values,
+            num_violated,
+        })
+    }
+
+    pub fn compiled(&self) -> &CompiledInstance {
+        &self.compiled
+    }
+
+    /// Current input ordered as [`CompiledInstance::decision_variable_ids`]
+    pub fn x(&self) -> &[f64] {
+        &self.x
+    }
+
+    pub fn objective(&self) -> f64 {
+        self.objective
+    }
+
+    /// Current constraint values ordered as [`CompiledInstance::constraint_ids`]
+    pub fn constraint_values(&self) -> &[f64] {
+        &self.constraint_values
+    }
+
+    /// Number of violated constraints including the removed constraints
+    pub fn num_violated(&self) -> usize {
+        self.num_violated
+    }
+
+    pub fn is_feasible(&self) -> bool {
+        self.num_violated == 0
+    }
+
+    fn position(&self, id: u64) -> Result<usize> {
+        self.compiled
+            .decision_variable_position(id)
+            .with_context(|| format!("Unknown decision variable ID={id}"))
+    }
+
+    fn delta_at(&self, i: usize, value: f64) -> Delta {
+        let current = self.x[i];
+        let diff = value - current;
+        let mut objective = 0.0;
+        let mut constraints: Vec<(usize, f64)> = Vec::new();
+        for adjacent in &self.adjacency[i] {
+            let (row, delta) = match *adjacent {
+                Adjacent::Linear { row, coefficient } => (row, coefficient * diff),
+                Adjacent::Quadratic {
+                    row,
+                    other,
+                    coefficient,
+                } => {
+                    if other == i {
+                        (row, coefficient * (value * value - current * current))
+                    } else {
+                        (row, coefficient * diff * self.x[other])
+                    }
+                }
+                Adjacent::Higher { row, term, offset } => {
+                    let functions = if offset == 0 {
+                        &self.compiled.objective
+                    } else {
+                        &self.compiled.constraints
+                    };
+                    (row, functions.higher_term_delta(term, &self.x, i, value))
+                }
+            };
+            if row == 0 {
+                objective += delta;
+            } else {
+                constraints.push((row - 1, delta));
+            }
+        }
+        // Merge the changes of the same constraint
+        constraints.sort_unstable_by_key(|(k, _)| *k);
+        constraints.dedup_by(|(k, delta), (k_prev, delta_prev)| {
+            if k == k_prev {
+                *delta_prev += *delta;
+                true
+            } else {
+                false
+            }
+        });
+
+        let mut num_violated = 0;
+        for (k, delta) in &constraints {
+            let equality = self.compiled.equalities[*k];
+            let before = self.constraint_values[*k];
+            match (
+                is_satisfied(equality, before),
+                is_satisfied(equality, before + delta),
+            ) {
+                (true, false) => num_violated += 1,
+                (false, true) => num_violated -= 1,
+                _ => {}
+            }
+        }
+        Delta {
+            objective,
+            constraints,
+            num_violated,
+            feasible: self.num_violated as i64 + num_violated == 0,
+        }
+    }
+
+    /// Change when the decision variable is set to `value`, without updating the state
+    pub fn delta_to(&self, id: u64, value: f64) -> Result<Delta> {
+        Ok(self.delta_at(self.position(id)?, value))
+    }
+
+    /// Set the decision variable to `value`, and return the change
+    pub fn set(&mut self, id: u64, value: f64) -> Result<Delta> {
+        let i = self.position(id)?;
+        let delta = self.delta_at(i, value);
+        self.x[i] = value;
+        self.objective += delta.objective;
+        for (k, d) in &delta.constraints {
+            self.constraint_values[*k] += d;
+        }
+        self.num_violated = (self.num_violated as i64 + delta.num_violated) as usize;
+        Ok(delta)
+    }
+
+    /// Change when the binary decision variable is flipped, i.e. `x -> 1 - x`, without updating the state
+    pub fn delta(&self, id: u64) -> Result<Delta> {
+        let i = self.position(id)?;
+        Ok(self.delta_at(i, 1.0 - self.x[i]))
+    }
+
+    /// Flip the binary decision variable, i.e. `x -> 1 - x`, and return the change
+    pub fn flip(&mut self, id: u64) -> Result<Delta> {
+        let i = self.position(id)?;
+        self.set(id, 1.0 - self.x[i])
+    }
+}
+
+impl CompiledInstance {
+    /// Start incremental evaluation from the input `x`
+    pub fn incremental(&self, x: Vec<f64>) -> Result<IncrementalEvaluator> {
+        IncrementalEvaluator::new(self.clone(), x)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{random::*, Evaluate};
+    use approx::*;
+    use proptest::prelude::*;
+
+    fn instance_with_state() -> BoxedStrategy<(Instance, crate::v1::State)> {
+        Instance::arbitrary()
+            .prop_flat_map(|instance| {
+                let used_ids = instance.used_decision_variable_ids();
+                (Just(instance), arbitrary_state(used_ids))
+            })
+            .boxed()
+    }
+
+    proptest! {
+        #[test]
+        fn evaluate_compiled((instance, state) in instance_with_state()) {
+            let compiled = CompiledInstance::new(&instance).unwrap();
+            let x: Vec<f64> = compiled
+                .decision_variable_ids()
+                .iter()
+                .map(|id| state.entries.get(id).copied().unwrap_or_default())
+                .collect();
+            let (objective, constraint_values, feasible) = compiled.evaluate(&x).unwrap();
+
+            let (solution, _) = instance.evaluate(&state).unwrap();
+            prop_assert!(abs_diff_eq!(objective, solution.objective, epsilon = 1e-9));
+            prop_assert_eq!(feasible, solution.feasible);
+            for (id, value) in compiled.constraint_ids().iter().zip(&constraint_values) {
+                let c = solution
+                    .evaluated_constraints
+                    .iter()
+                    .find(|c| c.id == *id)
+                    .unwrap();
+                prop_assert!(abs_diff_eq!(*value, c.evaluated_value, epsilon = 1e-9));
+            }
+
+            // Batch evaluation of the same input twice
+            let xs: Vec<f64> = x.iter().chain(x.iter()).cloned().collect();
+            let (objectives, values, feasibles) = compiled.evaluate_batch(&xs, 2).unwrap();
+            prop_assert_eq!(objectives, vec![objective; 2]);
+            prop_assert_eq!(values, [constraint_values.clone(), constraint_values].concat());
+            prop_assert_eq!(feasibles, vec![feasible; 2]);
+        }
+    }
+
+    fn binary_instance_with_flips() -> BoxedStrategy<(Instance, Vec<f64>, Vec<usize>)> {
+        Instance::arbitrary_with(InstanceParameters::default_binary())
+            .prop_flat_map(|instance| {
+                let n = instance.decision_variables.len();
+                (
+                    Just(instance),
+                    proptest::collection::vec(proptest::bool::ANY.prop_map(f64::from), n),
+                    proptest::collection::vec(0..n.max(1), 0..10),
+                )
+            })
+            .boxed()
+    }
+
+    proptest! {
+        #[test]
+        fn incremental_flip((instance, x, flips) in binary_instance_with_flips()) {
+            let compiled = instance.compile().unwrap();
+            let mut incremental = compiled.incremental(x.clone()).unwrap();
+            let mut x = x;
+            for i in flips {
+                if i >= x.len() {
+                    continue;
+                }
+                let id = compiled.decision_variable_ids()[i];
+                let expected = incremental.delta(id).unwrap();
+                let delta = incremental.flip(id).unwrap();
+                prop_assert_eq!(&expected, &delta);
+
+                x[i] = 1.0 - x[i];
+                let (objective, constraint_values, feasible) = compiled.evaluate(&x).unwrap();
+                prop_assert!(abs_diff_eq!(incremental.objective(), objective, epsilon = 1e-6));
+                for (a, b) in incremental.constraint_values().iter().zip(&constraint_values) {
+                    prop_assert!(abs_diff_eq!(a, b, epsilon = 1e-6));
+                }
+                prop_assert_eq!(incremental.is_feasible(), feasible);
+                prop_assert_eq!(delta.feasible, feasible);
+            }
+        }
+    }
+}
@@ -5,6 +5,7 @@ use crate::v1::{
     SampledValues, Samples, Solution, State,
 };
 use anyhow::{bail, ensure, Context, Result};
+use rayon::prelude::*;
 use std::collections::{BTreeMap, BTreeSet, HashMap};
 
 /// Evaluate with a [State]
@@ -15,6 +16,13 @@ pub trait Evaluate {
     /// Evaluate to return the output with used variable ids
     fn evaluate(&self, solution: &State) -> Result<(Self::Output, BTreeSet<u64>)>;
 
+    /// Evaluate to return only the output.
+    ///
+    /// This is faster than [`Evaluate::evaluate`] since it does not collect used variable ids.
+    fn evaluate_value(&self, solution: &State) -> Result<Self::Output> {
+        Ok(self.evaluate(solution)?.0)
+    }
+
     /// Partially evaluate the function to return the used variable ids
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>>;
 
@@ -27,14 +35,20 @@ impl Evaluate for Function {
     type SampledOutput = SampledValues;
 
     fn evaluate(&self, solution: &State) -> Result<(f64, BTreeSet<u64>)> {
-        let out = match &self.function {
-            Some(FunctionEnum::Constant(c)) => (*c, BTreeSet::new()),
-            Some(FunctionEnum::Linear(linear)) => linear.evaluate(solution)?,
-            Some(FunctionEnum::Quadratic(quadratic)) => quadratic.evaluate(solution)?,
-            Some(FunctionEnum::Polynomial(poly)) => poly.evaluate(solution)?,
-            None => (0.0, BTreeSet::new()),
-        };
-        Ok(out)
+        Ok((
+            self.evaluate_value(solution)?,
+            self.used_decision_variable_ids(),
+        ))
+    }
+
+    fn evaluate_value(&self, solution: &State) -> Result<f64> {
+        Ok(match &self.function {
+            Some(FunctionEnum::Constant(c)) => *c,
+            Some(FunctionEnum::Linear(linear)) => linear.evaluate_value(solution)?,
+            Some(FunctionEnum::Quadratic(quadratic)) => quadratic.evaluate_value(solution)?,
+            Some(FunctionEnum::Polynomial(poly)) => poly.evaluate_value(solution)?,
+            None => 0.0,
+        })
     }
 
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
@@ -48,13 +62,9 @@ impl Evaluate for Function {
     }
 
     fn evaluate_samples(&self, samples: &Samples) -> Result<(Self::SampledOutput, BTreeSet<u64>)> {
-        let mut ids = BTreeSet::new();
-        let out = samples.map(|s| {
-            let (value, mut used_ids) = self.evaluate(s)?;
-            ids.append(&mut used_ids);
-            Ok(value)
-        })?;
-        Ok((out, ids))
+        // Used IDs do not depend on the sample, so they are not collected for each sample
+        let out = samples.par_map(|s| self.evaluate_value(s))?;
+        Ok((out, self.used_decision_variable_ids()))
     }
 }
 
@@ -63,17 +73,22 @@ impl Evaluate for Linear {
     type SampledOutput = SampledValues;
 
     fn evaluate(&self, solution: &State) -> Result<(f64, BTreeSet<u64>)> {
+        Ok((
+            self.evaluate_value(solution)?,
+            self.used_decision_variable_ids(),
+        ))
+    }
+
+    fn evaluate_value(&self, solution: &State) -> Result<f64> {
         let mut sum = self.constant;
-        let mut used_ids = BTreeSet::new();
         for LinearTerm { id, coefficient } in &self.terms {
-            used_ids.insert(*id);
             let s = solution
                 .entries
                 .get(id)
                 .with_context(|| format!("Variable id ({id}) is not found in the solution"))?;
             sum += coefficient * s;
         }
-        Ok((sum, used_ids))
+        Ok(sum)
     }
 
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
@@ -93,13 +108,9 @@ impl Evaluate for Linear {
     }
 
     fn evaluate_samples(&self, samples: &Samples) -> Result<(Self::SampledOutput, BTreeSet<u64>)> {
-        let mut ids = BTreeSet::new();
-        let out = samples.map(|s| {
-            let (value, mut used_ids) = self.evaluate(s)?;
-            ids.append(&mut used_ids);
-            Ok(value)
-        })?;
-        Ok((out, ids))
+        // Used IDs do not depend on the sample, so they are not collected for each sample
+        let out = samples.par_map(|s| self.evaluate_value(s))?;
+        Ok((out, self.used_decision_variable_ids()))
     }
 }
 
@@ -108,17 +119,21 @@ impl Evaluate for Quadratic {
     type SampledOutput = SampledValues;
 
     fn evaluate(&self, solution: &State) -> Result<(f64, BTreeSet<u64>)> {
-        let (mut sum, mut used_ids) = if let Some(linear) = &self.linear {
-            linear.evaluate(solution)?
+        Ok((
+            self.evaluate_value(solution)?,
+            self.used_decision_variable_ids(),
+        ))
+    }
+
+    fn evaluate_value(&self, solution: &State) -> Result<f64> {
+        let mut sum = if let Some(linear) = &self.linear {
+            linear.evaluate_value(solution)?
         } else {
-            (0.0, BTreeSet::new())
+            0.0
         };
         for (i, j, value) in
             itertools::multizip((self.rows.iter(), self.columns.iter(), self.values.iter()))
         {
-            used_ids.insert(*i);
-            used_ids.insert(*j);
-
             let u = solution
                 .entries
                 .get(i)
@@ -129,7 +144,7 @@ impl Evaluate for Quadratic {
                 .with_context(|| format!("Variable id ({j}) is not found in the solution"))?;
             sum += value * u * v;
         }
-        Ok((sum, used_ids))
+        Ok(sum)
     }
 
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
@@ -182,13 +197,9 @@ impl Evaluate for Quadratic {
     }
 
     fn evaluate_samples(&self, samples: &Samples) -> Result<(Self::SampledOutput, BTreeSet<u64>)> {
-        let mut ids = BTreeSet::new();
-        let out = samples.map(|s| {
-            let (value, mut used_ids) = self.evaluate(s)?;
-            ids.append(&mut used_ids);
-            Ok(value)
-        })?;
-        Ok((out, ids))
+        // Used IDs do not depend on the sample, so they are not collected for each sample
+        let out = samples.par_map(|s| self.evaluate_value(s))?;
+        Ok((out, self.used_decision_variable_ids()))
     }
 }
 
@@ -197,12 +208,17 @@ impl Evaluate for Polynomial {
     type SampledOutput = SampledValues;
 
     fn evaluate(&self, solution: &State) -> Result<(f64, BTreeSet<u64>)> {
+        Ok((
+            self.evaluate_value(solution)?,
+            self.used_decision_variable_ids(),
+        ))
+    }
+
+    fn evaluate_value(&self, solution: &State) -> Result<f64> {
         let mut sum = 0.0;
-        let mut used_ids = BTreeSet::new();
         for term in &self.terms {
             let mut v = term.coefficient;
             for id in &term.ids {
-                used_ids.insert(*id);
                 v *= solution
                     .entries
                     .get(id)
@@ -210,7 +226,7 @@ impl Evaluate for Polynomial {
             }
             sum += v;
         }
-        Ok((sum, used_ids))
+        Ok(sum)
     }
 
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
@@ -244,13 +260,9 @@ impl Evaluate for Polynomial {
     }
 
     fn evaluate_samples(&self, samples: &Samples) -> Result<(Self::SampledOutput, BTreeSet<u64>)> {
-        let mut ids = BTreeSet::new();
-        let out = samples.map(|s| {
-            let (value, mut used_ids) = self.evaluate(s)?;
-            ids.append(&mut used_ids);
-            Ok(value)
-        })?;
-        Ok((out, ids))
+        // Used IDs do not depend on the sample, so they are not collected for each sample
+        let out = samples.par_map(|s| self.evaluate_value(s))?;
+        Ok((out, self.used_decision_variable_ids()))
     }
 }
 
@@ -259,24 +271,22 @@ impl Evaluate for Constraint {
     type SampledOutput = SampledConstraint;
 
     fn evaluate(&self, solution: &State) -> Result<(Self::Output, BTreeSet<u64>)> {
-        let (evaluated_value, used_ids) = self.function().evaluate(solution)?;
-        let used_decision_variable_ids = used_ids.iter().cloned().collect();
-        Ok((
-            EvaluatedConstraint {
-                id: self.id,
-                equality: self.equality,
-                evaluated_value,
-                used_decision_variable_ids,
-                name: self.name.clone(),
-                subscripts: self.subscripts.clone(),
-                parameters: self.parameters.clone(),
-                description: self.description.clone(),
-                dual_variable: None,
-                removed_reason: None,
-                removed_reason_parameters: Default::default(),
-            },
-            used_ids,
-        ))
+        let evaluated = self.evaluate_value(solution)?;
+        let used_ids = evaluated
+            .used_decision_variable_ids
+            .iter()
+            .cloned()
+            .collect();
+        Ok((evaluated, used_ids))
+    }
+
+    fn evaluate_value(&self, solution: &State) -> Result<Self::Output> {
+        let used_ids: Vec<u64> = self
+            .function()
+            .used_decision_variable_ids()
+            .into_iter()
+            .collect();
+        self.evaluate_with_used_ids(solution, &used_ids)
     }
 
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
@@ -335,6 +345,18 @@ impl Evaluate for RemovedConstraint {
         Ok((out, used_ids))
     }
 
+    fn evaluate_value(&self, solution: &State) -> Result<Self::Output> {
+        let used_ids: Vec<u64> = self
+            .constraint
+            .as_ref()
+            .context("RemovedConstraint does not contain constraint")?
+            .function()
+            .used_decision_variable_ids()
+            .into_iter()
+            .collect();
+        self.evaluate_with_used_ids(solution, &used_ids)
+    }
+
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
         self.constraint
             .as_mut()
@@ -354,17 +376,97 @@ impl Evaluate for RemovedConstraint {
     }
 }
 
-impl Evaluate for Instance {
-    type Output = Solution;
-    type SampledOutput = SampleSet;
+impl Constraint {
+    /// [`Evaluate::evaluate_value`] with the used decision variable IDs of the constraint computed beforehand
+    fn evaluate_with_used_ids(
+        &self,
+        solution: &State,
+        used_ids: &[u64],
+    ) -> Result<EvaluatedConstraint> {
+        Ok(EvaluatedConstraint {
+            id: self.id,
+            equality: self.equality,
+            evaluated_value: self.function().evaluate_value(solution)?,
+            used_decision_variable_ids: used_ids.to_vec(),
+            name: self.name.clone(),
+            subscripts: self.subscripts.clone(),
+            parameters: self.parameters.clone(),
+            description: self.description.clone(),
+            dual_variable: None,
+            removed_reason: None,
+            removed_reason_parameters: Default::default(),
+        })
+    }
+}
 
-    fn evaluate(&self, state: &State) -> Result<(Self::Output, BTreeSet<u64>)> {
-        let mut used_ids = BTreeSet::new();
+impl RemovedConstraint {
+    /// [`Evaluate::evaluate_value`] with the used decision variable IDs of the constraint computed beforehand
+    fn evaluate_with_used_ids(
+        &self,
+        solution: &State,
+        used_ids: &[u64],
+    ) -> Result<EvaluatedConstraint> {
+        let mut out = self
+            .constraint
+            .as_ref()
+            .context("RemovedConstraint does not contain constraint")?
+            .evaluate_with_used_ids(solution, used_ids)?;
+        out.removed_reason = Some(self.removed_reason.clone());
+        out.removed_reason_parameters = self.removed_reason_parameters.clone();
+        Ok(out)
+    }
+}
+
+/// Used decision variable IDs of each constraint and removed constraint of an [`Instance`]
+///
+/// They do not depend on the state, so they can be computed once for an instance
+/// and reused by [`Instance::evaluate_with_used_ids`] for evaluating it with many states.
+#[derive(Debug, Clone, Default, PartialEq, Eq)]
+pub struct ConstraintUsedIds {
+    constraints: Vec<Vec<u64>>,
+    removed_constraints: Vec<Vec<u64>>,
+}
+
+impl ConstraintUsedIds {
+    pub fn new(instance: &Instance) -> Self {
+        let used_ids =
+            |f: &Function| -> Vec<u64> { f.used_decision_variable_ids().into_iter().collect() };
+        Self {
+            constraints: instance
+                .constraints
+                .iter()
+                .map(|c| used_ids(&c.function()))
+                .collect(),
+            removed_constraints: instance
+                .removed_constraints
+                .iter()
+                .map(|c| {
+                    c.constraint
+                        .as_ref()
+                        .map(|c| used_ids(&c.function()))
+                        .unwrap_or_default()
+                })
+                .collect(),
+        }
+    }
+}
+
+impl Instance {
+    /// [`Evaluate::evaluate_value`] with the used decision variable IDs of the constraints computed beforehand by [`ConstraintUsedIds::new`]
+    pub fn evaluate_with_used_ids(
+        &self,
+        state: &State,
+        used_ids: &ConstraintUsedIds,
+    ) -> Result<Solution> {
+        ensure!(
+            used_ids.constraints.len() == self.constraints.len()
+                && used_ids.removed_constraints.len() == self.removed_constraints.len(),
+            "Used decision variable IDs do not match the constraints of the instance"
+        );
         let mut evaluated_constraints = Vec::new();
         let mut feasible_relaxed = true;
-        for c in &self.constraints {
-            let (c, used_ids_) = c.evaluate(state)?;
-            used_ids.extend(used_ids_);
+        for (c, ids) in self.constraints.iter().zip(&used_ids.constraints) {
+            let c = c.evaluate_with_used_ids(state, ids)?;
             // Only check non-removed constraints for feasibility
             if feasible_relaxed {
                 feasible_relaxed = c.is_feasible(1e-6)?;
@@ -372,17 +474,19 @@ impl Evaluate for Instance {
             evaluated_constraints.push(c);
         }
         let mut feasible = feasible_relaxed;
-        for c in &self.removed_constraints {
-            let (c, used_ids_) = c.evaluate(state)?;
-            used_ids.extend(used_ids_);
+        for (c, ids) in self
+            .removed_constraints
+            .iter()
+            .zip(&used_ids.removed_constraints)
+        {
+            let c = c.evaluate_with_used_ids(state, ids)?;
             if feasible {
                 feasible = c.is_feasible(1e-6)?;
             }
             evaluated_constraints.push(c);
         }
 
-        let (objective, used_ids_) = self.objective().evaluate(state)?;
-        used_ids.extend(used_ids_);
+        let objective = self.objective().evaluate_value(state)?;
 
         let mut state = state.clone();
         for v in &self.decision_variables {
@@ -391,22 +495,35 @@ impl Evaluate for Instance {
             }
         }
         eval_dependencies(&self.decision_variable_dependency, &mut state)?;
+        Ok(Solution {
+            decision_variables: self.decision_variables.clone(),
+            state: Some(state),
+            evaluated_constraints,
+            feasible_relaxed: Some(feasible_relaxed),
+            feasible,
+            objective,
+            optimality: Optimality::Unspecified.into(),
+            relaxation: Relaxation::Unspecified.into(),
+            ..Default::default()
+        })
+    }
+}
+
+impl Evaluate for Instance {
+    type Output = Solution;
+    type SampledOutput = SampleSet;
+
+    fn evaluate(&self, state: &State) -> Result<(Self::Output, BTreeSet<u64>)> {
         Ok((
-            Solution {
-                decision_variables: self.decision_variables.clone(),
-                state: Some(state),
-                evaluated_constraints,
-                feasible_relaxed: Some(feasible_relaxed),
-                feasible,
-                objective,
-                optimality: Optimality::Unspecified.into(),
-                relaxation: Relaxation::Unspecified.into(),
-                ..Default::default()
-            },
-            used_ids,
+            self.evaluate_value(state)?,
+            self.used_decision_variable_ids(),
         ))
     }
 
+    fn evaluate_value(&self, state: &State) -> Result<Self::Output> {
+        self.evaluate_with_used_ids(state, &ConstraintUsedIds::new(self))
+    }
+
     fn partial_evaluate(&mut self, state: &State) -> Result<BTreeSet<u64>> {
         for v in &mut self.decision_variables {
             if let Some(value) = state.entries.get(&v.id) {
@@ -438,10 +555,20 @@ impl Evaluate for Instance {
             samples.ids().map(|id| (*id, true)).collect();
         let mut used_ids = BTreeSet::new();
 
-        // Constraints
-        let mut constraints = Vec::new();
-        for c in &self.constraints {
-            let (evaluated, mut ids) = c.evaluate_samples(samples)?;
+        // Constraints are evaluated in parallel, and then feasibility is merged sequentially
+        let evaluated = self
+            .constraints
+            .par_iter()
+            .map(|c| c.evaluate_samples(samples))
+            .collect::<Result<Vec<_>>>()?;
+        let removed = self
+            .removed_constraints
+            .par_iter()
+            .map(|c| c.evaluate_samples(samples))
+            .collect::<Result<Vec<_>>>()?;
+
+        let mut constraints = Vec::with_capacity(evaluated.len() + removed.len());
+        for (evaluated, mut ids) in evaluated {
             used_ids.append(&mut ids);
             for (sample_id, feasible_) in evaluated.is_feasible(1e-6)? {
                 if !feasible_ {
@@ -451,8 +578,7 @@ impl Evaluate for Instance {
             constraints.push(evaluated);
         }
         let mut feasible = feasible_relaxed.clone();
-        for c in &self.removed_constraints {
-            let (v, mut ids) = c.evaluate_samples(samples)?;
+        for (v, mut ids) in removed {
             used_ids.append(&mut ids);
             for (sample_id, feasible_) in v.is_feasible(1e-6)? {
                 if !feasible_ {
@@ -468,8 +594,18 @@ impl Evaluate for Instance {
 
         // Reconstruct decision variable values
         let mut samples = samples.clone();
-        for state in samples.states_mut() {
-            let mut new = eval_dependencies(&self.decision_variable_dependency, state?)?;
+        let dependency_ids = samples
+            .entries
+            .par_iter_mut()
+            .map(|entry| {
+                let state = entry
+                    .state
+                    .as_mut()
+                    .context("ommx.v1.Samples.Entry must has state. Broken Data.")?;
+                eval_dependencies(&self.decision_variable_dependency, state)
+            })
+            .collect::<Result<Vec<_>>>()?;
+        for mut new in dependency_ids {
             used_ids.append(&mut new);
         }
         let mut transposed = samples.transpose();
@@ -715,6 +851,24 @@ mod tests {
             .boxed()
     }
 
+    proptest! {
+        #[test]
+        fn evaluate_value_instance((instance, state) in instance_with_state()) {
+            let (solution, used_ids) = instance.evaluate(&state).unwrap();
+            prop_assert_eq!(&solution, &instance.evaluate_value(&state).unwrap());
+            prop_assert_eq!(used_ids, instance.used_decision_variable_ids());
+            let constraint_used_ids = ConstraintUsedIds::new(&instance);
+            prop_assert_eq!(
+                &solution,
+                &instance.evaluate_with_used_ids(&state, &constraint_used_ids).unwrap()
+            );
+            if !instance.constraints.is_empty() {
+                let empty = ConstraintUsedIds::default();
+                prop_assert!(instance.evaluate_with_used_ids(&state, &empty).is_err());
+            }
+        }
+    }
+
     proptest! {
         #[test]
         fn evaluate_instance((instance, state) in instance_with_state()) {
@@ -0,0 +1,360 @@
+use crate::{
+    sorted_ids::SortedIds,
+    v1::{
+        function::Function as FunctionEnum, linear::Term, Function, Linear, Monomial, Polynomial,
+        Quadratic,
+    },
+};
+use std::collections::HashMap;
+
+/// Accumulator of terms to build a [`Function`] from many functions or products of functions.
+///
+/// Adding [`Function`]s by `+` rebuilds the sorted terms at every addition,
+/// and summing up `n` functions by a left fold costs `O(n^2 log n)`.
+/// This builder collects the terms into hash maps, and sorts them only once in [`FunctionBuilder::build`].
+///
+/// The type of the built function is the one which `+` and `*` yield,
+/// e.g. the sum of linear functions is [`Linear`] even if all terms are cancelled out.
+///
+/// ```rust
+/// use ommx::{FunctionBuilder, v1::{Function, Linear}};
+///
+/// let x1 = Function::from(Linear::single_term(1, 1.0));
+/// let x2 = Function::from(Linear::single_term(2, 1.0));
+///
+/// // (x1 + x2)^2 + 3 * x1
+/// let mut builder = FunctionBuilder::new();
+/// let f = x1.clone() + x2.clone();
+/// builder.add_product(1.0, &[&f, &f]);
+/// builder.add_scaled(&x1, 3.0);
+/// let built = builder.build();
+/// assert_eq!(built.to_string(), "x1*x1 + 2*x1*x2 + x2*x2 + 3*x1");
+/// ```
+#[derive(Debug, Clone, Default)]
+pub struct FunctionBuilder {
+    /// Rank of the type of the built function, see [`rank`]
+    rank: usize,
+    constant: f64,
+    linear: HashMap<u64, f64>,
+    /// Keyed by `(row, column)` with `row <= column`
+    quadratic: HashMap<(u64, u64), f64>,
+    /// Terms of degree three or higher
+    higher: HashMap<SortedIds, f64>,
+}
+
+/// Rank of the type of function in the order of promotion by `+` and `*`,
+/// i.e. 0 for constant, 1 for linear, 2 for quadratic, and 3 for polynomial.
+fn rank(function: &Function) -> usize {
+    match &function.function {
+        Some(FunctionEnum::Constant(_)) | None => 0,
+        Some(FunctionEnum::Linear(_)) => 1,
+        Some(FunctionEnum::Quadratic(_)) => 2,
+        Some(FunctionEnum::Polynomial(_)) => 3,
+    }
+}
+
+/// Call `f` for each term of the function with its (not necessarily sorted) IDs and coefficient
+fn for_each_term(function: &Function, mut f: impl FnMut(&[u64], f64)) {
+    fn linear_terms(linear: &Linear, f: &mut impl FnMut(&[u64], f64)) {
+        for term in &linear.terms {
+            f(std::slice::from_ref(&term.id), term.coefficient);
+        }
+        f(&[], linear.constant);
+    }
+
+    match &function.function {
+        Some(FunctionEnum::Constant(c)) => f(&[], *c),
+        Some(FunctionEnum::Linear(linear)) => linear_terms(linear, &mut f),
+        Some(FunctionEnum::Quadratic(quadratic)) => {
+            for ((column, row), value) in quadratic.quad_iter() {
+                f(&[column, row], value);
+            }
+            if let Some(linear) = &quadratic.linear {
+                linear_terms(linear, &mut f);
+            }
+        }
+        Some(FunctionEnum::Polynomial(poly)) => {
+            for term in &poly.terms {
+                f(&term.ids, term.coefficient);
+            }
+        }
+        None => {}
+    }
+}
+
+fn is_nonzero(coefficient: f64) -> bool {
+    coefficient.abs() > f64::EPSILON
+}
+
+impl FunctionBuilder {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    fn insert(&mut self, ids: &[u64], coefficient: f64) {
+        if coefficient == 0.0 {
+            return;
+        }
+        match *ids {
+            [] => self.constant += coefficient,
+            [id] => *self.linear.entry(id).or_default() += coefficient,
+            [a, b] => {
+                let key = if a <= b { (a, b) } else { (b, a) };
+                *self.quadratic.entry(key).or_default() += coefficient;
+            }
+            _ => *self.higher.entry(SortedIds::new(ids.to_vec())).or_default() += coefficient,
+        }
+    }
+
+    /// Add a term `coefficient * x[ids[0]] * x[ids[1]] * ...`. The IDs do not need to be sorted.
+    pub fn add_term(&mut self, ids: &[u64], coefficient: f64) {
+        self.rank = self.rank.max(ids.len().min(3));
+        self.insert(ids, coefficient);
+    }
+
+    /// Add a function
+    pub fn add(&mut self, function: &Function) {
+        self.add_scaled(function, 1.0);
+    }
+
+    /// Add `scale * function`
+    pub fn add_scaled(&mut self, function: &Function, scale: f64) {
+        self.rank = self.rank.max(rank(function));
+        for_each_term(function, |ids, coefficient| {
+            self.insert(ids, scale * coefficient)
+        });
+    }
+
+    /// Add `coefficient * factors[0] * factors[1] * ...` by expanding the product term by term,
+    /// without creating the intermediate products.
+    pub fn add_product(&mut self, coefficient: f64, factors: &[&Function]) {
+        let rank = factors.iter().map(|f| rank(f)).sum::<usize>().min(3);
+        self.rank = self.rank.max(rank);
+        self.expand(factors, &mut Vec::new(), coefficient);
+    }
+
+    fn expand(&mut self, factors: &[&Function], ids: &mut Vec<u64>, coefficient: f64) {
+        let Some((first, rest)) = factors.split_first() else {
+            self.insert(ids, coefficient);
+            return;
+        };
+        for_each_term(first, |term_ids, c| {
+            if c == 0.0 {
+                return;
+            }
+            let len = ids.len();
+            ids.extend_from_slice(term_ids);
+            self.expand(rest, ids, coefficient * c);
+            ids.truncate(len);
+        });
+    }
+
+    /// Add `x[ids[0]] * x[ids[1]] * ... * function^2`, e.g. a penalty term `p * f(x)^2` of a constraint `f(x) = 0`.
+    ///
+    /// The square of a linear function is expanded directly into the upper-triangular entries
+    /// `2 a_i a_j x_i x_j` for `i < j` and `a_i^2 x_i^2`, without creating the quadratic function `f * f`.
+    pub fn add_square(&mut self, ids: &[u64], function: &Function) {
+        let (terms, constant): (&[Term], f64) = match &function.function {
+            Some(FunctionEnum::Linear(linear)) => (&linear.terms, linear.constant),
+            Some(FunctionEnum::Constant(c)) => (&[], *c),
+            None => (&[], 0.0),
+            _ => {
+                let factors: Vec<Function> = ids
+                    .iter()
+                    .map(|id| Function::from(Linear::single_term(*id, 1.0)))
+                    .collect();
+                let mut factors: Vec<&Function> = factors.iter().collect();
+                factors.extend([function, function]);
+                self.add_product(1.0, &factors);
+                return;
+            }
+        };
+        self.rank = self.rank.max((ids.len() + 2 * rank(function)).min(3));
+
+        let reserved = terms.len() * (terms.len() + 1) / 2;
+        match ids.len() {
+            0 => self.quadratic.reserve(reserved),
+            _ => self.higher.reserve(reserved),
+        }
+        let mut buffer = Vec::with_capacity(ids.len() + 2);
+        let mut emit = |builder: &mut Self, term_ids: &[u64], coefficient: f64| {
+            buffer.clear();
+            buffer.extend_from_slice(ids);
+            buffer.extend_from_slice(term_ids);
+            builder.insert(&buffer, coefficient);
+        };
+        for (i, a) in terms.iter().enumerate() {
+            emit(self, &[a.id, a.id], a.coefficient * a.coefficient);
+            for b in &terms[i + 1..] {
+                emit(self, &[a.id, b.id], 2.0 * a.coefficient * b.coefficient);
+            }
+            emit(self, &[a.id], 2.0 * constant * a.coefficient);
+        }
+        emit(self, &[], constant * constant);
+    }
+
+    /// Merge the terms accumulated in another builder, e.g. the ones built in parallel.
+    pub fn merge(mut self, mut other: Self) -> Self {
+        if self.len() < other.len() {
+            std::mem::swap(&mut self, &mut other);
+        }
+        self.rank = self.rank.max(other.rank);
+        self.constant += other.constant;
+        for (id, coefficient) in other.linear {
+            *self.linear.entry(id).or_default() += coefficient;
+        }
+        for (ids, value) in other.quadratic {
+            *self.quadratic.entry(ids).or_default() += value;
+        }
+        for (ids, coefficient) in other.higher {
+            *self.higher.entry(ids).or_default() += coefficient;
+        }
+        self
+    }
+
+    fn len(&self) -> usize {
+        self.linear.len() + self.quadratic.len() + self.higher.len()
+    }
+
+    fn linear_terms(linear: HashMap<u64, f64>) -> Vec<Term> {
+        let mut terms: Vec<Term> = linear
+            .into_iter()
+            .filter(|(_, coefficient)| is_nonzero(*coefficient))
+            .map(|(id, coefficient)| Term { id, coefficient })
+            .collect();
+        terms.sort_unstable_by_key(|term| term.id);
+        terms
+    }
+
+    /// Build the function by merging and sorting the accumulated terms. Terms cancelled out are removed.
+    pub fn build(self) -> Function {
+        match self.rank {
+            0 => Function::from(self.constant),
+            1 => Function::from(Linear {
+                terms: Self::linear_terms(self.linear),
+                constant: self.constant,
+            }),
+            2 => {
+                let mut quad: Vec<_> = self
+                    .quadratic
+                    .into_iter()
+                    .filter(|(_, value)| is_nonzero(*value))
+                    .collect();
+                quad.sort_unstable_by_key(|(ids, _)| *ids);
+                Function::from(Quadratic {
+                    columns: quad.iter().map(|((_, column), _)| *column).collect(),
+                    rows: quad.iter().map(|((row, _), _)| *row).collect(),
+                    values: quad.iter().map(|(_, value)| *value).collect(),
+                    linear: Some(Linear {
+                        terms: Self::linear_terms(self.linear),
+                        constant: self.constant,
+                    }),
+                })
+            }
+            _ => {
+                let mut terms: Vec<(SortedIds, f64)> = self
+                    .higher
+                    .into_iter()
+                    .chain(
+                        self.quadratic
+                            .into_iter()
+                            .map(|((row, column), value)| (vec![row, column].into(), value)),
+                    )
+                    .chain(
+                        self.linear
+                            .into_iter()
+                            .map(|(id, coefficient)| (vec![id].into(), coefficient)),
+                    )
+                    .chain(std::iter::once((SortedIds::empty(), self.constant)))
+                    .filter(|(_, coefficient)| is_nonzero(*coefficient))
+                    .collect();
+                terms.sort_unstable_by(|(a, _), (b, _)| a.cmp(b));
+                Function::from(Polynomial {
+                    terms: terms
+                        .into_iter()
+                        .map(|(ids, coefficient)| Monomial {
+                            ids: ids.into_inner(),
+                            coefficient,
+                        })
+                        .collect(),
+                })
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use approx::AbsDiffEq;
+    use num::Zero;
+    use proptest::prelude::*;
+
+    proptest! {
+        #[test]
+        fn sum(fs in proptest::collection::vec(Function::arbitrary(), 0..5)) {
+            let expected = fs.iter().cloned().fold(Function::zero(), |acc, f| acc + f);
+            let mut builder = FunctionBuilder::new();
+            for f in &fs {
+                builder.add(f);
+            }
+            let built = builder.build();
+            prop_assert!(built.abs_diff_eq(&expected, 1e-10), "{built} != {expected}");
+            prop_assert_eq!(rank(&built), rank(&expected));
+        }
+
+        #[test]
+        fn product(f in Function::arbitrary(), g in Function::arbitrary(), c in -3.0..3.0) {
+            let expected = Function::from(c) * f.clone() * g.clone();
+            let mut builder = FunctionBuilder::new();
+            builder.add_product(c, &[&f, &g]);
+            let built = builder.build();
+            prop_assert!(built.abs_diff_eq(&expected, 1e-10), "{built} != {expected}");
+            prop_assert_eq!(rank(&built), rank(&expected));
+        }
+
+        #[test]
+        fn square(f in Function::arbitrary(), ids in proptest::collection::vec(0..5_u64, 0..2)) {
+            let expected = ids
+                .iter()
+                .map(|id| Function::from(Linear::single_term(*id, 1.0)))
+                .chain([f.clone(), f.clone()])
+                .fold(Function::from(1.0), |acc, f| acc * f);
+            let mut builder = FunctionBuilder::new();
+            builder.add_square(&ids, &f);
+            let built = builder.build();
+            prop_assert!(built.abs_diff_eq(&expected, 1e-10), "{built} != {expected}");
+            prop_assert_eq!(rank(&built), rank(&expected));
+        }
+
+        #[test]
+        fn merge(fs in proptest::collection::vec(Function::arbitrary(), 0..5), at in 0..5_usize) {
+            let mut expected = FunctionBuilder::new();
+            let mut lhs = FunctionBuilder::new();
+            let mut rhs = FunctionBuilder::new();
+            for (i, f) in fs.iter().enumerate() {
+                expected.add(f);
+                if i < at {
+                    lhs.add(f);
+                } else {
+                    rhs.add(f);
+                }
+            }
+            let expected = expected.build();
+            let built = lhs.merge(rhs).build();
+            prop_assert!(built.abs_diff_eq(&expected, 1e-10), "{built} != {expected}");
+            prop_assert_eq!(rank(&built), rank(&expected));
+        }
+    }
+
+    #[test]
+    fn add_term() {
+        let mut builder = FunctionBuilder::new();
+        builder.add_term(&[2, 1], 1.0);
+        builder.add_term(&[1, 2], 1.0);
+        builder.add_term(&[3], 1.0);
+        builder.add_term(&[3], -1.0);
+        builder.add_term(&[], 2.0);
+        assert_eq!(builder.build().to_string(), "2*x1*x2 + 2");
+    }
+}
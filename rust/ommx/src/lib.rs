@@ -144,11 +144,13 @@ pub mod random;
 
 // Internal modules
 mod bound;
+mod compiled;
 mod constraint;
 mod decision_variable;
 mod evaluate;
 mod format;
 mod function;
+mod function_builder;
 mod infeasible_detected;
 mod instance;
 mod linear;
@@ -163,12 +165,17 @@ mod sorted_ids;
 mod state;
 
 pub use bound::*;
+pub use compiled::{CompiledInstance, Delta, IncrementalEvaluator};
 pub use constraint::*;
 pub use decision_variable::*;
-pub use evaluate::Evaluate;
+pub use evaluate::{ConstraintUsedIds, Evaluate};
 pub use function::*;
+pub use function_builder::FunctionBuilder;
 pub use infeasible_detected::*;
 pub use instance::*;
+pub use sample_set::{
+    ConstraintColumns, SampleMatrix, SampleSetIndex, SampleSetStatistics, ViolationHistogram,
+};
 
 /// Module created from `ommx.v1` proto files
 pub mod v1 {
@@ -2,6 +2,7 @@ use crate::{
     macros::*,
     v1::{linear::Term, Linear, Quadratic},
 };
+use anyhow::{ensure, Result};
 use approx::AbsDiffEq;
 use num::Zero;
 use std::{
@@ -41,6 +42,29 @@ impl Linear {
         }
     }
 
+    /// Create a linear function from the IDs and coefficients given as separate slices, e.g. a row of a CSR matrix.
+    ///
+    /// Sorting and merging of terms are skipped if the IDs are strictly increasing.
+    pub fn from_slices(ids: &[u64], coefficients: &[f64], constant: f64) -> Result<Self> {
+        ensure!(
+            ids.len() == coefficients.len(),
+            "Length of IDs ({}) and coefficients ({}) mismatch",
+            ids.len(),
+            coefficients.len()
+        );
+        let terms = ids.iter().copied().zip(coefficients.iter().copied());
+        if !ids.windows(2).all(|w| w[0] < w[1]) {
+            return Ok(Self::new(terms, constant));
+        }
+        Ok(Self {
+            terms: terms
+                .filter(|(_, coefficient)| coefficient.abs() > f64::EPSILON)
+                .map(|(id, coefficient)| Term { id, coefficient })
+                .collect(),
+            constant,
+        })
+    }
+
     pub fn single_term(id: u64, coefficient: f64) -> Self {
         Self {
             terms: vec![Term { id, coefficient }],
@@ -169,9 +193,68 @@ impl_add_inverse!(f64, Linear);
 impl_sub_by_neg_add!(Linear, f64);
 impl_sub_by_neg_add!(Linear, Linear);
 
+impl Linear {
+    /// Whether the terms are sorted by ID without duplicated IDs and zero coefficients, as the results of [`Add`] are.
+    ///
+    /// Terms decoded from protobuf or given by users may not satisfy this.
+    fn is_normalized(&self) -> bool {
+        self.terms.windows(2).all(|pair| pair[0].id < pair[1].id)
+            && self
+                .terms
+                .iter()
+                .all(|term| term.coefficient.abs() > f64::EPSILON)
+    }
+
+    /// Add `rhs` into `self` which is normalized, see [`Linear::is_normalized`]. The result is also normalized.
+    ///
+    /// The terms of `rhs` are appended without rebuilding the terms of `self`
+    /// when every ID in `rhs` is larger than those in `self`, e.g. when summing up terms in order of ID.
+    fn add_assign_normalized(&mut self, rhs: Self) {
+        let appendable = match (self.terms.last(), rhs.terms.first()) {
+            (Some(last), Some(first)) => last.id < first.id,
+            _ => true,
+        } && rhs.terms.windows(2).all(|pair| pair[0].id < pair[1].id);
+        if appendable {
+            self.terms.extend(
+                rhs.terms
+                    .into_iter()
+                    .filter(|term| term.coefficient.abs() > f64::EPSILON),
+            );
+            self.constant += rhs.constant;
+        } else {
+            *self = std::mem::take(self) + rhs;
+        }
+    }
+}
+
+/// In-place addition, which appends the terms of `rhs` without rebuilding the terms of `self` if possible.
+///
+/// If the terms of `self` are not normalized, i.e. unsorted or containing duplicated IDs or zero coefficients,
+/// they are normalized first in the same way as [`Add`].
+impl AddAssign for Linear {
+    fn add_assign(&mut self, rhs: Self) {
+        if self.is_normalized() {
+            self.add_assign_normalized(rhs);
+        } else {
+            *self = std::mem::take(self) + rhs;
+        }
+    }
+}
+
+impl AddAssign<f64> for Linear {
+    fn add_assign(&mut self, rhs: f64) {
+        self.constant += rhs;
+    }
+}
+
 impl Sum for Linear {
     fn sum<I: Iterator<Item = Self>>(iter: I) -> Self {
-        iter.fold(Linear::from(0), Add::add)
+        // The accumulator stays normalized, so it is not checked for each item
+        let mut sum = Linear::zero();
+        for linear in iter {
+            sum.add_assign_normalized(linear);
+        }
+        sum
     }
 }
 
@@ -258,6 +341,67 @@ mod tests {
 
     test_algebraic!(super::Linear);
 
+    #[test]
+    fn add_assign_terms() {
+        let mut linear = super::Linear::zero();
+        for id in [3, 1, 2, 5, 4] {
+            linear += super::Linear::single_term(id, 1.0);
+        }
+        linear += 2.0;
+        assert_eq!(linear, super::Linear::new((1..=5).map(|id| (id, 1.0)), 2.0));
+
+        // cancelled terms are removed as `+`
+        linear += super::Linear::single_term(5, -1.0);
+        linear += super::Linear::single_term(6, 0.0);
+        assert_eq!(linear, super::Linear::new((1..=4).map(|id| (id, 1.0)), 2.0));
+    }
+
+    #[test]
+    fn add_assign_unnormalized() {
+        let term = |id, coefficient| Term { id, coefficient };
+        // unsorted terms, e.g. decoded from protobuf
+        let mut linear = super::Linear {
+            terms: vec![term(5, 1.0), term(1, 1.0)],
+            constant: 0.0,
+        };
+        linear += super::Linear::single_term(5, 1.0);
+        assert_eq!(linear.terms, vec![term(1, 1.0), term(5, 2.0)]);
+
+        // zero coefficient
+        let mut linear = super::Linear {
+            terms: vec![term(1, 0.0)],
+            constant: 0.0,
+        };
+        linear += super::Linear::single_term(2, 1.0);
+        assert_eq!(linear.terms, vec![term(2, 1.0)]);
+    }
+
+    #[test]
+    fn sum_terms() {
+        let linear: super::Linear = [3, 1, 2, 5, 4, 5]
+            .into_iter()
+            .map(|id| super::Linear::single_term(id, 1.0))
+            .sum();
+        let expected = super::Linear::new(
+            [(1, 1.0), (2, 1.0), (3, 1.0), (4, 1.0), (5, 2.0)].into_iter(),
+            0.0,
+        );
+        assert_eq!(linear, expected);
+    }
+
+    #[test]
+    fn from_slices() {
+        let expected = super::Linear::new([(1, 2.0), (3, 1.0)].into_iter(), 1.0);
+        // sorted
+        let linear = super::Linear::from_slices(&[1, 2, 3], &[2.0, 0.0, 1.0], 1.0).unwrap();
+        assert_eq!(linear, expected);
+        // unsorted with duplicated IDs
+        let linear = super::Linear::from_slices(&[3, 1, 2, 1], &[1.0, 1.0, 0.0, 1.0], 1.0).unwrap();
+        assert_eq!(linear, expected);
+        // length mismatch
+        assert!(super::Linear::from_slices(&[1, 2], &[1.0], 0.0).is_err());
+    }
+
     #[test]
     fn format() {
         let linear = super::Linear::new(
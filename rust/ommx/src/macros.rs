@@ -36,6 +36,18 @@ macro_rules! impl_sub_by_neg_add {
 }
 pub(crate) use impl_sub_by_neg_add;
 
+/// In-place addition through `Add`, taking `self` out to avoid cloning it
+macro_rules! impl_add_assign_by_add {
+    ($lhs:ty, $rhs:ty) => {
+        impl ::std::ops::AddAssign<$rhs> for $lhs {
+            fn add_assign(&mut self, rhs: $rhs) {
+                *self = ::std::mem::take(self) + rhs;
+            }
+        }
+    };
+}
+pub(crate) use impl_add_assign_by_add;
+
 macro_rules! impl_mul_inverse {
     ($lhs:ty, $rhs:ty) => {
         impl ::std::ops::Mul<$rhs> for $lhs {
@@ -94,6 +106,13 @@ macro_rules! test_algebraic {
                 prop_assert!(z.is_zero());
             }
 
+            #[test]
+            fn test_add_assign(a in any::<$target>(), b in any::<$target>()) {
+                let mut c = a.clone();
+                c += b.clone();
+                prop_assert!(c.abs_diff_eq(&(a + b), 1e-10));
+            }
+
             #[test]
             fn test_scalar_distributive(x in any::<$target>(), y in any::<$target>(), a in -1.0..1.0_f64) {
                 let a_xy = a * (x.clone() + y.clone());
@@ -51,35 +51,73 @@
 //!
 
 use prost::Message;
-use std::{io::Read, path::Path};
+use std::{
+    io::{BufReader, Read, Seek},
+    path::Path,
+};
 
 mod convert;
 mod parser;
+mod pipeline;
 mod to_mps;
 
 #[cfg(test)]
 mod tests;
 
 use parser::*;
+pub use to_mps::write_mps;
+
+/// Capacity of the buffer used for reading MPS files.
+const READ_BUFFER_SIZE: usize = 1 << 16;
 
 /// Reads and parses the reader as a gzipped MPS file.
 pub fn load_zipped_reader(reader: impl Read) -> Result<crate::v1::Instance, MpsParseError> {
-    let mps_data = Mps::from_zipped_reader(reader)?;
-    convert::convert(mps_data)
+    load_raw_reader(flate2::read::GzDecoder::new(reader))
 }
 
 /// Reads and parses the reader as an _uncompressed_ MPS file.
+///
+/// The input is streamed: lines are scanned in a reused byte buffer and row and column names are interned,
+/// so the memory usage is bounded by the size of the resulting instance rather than the size of the file.
 pub fn load_raw_reader(reader: impl Read) -> Result<crate::v1::Instance, MpsParseError> {
-    let mps_data = Mps::from_raw_reader(reader)?;
+    let mps_data = Mps::from_buf_reader(BufReader::with_capacity(READ_BUFFER_SIZE, reader))?;
     convert::convert(mps_data)
 }
 
-/// Reads and parses the file at the given path as a gzipped MPS file.
-pub fn load_file(path: impl AsRef<Path>) -> Result<crate::v1::Instance, MpsParseError> {
-    let mps_data = Mps::from_file(path)?;
+/// Parses an _uncompressed_ MPS file loaded on memory.
+///
+/// The `COLUMNS` section is split into chunks and parsed in parallel.
+pub fn load_raw_bytes(bytes: &[u8]) -> Result<crate::v1::Instance, MpsParseError> {
+    let mps_data = Mps::from_slice(bytes)?;
     convert::convert(mps_data)
 }
 
+/// The first two bytes of gzip format
+const GZIP_MAGIC: [u8; 2] = [0x1f, 0x8b];
+
+/// Reads and parses the file at the given path as an MPS file.
+///
+/// - A gzipped file is decompressed on a background thread while being parsed on the current thread.
+/// - An uncompressed file is memory-mapped and parsed by [`load_raw_bytes`].
+pub fn load_file(path: impl AsRef<Path>) -> Result<crate::v1::Instance, MpsParseError> {
+    let mut file = std::fs::File::open(path)?;
+    let mut magic = Vec::with_capacity(GZIP_MAGIC.len());
+    (&mut file)
+        .take(GZIP_MAGIC.len() as u64)
+        .read_to_end(&mut magic)?;
+    file.rewind()?;
+
+    if magic == GZIP_MAGIC {
+        let mps_data = pipeline::with_gz_decoder(file, |reader| Mps::from_buf_reader(reader))?;
+        convert::convert(mps_data)
+    } else {
+        // SAFETY: The file must not be modified by other processes while it is mapped.
+        // The mapping is only read during parsing and dropped before returning.
+        let mmap = unsafe { memmap2::Mmap::map(&file)? };
+        load_raw_bytes(&mmap)
+    }
+}
+
 pub fn load_file_bytes(path: impl AsRef<Path>) -> Result<Vec<u8>, MpsParseError> {
     let instance = load_file(path)?;
     Ok(instance.encode_to_vec())
@@ -87,7 +125,7 @@ pub fn load_file_bytes(path: impl AsRef<Path>) -> Result<Vec<u8>, MpsParseError>
 
 /// Writes out the instance as an MPS file to the specified path.
 ///
-/// This function automatically Gzips the output.
+/// This function automatically Gzips the output on a background thread.
 ///
 /// Only linear problems are supported.
 ///
@@ -107,9 +145,10 @@ pub fn write_file(
         .truncate(true)
         .open(path)?;
 
-    let mut writer = flate2::write::GzEncoder::new(file, flate2::Compression::new(5));
-    to_mps::write_mps(instance, &mut writer)?;
-    Ok(())
+    // compress on a background thread while formatting the MPS on the current thread
+    pipeline::with_gz_encoder(file, flate2::Compression::new(5), |writer| {
+        to_mps::write_mps(instance, writer)
+    })
 }
 
 #[derive(Debug, thiserror::Error)]
@@ -132,11 +171,17 @@ pub enum MpsParseError {
     #[error("Invalid OBJSENSE: {0}")]
     InvalidObjSense(String),
 
+    #[error("Invalid number of fields: {0}")]
+    InvalidNumberOfFields(String),
+
     #[error(transparent)]
     Io(#[from] std::io::Error),
 
     #[error(transparent)]
     ParseFloat(#[from] std::num::ParseFloatError),
+
+    #[error(transparent)]
+    Utf8(#[from] std::str::Utf8Error),
 }
 
 #[derive(Debug, thiserror::Error)]
@@ -1,13 +1,13 @@
 use super::MpsParseError;
-use derive_more::Deref;
+use crate::v1::linear::Term;
 use std::{
     collections::{HashMap, HashSet},
-    fs,
-    io::{self, BufRead, Read},
-    path::Path,
+    io::BufRead,
     str::FromStr,
 };
 
+mod parallel;
+
 type Result<T> = std::result::Result<T, MpsParseError>;
 
 /// A linear optimization problem loaded from MPS format
@@ -22,46 +22,69 @@ type Result<T> = std::result::Result<T, MpsParseError>;
 /// $$
 ///
 /// where $\circ$ is a vector of equality ($=$) or inequality ($\ge, \le$) operators.
-/// The index of $x$ is the name of columns represented by [ColumnName].
-/// $c$ and each row of $A$ also has the name represented by [RowName].
 /// This parser converts any numerical variables into `f64`.
 ///
+/// Names are interned while the file is scanned: a column is identified by the order of its first appearance
+/// in the `COLUMNS` section, and each row stores its coefficients as [`Term`]s keyed by this index.
+/// The names themselves are stored only once in [`Column::name`] and [`Row::name`].
+///
+/// This is kept as the only intermediate representation instead of building [`crate::v1::Instance`] while scanning,
+/// since the IDs of the decision variables and constraints are determined only after all names are read,
+/// see `convert::recover_ids`, and the right hand sides and bounds come in later sections than `COLUMNS`.
+/// The conversion moves the [`Term`] vectors of the rows into the constraints without copying them.
+///
 #[derive(Debug, Clone, PartialEq, Default)]
 pub struct Mps {
     /// The name of the problem
     pub name: String,
     pub obj_sense: ObjSense,
     /// The name of the row corresponding to the objective function
-    pub objective_name: RowName,
-    /// The collection of all variables present -- useful for iterating over
-    /// all variables in a problem.
-    pub vars: HashSet<ColumnName>,
+    pub objective_name: String,
     /// The coefficients of objective function, $c$
-    pub c: HashMap<ColumnName, f64>,
-
-    /// Constraint matrix, $A$
-    pub a: HashMap<RowName, HashMap<ColumnName, f64>>,
-    /// Right hand side of constraints, $b$
-    pub b: HashMap<RowName, f64>,
-
-    /// Upper bound for each column, $u$
-    pub u: HashMap<ColumnName, f64>,
-    /// Lower bound for each column, $l$
-    pub l: HashMap<ColumnName, f64>,
-
-    /// The column names of the variables that are required to be integer
-    pub integer: HashSet<ColumnName>,
-    /// The column names of the variables that are required to be binary
-    pub binary: HashSet<ColumnName>,
-    /// The column names which are not specified as integer or binary
-    pub real: HashSet<ColumnName>,
-
-    /// The row names of the constraints with equality
-    pub eq: HashSet<RowName>,
-    /// The row names of the constraints with inequality ($\ge$)
-    pub ge: HashSet<RowName>,
-    /// The row names of the constraints with inequality ($\le$)
-    pub le: HashSet<RowName>,
+    pub c: Vec<Term>,
+    /// The right hand side of the objective row, i.e. the negative of the constant term of the objective function
+    pub c_rhs: f64,
+    /// The rows of constraints, in the order of declaration followed by the rows generated by `RANGES`
+    pub rows: Vec<Row>,
+    /// The columns, in the order of first appearance in the `COLUMNS` section
+    pub columns: Vec<Column>,
+}
+
+/// A row of the constraint matrix $A$ with its right hand side $b$
+#[derive(Debug, Clone, PartialEq)]
+pub struct Row {
+    pub name: String,
+    pub kind: RowKind,
+    /// Right hand side of the constraint, $b$
+    pub rhs: f64,
+    /// Non-zero coefficients of this row, where [`Term::id`] is the index of the column in [`Mps::columns`]
+    pub terms: Vec<Term>,
+}
+
+#[derive(Debug, Copy, Clone, PartialEq, Eq, Hash)]
+pub enum RowKind {
+    /// Equality, $=$
+    Eq,
+    /// Inequality, $\ge$
+    Ge,
+    /// Inequality, $\le$
+    Le,
+}
+
+/// A column, i.e. a decision variable, with its bounds and integrality
+#[derive(Debug, Clone, PartialEq, Default)]
+pub struct Column {
+    pub name: String,
+    /// Lower bound, $l$
+    pub lower: Option<f64>,
+    /// Upper bound, $u$
+    pub upper: Option<f64>,
+    /// Required to be integer
+    pub integer: bool,
+    /// Required to be binary
+    pub binary: bool,
+    /// Not specified as integer or binary
+    pub real: bool,
 }
 
 #[derive(Debug, Copy, Clone, PartialEq, Eq, PartialOrd, Ord, Hash, Default)]
@@ -92,26 +115,6 @@ impl std::fmt::Display for ObjSense {
     }
 }
 
-/// A marker new type of `String` to distinguish row name and column name
-#[derive(Debug, Deref, Clone, PartialEq, Eq, Hash, Default)]
-pub struct RowName(pub String);
-
-impl From<&str> for RowName {
-    fn from(s: &str) -> Self {
-        Self(s.to_string())
-    }
-}
-
-/// A marker new type of `String` to distinguish row name and column name
-#[derive(Debug, Deref, Clone, PartialEq, Eq, Hash, Default)]
-pub struct ColumnName(pub String);
-
-impl From<&str> for ColumnName {
-    fn from(s: &str) -> Self {
-        Self(s.to_string())
-    }
-}
-
 #[derive(Debug, Default)]
 enum Cursor {
     #[default]
@@ -139,62 +142,236 @@ impl FromStr for Cursor {
     }
 }
 
+fn as_str(bytes: &[u8]) -> Result<&str> {
+    Ok(std::str::from_utf8(bytes)?)
+}
+
+fn parse_f64(bytes: &[u8]) -> Result<f64> {
+    Ok(as_str(bytes)?.parse()?)
+}
+
+/// The maximum number of fields in a line
+const MAX_FIELDS: usize = 6;
+
+/// Split a line into whitespace-separated fields, and returns the number of fields.
+fn split_fields<'a>(line: &'a [u8], buffer: &mut [&'a [u8]; MAX_FIELDS]) -> Result<usize> {
+    let mut num_fields = 0;
+    for field in line
+        .split(|b| b.is_ascii_whitespace())
+        .filter(|f| !f.is_empty())
+    {
+        if num_fields == buffer.len() {
+            return Err(MpsParseError::InvalidNumberOfFields(
+                String::from_utf8_lossy(line).to_string(),
+            ));
+        }
+        buffer[num_fields] = field;
+        num_fields += 1;
+    }
+    Ok(num_fields)
+}
+
+fn invalid_fields(fields: &[&[u8]]) -> MpsParseError {
+    let fields: Vec<_> = fields.iter().map(|f| String::from_utf8_lossy(f)).collect();
+    MpsParseError::InvalidNumberOfFields(fields.join(" "))
+}
+
+/// Add a coefficient to the terms of a row.
+///
+/// The entries of a column are usually contiguous in the `COLUMNS` section,
+/// so a duplicated entry for the same row overwrites the last term.
+/// Duplicates left by a column appearing again after other columns are merged by [`dedup_terms`].
+fn insert_term(terms: &mut Vec<Term>, id: u64, coefficient: f64) {
+    match terms.last_mut() {
+        Some(last) if last.id == id => last.coefficient = coefficient,
+        _ => terms.push(Term { id, coefficient }),
+    }
+}
+
+/// Merge the terms of the same column, where the later entry overwrites the former one.
+///
+/// Column indices are assigned in the order of first appearance,
+/// so the terms are strictly increasing unless a column appears non-contiguously.
+fn dedup_terms(terms: &mut Vec<Term>) {
+    if terms.windows(2).all(|w| w[0].id < w[1].id) {
+        return;
+    }
+    let mut position = HashMap::new();
+    let mut deduped: Vec<Term> = Vec::with_capacity(terms.len());
+    for term in terms.drain(..) {
+        if let Some(&i) = position.get(&term.id) {
+            deduped[i].coefficient = term.coefficient;
+        } else {
+            position.insert(term.id, deduped.len());
+            deduped.push(term);
+        }
+    }
+    *terms = deduped;
+}
+
 /// State machine for parsing MPS format
 #[derive(Debug, Default)]
 struct State {
     cursor: Cursor,
     is_integer_variable: bool,
     is_waiting_objsense_line: bool,
+    /// Index of rows in `mps.rows`
+    row_index: HashMap<Box<str>, usize>,
+    /// Additional `N` rows, which are ignored
+    free_rows: HashSet<Box<str>>,
+    /// Index of columns in `mps.columns`
+    column_index: HashMap<Box<str>, usize>,
+    /// The last column read in `COLUMNS` section to skip the lookup of `column_index`
+    last_column: Option<(Vec<u8>, usize)>,
     mps: Mps,
 }
 
 impl State {
-    fn read_header(&mut self, line: String) -> Result<()> {
-        if let Some(name) = line.strip_prefix("NAME") {
-            self.mps.name = name.trim().to_string();
-        } else if let Some(sense) = line.strip_prefix("OBJSENSE") {
-            if sense.trim().is_empty() {
+    /// Read a line, and returns `false` if the end of data is reached
+    fn read_line(&mut self, line: &[u8]) -> Result<bool> {
+        let line = line.strip_suffix(b"\n").unwrap_or(line);
+        let line = line.strip_suffix(b"\r").unwrap_or(line);
+        if line.trim_ascii().is_empty() {
+            return Ok(true);
+        }
+
+        // `*` is used as a comment in some files
+        if line.starts_with(b"*") {
+            return Ok(true);
+        }
+
+        // HEADER case
+        if !line.starts_with(b" ") && !line.starts_with(b"\t") {
+            self.read_header(line)?;
+            return Ok(!matches!(self.cursor, Cursor::End));
+        }
+
+        // FIELD case
+        //
+        // The original fixed format is designed as following:
+        // ---------------------------------------------------------------------
+        // Field:    1           2          3         4         5         6
+        // Columns:  2-3        5-12      15-22     25-36     40-47     50-61
+        // ---------------------------------------------------------------------
+        //
+        // But some data including the benchmark dataset in MIPLIB does not follow it.
+        // Instead, we parse it as space-separated format.
+        let mut buffer: [&[u8]; MAX_FIELDS] = [&[]; MAX_FIELDS];
+        let num_fields = split_fields(line, &mut buffer)?;
+        let fields = &buffer[..num_fields];
+
+        if self.is_waiting_objsense_line {
+            self.mps.obj_sense = as_str(fields[0])?.parse()?;
+            self.is_waiting_objsense_line = false;
+            return Ok(true);
+        }
+
+        match self.cursor {
+            Cursor::Rows => self.read_row_field(fields)?,
+            Cursor::Columns => self.read_column_field(fields)?,
+            Cursor::Rhs => self.read_rhs_field(fields)?,
+            Cursor::Ranges => self.read_range_field(fields)?,
+            Cursor::Bounds => self.read_bound_field(fields)?,
+            Cursor::Name => {
+                return Err(MpsParseError::InvalidHeader(
+                    String::from_utf8_lossy(line).to_string(),
+                ))
+            }
+            Cursor::End => return Ok(false),
+        }
+        Ok(true)
+    }
+
+    fn read_header(&mut self, line: &[u8]) -> Result<()> {
+        if let Some(name) = line.strip_prefix(b"NAME") {
+            self.mps.name = String::from_utf8_lossy(name.trim_ascii()).to_string();
+        } else if let Some(sense) = line.strip_prefix(b"OBJSENSE") {
+            let sense = sense.trim_ascii();
+            if sense.is_empty() {
                 self.is_waiting_objsense_line = true;
                 return Ok(());
             }
-            self.mps.obj_sense = sense.trim().parse()?;
+            self.mps.obj_sense = as_str(sense)?.parse()?;
         } else {
-            self.cursor = line.trim().parse()?;
+            self.cursor = String::from_utf8_lossy(line.trim_ascii()).parse()?;
         }
         Ok(())
     }
 
+    fn row(&self, name: &[u8]) -> Result<usize> {
+        let name = as_str(name)?;
+        self.row_index
+            .get(name)
+            .copied()
+            .ok_or_else(|| MpsParseError::UnknownRowName(name.to_string()))
+    }
+
+    /// Get the index of the column, and register it if it is a new column.
+    fn intern_column(&mut self, name: &str) -> usize {
+        match self.column_index.get(name) {
+            Some(index) => *index,
+            None => {
+                let index = self.mps.columns.len();
+                self.column_index.insert(name.into(), index);
+                self.mps.columns.push(Column::default());
+                index
+            }
+        }
+    }
+
+    /// [`State::intern_column`] with a cache of the last column,
+    /// since the entries of a column are contiguous in the `COLUMNS` section.
+    fn column(&mut self, name: &[u8]) -> Result<usize> {
+        if let Some((last, index)) = &self.last_column {
+            if last.as_slice() == name {
+                return Ok(*index);
+            }
+        }
+        let index = self.intern_column(as_str(name)?);
+        let (last, last_index) = self.last_column.get_or_insert_with(Default::default);
+        last.clear();
+        last.extend_from_slice(name);
+        *last_index = index;
+        Ok(index)
+    }
+
     // ---------------------------------------------------------------------
     // Field:    1           2          3         4         5         6
     // Columns:  2-3        5-12      15-22     25-36     40-47     50-61
     // ---------------------------------------------------------------------
     //           ROWS
     //            type     name
-    fn read_row_field(&mut self, fields: Vec<&str>) -> Result<()> {
-        assert_eq!(fields.len(), 2);
-        let row_name = RowName(fields[1].to_string());
-        match fields[0] {
-            "N" => {
+    fn read_row_field(&mut self, fields: &[&[u8]]) -> Result<()> {
+        if fields.len() != 2 {
+            return Err(invalid_fields(fields));
+        }
+        let row_name = as_str(fields[1])?;
+        let kind = match fields[0] {
+            b"N" => {
                 if self.mps.objective_name.is_empty() {
-                    self.mps.objective_name = row_name
+                    self.mps.objective_name = row_name.to_string();
+                } else {
+                    self.free_rows.insert(row_name.into());
                 }
                 // skip adding this row to `a` matrix
                 return Ok(());
             }
-            "E" => {
-                self.mps.eq.insert(row_name.clone());
-            }
-            "G" => {
-                self.mps.ge.insert(row_name.clone());
-            }
-            "L" => {
-                self.mps.le.insert(row_name.clone());
-            }
+            b"E" => RowKind::Eq,
+            b"G" => RowKind::Ge,
+            b"L" => RowKind::Le,
             _ => {
-                return Err(MpsParseError::InvalidRowType(fields[0].to_string()));
+                return Err(MpsParseError::InvalidRowType(
+                    String::from_utf8_lossy(fields[0]).to_string(),
+                ));
             }
-        }
-        self.mps.a.insert(row_name, HashMap::new());
+        };
+        self.row_index.insert(row_name.into(), self.mps.rows.len());
+        self.mps.rows.push(Row {
+            name: String::new(),
+            kind,
+            rhs: 0.0,
+            terms: Vec::new(),
+        });
         Ok(())
     }
 
@@ -205,8 +382,10 @@ impl State {
     //           COLUMNS
     //                    column       row       value     row      value
     //                     name        name                name
-    fn read_column_field(&mut self, fields: Vec<&str>) -> Result<()> {
-        assert!(fields.len() == 3 || fields.len() == 5);
+    fn read_column_field(&mut self, fields: &[&[u8]]) -> Result<()> {
+        if fields.len() != 3 && fields.len() != 5 {
+            return Err(invalid_fields(fields));
+        }
 
         // G. A mixed integer program requires the specification of which variables
         //    are required to be integer.  Markers are used to indicate the start
@@ -214,35 +393,39 @@ impl State {
         //    name in field 2, 'MARKER' in field 3, and 'INTORG' in field 5.  The
         //    end marker has its name in field 2, 'MARKER' in field 3, and 'INTEND'
         //    in field 5.  These markers are placed in the COLUMNS section.
-        if fields[1] == "'MARKER'" {
+        if fields[1] == b"'MARKER'" {
             match fields[2] {
-                "'INTORG'" => self.is_integer_variable = true,
-                "'INTEND'" => self.is_integer_variable = false,
-                _ => return Err(MpsParseError::InvalidMarker(fields[2].to_string())),
+                b"'INTORG'" => self.is_integer_variable = true,
+                b"'INTEND'" => self.is_integer_variable = false,
+                _ => {
+                    return Err(MpsParseError::InvalidMarker(
+                        String::from_utf8_lossy(fields[2]).to_string(),
+                    ))
+                }
             }
             return Ok(());
         }
 
-        let col_name = ColumnName(fields[0].to_string());
-        self.mps.vars.insert(col_name.clone());
+        let column = self.column(fields[0])?;
         if self.is_integer_variable {
-            self.mps.integer.insert(col_name.clone());
+            self.mps.columns[column].integer = true;
         } else {
-            self.mps.real.insert(col_name.clone());
+            self.mps.columns[column].real = true;
         }
 
         for chunk in fields[1..].chunks(2) {
-            let row_name = RowName(chunk[0].to_string());
-            let coefficient = chunk[1].parse()?;
-            if row_name == self.mps.objective_name {
-                self.mps.c.insert(col_name.clone(), coefficient);
+            let row_name = as_str(chunk[0])?;
+            let coefficient = parse_f64(chunk[1])?;
+            let terms = if row_name == self.mps.objective_name {
+                &mut self.mps.c
+            } else if let Some(&row) = self.row_index.get(row_name) {
+                &mut self.mps.rows[row].terms
+            } else if self.free_rows.contains(row_name) {
+                continue;
             } else {
-                self.mps
-                    .a
-                    .get_mut(&row_name)
-                    .ok_or(MpsParseError::UnknownRowName(row_name.0.clone()))?
-                    .insert(col_name.clone(), coefficient);
-            }
+                return Err(MpsParseError::UnknownRowName(row_name.to_string()));
+            };
+            insert_term(terms, column as u64, coefficient);
         }
         Ok(())
     }
@@ -254,12 +437,18 @@ impl State {
     //           RHS
     //                     rhs         row       value     row      value
     //                     name        name                name
-    fn read_rhs_field(&mut self, fields: Vec<&str>) -> Result<()> {
-        assert!(fields.len() == 3 || fields.len() == 5);
+    fn read_rhs_field(&mut self, fields: &[&[u8]]) -> Result<()> {
+        if fields.len() != 3 && fields.len() != 5 {
+            return Err(invalid_fields(fields));
+        }
         for chunk in fields[1..].chunks(2) {
-            let row_name = RowName(chunk[0].to_string());
-            let coefficient = chunk[1].parse()?;
-            self.mps.b.insert(row_name, coefficient);
+            let row_name = as_str(chunk[0])?;
+            let rhs = parse_f64(chunk[1])?;
+            if row_name == self.mps.objective_name {
+                self.mps.c_rhs = rhs;
+            } else if let Some(&row) = self.row_index.get(row_name) {
+                self.mps.rows[row].rhs = rhs;
+            }
         }
         Ok(())
     }
@@ -272,53 +461,42 @@ impl State {
     //                     range       row       value     row      value
     //                     name        name                name
     //
-    fn read_range_field(&mut self, fields: Vec<&str>) -> Result<()> {
-        assert!(fields.len() == 3 || fields.len() == 5);
+    fn read_range_field(&mut self, fields: &[&[u8]]) -> Result<()> {
+        if fields.len() != 3 && fields.len() != 5 {
+            return Err(invalid_fields(fields));
+        }
         for chunk in fields[1..].chunks(2) {
-            let row_name = RowName(chunk[0].to_string());
-            let range: f64 = chunk[1].parse()?;
-            assert_ne!(range, 0.0, "RANGES with 0.0 is not supported");
-            let mut new_row_name_candidate = RowName(format!("{}_", row_name.0));
-            let new_row_name = loop {
-                if !self.mps.a.contains_key(&new_row_name_candidate) {
-                    break new_row_name_candidate;
-                }
-                new_row_name_candidate = RowName(format!("{}_", new_row_name_candidate.0));
-            };
-            let constraint = self
-                .mps
-                .a
-                .get_mut(&row_name)
-                .ok_or(MpsParseError::UnknownRowName(row_name.0.clone()))?
-                .clone();
-            self.mps.a.insert(new_row_name.clone(), constraint);
+            let row = self.row(chunk[0])?;
+            let range = parse_f64(chunk[1])?;
             // row type       sign of r       h          u
             // ----------------------------------------------
             //    G            + or -         b        b + |r|
             //    L            + or -       b - |r|      b
             //    E              +            b        b + |r|
             //    E              -          b - |r|      b
-            let new_b = if self.mps.eq.contains(&row_name) {
-                self.mps.eq.remove(&row_name);
-                if range > 0.0 {
-                    self.mps.ge.insert(row_name.clone());
-                    self.mps.le.insert(new_row_name.clone());
-                    self.mps.b.get(&row_name).unwrap_or(&0.0) + range.abs()
-                } else {
-                    self.mps.le.insert(row_name.clone());
-                    self.mps.ge.insert(new_row_name.clone());
-                    self.mps.b.get(&row_name).unwrap_or(&0.0) - range.abs()
-                }
-            } else if self.mps.ge.contains(&row_name) {
-                self.mps.le.insert(new_row_name.clone());
-                self.mps.b.get(&row_name).unwrap_or(&0.0) + range.abs()
-            } else if self.mps.le.contains(&row_name) {
-                self.mps.ge.insert(new_row_name.clone());
-                self.mps.b.get(&row_name).unwrap_or(&0.0) - range.abs()
-            } else {
-                continue;
+            let b = self.mps.rows[row].rhs;
+            let (kind, new_kind, new_b) = match self.mps.rows[row].kind {
+                RowKind::Eq if range > 0.0 => (RowKind::Ge, RowKind::Le, b + range.abs()),
+                RowKind::Eq if range < 0.0 => (RowKind::Le, RowKind::Ge, b - range.abs()),
+                // zero range keeps the equality as is
+                RowKind::Eq => continue,
+                RowKind::Ge => (RowKind::Ge, RowKind::Le, b + range.abs()),
+                RowKind::Le => (RowKind::Le, RowKind::Ge, b - range.abs()),
             };
-            self.mps.b.insert(new_row_name, new_b);
+            let mut new_row_name = format!("{}_", as_str(chunk[0])?);
+            while self.row_index.contains_key(new_row_name.as_str()) {
+                new_row_name.push('_');
+            }
+            self.mps.rows[row].kind = kind;
+            let terms = self.mps.rows[row].terms.clone();
+            self.row_index
+                .insert(new_row_name.into(), self.mps.rows.len());
+            self.mps.rows.push(Row {
+                name: String::new(),
+                kind: new_kind,
+                rhs: new_b,
+                terms,
+            });
         }
         Ok(())
     }
@@ -330,62 +508,56 @@ impl State {
     //           BOUNDS
     //            type     bound       column     value
     //                     name        name
-    fn read_bound_field(&mut self, fields: Vec<&str>) -> Result<()> {
+    fn read_bound_field(&mut self, fields: &[&[u8]]) -> Result<()> {
+        if fields.len() < 3 {
+            return Err(invalid_fields(fields));
+        }
+        let value =
+            || -> Result<f64> { parse_f64(fields.get(3).ok_or_else(|| invalid_fields(fields))?) };
+        // Bounds of columns which do not appear in the `COLUMNS` section are ignored
+        let Some(&column) = self.column_index.get(as_str(fields[2])?) else {
+            return Ok(());
+        };
+        let column = &mut self.mps.columns[column];
         match fields[0] {
             //  type            meaning
             // -----------------------------------
             //   LO    lower bound        b <= x
-            "LO" => {
-                self.mps
-                    .l
-                    .insert(ColumnName(fields[2].to_string()), fields[3].parse()?);
-            }
+            b"LO" => column.lower = Some(value()?),
             //   UP    upper bound        x <= b
-            "UP" => {
-                self.mps
-                    .u
-                    .insert(ColumnName(fields[2].to_string()), fields[3].parse()?);
-            }
+            b"UP" => column.upper = Some(value()?),
             //   FX    fixed variable     x = b
-            "FX" => {
-                let col_name = ColumnName(fields[2].to_string());
-                let val = fields[3].parse()?;
-                self.mps.l.insert(col_name.clone(), val);
-                self.mps.u.insert(col_name, val);
+            b"FX" => {
+                let val = value()?;
+                column.lower = Some(val);
+                column.upper = Some(val);
             }
             //   MI    lower bound -inf   -inf < x
-            "MI" => {
-                self.mps
-                    .l
-                    .insert(ColumnName(fields[2].to_string()), f64::NEG_INFINITY);
-            }
+            b"MI" => column.lower = Some(f64::NEG_INFINITY),
             //   BV    binary variable    x = 0 or 1
-            "BV" => {
-                let column_name = ColumnName(fields[2].to_string());
-                self.mps.integer.remove(&column_name);
-                self.mps.real.remove(&column_name);
-                self.mps.binary.insert(column_name);
+            b"BV" => {
+                column.integer = false;
+                column.real = false;
+                column.binary = true;
             }
             //   FR    free variable
-            "FR" | "PL" => { /* do nothing */ }
+            b"FR" | b"PL" => { /* do nothing */ }
             //   UI    upper (positive) integer
-            "UI" => {
-                let column_name = ColumnName(fields[2].to_string());
-                let bound = fields[3].parse()?;
-                self.mps.integer.insert(column_name.clone());
-                self.mps.real.remove(&column_name);
-                self.mps.u.insert(column_name, bound);
+            b"UI" => {
+                column.upper = Some(value()?);
+                column.integer = true;
+                column.real = false;
             }
             //   LI    lower (negative) integer
-            "LI" => {
-                let column_name = ColumnName(fields[2].to_string());
-                let bound = fields[3].parse()?;
-                self.mps.integer.insert(column_name.clone());
-                self.mps.real.remove(&column_name);
-                self.mps.l.insert(column_name, bound);
+            b"LI" => {
+                column.lower = Some(value()?);
+                column.integer = true;
+                column.real = false;
             }
             _ => {
-                return Err(MpsParseError::InvalidBoundType(fields[0].to_string()));
+                return Err(MpsParseError::InvalidBoundType(
+                    String::from_utf8_lossy(fields[0]).to_string(),
+                ));
             }
         }
         Ok(())
@@ -394,105 +566,46 @@ impl State {
     fn finish(mut self) -> Mps {
         // If an integer variable `x` has a bound `0 <= x <= 1`,
         // regard it as a binary variable.
-        for (name, u) in &self.mps.u {
-            if *u == 1.0 {
-                if let Some(l) = self.mps.l.get(name) {
-                    if *l != 0.0 {
-                        continue;
-                    }
-                }
-                if let Some(name) = self.mps.integer.take(name) {
-                    self.mps.binary.insert(name);
-                }
+        for column in &mut self.mps.columns {
+            if column.integer && column.upper == Some(1.0) && column.lower.unwrap_or(0.0) == 0.0 {
+                column.integer = false;
+                column.binary = true;
             }
         }
+        dedup_terms(&mut self.mps.c);
+        for row in &mut self.mps.rows {
+            dedup_terms(&mut row.terms);
+        }
+        // Move the interned names to the rows and columns
+        for (name, index) in self.row_index {
+            self.mps.rows[index].name = name.into();
+        }
+        for (name, index) in self.column_index {
+            self.mps.columns[index].name = name.into();
+        }
         self.mps
     }
 }
 
 impl Mps {
-    pub fn from_file(path: impl AsRef<Path>) -> Result<Self> {
-        let f = fs::File::open(path)?;
-        Self::from_zipped_reader(f)
-    }
-
-    pub fn from_zipped_reader(reader: impl Read) -> Result<Self> {
-        let buf = flate2::read::GzDecoder::new(reader);
-        let buf = io::BufReader::new(buf);
-        Self::from_lines(buf.lines().map_while(|x| x.ok()))
-    }
-
-    pub fn from_raw_reader(reader: impl Read) -> Result<Self> {
-        let buf = io::BufReader::new(reader);
-        Self::from_lines(buf.lines().map_while(|x| x.ok()))
-    }
-
-    fn from_lines(lines: impl Iterator<Item = String>) -> Result<Self> {
+    /// Parse MPS format from a buffered reader.
+    ///
+    /// The input is scanned line by line with a single reused buffer,
+    /// and only the interned names and coefficients are kept in memory.
+    pub fn from_buf_reader(mut reader: impl BufRead) -> Result<Self> {
         let mut state = State::default();
-        for line in lines {
-            if line.trim().is_empty() {
-                continue;
+        let mut line = Vec::new();
+        loop {
+            line.clear();
+            if reader.read_until(b'\n', &mut line)? == 0 {
+                break;
             }
-
-            // `*` is used as a comment in some files
-            if line.starts_with('*') {
-                continue;
-            }
-
-            // HEADER case
-            if !line.starts_with(' ') {
-                state.read_header(line)?;
-                continue;
-            }
-
-            // FIELD case
-            //
-            // The original fixed format is designed as following:
-            // ---------------------------------------------------------------------
-            // Field:    1           2          3         4         5         6
-            // Columns:  2-3        5-12      15-22     25-36     40-47     50-61
-            // ---------------------------------------------------------------------
-            //
-            // But some data including the benchmark dataset in MIPLIB does not follow it.
-            // Instead, we parse it as space-separated format.
-            let fields = line.split_whitespace().collect::<Vec<_>>();
-
-            if state.is_waiting_objsense_line {
-                state.mps.obj_sense = fields[0].parse()?;
-                state.is_waiting_objsense_line = false;
-                continue;
-            }
-
-            match state.cursor {
-                Cursor::Rows => state.read_row_field(fields)?,
-                Cursor::Columns => state.read_column_field(fields)?,
-                Cursor::Rhs => state.read_rhs_field(fields)?,
-                Cursor::Ranges => state.read_range_field(fields)?,
-                Cursor::Bounds => state.read_bound_field(fields)?,
-                Cursor::Name => return Err(MpsParseError::InvalidHeader(line)),
-                Cursor::End => break,
+            if !state.read_line(&line)? {
+                break;
             }
         }
         Ok(state.finish())
     }
-
-    // /// Get statistics of the problem
-    // pub fn get_stat(&self) -> Stat {
-    //     let nb = self.binary.len();
-    //     let ni = self.integer.len();
-    //     let nr = self.real.len();
-    //     let me = self.eq.len();
-    //     let mg = self.ge.len();
-    //     let ml = self.le.len();
-    //     Stat {
-    //         variable: nb + ni + nr,
-    //         constraint: me + mg + ml,
-    //         binary: nb,
-    //         integer: ni,
-    //         continuous: nr,
-    //         non_zero: self.non_zero(),
-    //     }
-    // }
 }
 
 /// Statistics of the problem
@@ -512,112 +625,180 @@ pub struct Stat {
 mod tests {
     use super::*;
 
+    fn row<'a>(mps: &'a Mps, name: &str) -> &'a Row {
+        mps.rows.iter().find(|r| r.name == name).unwrap()
+    }
+
+    fn range(kind: &[u8], rhs: &[u8], range: &[u8]) -> Mps {
+        let mut state = State::default();
+        state.read_row_field(&[kind, b"r1"]).unwrap();
+        state.read_column_field(&[b"c1", b"r1", b"1.0"]).unwrap(); // a[c1, r1] = 1
+        state.read_rhs_field(&[b"rhs", b"r1", rhs]).unwrap();
+        state.read_range_field(&[b"range", b"r1", range]).unwrap();
+        dbg!(state.finish())
+    }
+
     #[test]
     fn range_eq_p() {
         // x = 1, range = 1.0 -> 1 <= x <= 2
-        let mut state = State::default();
-        state.read_row_field(vec!["E", "r1"]).unwrap(); // r1 is equality
-        state.read_column_field(vec!["c1", "r1", "1.0"]).unwrap(); // a[c1, r1] = 1
-        state.read_rhs_field(vec!["rhs", "r1", "1.0"]).unwrap(); // b[r1] = 1
-        state.read_range_field(vec!["range", "r1", "1.0"]).unwrap();
-        dbg!(&state);
-
-        let r1: RowName = "r1".into();
-        let new: RowName = "r1_".into();
-        assert!(state.mps.eq.is_empty());
+        let mps = range(b"E", b"1.0", b"1.0");
+        assert_eq!(mps.rows.len(), 2);
         // x >= 1, this row is original one
-        assert_eq!(state.mps.ge, [r1.clone()].into());
-        assert_eq!(state.mps.b.get(&r1), Some(&1.0));
+        assert_eq!(row(&mps, "r1").kind, RowKind::Ge);
+        assert_eq!(row(&mps, "r1").rhs, 1.0);
         // x <= 2, this row is new one
-        assert_eq!(state.mps.le, [new.clone()].into());
-        assert_eq!(state.mps.b.get(&new), Some(&2.0));
+        assert_eq!(row(&mps, "r1_").kind, RowKind::Le);
+        assert_eq!(row(&mps, "r1_").rhs, 2.0);
+        assert_eq!(row(&mps, "r1_").terms, row(&mps, "r1").terms);
     }
 
     #[test]
     fn range_eq_n() {
         // x = 2, range = -1 -> 1 <= x <= 2
-        let mut state = State::default();
-        state.read_row_field(vec!["E", "r1"]).unwrap(); // r1 is equality
-        state.read_column_field(vec!["c1", "r1", "1.0"]).unwrap(); // a[c1, r1] = 1
-        state.read_rhs_field(vec!["rhs", "r1", "2.0"]).unwrap(); // b[r1] = 2
-        state.read_range_field(vec!["range", "r1", "-1.0"]).unwrap();
-        dbg!(&state);
-
-        let r1: RowName = "r1".into();
-        let new: RowName = "r1_".into();
-        assert!(state.mps.eq.is_empty());
+        let mps = range(b"E", b"2.0", b"-1.0");
         // x >= 1, this row is new one
-        assert_eq!(state.mps.ge, [new.clone()].into());
-        assert_eq!(state.mps.b.get(&new), Some(&1.0));
+        assert_eq!(row(&mps, "r1_").kind, RowKind::Ge);
+        assert_eq!(row(&mps, "r1_").rhs, 1.0);
         // x <= 2, this row is original one
-        assert_eq!(state.mps.le, [r1.clone()].into());
-        assert_eq!(state.mps.b.get(&r1), Some(&2.0));
+        assert_eq!(row(&mps, "r1").kind, RowKind::Le);
+        assert_eq!(row(&mps, "r1").rhs, 2.0);
     }
 
     #[test]
     fn range_ge() {
         // x >= 1, range = 1 -> 1 <= x <= 2
-        let mut state = State::default();
-        state.read_row_field(vec!["G", "r1"]).unwrap(); // r1 is greater-than inequality
-        state.read_column_field(vec!["c1", "r1", "1.0"]).unwrap(); // a[c1, r1] = 1
-        state.read_rhs_field(vec!["rhs", "r1", "1.0"]).unwrap(); // b[r1] = 1
-        state.read_range_field(vec!["range", "r1", "1.0"]).unwrap();
-        dbg!(&state);
-
-        let r1: RowName = "r1".into();
-        let new: RowName = "r1_".into();
-        assert!(state.mps.eq.is_empty());
+        let mps = range(b"G", b"1.0", b"1.0");
         // x >= 1, this row is original one
-        assert_eq!(state.mps.ge, [r1.clone()].into());
-        assert_eq!(state.mps.b.get(&r1), Some(&1.0));
+        assert_eq!(row(&mps, "r1").kind, RowKind::Ge);
+        assert_eq!(row(&mps, "r1").rhs, 1.0);
         // x <= 2, this row is new one
-        assert_eq!(state.mps.le, [new.clone()].into());
-        assert_eq!(state.mps.b.get(&new), Some(&2.0));
+        assert_eq!(row(&mps, "r1_").kind, RowKind::Le);
+        assert_eq!(row(&mps, "r1_").rhs, 2.0);
     }
 
     #[test]
     fn range_le() {
         // x <= 2, range = 1 -> 1 <= x <= 2
-        let mut state = State::default();
-        state.read_row_field(vec!["L", "r1"]).unwrap(); // r1 is greater-than inequality
-        state.read_column_field(vec!["c1", "r1", "1.0"]).unwrap(); // a[c1, r1] = 1
-        state.read_rhs_field(vec!["rhs", "r1", "2.0"]).unwrap(); // b[r1] = 2
-        state.read_range_field(vec!["range", "r1", "1.0"]).unwrap();
-        dbg!(&state);
-
-        let r1: RowName = "r1".into();
-        let new: RowName = "r1_".into();
-        assert!(state.mps.eq.is_empty());
+        let mps = range(b"L", b"2.0", b"1.0");
         // x >= 1, this row is new one
-        assert_eq!(state.mps.ge, [new.clone()].into());
-        assert_eq!(state.mps.b.get(&new), Some(&1.0));
+        assert_eq!(row(&mps, "r1_").kind, RowKind::Ge);
+        assert_eq!(row(&mps, "r1_").rhs, 1.0);
         // x <= 2, this row is original one
-        assert_eq!(state.mps.le, [r1.clone()].into());
-        assert_eq!(state.mps.b.get(&r1), Some(&2.0));
+        assert_eq!(row(&mps, "r1").kind, RowKind::Le);
+        assert_eq!(row(&mps, "r1").rhs, 2.0);
     }
 
     #[test]
     fn as_binary() {
         // 0 <= x <= 1
         let mut state = State::default();
-        let col: ColumnName = "x".into();
-        state.mps.integer.insert(col.clone());
-        state.mps.u.insert(col.clone(), 1.0);
-
+        state.read_row_field(&[b"L", b"r1"]).unwrap();
+        state.is_integer_variable = true;
+        state.read_column_field(&[b"x", b"r1", b"1.0"]).unwrap();
+        state
+            .read_bound_field(&[b"UP", b"BND", b"x", b"1"])
+            .unwrap();
         let mps = state.finish();
-        assert!(mps.integer.is_empty());
-        assert_eq!(mps.binary, [col].into());
+        assert!(!mps.columns[0].integer);
+        assert!(mps.columns[0].binary);
 
         // -1 <= x <= 1
         let mut state = State::default();
-        let col: ColumnName = "x".into();
-        state.mps.integer.insert(col.clone());
-        state.mps.u.insert(col.clone(), 1.0);
-        state.mps.l.insert(col.clone(), -1.0);
-
+        state.read_row_field(&[b"L", b"r1"]).unwrap();
+        state.is_integer_variable = true;
+        state.read_column_field(&[b"x", b"r1", b"1.0"]).unwrap();
+        state
+            .read_bound_field(&[b"UP", b"BND", b"x", b"1"])
+            .unwrap();
+        state
+            .read_bound_field(&[b"LO", b"BND", b"x", b"-1"])
+            .unwrap();
         let mps = state.finish();
-        assert_eq!(mps.integer, [col].into());
-        assert!(mps.binary.is_empty());
+        assert!(mps.columns[0].integer);
+        assert!(!mps.columns[0].binary);
+    }
+
+    #[test]
+    fn interned_columns() {
+        let input = indoc::indoc! {r#"
+            NAME TESTPROB
+            ROWS
+             N  COST
+             L  LIM1
+             N  FREE
+             E  MYEQN
+            COLUMNS
+                XONE      COST         1   LIM1         1
+                XONE      FREE         3
+                YTWO      COST         4   LIM1         1
+                YTWO      MYEQN       -1
+                YTWO      MYEQN       -2
+            RHS
+                RHS1      COST        10   MYEQN        7
+            ENDATA
+        "#};
+        let mps = Mps::from_buf_reader(input.as_bytes()).unwrap();
+        assert_eq!(mps.name, "TESTPROB");
+        assert_eq!(mps.objective_name, "COST");
+        assert_eq!(mps.c_rhs, 10.0);
+        let names: Vec<_> = mps.columns.iter().map(|c| c.name.as_str()).collect();
+        assert_eq!(names, ["XONE", "YTWO"]);
+        assert_eq!(
+            row(&mps, "LIM1").terms,
+            vec![
+                Term {
+                    id: 0,
+                    coefficient: 1.0
+                },
+                Term {
+                    id: 1,
+                    coefficient: 1.0
+                }
+            ]
+        );
+        // duplicated entry overwrites the previous one
+        assert_eq!(
+            row(&mps, "MYEQN").terms,
+            vec![Term {
+                id: 1,
+                coefficient: -2.0
+            }]
+        );
+        assert_eq!(row(&mps, "MYEQN").rhs, 7.0);
+    }
+
+    #[test]
+    fn non_contiguous_column() {
+        let input = indoc::indoc! {r#"
+            NAME TESTPROB
+            ROWS
+             N  COST
+             L  LIM1
+            COLUMNS
+                XONE      COST         1   LIM1         1
+                YTWO      COST         2   LIM1         2
+                XONE      COST         3   LIM1         3
+            RHS
+                RHS1      LIM1         4
+            ENDATA
+        "#};
+        let mps = Mps::from_buf_reader(input.as_bytes()).unwrap();
+        let names: Vec<_> = mps.columns.iter().map(|c| c.name.as_str()).collect();
+        assert_eq!(names, ["XONE", "YTWO"]);
+        // The later entry of XONE overwrites the former one
+        let expected = vec![
+            Term {
+                id: 0,
+                coefficient: 3.0,
+            },
+            Term {
+                id: 1,
+                coefficient: 2.0,
+            },
+        ];
+        assert_eq!(mps.c, expected);
+        assert_eq!(row(&mps, "LIM1").terms, expected);
+        assert_eq!(Mps::from_slice(input.as_bytes()).unwrap(), mps);
     }
 
     #[test]
@@ -627,7 +808,7 @@ mod tests {
             OBJSENSE MAX
             ENDATA
         "#};
-        let mps = Mps::from_lines(input.lines().map(|x| x.to_string())).unwrap();
+        let mps = Mps::from_buf_reader(input.as_bytes()).unwrap();
         assert_eq!(mps.obj_sense, ObjSense::Max);
 
         // maybe separated line
@@ -637,7 +818,7 @@ mod tests {
              MAX
             ENDATA
         "#};
-        let mps = Mps::from_lines(input.lines().map(|x| x.to_string())).unwrap();
+        let mps = Mps::from_buf_reader(input.as_bytes()).unwrap();
         assert_eq!(mps.obj_sense, ObjSense::Max);
 
         // MIN and MAX are only allowed
@@ -647,7 +828,7 @@ mod tests {
              MINMAX
             ENDATA
         "#};
-        assert!(Mps::from_lines(input.lines().map(|x| x.to_string())).is_err());
+        assert!(Mps::from_buf_reader(input.as_bytes()).is_err());
 
         // MAX must be field, not be header
         let input = indoc::indoc! {r#"
@@ -656,6 +837,6 @@ mod tests {
             MAX
             ENDATA
         "#};
-        assert!(Mps::from_lines(input.lines().map(|x| x.to_string())).is_err());
+        assert!(Mps::from_buf_reader(input.as_bytes()).is_err());
     }
 }
@@ -0,0 +1,307 @@
+//! Parse MPS format from an in-memory buffer with parallel processing of the `COLUMNS` section
+//!
+//! The `COLUMNS` section holds almost all of the data in practical MPS files.
+//! It is split into chunks at line boundaries, and each chunk is parsed on a thread of the rayon pool
+//! into COO entries with locally interned column names borrowing the input buffer.
+//! The chunks are then merged in order into the per-row terms, which gives the same result as the sequential parser.
+//! The other sections are small and parsed sequentially by [`State`].
+
+use super::{
+    as_str, insert_term, invalid_fields, parse_f64, split_fields, Cursor, Mps, MpsParseError,
+    Result, State, MAX_FIELDS,
+};
+use rayon::prelude::*;
+use std::collections::HashMap;
+
+/// Minimum size of chunks of the `COLUMNS` section parsed in parallel
+const MIN_CHUNK_SIZE: usize = 1 << 20;
+
+/// Row index of entries for the objective function
+const OBJECTIVE_ROW: u32 = u32::MAX;
+
+/// A column appearing in a chunk
+#[derive(Debug)]
+struct ChunkColumn<'a> {
+    name: &'a [u8],
+    /// Appears in an `INTORG` block in this chunk
+    integer: bool,
+    /// Appears out of `INTORG` block in this chunk
+    real: bool,
+    /// Appears before any marker in this chunk, i.e. the kind depends on the previous chunks
+    inherited: bool,
+}
+
+/// Entries of the `COLUMNS` section in a chunk
+#[derive(Debug, Default)]
+struct Chunk<'a> {
+    columns: Vec<ChunkColumn<'a>>,
+    /// `(row, column, coefficient)` where `column` is the index in `columns`
+    entries: Vec<(u32, u32, f64)>,
+    /// Whether the chunk ends in an `INTORG` block, if any marker appears in this chunk
+    last_marker: Option<bool>,
+}
+
+/// Split the buffer into a line and the rest
+fn next_line(bytes: &[u8]) -> (&[u8], &[u8]) {
+    match bytes.iter().position(|b| *b == b'\n') {
+        Some(pos) => bytes.split_at(pos + 1),
+        None => (bytes, &[]),
+    }
+}
+
+/// The offset of the next header line, i.e. the end of the current section
+fn section_end(bytes: &[u8]) -> usize {
+    let mut offset = 0;
+    for line in bytes.split_inclusive(|b| *b == b'\n') {
+        if let Some(first) = line.first() {
+            if !matches!(first, b' ' | b'\t' | b'*' | b'\r' | b'\n') {
+                return offset;
+            }
+        }
+        offset += line.len();
+    }
+    offset
+}
+
+/// Split the buffer into chunks of at least `chunk_size` bytes at line boundaries
+fn split_chunks(bytes: &[u8], chunk_size: usize) -> Vec<&[u8]> {
+    let mut chunks = Vec::new();
+    let mut rest = bytes;
+    while rest.len() > chunk_size {
+        let end = rest[chunk_size..]
+            .iter()
+            .position(|b| *b == b'\n')
+            .map_or(rest.len(), |pos| chunk_size + pos + 1);
+        let (chunk, tail) = rest.split_at(end);
+        chunks.push(chunk);
+        rest = tail;
+    }
+    if !rest.is_empty() {
+        chunks.push(rest);
+    }
+    chunks
+}
+
+impl State {
+    fn read_column_chunk<'a>(&self, bytes: &'a [u8]) -> Result<Chunk<'a>> {
+        let mut chunk = Chunk::default();
+        let mut column_index: HashMap<&[u8], u32> = HashMap::new();
+        let mut last_column: Option<(&[u8], u32)> = None;
+        let mut buffer: [&[u8]; MAX_FIELDS] = [&[]; MAX_FIELDS];
+        for line in bytes.split(|b| *b == b'\n') {
+            if line.starts_with(b"*") {
+                continue;
+            }
+            let num_fields = split_fields(line, &mut buffer)?;
+            let fields = &buffer[..num_fields];
+            match num_fields {
+                0 => continue,
+                3 | 5 => {}
+                _ => return Err(invalid_fields(fields)),
+            }
+
+            if fields[1] == b"'MARKER'" {
+                match fields[2] {
+                    b"'INTORG'" => chunk.last_marker = Some(true),
+                    b"'INTEND'" => chunk.last_marker = Some(false),
+                    _ => {
+                        return Err(MpsParseError::InvalidMarker(
+                            String::from_utf8_lossy(fields[2]).to_string(),
+                        ))
+                    }
+                }
+                continue;
+            }
+
+            let column = match last_column {
+                Some((name, index)) if name == fields[0] => index,
+                _ => {
+                    let index = *column_index.entry(fields[0]).or_insert_with(|| {
+                        chunk.columns.push(ChunkColumn {
+                            name: fields[0],
+                            integer: false,
+                            real: false,
+                            inherited: false,
+                        });
+                        (chunk.columns.len() - 1) as u32
+                    });
+                    last_column = Some((fields[0], index));
+                    index
+                }
+            };
+            let info = &mut chunk.columns[column as usize];
+            match chunk.last_marker {
+                Some(true) => info.integer = true,
+                Some(false) => info.real = true,
+                None => info.inherited = true,
+            }
+
+            for pair in fields[1..].chunks(2) {
+                let row_name = as_str(pair[0])?;
+                let coefficient = parse_f64(pair[1])?;
+                let row = if row_name == self.mps.objective_name {
+                    OBJECTIVE_ROW
+                } else if let Some(&row) = self.row_index.get(row_name) {
+                    row as u32
+                } else if self.free_rows.contains(row_name) {
+                    continue;
+                } else {
+                    return Err(MpsParseError::UnknownRowName(row_name.to_string()));
+                };
+                chunk.entries.push((row, column, coefficient));
+            }
+        }
+        Ok(chunk)
+    }
+
+    /// Merge the chunks in order of appearance
+    fn merge_column_chunks(&mut self, chunks: Vec<Chunk>) -> Result<()> {
+        let mut counts = vec![0; self.mps.rows.len()];
+        for (row, _, _) in chunks.iter().flat_map(|chunk| chunk.entries.iter()) {
+            if *row != OBJECTIVE_ROW {
+                counts[*row as usize] += 1;
+            }
+        }
+        for (row, count) in self.mps.rows.iter_mut().zip(counts) {
+            row.terms.reserve_exact(count);
+        }
+
+        let mut is_integer_variable = self.is_integer_variable;
+        for chunk in chunks {
+            let mut ids = Vec::with_capacity(chunk.columns.len());
+            for column in &chunk.columns {
+                let index = self.intern_column(as_str(column.name)?);
+                let info = &mut self.mps.columns[index];
+                info.integer |= column.integer || (column.inherited && is_integer_variable);
+                info.real |= column.real || (column.inherited && !is_integer_variable);
+                ids.push(index as u64);
+            }
+            if let Some(marker) = chunk.last_marker {
+                is_integer_variable = marker;
+            }
+            for (row, column, coefficient) in chunk.entries {
+                let terms = if row == OBJECTIVE_ROW {
+                    &mut self.mps.c
+                } else {
+                    &mut self.mps.rows[row as usize].terms
+                };
+                insert_term(terms, ids[column as usize], coefficient);
+            }
+        }
+        self.is_integer_variable = is_integer_variable;
+        Ok(())
+    }
+
+    fn read_columns_parallel(&mut self, bytes: &[u8], chunk_size: usize) -> Result<()> {
+        if self.mps.rows.len() >= OBJECTIVE_ROW as usize {
+            // Row indices do not fit in the COO entries
+            for line in bytes.split_inclusive(|b| *b == b'\n') {
+                self.read_line(line)?;
+            }
+            return Ok(());
+        }
+        let state = &*self;
+        let chunks = split_chunks(bytes, chunk_size)
+            .into_par_iter()
+            .map(|chunk| state.read_column_chunk(chunk))
+            .collect::<Result<Vec<_>>>()?;
+        self.merge_column_chunks(chunks)
+    }
+}
+
+impl Mps {
+    /// Parse MPS format from an in-memory buffer, e.g. a memory-mapped file.
+    ///
+    /// The `COLUMNS` section is parsed in parallel on the rayon thread pool.
+    pub fn from_slice(bytes: &[u8]) -> Result<Self> {
+        let chunk_size = (bytes.len() / (4 * rayon::current_num_threads())).max(MIN_CHUNK_SIZE);
+        Self::from_slice_with_chunk_size(bytes, chunk_size)
+    }
+
+    fn from_slice_with_chunk_size(bytes: &[u8], chunk_size: usize) -> Result<Self> {
+        let mut state = State::default();
+        let mut rest = bytes;
+        while !rest.is_empty() {
+            let (line, tail) = next_line(rest);
+            rest = tail;
+            let in_columns = matches!(state.cursor, Cursor::Columns);
+            if !state.read_line(line)? {
+                break;
+            }
+            if !in_columns && matches!(state.cursor, Cursor::Columns) {
+                let (section, tail) = rest.split_at(section_end(rest));
+                state.read_columns_parallel(section, chunk_size)?;
+                rest = tail;
+            }
+        }
+        Ok(state.finish())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{
+        mps::write_mps,
+        random::{FunctionParameters, InstanceParameters},
+        v1::{decision_variable::Kind, Instance},
+    };
+    use proptest::prelude::*;
+
+    fn parameters() -> InstanceParameters {
+        let function = FunctionParameters {
+            num_terms: 10,
+            max_degree: 1,
+            max_id: 20,
+        };
+        InstanceParameters {
+            num_constraints: 10,
+            objective: function.clone(),
+            constraint: function,
+            kinds: vec![Kind::Continuous, Kind::Integer, Kind::Binary],
+        }
+    }
+
+    proptest! {
+        #[test]
+        fn parallel_eq_sequential(instance in Instance::arbitrary_with(parameters()), chunk_size in 1..256_usize) {
+            let mut buffer = Vec::new();
+            write_mps(&instance, &mut buffer).unwrap();
+            let sequential = Mps::from_buf_reader(buffer.as_slice()).unwrap();
+            let parallel = Mps::from_slice_with_chunk_size(&buffer, chunk_size).unwrap();
+            prop_assert_eq!(sequential, parallel);
+        }
+    }
+
+    #[test]
+    fn markers_across_chunks() {
+        let input = indoc::indoc! {r#"
+            NAME TEST
+            ROWS
+             N  OBJ
+             L  R1
+            COLUMNS
+                M1        'MARKER'                 'INTORG'
+                X         OBJ          1   R1           1
+                Y         OBJ          1   R1           1
+                M2        'MARKER'                 'INTEND'
+                Z         OBJ          1   R1           1
+                X         R1           2
+            ENDATA
+        "#};
+        for chunk_size in 1..input.len() {
+            let mps = Mps::from_slice_with_chunk_size(input.as_bytes(), chunk_size).unwrap();
+            assert_eq!(mps, Mps::from_buf_reader(input.as_bytes()).unwrap());
+        }
+        let mps = Mps::from_slice(input.as_bytes()).unwrap();
+        let kinds: Vec<_> = mps
+            .columns
+            .iter()
+            .map(|c| (c.name.as_str(), c.integer, c.real))
+            .collect();
+        assert_eq!(
+            kinds,
+            [("X", true, true), ("Y", true, false), ("Z", false, true)]
+        );
+    }
+}
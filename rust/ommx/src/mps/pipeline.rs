@@ -0,0 +1,216 @@
+use std::{
+    io::{self, BufRead, Read, Write},
+    sync::mpsc::{sync_channel, Receiver, SyncSender},
+};
+
+/// Size of the decompressed blocks sent from the decompressing thread
+const BLOCK_SIZE: usize = 1 << 20;
+
+/// Number of blocks buffered between the decompressing thread and the parser
+const PIPELINE_DEPTH: usize = 4;
+
+/// Decompress the gzipped `reader` on a background thread,
+/// and process the decompressed stream by `f` on the current thread concurrently.
+///
+/// At most [`PIPELINE_DEPTH`] blocks of [`BLOCK_SIZE`] bytes are buffered,
+/// so the memory usage does not depend on the size of the input.
+pub fn with_gz_decoder<R: Read + Send, T>(reader: R, f: impl FnOnce(BlockReader) -> T) -> T {
+    std::thread::scope(|s| {
+        let (sender, receiver) = sync_channel(PIPELINE_DEPTH);
+        s.spawn(move || {
+            let mut decoder = flate2::read::GzDecoder::new(reader);
+            loop {
+                let mut block = Vec::with_capacity(BLOCK_SIZE);
+                let result = (&mut decoder)
+                    .take(BLOCK_SIZE as u64)
+                    .read_to_end(&mut block);
+                // Empty block or an error is the last message
+                let last = !matches!(result, Ok(n) if n > 0);
+                // The receiver is dropped if the parser stops before the end of input
+                if sender.send(result.map(|_| block)).is_err() || last {
+                    break;
+                }
+            }
+        });
+        f(BlockReader {
+            receiver,
+            block: Vec::new(),
+            position: 0,
+            done: false,
+        })
+    })
+}
+
+/// [`BufRead`] over the blocks received from the decompressing thread
+pub struct BlockReader {
+    receiver: Receiver<io::Result<Vec<u8>>>,
+    block: Vec<u8>,
+    position: usize,
+    done: bool,
+}
+
+impl BufRead for BlockReader {
+    fn fill_buf(&mut self) -> io::Result<&[u8]> {
+        while self.position == self.block.len() && !self.done {
+            match self.receiver.recv() {
+                Ok(Ok(block)) => {
+                    self.done = block.is_empty();
+                    self.block = block;
+                    self.position = 0;
+                }
+                Ok(Err(err)) => {
+                    self.done = true;
+                    return Err(err);
+                }
+                // The decompressing thread has panicked
+                Err(_) => self.done = true,
+            }
+        }
+        Ok(&self.block[self.position..])
+    }
+
+    fn consume(&mut self, amt: usize) {
+        self.position = (self.position + amt).min(self.block.len());
+    }
+}
+
+impl Read for BlockReader {
+    fn read(&mut self, buf: &mut [u8]) -> io::Result<usize> {
+        let available = self.fill_buf()?;
+        let n = available.len().min(buf.len());
+        buf[..n].copy_from_slice(&available[..n]);
+        self.consume(n);
+        Ok(n)
+    }
+}
+
+/// Compress the output of `f` with gzip on a background thread, and write it into `writer`.
+///
+/// `f` runs on the current thread, and the blocks written by `f` are compressed concurrently.
+pub fn with_gz_encoder<W: Write + Send, T, E: From<io::Error>>(
+    writer: W,
+    level: flate2::Compression,
+    f: impl FnOnce(&mut BlockWriter) -> Result<T, E>,
+) -> Result<T, E> {
+    std::thread::scope(|s| {
+        let (sender, receiver) = sync_channel::<Vec<u8>>(PIPELINE_DEPTH);
+        let encoder = s.spawn(move || -> io::Result<()> {
+            let mut encoder = flate2::write::GzEncoder::new(writer, level);
+            for block in receiver {
+                encoder.write_all(&block)?;
+            }
+            encoder.finish()?.flush()
+        });
+        let mut writer = BlockWriter {
+            sender: Some(sender),
+            block: Vec::with_capacity(BLOCK_SIZE),
+        };
+        let result = f(&mut writer).and_then(|value| {
+            writer.close()?;
+            Ok(value)
+        });
+        drop(writer);
+        match encoder.join() {
+            // The error in the encoder thread is the cause of the error in `f`, if any
+            Ok(Err(err)) => Err(err.into()),
+            Ok(Ok(())) => result,
+            Err(panic) => std::panic::resume_unwind(panic),
+        }
+    })
+}
+
+/// [`Write`] sending the blocks to the compressing thread
+pub struct BlockWriter {
+    sender: Option<SyncSender<Vec<u8>>>,
+    block: Vec<u8>,
+}
+
+impl BlockWriter {
+    fn send(&mut self) -> io::Result<()> {
+        if self.block.is_empty() {
+            return Ok(());
+        }
+        let block = std::mem::replace(&mut self.block, Vec::with_capacity(BLOCK_SIZE));
+        self.sender
+            .as_ref()
+            .and_then(|sender| sender.send(block).ok())
+            .ok_or_else(|| io::Error::from(io::ErrorKind::BrokenPipe))
+    }
+
+    /// Send the remaining data and close the channel
+    fn close(&mut self) -> io::Result<()> {
+        self.send()?;
+        self.sender = None;
+        Ok(())
+    }
+}
+
+impl Write for BlockWriter {
+    fn write(&mut self, buf: &[u8]) -> io::Result<usize> {
+        self.block.extend_from_slice(buf);
+        if self.block.len() >= BLOCK_SIZE {
+            self.send()?;
+        }
+        Ok(buf.len())
+    }
+
+    fn flush(&mut self) -> io::Result<()> {
+        self.send()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn roundtrip() {
+        let input: Vec<u8> = (0..3 * BLOCK_SIZE + 17).map(|i| (i % 251) as u8).collect();
+        let mut encoder = flate2::write::GzEncoder::new(Vec::new(), flate2::Compression::fast());
+        encoder.write_all(&input).unwrap();
+        let compressed = encoder.finish().unwrap();
+
+        let output = with_gz_decoder(compressed.as_slice(), |mut reader| {
+            let mut output = Vec::new();
+            reader.read_to_end(&mut output).unwrap();
+            output
+        });
+        assert_eq!(input, output);
+
+        // Stop reading before the end of input
+        let head = with_gz_decoder(compressed.as_slice(), |mut reader| {
+            let mut head = vec![0; 10];
+            reader.read_exact(&mut head).unwrap();
+            head
+        });
+        assert_eq!(&input[..10], head.as_slice());
+    }
+
+    #[test]
+    fn encoder_roundtrip() {
+        let input: Vec<u8> = (0..3 * BLOCK_SIZE + 17).map(|i| (i % 251) as u8).collect();
+        let mut compressed = Vec::new();
+        with_gz_encoder(&mut compressed, flate2::Compression::fast(), |writer| {
+            // write in small pieces to cross the block boundaries
+            for chunk in input.chunks(1000) {
+                writer.write_all(chunk)?;
+            }
+            io::Result::Ok(())
+        })
+        .unwrap();
+
+        let mut output = Vec::new();
+        flate2::read::GzDecoder::new(compressed.as_slice())
+            .read_to_end(&mut output)
+            .unwrap();
+        assert_eq!(input, output);
+    }
+
+    #[test]
+    fn invalid_input() {
+        let result = with_gz_decoder(&b"not gzipped"[..], |mut reader| {
+            reader.read_to_end(&mut Vec::new())
+        });
+        assert!(result.is_err());
+    }
+}
@@ -1,4 +1,8 @@
-use crate::{mps::*, random::InstanceParameters, v1::Instance};
+use crate::{
+    mps::*,
+    random::InstanceParameters,
+    v1::{decision_variable::Kind, Equality, Instance, Linear},
+};
 use approx::AbsDiffEq;
 use proptest::prelude::*;
 
@@ -18,3 +22,128 @@ proptest! {
         prop_assert!(instance.abs_diff_eq(&dbg!(loaded_instance), 1e-6))
     }
 }
+
+#[test]
+fn test_load_general_names() {
+    let input = indoc::indoc! {r#"
+        NAME          TESTPROB
+        ROWS
+         N  COST
+         L  LIM1
+         G  LIM2
+         E  MYEQN
+        COLUMNS
+            MARKER                 'MARKER'                 'INTORG'
+            XONE      COST         1   LIM1         1
+            XONE      LIM2         1
+            MARKER                 'MARKER'                 'INTEND'
+            YTWO      COST         4   LIM1         1
+            YTWO      MYEQN       -1
+            ZTHREE    COST         9   LIM2         1
+            ZTHREE    MYEQN        1
+        RHS
+            RHS1      COST        -3
+            RHS1      LIM1         5   LIM2        10
+            RHS1      MYEQN        7
+        BOUNDS
+         UP BND1      XONE         4
+         LO BND1      YTWO        -1
+         UP BND1      YTWO         1
+        ENDATA
+    "#};
+    let instance = load_raw_reader(input.as_bytes()).unwrap();
+    assert_eq!(instance.description.unwrap().name.unwrap(), "TESTPROB");
+
+    // IDs are assigned in the order of appearance in the COLUMNS section
+    let names: Vec<_> = instance
+        .decision_variables
+        .iter()
+        .map(|dv| (dv.id, dv.name.clone().unwrap()))
+        .collect();
+    assert_eq!(
+        names,
+        [
+            (0, "XONE".to_string()),
+            (1, "YTWO".to_string()),
+            (2, "ZTHREE".to_string())
+        ]
+    );
+    let kinds: Vec<_> = instance
+        .decision_variables
+        .iter()
+        .map(|dv| dv.kind)
+        .collect();
+    assert_eq!(
+        kinds,
+        [
+            Kind::Integer as i32,
+            Kind::Continuous as i32,
+            Kind::Continuous as i32
+        ]
+    );
+    let bounds: Vec<_> = instance
+        .decision_variables
+        .iter()
+        .map(|dv| {
+            let bound = dv.bound.as_ref().unwrap();
+            (bound.lower, bound.upper)
+        })
+        .collect();
+    assert_eq!(bounds, [(0.0, 4.0), (-1.0, 1.0), (0.0, f64::INFINITY)]);
+
+    // objective = x + 4y + 9z + 3
+    let objective = Linear::new([(0, 1.0), (1, 4.0), (2, 9.0)].into_iter(), 3.0);
+    assert!(instance.objective().abs_diff_eq(&objective.into(), 1e-9));
+
+    let constraints: Vec<_> = instance
+        .constraints
+        .iter()
+        .map(|c| (c.id, c.name.clone().unwrap(), c.equality))
+        .collect();
+    assert_eq!(
+        constraints,
+        [
+            (
+                0,
+                "LIM1".to_string(),
+                Equality::LessThanOrEqualToZero as i32
+            ),
+            (
+                1,
+                "LIM2".to_string(),
+                Equality::LessThanOrEqualToZero as i32
+            ),
+            (2, "MYEQN".to_string(), Equality::EqualToZero as i32),
+        ]
+    );
+    // x + y <= 5
+    let lim1 = Linear::new([(0, 1.0), (1, 1.0)].into_iter(), -5.0);
+    assert!(instance.constraints[0]
+        .function()
+        .abs_diff_eq(&lim1.into(), 1e-9));
+    // x + z >= 10
+    let lim2 = Linear::new([(0, -1.0), (2, -1.0)].into_iter(), 10.0);
+    assert!(instance.constraints[1]
+        .function()
+        .abs_diff_eq(&lim2.into(), 1e-9));
+}
+
+#[test]
+fn test_load_file_compressed_and_uncompressed() {
+    let instance: Instance = crate::random::random_deterministic(InstanceParameters::default_lp());
+    let dir = std::env::temp_dir().join(format!("ommx-mps-{}", uuid::Uuid::new_v4()));
+
+    let gz_path = dir.join("instance.mps.gz");
+    write_file(&instance, &gz_path).unwrap();
+    let loaded = load_file(&gz_path).unwrap();
+    assert!(instance.abs_diff_eq(&loaded, 1e-6));
+
+    let raw_path = dir.join("instance.mps");
+    let mut buffer = Vec::new();
+    write_mps(&instance, &mut buffer).unwrap();
+    std::fs::write(&raw_path, &buffer).unwrap();
+    let loaded = load_file(&raw_path).unwrap();
+    assert!(instance.abs_diff_eq(&loaded, 1e-6));
+
+    std::fs::remove_dir_all(&dir).unwrap();
+}
@@ -1,11 +1,18 @@
 use super::MpsWriteError;
 use crate::{mps::ObjSense, v1};
-use std::{collections::HashMap, io::Write};
+use std::{
+    borrow::Cow,
+    collections::HashMap,
+    io::{BufWriter, Write},
+};
 
 pub(crate) const OBJ_NAME: &str = "OBJ";
 pub(crate) const CONSTR_PREFIX: &str = "OMMX_CONSTR_";
 pub(crate) const VAR_PREFIX: &str = "OMMX_VAR_";
 
+/// Size of the buffer for writing MPS format
+const WRITE_BUFFER_SIZE: usize = 1 << 20;
+
 /// Writes out the instance in MPS format to the specified `Write`r.
 ///
 /// This function does not automatically Gzip the output -- that is the
@@ -16,15 +23,108 @@ pub(crate) const VAR_PREFIX: &str = "OMMX_VAR_";
 /// Metadata like problem descriptions and variable/constraint names are not
 /// preserved.
 pub fn write_mps<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), MpsWriteError> {
-    write_beginning(instance, out)?;
-    write_rows(instance, out)?;
-    write_columns(instance, out)?;
-    write_rhs(instance, out)?;
-    write_bounds(instance, out)?;
+    let rows = linear_rows(instance)?;
+    let mut out = BufWriter::with_capacity(WRITE_BUFFER_SIZE, out);
+    write_beginning(instance, &mut out)?;
+    write_rows(instance, &mut out)?;
+    write_columns(instance, &rows, &mut out)?;
+    write_rhs(&rows, &mut out)?;
+    write_bounds(instance, &mut out)?;
     writeln!(out, "ENDATA\n")?;
+    out.flush()?;
     Ok(())
 }
 
+/// A row of MPS format, i.e. the objective function or a constraint
+struct LinearRow<'a> {
+    name: String,
+    linear: Cow<'a, v1::Linear>,
+}
+
+/// Downcast a function to linear without copying if it is already linear.
+///
+/// Returns the degree of the function if it is not linear.
+fn as_linear(function: Option<&v1::Function>) -> Result<Cow<'_, v1::Linear>, u32> {
+    let Some(function) = function else {
+        return Ok(Cow::Owned(v1::Linear::default()));
+    };
+    match &function.function {
+        Some(v1::function::Function::Linear(linear)) => Ok(Cow::Borrowed(linear)),
+        _ => function
+            .clone()
+            .as_linear()
+            .map(Cow::Owned)
+            .ok_or_else(|| function.degree()),
+    }
+}
+
+/// Downcast the objective function and constraints to linear once,
+/// where the objective function is the first row.
+fn linear_rows(instance: &v1::Instance) -> Result<Vec<LinearRow<'_>>, MpsWriteError> {
+    let mut rows = Vec::with_capacity(instance.constraints.len() + 1);
+    rows.push(LinearRow {
+        name: OBJ_NAME.to_string(),
+        linear: as_linear(instance.objective.as_ref())
+            .map_err(|degree| MpsWriteError::InvalidObjectiveType { degree })?,
+    });
+    for constr in instance.constraints.iter() {
+        let name = constr_name(constr);
+        let linear = as_linear(constr.function.as_ref()).map_err(|degree| {
+            MpsWriteError::InvalidConstraintType {
+                name: name.clone(),
+                degree,
+            }
+        })?;
+        rows.push(LinearRow { name, linear });
+    }
+    Ok(rows)
+}
+
+/// Column-major index of the non-zero coefficients, in the order of `instance.decision_variables`
+struct ColumnIndex {
+    /// `entries[indptr[i]..indptr[i + 1]]` are `(row, coefficient)` of the `i`-th decision variable
+    indptr: Vec<usize>,
+    entries: Vec<(usize, f64)>,
+}
+
+impl ColumnIndex {
+    fn new(decision_variables: &[v1::DecisionVariable], rows: &[LinearRow]) -> Self {
+        let mut position = HashMap::with_capacity(decision_variables.len());
+        for (i, dvar) in decision_variables.iter().enumerate() {
+            position.entry(dvar.id).or_insert(i);
+        }
+        let position = &position;
+        let nonzero_terms = || {
+            rows.iter().enumerate().flat_map(|(row, r)| {
+                r.linear
+                    .terms
+                    .iter()
+                    .filter(|term| term.coefficient != 0.0)
+                    .filter_map(move |term| Some((*position.get(&term.id)?, row, term.coefficient)))
+            })
+        };
+
+        let mut indptr = vec![0; decision_variables.len() + 1];
+        for (column, _, _) in nonzero_terms() {
+            indptr[column + 1] += 1;
+        }
+        for i in 0..decision_variables.len() {
+            indptr[i + 1] += indptr[i];
+        }
+        let mut cursor = indptr.clone();
+        let mut entries = vec![(0, 0.0); indptr[decision_variables.len()]];
+        for (column, row, coefficient) in nonzero_terms() {
+            entries[cursor[column]] = (row, coefficient);
+            cursor[column] += 1;
+        }
+        Self { indptr, entries }
+    }
+
+    fn column(&self, i: usize) -> &[(usize, f64)] {
+        &self.entries[self.indptr[i]..self.indptr[i + 1]]
+    }
+}
+
 fn write_beginning<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), MpsWriteError> {
     let name = instance
         .description
@@ -87,33 +187,26 @@ impl IntorgTracker {
     }
 }
 
-fn write_columns<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), MpsWriteError> {
+fn write_columns<W: Write>(
+    instance: &v1::Instance,
+    rows: &[LinearRow],
+    out: &mut W,
+) -> Result<(), MpsWriteError> {
     writeln!(out, "COLUMNS")?;
+    let index = ColumnIndex::new(&instance.decision_variables, rows);
+    let mut float = ryu::Buffer::new();
     let mut marker_tracker = IntorgTracker::default();
-    for dvar in instance.decision_variables.iter() {
-        let id = dvar.id;
-        let var_name = dvar_name(dvar);
+    for (i, dvar) in instance.decision_variables.iter().enumerate() {
         match dvar.kind {
             // binary or integer var
             1 | 2 => marker_tracker.intorg(out)?,
             _ => marker_tracker.intend(out)?,
         }
-        // write obj function entry
-        write_col_entry(id, &var_name, OBJ_NAME, instance.objective().as_ref(), out)
-            // a bit of a workaround so that write_col_entry is easier to write.
-            // It assumes we're dealing with constraints, but here we change the
-            // error type so the message is clearer with the objective function
-            .map_err(|err| {
-                if let MpsWriteError::InvalidConstraintType { degree, .. } = err {
-                    MpsWriteError::InvalidObjectiveType { degree }
-                } else {
-                    panic!() // we know this can't happen
-                }
-            })?;
-        // write entries of this var's column for each constraint
-        for constr in instance.constraints.iter() {
-            let row_name = constr_name(constr);
-            write_col_entry(id, &var_name, &row_name, constr.function().as_ref(), out)?;
+        // write entries of this var's column for the objective function and each constraint
+        for &(row, coeff) in index.column(i) {
+            let row_name = &rows[row].name;
+            let coeff = float.format(coeff);
+            writeln!(out, "    {VAR_PREFIX}{}  {row_name}  {coeff}", dvar.id)?;
         }
     }
     // print final INTEND
@@ -121,56 +214,14 @@ fn write_columns<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), M
     Ok(())
 }
 
-/// Writes the entry in the COLUMNS sections of the given id and name, for the
-/// corresponding row (constraint/obj function).
-///
-/// Only writes if var_id is part of the terms in the function, and only if
-/// coefficient is not 0.
-fn write_col_entry<W: Write>(
-    var_id: u64,
-    var_name: &str,
-    row_name: &str,
-    func: &v1::Function,
-    out: &mut W,
-) -> Result<(), MpsWriteError> {
-    if let Some(v1::Linear { terms, .. }) = func.clone().as_linear() {
-        // search for current id in terms. If present and coefficient not 0, write entry
-        for term in terms {
-            if term.id == var_id && term.coefficient != 0.0 {
-                let coeff = term.coefficient;
-                writeln!(out, "    {var_name}  {row_name}  {coeff}")?;
-            }
-        }
-    } else {
-        return Err(MpsWriteError::InvalidConstraintType {
-            name: row_name.to_string(),
-            degree: func.degree(),
-        });
-    }
-    Ok(())
-}
-
-fn write_rhs<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), MpsWriteError> {
+fn write_rhs<W: Write>(rows: &[LinearRow], out: &mut W) -> Result<(), MpsWriteError> {
     writeln!(out, "RHS")?;
-    // write out a RHS entry for the objective function if a non-zero constant is present
-    if let Some(v1::Linear { constant, .. }) = instance.objective().into_owned().as_linear() {
-        if constant != 0.0 {
-            let rhs = -constant;
-            writeln!(out, "  RHS1    {OBJ_NAME}   {rhs}")?;
-        }
-    }
-    for constr in instance.constraints.iter() {
-        let name = constr_name(constr);
-        if let Some(v1::Linear { constant, .. }) = constr.function().into_owned().as_linear() {
-            if constant != 0.0 {
-                let rhs = -constant;
-                writeln!(out, "  RHS1    {name}   {rhs}")?;
-            }
-        } else {
-            return Err(MpsWriteError::InvalidConstraintType {
-                name: name.to_string(),
-                degree: constr.function().degree(),
-            });
+    let mut float = ryu::Buffer::new();
+    // write out a RHS entry for the objective function (first row) and constraints if a non-zero constant is present
+    for LinearRow { name, linear } in rows {
+        if linear.constant != 0.0 {
+            let rhs = float.format(-linear.constant);
+            writeln!(out, "  RHS1    {name}   {rhs}")?;
         }
     }
     Ok(())
@@ -184,6 +235,7 @@ fn write_bounds<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), Mp
         .iter()
         .map(|var| (var.id, var))
         .collect();
+    let mut float = ryu::Buffer::new();
     for dvar_id in instance.used_decision_variable_ids().into_iter() {
         let dvar = var_by_id
             .get(&dvar_id)
@@ -196,8 +248,16 @@ fn write_bounds<W: Write>(instance: &v1::Instance, out: &mut W) -> Result<(), Mp
                 1 | 2 => ("LI", "UI"),
                 _ => ("LO", "UP"),
             };
-            writeln!(out, "  {up_kind} BND1    {name}  {}", bound.upper)?;
-            writeln!(out, "  {low_kind} BND1    {name}  {}", bound.lower)?;
+            writeln!(
+                out,
+                "  {up_kind} BND1    {name}  {}",
+                float.format(bound.upper)
+            )?;
+            writeln!(
+                out,
+                "  {low_kind} BND1    {name}  {}",
+                float.format(bound.lower)
+            )?;
         };
     }
     Ok(())
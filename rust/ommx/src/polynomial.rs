@@ -172,6 +172,7 @@ impl_add_inverse!(f64, Polynomial);
 impl_add_inverse!(Linear, Polynomial);
 impl_add_inverse!(Quadratic, Polynomial);
 impl_sub_by_neg_add!(Polynomial, Polynomial);
+impl_add_assign_by_add!(Polynomial, Polynomial);
 
 impl Mul for Polynomial {
     type Output = Self;
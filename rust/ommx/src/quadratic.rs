@@ -8,7 +8,7 @@ use num::Zero;
 use std::{
     collections::{BTreeMap, BTreeSet},
     fmt,
-    ops::{Add, Mul},
+    ops::{Add, AddAssign, Mul},
 };
 
 use super::format::format_polynomial;
@@ -212,6 +212,25 @@ impl_add_inverse!(f64, Quadratic);
 impl_sub_by_neg_add!(Quadratic, Linear);
 impl_sub_by_neg_add!(Quadratic, f64);
 impl_sub_by_neg_add!(Quadratic, Quadratic);
+impl_add_assign_by_add!(Quadratic, Quadratic);
+
+impl AddAssign<Linear> for Quadratic {
+    fn add_assign(&mut self, rhs: Linear) {
+        match &mut self.linear {
+            Some(linear) => *linear += rhs,
+            None => self.linear = Some(rhs),
+        }
+    }
+}
+
+impl AddAssign<f64> for Quadratic {
+    fn add_assign(&mut self, rhs: f64) {
+        match &mut self.linear {
+            Some(linear) => *linear += rhs,
+            None => self.linear = Some(rhs.into()),
+        }
+    }
+}
 
 impl Mul for Quadratic {
     type Output = Polynomial;
@@ -1,10 +1,268 @@
 use crate::v1::{
-    instance::Sense, sampled_values::SampledValuesEntry, samples::SamplesEntry, SampleSet,
-    SampledValues, Samples, Solution, State,
+    instance::Sense, sampled_values::SampledValuesEntry, samples::SamplesEntry, Equality,
+    SampleSet, SampledConstraint, SampledValues, Samples, Solution, State,
 };
 use anyhow::{bail, ensure, Context, Result};
 use ordered_float::OrderedFloat;
-use std::collections::{BTreeSet, HashMap};
+use rayon::prelude::*;
+use std::{
+    cmp::Ordering,
+    collections::{hash_map::DefaultHasher, BTreeSet, HashMap, HashSet},
+    hash::{Hash, Hasher},
+};
+
+mod compact;
+
+/// Dense `num_samples × num_decision_variables` matrix of sampled decision variable values.
+///
+/// The values are stored in row-major order, i.e. the values of a sample are contiguous.
+/// Row and column positions are looked up by hash maps, so that [`SampleMatrix::get`] is O(1)
+/// while [`SampledValues::get`] scans all the entries.
+#[derive(Debug, Clone, PartialEq)]
+pub struct SampleMatrix {
+    sample_ids: Vec<u64>,
+    decision_variable_ids: Vec<u64>,
+    values: Vec<f64>,
+    sample_index: HashMap<u64, usize>,
+    decision_variable_index: HashMap<u64, usize>,
+}
+
+impl SampleMatrix {
+    /// Sample IDs corresponding to rows, sorted in ascending order
+    pub fn sample_ids(&self) -> &[u64] {
+        &self.sample_ids
+    }
+
+    /// Decision variable IDs corresponding to columns, sorted in ascending order
+    pub fn decision_variable_ids(&self) -> &[u64] {
+        &self.decision_variable_ids
+    }
+
+    /// Row-major values of the matrix
+    pub fn values(&self) -> &[f64] {
+        &self.values
+    }
+
+    pub fn num_samples(&self) -> usize {
+        self.sample_ids.len()
+    }
+
+    pub fn num_decision_variables(&self) -> usize {
+        self.decision_variable_ids.len()
+    }
+
+    /// Shape of the matrix, `(num_samples, num_decision_variables)`
+    pub fn shape(&self) -> (usize, usize) {
+        (self.num_samples(), self.num_decision_variables())
+    }
+
+    pub fn sample_position(&self, sample_id: u64) -> Option<usize> {
+        self.sample_index.get(&sample_id).copied()
+    }
+
+    pub fn decision_variable_position(&self, decision_variable_id: u64) -> Option<usize> {
+        self.decision_variable_index
+            .get(&decision_variable_id)
+            .copied()
+    }
+
+    /// Values of all decision variables for a sample, ordered as [`SampleMatrix::decision_variable_ids`]
+    pub fn row(&self, sample_id: u64) -> Option<&[f64]> {
+        let i = self.sample_position(sample_id)?;
+        let n = self.num_decision_variables();
+        Some(&self.values[i * n..(i + 1) * n])
+    }
+
+    pub fn get(&self, sample_id: u64, decision_variable_id: u64) -> Option<f64> {
+        let i = self.sample_position(sample_id)?;
+        let j = self.decision_variable_position(decision_variable_id)?;
+        Some(self.values[i * self.num_decision_variables() + j])
+    }
+}
+
+/// Index from sample IDs to the entries of all [`SampledValues`] in a [`SampleSet`], created by [`SampleSet::index`].
+///
+/// [`SampledValues::get`] scans all the entries, so that [`SampleSet::get`] is O(#samples) for each value.
+/// This index is built in a single pass over the sample set, and makes each lookup in [`SampleSet::get_indexed`] O(1).
+#[derive(Debug, Clone, Default)]
+pub struct SampleSetIndex {
+    sample_index: HashMap<u64, usize>,
+    /// Position of the entry in [`SampleSet::objectives`] for each sample position
+    objectives: Vec<u32>,
+    /// Same as `objectives` for each of [`SampleSet::decision_variables`]
+    decision_variables: Vec<Vec<u32>>,
+    /// Same as `objectives` for each of [`SampleSet::constraints`]
+    constraints: Vec<Vec<u32>>,
+}
+
+/// Which [`SampledValues`] in a [`SampleSet`] to look up
+#[derive(Debug, Clone, Copy)]
+enum Slot {
+    Objectives,
+    DecisionVariable(usize),
+    Constraint(usize),
+}
+
+impl SampleSetIndex {
+    /// Marker of the samples which are not in [`SampledValues`]
+    const MISSING: u32 = u32::MAX;
+
+    fn entries(
+        sample_index: &mut HashMap<u64, usize>,
+        values: Option<&SampledValues>,
+    ) -> Result<Vec<u32>> {
+        let mut entries = vec![Self::MISSING; sample_index.len()];
+        let Some(values) = values else {
+            return Ok(entries);
+        };
+        ensure!(
+            values.entries.len() < Self::MISSING as usize,
+            "Too many entries in SampledValues: {}",
+            values.entries.len()
+        );
+        for (k, entry) in values.entries.iter().enumerate() {
+            for id in &entry.ids {
+                // Sample IDs missing in the feasibility are appended, so that the lookup agrees with `SampledValues::get`
+                let next = sample_index.len();
+                let i = *sample_index.entry(*id).or_insert(next);
+                if i >= entries.len() {
+                    entries.resize(i + 1, Self::MISSING);
+                }
+                entries[i] = k as u32;
+            }
+        }
+        Ok(entries)
+    }
+
+    /// Whether the sample ID appears in the indexed [`SampleSet`]
+    pub fn contains(&self, sample_id: u64) -> bool {
+        self.sample_index.contains_key(&sample_id)
+    }
+
+    fn get(&self, slot: Slot, values: &SampledValues, sample_id: u64) -> Option<f64> {
+        let entries = match slot {
+            Slot::Objectives => &self.objectives,
+            Slot::DecisionVariable(j) => self.decision_variables.get(j)?,
+            Slot::Constraint(k) => self.constraints.get(k)?,
+        };
+        let i = *self.sample_index.get(&sample_id)?;
+        match *entries.get(i)? {
+            Self::MISSING => None,
+            k => values.entries.get(k as usize).map(|entry| entry.value),
+        }
+    }
+}
+
+/// Evaluated values and feasibility of the constraints for all samples, created by [`SampleSet::constraint_columns`].
+///
+/// The values are stored in column-major order, i.e. the values of a constraint are contiguous,
+/// so that each constraint can be exported as a column without copying, e.g. into Apache Arrow.
+#[derive(Debug, Clone, PartialEq)]
+pub struct ConstraintColumns {
+    /// Sample IDs sorted in ascending order
+    pub sample_ids: Vec<u64>,
+    /// Constraint IDs sorted in ascending order
+    pub constraint_ids: Vec<u64>,
+    /// `values[j * sample_ids.len() + i]` is the value of the constraint `constraint_ids[j]` for the sample `sample_ids[i]`
+    pub values: Vec<f64>,
+    /// Feasibility of each constraint in the same layout as `values`
+    pub feasible: Vec<bool>,
+}
+
+/// Aggregate statistics of a [`SampleSet`], created by [`SampleSet::statistics`]
+#[derive(Debug, Clone, PartialEq)]
+pub struct SampleSetStatistics {
+    pub num_samples: usize,
+    /// Number of samples feasible for the original constraints
+    pub num_feasible: usize,
+    /// Number of samples feasible for the remaining (non-removed) constraints
+    pub num_feasible_relaxed: usize,
+    /// Pairs of probability and the quantile of the objective values, interpolated linearly as `numpy.quantile`.
+    /// The quantiles are NaN if there is no sample.
+    pub objective_quantiles: Vec<(f64, f64)>,
+    pub violation_histograms: Vec<ViolationHistogram>,
+}
+
+impl SampleSetStatistics {
+    /// Ratio of the samples feasible for the original constraints, or NaN if there is no sample
+    pub fn feasibility_rate(&self) -> f64 {
+        self.num_feasible as f64 / self.num_samples as f64
+    }
+
+    /// Ratio of the samples feasible for the remaining constraints, or NaN if there is no sample
+    pub fn feasibility_rate_relaxed(&self) -> f64 {
+        self.num_feasible_relaxed as f64 / self.num_samples as f64
+    }
+}
+
+/// Histogram of the violations of a constraint over the samples.
+///
+/// The violation is `|f(x)|` for equality constraints and `max(f(x), 0)` for inequality constraints.
+#[derive(Debug, Clone, PartialEq)]
+pub struct ViolationHistogram {
+    pub constraint_id: u64,
+    /// `bins + 1` edges of the equal-width bins from zero to the largest violation
+    pub edges: Vec<f64>,
+    /// Number of samples in each bin. The last bin includes its right edge.
+    pub counts: Vec<u64>,
+}
+
+impl ViolationHistogram {
+    fn new(constraint: &SampledConstraint, bins: usize) -> Result<Self> {
+        let values = constraint
+            .evaluated_values
+            .as_ref()
+            .context("evaluated_values of SampledConstraints is lacked")?;
+        let equality = constraint.equality();
+        let violation: fn(f64) -> f64 = match equality {
+            Equality::EqualToZero => f64::abs,
+            Equality::LessThanOrEqualToZero => |value: f64| value.max(0.0),
+            _ => bail!("Unsupported equality: {:?}", equality),
+        };
+        let max = values
+            .entries
+            .iter()
+            .filter(|entry| !entry.ids.is_empty())
+            .map(|entry| violation(entry.value))
+            .fold(0.0, f64::max);
+        let mut counts = vec![0; bins];
+        for entry in &values.entries {
+            let i = if max > 0.0 {
+                ((violation(entry.value) / max * bins as f64) as usize).min(bins - 1)
+            } else {
+                0
+            };
+            counts[i] += entry.ids.len() as u64;
+        }
+        Ok(Self {
+            constraint_id: constraint.id,
+            edges: (0..=bins).map(|i| max * i as f64 / bins as f64).collect(),
+            counts,
+        })
+    }
+}
+
+/// Quantile of the values given as `(value, count)` pairs sorted by value, interpolated linearly as `numpy.quantile`
+fn quantile(sorted: &[(f64, usize)], num_values: usize, q: f64) -> f64 {
+    if num_values == 0 {
+        return f64::NAN;
+    }
+    // The `k`-th smallest value
+    let nth = |k: usize| {
+        let mut count = 0;
+        for (value, n) in sorted {
+            count += n;
+            if k < count {
+                return *value;
+            }
+        }
+        unreachable!("k={k} exceeds the number of values {num_values}")
+    };
+    let position = q * (num_values - 1) as f64;
+    let lower = nth(position.floor() as usize);
+    let upper = nth(position.ceil() as usize);
+    lower + (upper - lower) * position.fract()
+}
 
 impl From<HashMap<OrderedFloat<f64>, Vec<u64>>> for SampledValues {
     fn from(map: HashMap<OrderedFloat<f64>, Vec<u64>>) -> Self {
@@ -72,6 +330,102 @@ impl Samples {
         }
     }
 
+    /// Create samples from a row-major `(num_rows, variable_ids.len())` matrix, e.g. the reads of a sampler.
+    ///
+    /// Each row is a state of the decision variables `variable_ids`, sampled `occurrences[row]` times (once if not given).
+    /// Sample IDs are assigned to the occurrences in order from `sample_ids`, or `0, 1, ...` if not given.
+    /// Identical rows are merged into one entry by hashing, instead of comparing with all entries as [`Samples::add_sample`].
+    pub fn from_array(
+        xs: &[f64],
+        variable_ids: &[u64],
+        sample_ids: Option<&[u64]>,
+        occurrences: Option<&[u64]>,
+    ) -> Result<Self> {
+        let n = variable_ids.len();
+        ensure!(
+            variable_ids.iter().collect::<HashSet<_>>().len() == n,
+            "Duplicated decision variable IDs are given"
+        );
+        if n == 0 {
+            ensure!(xs.is_empty(), "No decision variable IDs are given");
+            return Ok(Self::default());
+        }
+        ensure!(
+            xs.len() % n == 0,
+            "Input has {} values, which is not a multiple of the number of decision variables {}",
+            xs.len(),
+            n
+        );
+        let num_rows = xs.len() / n;
+        if let Some(occurrences) = occurrences {
+            ensure!(
+                occurrences.len() == num_rows,
+                "Length of occurrences ({}) and the number of rows ({}) mismatch",
+                occurrences.len(),
+                num_rows
+            );
+        }
+        let num_samples = match occurrences {
+            Some(occurrences) => occurrences.iter().sum::<u64>() as usize,
+            None => num_rows,
+        };
+        if let Some(sample_ids) = sample_ids {
+            ensure!(
+                sample_ids.len() == num_samples,
+                "Length of sample IDs ({}) and the number of samples ({}) mismatch",
+                sample_ids.len(),
+                num_samples
+            );
+            ensure!(
+                sample_ids.iter().collect::<HashSet<_>>().len() == num_samples,
+                "Duplicated sample IDs are given"
+            );
+        }
+
+        // Hash of the row -> indices of the distinct rows (and entries) with the hash
+        let mut buckets: HashMap<u64, Vec<usize>> = HashMap::new();
+        let mut rows: Vec<&[f64]> = Vec::new();
+        let mut ids: Vec<Vec<u64>> = Vec::new();
+        let mut next_id = 0;
+        for (i, row) in xs.chunks_exact(n).enumerate() {
+            let mut hasher = DefaultHasher::new();
+            for x in row {
+                // Normalize -0.0 to 0.0 since they are equal
+                (x + 0.0).to_bits().hash(&mut hasher);
+            }
+            let bucket = buckets.entry(hasher.finish()).or_default();
+            let k = match bucket.iter().find(|&&k| rows[k] == row) {
+                Some(&k) => k,
+                None => {
+                    bucket.push(rows.len());
+                    rows.push(row);
+                    ids.push(Vec::new());
+                    rows.len() - 1
+                }
+            };
+            let count = occurrences.map_or(1, |occurrences| occurrences[i] as usize);
+            ids[k].extend((next_id..next_id + count).map(|j| match sample_ids {
+                Some(sample_ids) => sample_ids[j],
+                None => j as u64,
+            }));
+            next_id += count;
+        }
+
+        Ok(Self {
+            entries: rows
+                .into_iter()
+                .zip(ids)
+                .filter(|(_, ids)| !ids.is_empty())
+                .map(|(row, ids)| SamplesEntry {
+                    state: Some(State::from_iter(
+                        variable_ids.iter().copied().zip(row.iter().copied()),
+                    )),
+                    ids,
+                })
+                .collect(),
+        })
+    }
+
     pub fn ids(&self) -> impl Iterator<Item = &u64> {
         self.entries.iter().flat_map(|v| v.ids.iter())
     }
@@ -112,6 +466,25 @@ impl Samples {
         map.into_iter().map(|(k, v)| (k, v.into())).collect()
     }
 
+    /// Parallel version of [`Samples::map`] using the current rayon thread pool
+    pub fn par_map(&self, f: impl Fn(&State) -> Result<f64> + Sync) -> Result<SampledValues> {
+        Ok(SampledValues {
+            entries: self
+                .entries
+                .par_iter()
+                .map(|v| {
+                    Ok(SampledValuesEntry {
+                        value: f(v
+                            .state
+                            .as_ref()
+                            .context("ommx.v1.Samples.Entry must has state. Broken Data.")?)?,
+                        ids: v.ids.clone(),
+                    })
+                })
+                .collect::<Result<_>>()?,
+        })
+    }
+
     pub fn map(&self, mut f: impl FnMut(&State) -> Result<f64>) -> Result<SampledValues> {
         Ok(SampledValues {
             entries: self
@@ -183,38 +556,90 @@ impl SampleSet {
             .collect()
     }
 
-    /// Find the best ID in terms of the total objective value.
-    fn best(&self, ids: impl Iterator<Item = u64>) -> Result<u64> {
-        let objectives = self.objectives()?;
-        let obj = ids
-            .map(|id| {
-                Ok((
-                    id,
-                    objectives
-                        .get(id)
-                        .context(format!("SampleSet lacks objective for sample ID={id}"))?,
-                ))
-            })
-            .collect::<Result<Vec<_>>>()?;
+    /// Order of `(sample ID, objective value)` pairs from the best objective value, where the ties are ordered by sample ID
+    fn objective_order(&self) -> Result<impl Fn(&(u64, f64), &(u64, f64)) -> Ordering + Copy> {
         let sense = Sense::try_from(self.sense).context("Invalid sense")?;
-        obj.iter()
-            .min_by(|(_, a), (_, b)| {
-                if sense == Sense::Minimize {
-                    a.total_cmp(b)
-                } else {
-                    b.total_cmp(a)
-                }
-            })
-            .map(|(id, _)| *id)
+        Ok(move |(i, a): &(u64, f64), (j, b): &(u64, f64)| {
+            let by_value = if sense == Sense::Minimize {
+                a.total_cmp(b)
+            } else {
+                b.total_cmp(a)
+            };
+            by_value.then(i.cmp(j))
+        })
+    }
+
+    /// Pairs of sample ID and objective value for `ids`.
+    ///
+    /// This scans the objectives once instead of looking up each ID by [`SampledValues::get`].
+    fn objectives_of(&self, ids: &BTreeSet<u64>) -> Result<Vec<(u64, f64)>> {
+        let obj = self
+            .objectives()?
+            .iter()
+            .filter(|(id, _)| ids.contains(id))
+            .map(|(id, value)| (*id, *value))
+            .collect::<Vec<_>>();
+        if obj.len() < ids.len() {
+            let found: HashSet<u64> = obj.iter().map(|(id, _)| *id).collect();
+            if let Some(id) = ids.iter().find(|id| !found.contains(id)) {
+                bail!("SampleSet lacks objective for sample ID={id}");
+            }
+        }
+        Ok(obj)
+    }
+
+    /// Find the best ID in terms of the total objective value, or the smallest ID among the ties.
+    fn best(&self, ids: BTreeSet<u64>) -> Result<u64> {
+        let order = self.objective_order()?;
+        self.objectives_of(&ids)?
+            .into_iter()
+            .min_by(order)
+            .map(|(id, _)| id)
             .context("No feasible solution found in SampleSet")
     }
 
+    /// IDs of the samples to be ranked by [`SampleSet::top_k_ids`] and [`SampleSet::sorted_ids`]
+    fn ranked_ids(&self, feasible_only: bool, relaxed: bool) -> BTreeSet<u64> {
+        match (feasible_only, relaxed) {
+            (false, _) => self.sample_ids(),
+            (true, true) => self.feasible_ids(),
+            (true, false) => self.feasible_unrelaxed_ids(),
+        }
+    }
+
+    /// IDs of the best `k` samples in terms of the objective value, sorted from the best.
+    ///
+    /// If `feasible_only`, only the feasible samples are ranked, where the feasibility is
+    /// for the remaining constraints if `relaxed`, and for the original constraints otherwise.
+    /// The `k` samples are selected in O(#samples), and only they are sorted.
+    pub fn top_k_ids(&self, k: usize, feasible_only: bool, relaxed: bool) -> Result<Vec<u64>> {
+        let order = self.objective_order()?;
+        let mut obj = self.objectives_of(&self.ranked_ids(feasible_only, relaxed))?;
+        if k == 0 {
+            return Ok(Vec::new());
+        }
+        if k < obj.len() {
+            obj.select_nth_unstable_by(k - 1, order);
+            obj.truncate(k);
+        }
+        obj.sort_unstable_by(order);
+        Ok(obj.into_iter().map(|(id, _)| id).collect())
+    }
+
+    /// IDs of the samples sorted by the objective value from the best, see [`SampleSet::top_k_ids`]
+    pub fn sorted_ids(&self, feasible_only: bool, relaxed: bool) -> Result<Vec<u64>> {
+        let order = self.objective_order()?;
+        let mut obj = self.objectives_of(&self.ranked_ids(feasible_only, relaxed))?;
+        obj.sort_unstable_by(order);
+        Ok(obj.into_iter().map(|(id, _)| id).collect())
+    }
+
     pub fn best_feasible_id(&self) -> Result<u64> {
-        self.best(self.feasible_ids().into_iter())
+        self.best(self.feasible_ids())
     }
 
     pub fn best_feasible_unrelaxed_id(&self) -> Result<u64> {
-        self.best(self.feasible_unrelaxed_ids().into_iter())
+        self.best(self.feasible_unrelaxed_ids())
     }
 
     pub fn best_feasible(&self) -> Result<Solution> {
@@ -225,24 +650,320 @@ impl SampleSet {
         self.get(self.best_feasible_unrelaxed_id()?)
     }
 
+    /// Aggregate the objective values and constraint violations of all samples into [`SampleSetStatistics`].
+    ///
+    /// `quantiles` are the probabilities in `[0, 1]` at which the quantiles of the objective values are evaluated,
+    /// and `bins` is the number of bins of the histograms of the constraint violations.
+    /// Each [`SampledValues`] is scanned only once per entry, not per sample.
+    pub fn statistics(&self, quantiles: &[f64], bins: usize) -> Result<SampleSetStatistics> {
+        ensure!(bins > 0, "The number of bins must be positive");
+        ensure!(
+            quantiles.iter().all(|q| (0.0..=1.0).contains(q)),
+            "Quantiles must be in [0, 1]: {quantiles:?}"
+        );
+        let num_samples = self.num_samples()?;
+
+        let mut objectives: Vec<(f64, usize)> = self
+            .objectives()?
+            .entries
+            .iter()
+            .map(|entry| (entry.value, entry.ids.len()))
+            .collect();
+        objectives.sort_unstable_by(|(a, _), (b, _)| a.total_cmp(b));
+        let objective_quantiles = quantiles
+            .iter()
+            .map(|q| (*q, quantile(&objectives, num_samples, *q)))
+            .collect();
+
+        let violation_histograms = self
+            .constraints
+            .par_iter()
+            .map(|c| ViolationHistogram::new(c, bins))
+            .collect::<Result<_>>()?;
+
+        Ok(SampleSetStatistics {
+            num_samples,
+            num_feasible: self.feasible_unrelaxed().values().filter(|f| **f).count(),
+            num_feasible_relaxed: self.feasible_relaxed().values().filter(|f| **f).count(),
+            objective_quantiles,
+            violation_histograms,
+        })
+    }
+
+    /// Collect the sampled values of decision variables into a dense [`SampleMatrix`].
+    ///
+    /// Substituted (fixed) decision variables are filled with their substituted value for all samples.
+    pub fn decision_variable_matrix(&self) -> Result<SampleMatrix> {
+        let sample_ids: Vec<u64> = self.sample_ids().into_iter().collect();
+        let sample_index: HashMap<u64, usize> = sample_ids
+            .iter()
+            .enumerate()
+            .map(|(i, id)| (*id, i))
+            .collect();
+
+        let mut sampled = self
+            .decision_variables
+            .iter()
+            .map(|sampled| {
+                let v = sampled
+                    .decision_variable
+                    .as_ref()
+                    .context("SampledDecisionVariable lacks decision_variable")?;
+                Ok((v.id, sampled))
+            })
+            .collect::<Result<Vec<_>>>()?;
+        sampled.sort_unstable_by_key(|(id, _)| *id);
+        let decision_variable_ids: Vec<u64> = sampled.iter().map(|(id, _)| *id).collect();
+        let decision_variable_index: HashMap<u64, usize> = decision_variable_ids
+            .iter()
+            .enumerate()
+            .map(|(j, id)| (*id, j))
+            .collect();
+        ensure!(
+            decision_variable_index.len() == decision_variable_ids.len(),
+            "SampleSet has duplicated decision variable IDs"
+        );
+
+        let n = decision_variable_ids.len();
+        let mut values = vec![f64::NAN; sample_ids.len() * n];
+        for (j, (id, sampled)) in sampled.iter().enumerate() {
+            let v = sampled.decision_variable.as_ref().unwrap(); // checked above
+            if let Some(value) = v.substituted_value {
+                for i in 0..sample_ids.len() {
+                    values[i * n + j] = value;
+                }
+                continue;
+            }
+            let samples = sampled
+                .samples
+                .as_ref()
+                .with_context(|| format!("Missing value for decision_variable with ID={id}"))?;
+            let mut filled = 0;
+            for (sample_id, value) in samples.iter() {
+                let i = sample_index.get(sample_id).with_context(|| {
+                    format!("Unknown sample ID={sample_id} for decision_variable with ID={id}")
+                })?;
+                values[i * n + j] = *value;
+                filled += 1;
+            }
+            ensure!(
+                filled == sample_ids.len(),
+                "Missing value for decision_variable with ID={id}"
+            );
+        }
+
+        Ok(SampleMatrix {
+            sample_ids,
+            decision_variable_ids,
+            values,
+            sample_index,
+            decision_variable_index,
+        })
+    }
+
+    /// Build [`SampleSetIndex`] for repeated lookups by sample ID, e.g. by [`SampleSet::get_indexed`].
+    pub fn index(&self) -> Result<SampleSetIndex> {
+        let mut sample_index: HashMap<u64, usize> = self
+            .sample_ids()
+            .into_iter()
+            .enumerate()
+            .map(|(i, id)| (id, i))
+            .collect();
+        let objectives = SampleSetIndex::entries(&mut sample_index, self.objectives.as_ref())?;
+        let decision_variables = self
+            .decision_variables
+            .iter()
+            .map(|sampled| SampleSetIndex::entries(&mut sample_index, sampled.samples.as_ref()))
+            .collect::<Result<_>>()?;
+        let constraints = self
+            .constraints
+            .iter()
+            .map(|c| SampleSetIndex::entries(&mut sample_index, c.evaluated_values.as_ref()))
+            .collect::<Result<_>>()?;
+        Ok(SampleSetIndex {
+            sample_index,
+            objectives,
+            decision_variables,
+            constraints,
+        })
+    }
+
+    /// Collect the evaluated values and feasibility of the constraints into dense [`ConstraintColumns`].
+    ///
+    /// The feasibility stored in each [`SampledConstraint`] is used if exists,
+    /// and otherwise it is evaluated with the same tolerance as [`crate::Evaluate::evaluate_samples`].
+    pub fn constraint_columns(&self) -> Result<ConstraintColumns> {
+        let sample_ids: Vec<u64> = self.sample_ids().into_iter().collect();
+        let sample_index: HashMap<u64, usize> = sample_ids
+            .iter()
+            .enumerate()
+            .map(|(i, id)| (*id, i))
+            .collect();
+
+        let mut constraints: Vec<&SampledConstraint> = self.constraints.iter().collect();
+        constraints.sort_unstable_by_key(|c| c.id);
+        let constraint_ids: Vec<u64> = constraints.iter().map(|c| c.id).collect();
+        ensure!(
+            constraint_ids.windows(2).all(|w| w[0] != w[1]),
+            "SampleSet has duplicated constraint IDs"
+        );
+
+        let n = sample_ids.len();
+        let mut values = vec![f64::NAN; n * constraint_ids.len()];
+        let mut feasible = vec![false; n * constraint_ids.len()];
+        if n == 0 {
+            return Ok(ConstraintColumns {
+                sample_ids,
+                constraint_ids,
+                values,
+                feasible,
+            });
+        }
+        values
+            .par_chunks_mut(n)
+            .zip(feasible.par_chunks_mut(n))
+            .zip(constraints.par_iter())
+            .try_for_each(|((values, feasible), c)| -> Result<()> {
+                let id = c.id;
+                let evaluated_values = c
+                    .evaluated_values
+                    .as_ref()
+                    .context("evaluated_values of SampledConstraints is lacked")?;
+                let mut filled = 0;
+                for (sample_id, value) in evaluated_values.iter() {
+                    let i = sample_index.get(sample_id).with_context(|| {
+                        format!("Unknown sample ID={sample_id} for constraint with ID={id}")
+                    })?;
+                    values[*i] = *value;
+                    filled += 1;
+                }
+                ensure!(filled == n, "Missing value for constraint with ID={id}");
+
+                let evaluated;
+                let is_feasible = if c.feasible.is_empty() {
+                    evaluated = c.is_feasible(1e-6)?;
+                    &evaluated
+                } else {
+                    &c.feasible
+                };
+                let mut filled = 0;
+                for (sample_id, f) in is_feasible {
+                    let i = sample_index.get(sample_id).with_context(|| {
+                        format!("Unknown sample ID={sample_id} for constraint with ID={id}")
+                    })?;
+                    feasible[*i] = *f;
+                    filled += 1;
+                }
+                ensure!(
+                    filled == n,
+                    "Missing feasibility for constraint with ID={id}"
+                );
+                Ok(())
+            })?;
+
+        Ok(ConstraintColumns {
+            sample_ids,
+            constraint_ids,
+            values,
+            feasible,
+        })
+    }
+
     pub fn get(&self, sample_id: u64) -> Result<Solution> {
+        self.get_with(sample_id, |_, values| values.get(sample_id))
+    }
+
+    /// Same as [`SampleSet::get`], but looks up the values by `index` created by [`SampleSet::index`] for this sample set
+    pub fn get_indexed(&self, index: &SampleSetIndex, sample_id: u64) -> Result<Solution> {
+        self.get_with(sample_id, |slot, values| index.get(slot, values, sample_id))
+    }
+
+    /// Values of the decision variables including the substituted ones for a sample, looked up by `index`
+    pub fn decision_variable_values(
+        &self,
+        index: &SampleSetIndex,
+        sample_id: u64,
+    ) -> Result<HashMap<u64, f64>> {
+        self.decision_variables
+            .iter()
+            .enumerate()
+            .map(|(j, sampled)| {
+                let v = sampled
+                    .decision_variable
+                    .as_ref()
+                    .context("SampledDecisionVariable lacks decision_variable")?;
+                let value = match v.substituted_value {
+                    Some(value) => Some(value),
+                    None => sampled
+                        .samples
+                        .as_ref()
+                        .and_then(|s| index.get(Slot::DecisionVariable(j), s, sample_id)),
+                };
+                let value = value.with_context(|| {
+                    format!("Missing value for decision_variable with ID={}", v.id)
+                })?;
+                Ok((v.id, value))
+            })
+            .collect()
+    }
+
+    /// Evaluated values of the constraints for a sample, looked up by `index`
+    pub fn constraint_values(
+        &self,
+        index: &SampleSetIndex,
+        sample_id: u64,
+    ) -> Result<HashMap<u64, f64>> {
+        self.constraints
+            .iter()
+            .enumerate()
+            .map(|(k, c)| {
+                let values = c
+                    .evaluated_values
+                    .as_ref()
+                    .context("evaluated_values of SampledConstraints is lacked")?;
+                let value = index
+                    .get(Slot::Constraint(k), values, sample_id)
+                    .context("SampledConstraint lacks evaluated value")?;
+                Ok((c.id, value))
+            })
+            .collect()
+    }
+
+    fn get_with(
+        &self,
+        sample_id: u64,
+        lookup: impl Fn(Slot, &SampledValues) -> Option<f64>,
+    ) -> Result<Solution> {
         let mut decision_variables = Vec::new();
         let mut state = State::default();
 
         let evaluated_constraints = self
             .constraints
             .iter()
-            .map(|c| c.get(sample_id))
+            .enumerate()
+            .map(|(k, c)| {
+                let values = c
+                    .evaluated_values
+                    .as_ref()
+                    .context("evaluated_values of SampledConstraints is lacked")?;
+                let value = lookup(Slot::Constraint(k), values)
+                    .context("SampledConstraint lacks evaluated value")?;
+                Ok(c.with_evaluated_value(value))
+            })
             .collect::<Result<Vec<_>>>()?;
 
-        for sampled in &self.decision_variables {
+        for (j, sampled) in self.decision_variables.iter().enumerate() {
             let v = sampled
                 .decision_variable
                 .clone()
                 .context("SampledDecisionVariable lacks decision_variable")?;
             if let Some(value) = v.substituted_value {
                 state.entries.insert(v.id, value);
-            } else if let Some(value) = sampled.samples.as_ref().and_then(|s| s.get(sample_id)) {
+            } else if let Some(value) = sampled
+                .samples
+                .as_ref()
+                .and_then(|s| lookup(Slot::DecisionVariable(j), s))
+            {
                 state.entries.insert(v.id, value);
             } else {
                 bail!("Missing value for decision_variable with ID={}", v.id);
@@ -252,7 +973,7 @@ impl SampleSet {
 
         Ok(Solution {
             state: Some(state),
-            objective: self.objectives()?.get(sample_id).with_context(|| {
+            objective: lookup(Slot::Objectives, self.objectives()?).with_context(|| {
                 format!("SampleSet lacks objective for sample with ID={}", sample_id)
             })?,
             decision_variables,
@@ -275,3 +996,206 @@ impl SampleSet {
         })
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{
+        random::{random_deterministic, InstanceParameters},
+        Evaluate,
+    };
+
+    #[test]
+    fn decision_variable_matrix() {
+        let instance = random_deterministic(InstanceParameters::default());
+        let ids: Vec<u64> = instance.decision_variables.iter().map(|v| v.id).collect();
+        let mut samples = Samples::default();
+        for sample_id in 0..3 {
+            let state = State::from_iter(ids.iter().map(|id| (*id, (sample_id * 10 + *id) as f64)));
+            samples.add_sample(sample_id, state);
+        }
+        let (sample_set, _) = instance.evaluate_samples(&samples).unwrap();
+        let matrix = sample_set.decision_variable_matrix().unwrap();
+
+        assert_eq!(matrix.shape(), (3, ids.len()));
+        assert_eq!(matrix.sample_ids(), &[0, 1, 2]);
+        for sample_id in 0..3 {
+            let solution = sample_set.get(sample_id).unwrap();
+            let state = solution.state.unwrap();
+            for (id, value) in &state.entries {
+                assert_eq!(matrix.get(sample_id, *id), Some(*value));
+            }
+            assert_eq!(matrix.row(sample_id).unwrap().len(), ids.len());
+        }
+        assert_eq!(matrix.get(3, ids[0]), None);
+    }
+
+    #[test]
+    fn get_indexed() {
+        let instance = random_deterministic(InstanceParameters::default());
+        let ids: Vec<u64> = instance.decision_variables.iter().map(|v| v.id).collect();
+        let mut samples = Samples::default();
+        for sample_id in 0..4 {
+            // Sample 0 and 2 share the same state
+            let state =
+                State::from_iter(ids.iter().map(|id| (*id, ((sample_id % 2) * *id) as f64)));
+            samples.add_sample(sample_id, state);
+        }
+        let (sample_set, _) = instance.evaluate_samples(&samples).unwrap();
+        let index = sample_set.index().unwrap();
+
+        for sample_id in 0..4 {
+            let solution = sample_set.get(sample_id).unwrap();
+            assert_eq!(sample_set.get_indexed(&index, sample_id).unwrap(), solution);
+            assert_eq!(
+                sample_set
+                    .decision_variable_values(&index, sample_id)
+                    .unwrap(),
+                solution.state.as_ref().unwrap().entries
+            );
+            let constraint_values: HashMap<u64, f64> = solution
+                .evaluated_constraints
+                .iter()
+                .map(|c| (c.id, c.evaluated_value))
+                .collect();
+            assert_eq!(
+                sample_set.constraint_values(&index, sample_id).unwrap(),
+                constraint_values
+            );
+        }
+        assert!(sample_set.get_indexed(&index, 4).is_err());
+        assert!(!index.contains(4));
+    }
+
+    #[test]
+    fn constraint_columns() {
+        let instance = random_deterministic(InstanceParameters::default());
+        let ids: Vec<u64> = instance.decision_variables.iter().map(|v| v.id).collect();
+        let mut samples = Samples::default();
+        for sample_id in 0..3 {
+            let state = State::from_iter(ids.iter().map(|id| (*id, (sample_id * *id) as f64)));
+            samples.add_sample(sample_id, state);
+        }
+        let (sample_set, _) = instance.evaluate_samples(&samples).unwrap();
+        let columns = sample_set.constraint_columns().unwrap();
+
+        assert_eq!(columns.sample_ids, vec![0, 1, 2]);
+        assert_eq!(columns.constraint_ids.len(), sample_set.constraints.len());
+        assert!(columns.constraint_ids.windows(2).all(|w| w[0] < w[1]));
+        for (i, sample_id) in columns.sample_ids.iter().enumerate() {
+            let solution = sample_set.get(*sample_id).unwrap();
+            for c in &solution.evaluated_constraints {
+                let j = columns
+                    .constraint_ids
+                    .iter()
+                    .position(|id| *id == c.id)
+                    .unwrap();
+                assert_eq!(columns.values[j * 3 + i], c.evaluated_value);
+                assert_eq!(columns.feasible[j * 3 + i], c.is_feasible(1e-6).unwrap());
+            }
+        }
+    }
+
+    #[test]
+    fn top_k_and_statistics() {
+        let instance = random_deterministic(InstanceParameters::default());
+        let ids: Vec<u64> = instance.decision_variables.iter().map(|v| v.id).collect();
+        let mut samples = Samples::default();
+        for sample_id in 0..10 {
+            let state =
+                State::from_iter(ids.iter().map(|id| (*id, ((sample_id + *id) % 3) as f64)));
+            samples.add_sample(sample_id, state);
+        }
+        let (sample_set, _) = instance.evaluate_samples(&samples).unwrap();
+
+        for (feasible_only, relaxed) in [(false, false), (true, false), (true, true)] {
+            let sorted = sample_set.sorted_ids(feasible_only, relaxed).unwrap();
+            for k in 0..=sorted.len() + 1 {
+                let top_k = sample_set.top_k_ids(k, feasible_only, relaxed).unwrap();
+                assert_eq!(top_k, sorted[..k.min(sorted.len())]);
+            }
+        }
+        assert_eq!(
+            sample_set
+                .top_k_ids(1, true, true)
+                .unwrap()
+                .first()
+                .copied(),
+            sample_set.best_feasible_id().ok()
+        );
+
+        let stats = sample_set.statistics(&[0.0, 0.5, 1.0], 4).unwrap();
+        assert_eq!(stats.num_samples, 10);
+        assert_eq!(
+            stats.num_feasible,
+            sample_set.feasible_unrelaxed_ids().len()
+        );
+        assert_eq!(stats.num_feasible_relaxed, sample_set.feasible_ids().len());
+        let objectives: Vec<f64> = sample_set
+            .objectives()
+            .unwrap()
+            .iter()
+            .map(|(_, v)| *v)
+            .collect();
+        let min = objectives.iter().copied().fold(f64::INFINITY, f64::min);
+        let max = objectives.iter().copied().fold(f64::NEG_INFINITY, f64::max);
+        assert_eq!(stats.objective_quantiles[0], (0.0, min));
+        assert_eq!(stats.objective_quantiles[2], (1.0, max));
+        assert_eq!(
+            stats.violation_histograms.len(),
+            sample_set.constraints.len()
+        );
+        for histogram in &stats.violation_histograms {
+            assert_eq!(histogram.edges.len(), 5);
+            assert_eq!(histogram.counts.iter().sum::<u64>(), 10);
+        }
+        assert!(sample_set.statistics(&[1.5], 4).is_err());
+        assert!(sample_set.statistics(&[0.5], 0).is_err());
+    }
+
+    #[test]
+    fn quantile_interpolation() {
+        // [1, 1, 3, 3, 3]
+        let sorted = [(1.0, 2), (3.0, 3)];
+        assert_eq!(quantile(&sorted, 5, 0.0), 1.0);
+        // Interpolated between the 0th and 1st values, both of which are 1
+        assert_eq!(quantile(&sorted, 5, 0.125), 1.0);
+        // Interpolated between the 1st and 2nd values
+        assert_eq!(quantile(&sorted, 5, 0.375), 2.0);
+        assert_eq!(quantile(&sorted, 5, 0.5), 3.0);
+        assert_eq!(quantile(&sorted, 5, 1.0), 3.0);
+        assert!(quantile(&[], 0, 0.5).is_nan());
+    }
+
+    #[test]
+    fn samples_from_array() {
+        let ids = [3, 1];
+        #[rustfmt::skip]
+        let xs = [
+            0.0, 1.0,
+            1.0, 1.0,
+            -0.0, 1.0,
+            1.0, 1.0,
+        ];
+        let mut expected = Samples::default();
+        for (sample_id, row) in xs.chunks(2).enumerate() {
+            let state = State::from_iter(ids.iter().copied().zip(row.iter().copied()));
+            expected.add_sample(sample_id as u64, state);
+        }
+        let samples = Samples::from_array(&xs, &ids, None, None).unwrap();
+        assert_eq!(samples, expected);
+
+        // The second row is sampled twice, and the last one is not sampled
+        let samples =
+            Samples::from_array(&xs, &ids, Some(&[10, 11, 12, 13]), Some(&[1, 2, 1, 0])).unwrap();
+        assert_eq!(samples.entries.len(), 2);
+        assert_eq!(samples.entries[0].ids, vec![10, 13]);
+        assert_eq!(samples.entries[1].ids, vec![11, 12]);
+
+        // Invalid inputs
+        assert!(Samples::from_array(&xs[..3], &ids, None, None).is_err());
+        assert!(Samples::from_array(&xs, &ids, Some(&[0, 1]), None).is_err());
+        assert!(Samples::from_array(&xs, &ids, Some(&[0, 0, 1, 2]), None).is_err());
+        assert!(Samples::from_array(&xs, &[1, 1], None, None).is_err());
+    }
+}
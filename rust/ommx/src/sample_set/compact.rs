@@ -0,0 +1,626 @@
+//! Compact columnar encoding of [`SampleSet`]
+//!
+//! The protobuf encoding of [`SampleSet`] stores the sample IDs for every sampled value,
+//! which is dominant for large sample sets of binary or integer decision variables.
+//! This encoding stores the sorted sample IDs only once, and the sampled values as columns aligned to them:
+//!
+//! ```text
+//! "OMMXSS" | version: u8 | flags: u8 | varint(num_samples) | varint(num_columns) | varint(metadata_len)
+//!   | payload (zstd-compressed if flags & 1)
+//!
+//! payload = metadata | delta-encoded sample IDs | columns...
+//! ```
+//!
+//! The counts in the uncompressed header bound the size of the payload,
+//! which limits the decompression of a corrupted or malicious input.
+//!
+//! where `metadata` is the protobuf encoding of the sample set whose sampled values are cleared,
+//! and columns are the objectives, the decision variables, the evaluated values and feasibility of the constraints,
+//! and the feasibility of the sample set in this order. Each column is bit-packed if it is binary,
+//! dictionary-encoded if it has a few distinct values, e.g. integer decision variables, or stored as raw `f64` otherwise.
+
+use crate::v1::{SampleSet, SampledConstraint, SampledDecisionVariable, SampledValues};
+use anyhow::{bail, ensure, Context, Result};
+use prost::Message;
+use rayon::prelude::*;
+use std::{
+    collections::{BTreeSet, HashMap},
+    io::Read,
+};
+
+const MAGIC: &[u8] = b"OMMXSS";
+const VERSION: u8 = 1;
+const FLAG_ZSTD: u8 = 1;
+
+const CONSTANT: u8 = 0;
+const BINARY: u8 = 1;
+const DICTIONARY: u8 = 2;
+const RAW: u8 = 3;
+/// Set to the column kind if some samples are missing, followed by a bitmap of present samples.
+const PARTIAL: u8 = 0x80;
+
+/// Columns with more distinct values than this are stored as raw `f64`.
+const MAX_DICTIONARY_SIZE: usize = 1 << 16;
+
+impl SampleSet {
+    /// Check if the bytes are created by [`SampleSet::to_compact_bytes`].
+    ///
+    /// The protobuf encoding never starts with the magic bytes since `O` (`0x4f`) is an invalid wire type.
+    pub fn is_compact_bytes(bytes: &[u8]) -> bool {
+        bytes.starts_with(MAGIC)
+    }
+
+    /// Encode into the compact columnar format, compressed by zstd if `zstd_level` is given.
+    ///
+    /// The result can be decoded by [`SampleSet::from_compact_bytes`].
+    /// Sampled values are compared by their bits, and NaN and `-0.0` are kept as is.
+    pub fn to_compact_bytes(&self, zstd_level: Option<i32>) -> Result<Vec<u8>> {
+        let sample_ids = self.all_sample_ids();
+        let position: HashMap<u64, usize> = sample_ids
+            .iter()
+            .enumerate()
+            .map(|(i, id)| (*id, i))
+            .collect();
+        let n = sample_ids.len();
+
+        let mut columns: Vec<Vec<Option<f64>>> = Vec::new();
+        let mut values_column = |values: &Option<SampledValues>| {
+            if let Some(values) = values {
+                let mut column = vec![None; n];
+                for (id, value) in values.iter() {
+                    column[position[id]] = Some(*value);
+                }
+                columns.push(column);
+            }
+        };
+        values_column(&self.objectives);
+        for v in &self.decision_variables {
+            values_column(&v.samples);
+        }
+        for c in &self.constraints {
+            values_column(&c.evaluated_values);
+        }
+        let mut bool_column = |values: &HashMap<u64, bool>| {
+            let mut column = vec![None; n];
+            for (id, value) in values {
+                column[position[id]] = Some(if *value { 1.0 } else { 0.0 });
+            }
+            columns.push(column);
+        };
+        for c in &self.constraints {
+            bool_column(&c.feasible);
+        }
+        bool_column(&self.feasible);
+        #[allow(deprecated)]
+        bool_column(&self.feasible_unrelaxed);
+        bool_column(&self.feasible_relaxed);
+
+        let mut payload = self.compact_metadata().encode_to_vec();
+        let metadata_len = payload.len();
+        let mut last = 0;
+        for id in &sample_ids {
+            encode_varint(id - last, &mut payload);
+            last = *id;
+        }
+        let encoded: Vec<Vec<u8>> = columns.par_iter().map(|c| encode_column(c)).collect();
+        for column in encoded {
+            payload.extend_from_slice(&column);
+        }
+
+        let mut out = MAGIC.to_vec();
+        out.push(VERSION);
+        out.push(if zstd_level.is_some() { FLAG_ZSTD } else { 0 });
+        encode_varint(n as u64, &mut out);
+        encode_varint(columns.len() as u64, &mut out);
+        encode_varint(metadata_len as u64, &mut out);
+        if let Some(level) = zstd_level {
+            out.extend(zstd::encode_all(payload.as_slice(), level)?);
+        } else {
+            out.extend(payload);
+        }
+        Ok(out)
+    }
+
+    /// Decode the bytes created by [`SampleSet::to_compact_bytes`].
+    pub fn from_compact_bytes(bytes: &[u8]) -> Result<Self> {
+        ensure!(
+            Self::is_compact_bytes(bytes),
+            "Not a compact encoding of ommx.v1.SampleSet"
+        );
+        let mut reader = Reader(&bytes[MAGIC.len()..]);
+        let version = reader.u8()?;
+        ensure!(
+            version == VERSION,
+            "Unsupported version of compact ommx.v1.SampleSet: {version}"
+        );
+        let flags = reader.u8()?;
+        let n = usize::try_from(reader.varint()?)?;
+        let num_columns = usize::try_from(reader.varint()?)?;
+        let len = usize::try_from(reader.varint()?)?;
+        let max_payload_len = max_payload_len(n, num_columns, len)
+            .context("Sizes in the header of compact ommx.v1.SampleSet overflow")?;
+        let decompressed;
+        if flags & FLAG_ZSTD != 0 {
+            let mut buf = Vec::new();
+            zstd::stream::read::Decoder::new(reader.0)?
+                .take(max_payload_len as u64 + 1)
+                .read_to_end(&mut buf)?;
+            ensure!(
+                buf.len() <= max_payload_len,
+                "Decompressed compact ommx.v1.SampleSet exceeds {max_payload_len} bytes bounded by its header"
+            );
+            decompressed = buf;
+            reader = Reader(&decompressed);
+        }
+
+        let mut sample_set = SampleSet::decode(reader.bytes(len)?)?;
+        ensure!(
+            num_columns == sample_set.num_compact_columns(),
+            "Number of columns {num_columns} does not match the metadata of compact ommx.v1.SampleSet"
+        );
+        // Each sample ID takes at least one byte, which bounds `n` before allocating
+        ensure!(
+            n <= reader.0.len(),
+            "Number of samples {n} exceeds the length of compact ommx.v1.SampleSet"
+        );
+        let mut sample_ids = Vec::with_capacity(n);
+        let mut last = 0_u64;
+        for _ in 0..n {
+            last = last
+                .checked_add(reader.varint()?)
+                .context("Sample ID overflow")?;
+            sample_ids.push(last);
+        }
+
+        let mut values_column = |values: &mut Option<SampledValues>| -> Result<()> {
+            if let Some(values) = values {
+                *values = decode_column(&mut reader, &sample_ids)?
+                    .filter_map(|(id, value)| Some((id, value?)))
+                    .collect();
+            }
+            Ok(())
+        };
+        values_column(&mut sample_set.objectives)?;
+        for v in &mut sample_set.decision_variables {
+            values_column(&mut v.samples)?;
+        }
+        for c in &mut sample_set.constraints {
+            values_column(&mut c.evaluated_values)?;
+        }
+        let mut bool_column = |values: &mut HashMap<u64, bool>| -> Result<()> {
+            *values = decode_column(&mut reader, &sample_ids)?
+                .filter_map(|(id, value)| Some((id, value? != 0.0)))
+                .collect();
+            Ok(())
+        };
+        for c in &mut sample_set.constraints {
+            bool_column(&mut c.feasible)?;
+        }
+        bool_column(&mut sample_set.feasible)?;
+        #[allow(deprecated)]
+        bool_column(&mut sample_set.feasible_unrelaxed)?;
+        bool_column(&mut sample_set.feasible_relaxed)?;
+        ensure!(
+            reader.0.is_empty(),
+            "Trailing bytes in compact ommx.v1.SampleSet"
+        );
+        Ok(sample_set)
+    }
+
+    /// Number of columns stored for the sample set, counted on its metadata
+    fn num_compact_columns(&self) -> usize {
+        self.objectives.is_some() as usize
+            + self
+                .decision_variables
+                .iter()
+                .filter(|v| v.samples.is_some())
+                .count()
+            + self
+                .constraints
+                .iter()
+                .filter(|c| c.evaluated_values.is_some())
+                .count()
+            + self.constraints.len()
+            + 3
+    }
+
+    /// The sample set whose sampled values are cleared, built without copying the sampled values
+    #[allow(deprecated)]
+    fn compact_metadata(&self) -> SampleSet {
+        let cleared = |values: &Option<SampledValues>| values.as_ref().map(|_| Default::default());
+        SampleSet {
+            objectives: cleared(&self.objectives),
+            decision_variables: self
+                .decision_variables
+                .iter()
+                .map(|v| SampledDecisionVariable {
+                    decision_variable: v.decision_variable.clone(),
+                    samples: cleared(&v.samples),
+                })
+                .collect(),
+            constraints: self
+                .constraints
+                .iter()
+                .map(|c| SampledConstraint {
+                    id: c.id,
+                    equality: c.equality,
+                    name: c.name.clone(),
+                    subscripts: c.subscripts.clone(),
+                    parameters: c.parameters.clone(),
+                    description: c.description.clone(),
+                    removed_reason: c.removed_reason.clone(),
+                    removed_reason_parameters: c.removed_reason_parameters.clone(),
+                    evaluated_values: cleared(&c.evaluated_values),
+                    used_decision_variable_ids: c.used_decision_variable_ids.clone(),
+                    feasible: HashMap::new(),
+                })
+                .collect(),
+            feasible: HashMap::new(),
+            feasible_unrelaxed: HashMap::new(),
+            feasible_relaxed: HashMap::new(),
+            sense: self.sense,
+        }
+    }
+
+    /// Sample IDs appearing anywhere in the sample set, not only in the objectives
+    fn all_sample_ids(&self) -> Vec<u64> {
+        let mut ids = BTreeSet::new();
+        let mut values = |v: &Option<SampledValues>| {
+            if let Some(v) = v {
+                for entry in &v.entries {
+                    ids.extend(entry.ids.iter().copied());
+                }
+            }
+        };
+        values(&self.objectives);
+        for v in &self.decision_variables {
+            values(&v.samples);
+        }
+        for c in &self.constraints {
+            values(&c.evaluated_values);
+        }
+        for c in &self.constraints {
+            ids.extend(c.feasible.keys().copied());
+        }
+        ids.extend(self.feasible.keys().copied());
+        #[allow(deprecated)]
+        ids.extend(self.feasible_unrelaxed.keys().copied());
+        ids.extend(self.feasible_relaxed.keys().copied());
+        ids.into_iter().collect()
+    }
+}
+
+fn encode_column(column: &[Option<f64>]) -> Vec<u8> {
+    let values: Vec<u64> = column.iter().flatten().map(|v| v.to_bits()).collect();
+    let (dictionary, codes) = dictionary(&values);
+    let kind = match dictionary.len() {
+        0 if !values.is_empty() => RAW,
+        0 | 1 => CONSTANT,
+        _ if dictionary
+            .iter()
+            .all(|&bits| bits == 0.0_f64.to_bits() || bits == 1.0_f64.to_bits()) =>
+        {
+            BINARY
+        }
+        size if 8 * size + (values.len() * bit_width(size) as usize).div_ceil(8)
+            < 8 * values.len() =>
+        {
+            DICTIONARY
+        }
+        _ => RAW,
+    };
+
+    let mut out = Vec::new();
+
+    if values.len() == column.len() {
+        out.push(kind);
+    } else {
+        out.push(kind | PARTIAL);
+        pack(column.iter().map(|v| v.is_some() as u32), 1, &mut out);
+    }
+    match kind {
+        CONSTANT => out.extend_from_slice(&dictionary.first().copied().unwrap_or(0).to_le_bytes()),
+        BINARY => pack(
+            values
+                .iter()
+                .map(|&bits| (bits == 1.0_f64.to_bits()) as u32),
+            1,
+            &mut out,
+        ),
+        DICTIONARY => {
+            encode_varint(dictionary.len() as u64, &mut out);
+            for bits in &dictionary {
+                out.extend_from_slice(&bits.to_le_bytes());
+            }
+            pack(
+                values.iter().map(|bits| codes[bits]),
+                bit_width(dictionary.len()),
+                &mut out,
+            );
+        }
+        _ => {
+            for bits in &values {
+                out.extend_from_slice(&bits.to_le_bytes());
+            }
+        }
+    }
+    out
+}
+
+/// Upper bound of the payload length of `num_columns` columns of `n` samples with the metadata of `metadata_len` bytes
+fn max_payload_len(n: usize, num_columns: usize, metadata_len: usize) -> Option<usize> {
+    // Each delta-encoded sample ID takes at most 10 bytes
+    let sample_ids = n.checked_mul(10)?;
+    // The kind, the bitmap of present samples, and the values; [`encode_column`] falls back to
+    // the raw `f64` unless the other kinds are smaller, and the varint of a dictionary size takes at most 3 bytes
+    let column = n
+        .div_ceil(8)
+        .checked_add(n.checked_mul(8)?)?
+        .checked_add(1 + 8 + 3)?;
+    metadata_len
+        .checked_add(sample_ids)?
+        .checked_add(column.checked_mul(num_columns)?)
+}
+
+/// Decode a column into the pairs of sample ID and its value, `None` for the missing samples.
+fn decode_column<'a>(
+    reader: &mut Reader,
+    sample_ids: &'a [u64],
+) -> Result<impl Iterator<Item = (u64, Option<f64>)> + 'a> {
+    let n = sample_ids.len();
+    let header = reader.u8()?;
+    let present: Vec<bool> = if header & PARTIAL != 0 {
+        unpack(reader, 1, n)?.into_iter().map(|b| b == 1).collect()
+    } else {
+        vec![true; n]
+    };
+    let m = present.iter().filter(|p| **p).count();
+    let values: Vec<f64> = match header & !PARTIAL {
+        CONSTANT => vec![reader.f64()?; m],
+        BINARY => unpack(reader, 1, m)?
+            .into_iter()
+            .map(|b| b as f64)
+            .collect(),
+        DICTIONARY => {
+            let size = reader.varint()? as usize;
+            ensure!(
+                (2..=MAX_DICTIONARY_SIZE).contains(&size),
+                "Invalid dictionary size in compact ommx.v1.SampleSet: {size}"
+            );
+            let dictionary = (0..size)
+                .map(|_| reader.f64())
+                .collect::<Result<Vec<_>>>()?;
+            unpack(reader, bit_width(size), m)?
+                .into_iter()
+                .map(|code| {
+                    dictionary
+                        .get(code as usize)
+                        .copied()
+                        .context("Dictionary code out of range in compact ommx.v1.SampleSet")
+                })
+                .collect::<Result<_>>()?
+        }
+        RAW => (0..m).map(|_| reader.f64()).collect::<Result<_>>()?,
+        kind => bail!("Unknown column kind in compact ommx.v1.SampleSet: {kind}"),
+    };
+    let mut values = values.into_iter();
+    Ok(sample_ids
+        .iter()
+        .zip(present)
+        .map(move |(id, present)| (*id, if present { values.next() } else { None })))
+}
+
+/// Distinct values in order of appearance and their codes, or empty if there are more than [`MAX_DICTIONARY_SIZE`] values
+fn dictionary(values: &[u64]) -> (Vec<u64>, HashMap<u64, u32>) {
+    let mut dictionary = Vec::new();
+    let mut codes = HashMap::new();
+    for &bits in values {
+        if codes.contains_key(&bits) {
+            continue;
+        }
+        if dictionary.len() == MAX_DICTIONARY_SIZE {
+            return (Vec::new(), HashMap::new());
+        }
+        codes.insert(bits, dictionary.len() as u32);
+        dictionary.push(bits);
+    }
+    (dictionary, codes)
+}
+
+/// Number of bits to store the codes `0..size`
+fn bit_width(size: usize) -> u32 {
+    usize::BITS - (size.max(2) - 1).leading_zeros()
+}
+
+/// Pack the values of `width` bits in LSB-first order
+fn pack(values: impl Iterator<Item = u32>, width: u32, out: &mut Vec<u8>) {
+    let mut buffer = 0_u64;
+    let mut filled = 0;
+    for value in values {
+        buffer |= (value as u64) << filled;
+        filled += width;
+        while filled >= 8 {
+            out.push(buffer as u8);
+            buffer >>= 8;
+            filled -= 8;
+        }
+    }
+    if filled > 0 {
+        out.push(buffer as u8);
+    }
+}
+
+fn unpack(reader: &mut Reader, width: u32, len: usize) -> Result<Vec<u32>> {
+    let bytes = reader.bytes((len * width as usize).div_ceil(8))?;
+    let mask = (1_u64 << width) - 1;
+    let mut out = Vec::with_capacity(len);
+    let mut bytes = bytes.iter();
+    let mut buffer = 0_u64;
+    let mut filled = 0;
+    for _ in 0..len {
+        while filled < width {
+            // `bytes` has enough length checked above
+            buffer |= (*bytes.next().unwrap() as u64) << filled;
+            filled += 8;
+        }
+        out.push((buffer & mask) as u32);
+        buffer >>= width;
+        filled -= width;
+    }
+    Ok(out)
+}
+
+fn encode_varint(mut value: u64, out: &mut Vec<u8>) {
+    while value >= 0x80 {
+        out.push(value as u8 | 0x80);
+        value >>= 7;
+    }
+    out.push(value as u8);
+}
+
+struct Reader<'a>(&'a [u8]);
+
+impl<'a> Reader<'a> {
+    fn bytes(&mut self, len: usize) -> Result<&'a [u8]> {
+        ensure!(
+            self.0.len() >= len,
+            "Unexpected end of compact ommx.v1.SampleSet"
+        );
+        let (head, tail) = self.0.split_at(len);
+        self.0 = tail;
+        Ok(head)
+    }
+
+    fn u8(&mut self) -> Result<u8> {
+        Ok(self.bytes(1)?[0])
+    }
+
+    fn f64(&mut self) -> Result<f64> {
+        Ok(f64::from_le_bytes(self.bytes(8)?.try_into()?))
+    }
+
+    fn varint(&mut self) -> Result<u64> {
+        let mut value = 0_u64;
+        for shift in (0..64).step_by(7) {
+            let byte = self.u8()?;
+            value |= ((byte & 0x7f) as u64) << shift;
+            if byte < 0x80 {
+                return Ok(value);
+            }
+        }
+        bail!("Invalid varint in compact ommx.v1.SampleSet")
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{
+        random::{random_deterministic, InstanceParameters},
+        v1::{Samples, State},
+        Evaluate,
+    };
+
+    #[test]
+    fn roundtrip() {
+        let instance = random_deterministic(InstanceParameters::default_binary());
+        let ids = instance.defined_ids();
+        let mut samples = Samples::default();
+        for sample_id in 0..50 {
+            let state = State::from_iter(
+                ids.iter()
+                    .map(|id| (*id, ((id * 7 + sample_id * 13) % 5 == 0) as u8 as f64)),
+            );
+            samples.add_sample(sample_id * 3, state);
+        }
+        let (sample_set, _) = instance.evaluate_samples(&samples).unwrap();
+        for zstd_level in [None, Some(3)] {
+            let bytes = sample_set.to_compact_bytes(zstd_level).unwrap();
+            assert!(SampleSet::is_compact_bytes(&bytes));
+            let decoded = SampleSet::from_compact_bytes(&bytes).unwrap();
+            assert_eq!(decoded.sample_ids(), sample_set.sample_ids());
+            assert_eq!(decoded.feasible, sample_set.feasible);
+            assert_eq!(decoded.feasible_relaxed, sample_set.feasible_relaxed);
+            for id in sample_set.sample_ids() {
+                assert_eq!(decoded.get(id).unwrap(), sample_set.get(id).unwrap());
+            }
+        }
+        assert!(sample_set.to_compact_bytes(None).unwrap().len() < sample_set.encoded_len());
+        assert!(!SampleSet::is_compact_bytes(&sample_set.encode_to_vec()));
+    }
+
+    #[test]
+    fn column_kinds() {
+        let sample_ids: Vec<u64> = (0..100).collect();
+        let columns = [
+            vec![Some(2.5); 100],
+            (0..100).map(|i| Some((i % 2) as f64)).collect(),
+            (0..100).map(|i| Some((i % 7) as f64 - 3.0)).collect(),
+            (0..100).map(|i| Some(i as f64 / 3.0)).collect(),
+            (0..100)
+                .map(|i| (i % 3 != 0).then_some((i % 2) as f64))
+                .collect::<Vec<_>>(),
+            vec![None; 100],
+            vec![Some(f64::NAN), Some(-0.0)]
+                .into_iter()
+                .chain(vec![Some(0.0); 98])
+                .collect(),
+        ];
+        for (column, kind) in columns.iter().zip([
+            CONSTANT,
+            BINARY,
+            DICTIONARY,
+            RAW,
+            BINARY | PARTIAL,
+            CONSTANT | PARTIAL,
+            DICTIONARY,
+        ]) {
+            let bytes = encode_column(column);
+            assert_eq!(bytes[0], kind);
+            let mut reader = Reader(&bytes);
+            let decoded: Vec<Option<u64>> = decode_column(&mut reader, &sample_ids)
+                .unwrap()
+                .map(|(_, v)| v.map(f64::to_bits))
+                .collect();
+            let expected: Vec<Option<u64>> = column.iter().map(|v| v.map(f64::to_bits)).collect();
+            assert_eq!(decoded, expected);
+            assert!(reader.0.is_empty());
+        }
+    }
+
+    #[test]
+    fn corrupted_num_samples() {
+        let mut bytes = MAGIC.to_vec();
+        bytes.extend([VERSION, 0]);
+        // A huge number of samples without their IDs
+        encode_varint(u64::MAX >> 4, &mut bytes);
+        encode_varint(3, &mut bytes);
+        encode_varint(0, &mut bytes);
+        assert!(SampleSet::from_compact_bytes(&bytes).is_err());
+    }
+
+    #[test]
+    fn corrupted_header() {
+        let sample_set = SampleSet::default();
+        let bytes = sample_set.to_compact_bytes(Some(3)).unwrap();
+        assert_eq!(SampleSet::from_compact_bytes(&bytes).unwrap(), sample_set);
+
+        // The number of columns does not match the metadata
+        let mut wrong_columns = MAGIC.to_vec();
+        wrong_columns.extend([VERSION, 0]);
+        encode_varint(0, &mut wrong_columns);
+        encode_varint(4, &mut wrong_columns);
+        encode_varint(0, &mut wrong_columns);
+        assert!(SampleSet::from_compact_bytes(&wrong_columns).is_err());
+
+        // The payload decompressed beyond the bound of the header is rejected
+        let mut bomb = MAGIC.to_vec();
+        bomb.extend([VERSION, FLAG_ZSTD]);
+        encode_varint(0, &mut bomb);
+        encode_varint(3, &mut bomb);
+        encode_varint(0, &mut bomb);
+        bomb.extend(zstd::encode_all(vec![0_u8; 1 << 20].as_slice(), 3).unwrap());
+        let err = SampleSet::from_compact_bytes(&bomb).unwrap_err();
+        assert!(err.to_string().contains("exceeds"), "{err}");
+    }
+}
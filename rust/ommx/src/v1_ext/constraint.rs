@@ -48,15 +48,21 @@ impl SampledConstraint {
     }
 
     pub fn get(&self, sample_id: u64) -> Result<EvaluatedConstraint> {
-        Ok(EvaluatedConstraint {
+        let evaluated_value = self
+            .evaluated_values
+            .as_ref()
+            .context("evaluated_values of SampledConstraints is lacked")?
+            .get(sample_id)
+            .context("SampledConstraint lacks evaluated value")?;
+        Ok(self.with_evaluated_value(evaluated_value))
+    }
+
+    /// [`EvaluatedConstraint`] with the metadata of this constraint and the given evaluated value
+    pub fn with_evaluated_value(&self, evaluated_value: f64) -> EvaluatedConstraint {
+        EvaluatedConstraint {
             id: self.id,
             equality: self.equality,
-            evaluated_value: self
-                .evaluated_values
-                .as_ref()
-                .context("evaluated_values of SampledConstraints is lacked")?
-                .get(sample_id)
-                .context("SampledConstraint lacks evaluated value")?,
+            evaluated_value,
             used_decision_variable_ids: self.used_decision_variable_ids.clone(),
             name: self.name.clone(),
             subscripts: self.subscripts.clone(),
@@ -65,7 +71,7 @@ impl SampledConstraint {
             removed_reason: self.removed_reason.clone(),
             removed_reason_parameters: self.removed_reason_parameters.clone(),
             dual_variable: None,
-        })
+        }
     }
 }
 
@@ -5,7 +5,7 @@ use crate::{
         function::{self, Function as FunctionEnum},
         Function, Linear, Polynomial, Quadratic,
     },
-    Bound, Bounds,
+    Bound, Bounds, FunctionBuilder,
 };
 use anyhow::{Context, Result};
 use approx::AbsDiffEq;
@@ -14,6 +14,7 @@ use num::{
     Zero,
 };
 use std::{
+    borrow::Cow,
     collections::{BTreeSet, HashMap},
     fmt,
     iter::*,
@@ -171,19 +172,19 @@ impl Function {
         if replacements.is_empty() {
             return Ok(self.clone());
         }
-        let mut out = Function::zero();
+        let mut out = FunctionBuilder::new();
         for (ids, coefficient) in self {
-            let mut v = Function::from(coefficient);
-            for id in ids.iter() {
-                if let Some(replacement) = replacements.get(id) {
-                    v = v * replacement.clone();
-                } else {
-                    v = v * Linear::single_term(*id, 1.0);
-                }
-            }
-            out = out + v;
+            let factors: Vec<Cow<Function>> = ids
+                .iter()
+                .map(|id| match replacements.get(id) {
+                    Some(replacement) => Cow::Borrowed(replacement),
+                    None => Cow::Owned(Function::from(Linear::single_term(*id, 1.0))),
+                })
+                .collect();
+            let factors: Vec<&Function> = factors.iter().map(|f| f.as_ref()).collect();
+            out.add_product(coefficient, &factors);
         }
-        Ok(out)
+        Ok(out.build())
     }
 
     pub fn evaluate_bound(&self, bounds: &Bounds) -> Bound {
@@ -291,6 +292,20 @@ impl_sub_by_neg_add!(Function, Linear);
 impl_sub_by_neg_add!(Function, Quadratic);
 impl_sub_by_neg_add!(Function, Polynomial);
 
+/// In-place addition, which updates linear and quadratic functions in place
+impl AddAssign for Function {
+    fn add_assign(&mut self, rhs: Self) {
+        match (self.function.as_mut(), rhs.function) {
+            (Some(FunctionEnum::Constant(lhs)), Some(FunctionEnum::Constant(rhs))) => *lhs += rhs,
+            (Some(FunctionEnum::Linear(lhs)), Some(FunctionEnum::Constant(rhs))) => *lhs += rhs,
+            (Some(FunctionEnum::Linear(lhs)), Some(FunctionEnum::Linear(rhs))) => *lhs += rhs,
+            (Some(FunctionEnum::Quadratic(lhs)), Some(FunctionEnum::Constant(rhs))) => *lhs += rhs,
+            (Some(FunctionEnum::Quadratic(lhs)), Some(FunctionEnum::Linear(rhs))) => *lhs += rhs,
+            (_, function) => *self = std::mem::take(self) + Function { function },
+        }
+    }
+}
+
 impl Mul for Function {
     type Output = Self;
 
@@ -344,7 +359,11 @@ impl_mul_inverse!(Polynomial, Function);
 
 impl Sum for Function {
     fn sum<I: Iterator<Item = Self>>(iter: I) -> Self {
-        iter.fold(Function::from(0.0), |acc, x| acc + x)
+        let mut builder = FunctionBuilder::new();
+        for f in iter {
+            builder.add(&f);
+        }
+        builder.build()
     }
 }
 
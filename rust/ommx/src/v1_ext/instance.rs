@@ -1,15 +1,17 @@
 use crate::{
     sorted_ids::{BinaryIdPair, BinaryIds},
     v1::{
-        decision_variable::Kind, instance::Sense, DecisionVariable, Equality, Function, Instance,
-        Linear, Parameter, ParametricInstance, RemovedConstraint,
+        decision_variable::Kind, instance::Sense, Constraint, DecisionVariable, Equality, Function,
+        Instance, Linear, Parameter, ParametricInstance, RemovedConstraint,
     },
-    Bound, Bounds, ConstraintID, InfeasibleDetected, VariableID,
+    Bound, Bounds, CompiledInstance, ConstraintID, FunctionBuilder, InfeasibleDetected, VariableID,
 };
 use anyhow::{bail, ensure, Context, Result};
 use approx::AbsDiffEq;
+use itertools::Itertools;
 use maplit::hashmap;
 use num::Zero;
+use rayon::prelude::*;
 use std::{
     borrow::Cow,
     collections::{BTreeMap, BTreeSet, HashMap, HashSet},
@@ -48,6 +50,11 @@ impl Instance {
             .collect()
     }
 
+    /// Compile into [`CompiledInstance`] for repeated evaluation on dense arrays
+    pub fn compile(&self) -> Result<CompiledInstance> {
+        CompiledInstance::new(self)
+    }
+
     pub fn used_decision_variable_ids(&self) -> BTreeSet<u64> {
         let mut used_ids = self.objective().used_decision_variable_ids();
         for c in &self.constraints {
@@ -122,28 +129,41 @@ impl Instance {
 
     pub fn penalty_method(self) -> Result<ParametricInstance> {
         let id_base = self.defined_ids().last().map(|id| id + 1).unwrap_or(0);
-        let mut objective = self.objective().into_owned();
-        let mut parameters = Vec::new();
-        let mut removed_constraints = Vec::new();
-        for (i, c) in self.constraints.into_iter().enumerate() {
-            let parameter = Parameter {
+        let parameters: Vec<Parameter> = self
+            .constraints
+            .iter()
+            .enumerate()
+            .map(|(i, c)| Parameter {
                 id: id_base + i as u64,
                 name: Some("penalty_weight".to_string()),
                 subscripts: vec![c.id as i64],
                 ..Default::default()
-            };
-            let f = c.function().into_owned();
-            objective = objective + &parameter * f.clone() * f;
-            removed_constraints.push(RemovedConstraint {
+            })
+            .collect();
+        // Expand `p_i * f_i^2` for each constraint in parallel
+        let mut objective = self
+            .constraints
+            .par_iter()
+            .zip(&parameters)
+            .fold(FunctionBuilder::new, |mut builder, (c, parameter)| {
+                builder.add_square(&[parameter.id], &c.function());
+                builder
+            })
+            .reduce(FunctionBuilder::new, FunctionBuilder::merge);
+        objective.add(&self.objective());
+        let removed_constraints = self
+            .constraints
+            .into_iter()
+            .zip(&parameters)
+            .map(|(c, parameter)| RemovedConstraint {
                 constraint: Some(c),
                 removed_reason: "penalty_method".to_string(),
                 removed_reason_parameters: hashmap! { "parameter_id".to_string() => parameter.id.to_string() },
-            });
-            parameters.push(parameter);
-        }
+            })
+            .collect();
         Ok(ParametricInstance {
             description: self.description,
-            objective: Some(objective),
+            objective: Some(objective.build()),
             constraints: Vec::new(),
             decision_variables: self.decision_variables.clone(),
             sense: self.sense,
@@ -156,27 +176,36 @@ impl Instance {
 
     pub fn uniform_penalty_method(self) -> Result<ParametricInstance> {
         let id_base = self.defined_ids().last().map(|id| id + 1).unwrap_or(0);
-        let mut objective = self.objective().into_owned();
         let parameter = Parameter {
             id: id_base,
             name: Some("uniform_penalty_weight".to_string()),
             ..Default::default()
         };
-        let mut removed_constraints = Vec::new();
-        let mut quad_sum = Function::zero();
-        for c in self.constraints.into_iter() {
-            let f = c.function().into_owned();
-            quad_sum = quad_sum + f.clone() * f;
-            removed_constraints.push(RemovedConstraint {
+        // Expand `sum_i f_i^2` in parallel, and then multiply the parameter only once
+        let quad_sum = self
+            .constraints
+            .par_iter()
+            .fold(FunctionBuilder::new, |mut builder, c| {
+                builder.add_square(&[], &c.function());
+                builder
+            })
+            .reduce(FunctionBuilder::new, FunctionBuilder::merge)
+            .build();
+        let mut objective = FunctionBuilder::new();
+        objective.add(&self.objective());
+        objective.add_product(1.0, &[&Function::from(&parameter), &quad_sum]);
+        let removed_constraints = self
+            .constraints
+            .into_iter()
+            .map(|c| RemovedConstraint {
                 constraint: Some(c),
                 removed_reason: "uniform_penalty_method".to_string(),
                 removed_reason_parameters: Default::default(),
-            });
-        }
-        objective = objective + &parameter * quad_sum;
+            })
+            .collect();
         Ok(ParametricInstance {
             description: self.description,
-            objective: Some(objective),
+            objective: Some(objective.build()),
             constraints: Vec::new(),
             decision_variables: self.decision_variables.clone(),
             sense: self.sense,
@@ -226,6 +255,74 @@ impl Instance {
         Ok(())
     }
 
+    /// Add linear constraints `A x = b` or `A x <= b` where `A` is given as a sparse matrix in the CSR format.
+    ///
+    /// The column indices of `A` are regarded as decision variable IDs,
+    /// and the `i`-th row yields a constraint `A_i x - b_i = 0` or `A_i x - b_i <= 0` according to `equality`.
+    /// The constraints get new IDs sequentially after the largest ID of existing and removed constraints,
+    /// which are returned in the order of rows.
+    ///
+    /// Errors
+    /// ------
+    /// - The lengths of `indptr`, `indices`, `data` and `rhs` are inconsistent, or `indptr` is decreasing
+    /// - A column index is not a defined decision variable ID
+    ///
+    pub fn add_linear_constraints_csr(
+        &mut self,
+        indptr: &[u64],
+        indices: &[u64],
+        data: &[f64],
+        rhs: &[f64],
+        equality: Equality,
+    ) -> Result<Vec<u64>> {
+        ensure!(
+            indptr.len() == rhs.len() + 1,
+            "Length of indptr ({}) must be the number of rows ({}) plus one",
+            indptr.len(),
+            rhs.len()
+        );
+        ensure!(
+            indices.len() == data.len(),
+            "Length of indices ({}) and data ({}) mismatch",
+            indices.len(),
+            data.len()
+        );
+        ensure!(
+            indptr.first() == Some(&0) && indptr.last() == Some(&(indices.len() as u64)),
+            "indptr must start with 0 and end with the number of non-zero entries ({})",
+            indices.len()
+        );
+        ensure!(
+            indptr.windows(2).all(|w| w[0] <= w[1]),
+            "indptr must be non-decreasing"
+        );
+        let defined = self.defined_ids();
+        if let Some(id) = indices.iter().find(|&&id| !defined.contains(&id)) {
+            bail!("Undefined decision variable ID is used: {}", id);
+        }
+
+        let id_base = self
+            .constraint_ids()
+            .union(&self.removed_constraint_ids())
+            .last()
+            .map_or(0, |id| id + 1);
+        self.constraints.reserve(rhs.len());
+        let mut ids = Vec::with_capacity(rhs.len());
+        for (i, (range, b)) in indptr.windows(2).zip(rhs).enumerate() {
+            let (start, end) = (range[0] as usize, range[1] as usize);
+            let id = id_base + i as u64;
+            let linear = Linear::from_slices(&indices[start..end], &data[start..end], -b)?;
+            self.constraints.push(Constraint {
+                id,
+                equality: equality as i32,
+                function: Some(Function::from(linear)),
+                ..Default::default()
+            });
+            ids.push(id);
+        }
+        Ok(ids)
+    }
+
     /// Create PUBO (Polynomial Unconstrained Binary Optimization) dictionary from the instance.
     ///
     /// Before calling this method, you should check that this instance is suitable for PUBO:
@@ -265,12 +362,26 @@ impl Instance {
     /// Convert the instance into a minimization problem.
     ///
     /// This is based on the fact that maximization problem with negative objective function is equivalent to minimization problem.
-    pub fn as_minimization_problem(&mut self) {
+    /// Returns `true` if the instance is converted, `false` if it is already a minimization problem.
+    pub fn as_minimization_problem(&mut self) -> bool {
         if self.sense() == Sense::Minimize {
-            return;
+            return false;
         }
         self.sense = Sense::Minimize as i32;
         self.objective = Some(-self.objective().into_owned());
+        true
+    }
+
+    /// Convert the instance into a maximization problem.
+    ///
+    /// Returns `true` if the instance is converted, `false` if it is already a maximization problem.
+    pub fn as_maximization_problem(&mut self) -> bool {
+        if self.sense() == Sense::Maximize {
+            return false;
+        }
+        self.sense = Sense::Maximize as i32;
+        self.objective = Some(-self.objective().into_owned());
+        true
     }
 
     /// Create QUBO (Quadratic Unconstrained Binary Optimization) dictionary from the instance.
@@ -316,6 +427,57 @@ impl Instance {
         Ok((quad, constant))
     }
 
+    /// Create QUBO as an upper-triangular matrix `Q` in the coordinate (COO) format,
+    /// i.e. the objective is `x^T Q x + offset` for the binary vector `x` whose `i`-th element is the decision variable `ids[i]`.
+    ///
+    /// Returns `(ids, rows, columns, values, offset)`, where `ids` are the sorted IDs of the decision variables used in the objective,
+    /// and `rows[k] <= columns[k]` are indices of `ids` sorted in row-major order.
+    /// This has the same requirements as [`Instance::as_qubo_format`], but does not create a map of the terms.
+    #[allow(clippy::type_complexity)]
+    pub fn as_qubo_coo(&self) -> Result<(Vec<u64>, Vec<u64>, Vec<u64>, Vec<f64>, f64)> {
+        if self.sense() == Sense::Maximize {
+            bail!("QUBO format is only for minimization problems.");
+        }
+        if !self.constraints.is_empty() {
+            bail!("The instance still has constraints. Use penalty method or other way to translate into unconstrained problem first.");
+        }
+        let objective = self.objective();
+        let ids: Vec<u64> = objective.used_decision_variable_ids().into_iter().collect();
+        let binary_ids = self.binary_ids();
+        if !ids.iter().all(|id| binary_ids.contains(id)) {
+            bail!("The objective function uses non-binary decision variables.");
+        }
+        // `ids` is sorted and contains all the IDs in the objective
+        let index = |id: u64| ids.binary_search(&id).unwrap() as u64;
+
+        let mut offset = 0.0;
+        let mut entries = Vec::new();
+        for (term_ids, c) in objective.into_iter() {
+            if c.abs() <= f64::EPSILON {
+                continue;
+            }
+            if term_ids.is_empty() {
+                offset += c;
+            } else {
+                let BinaryIdPair(row, column) = BinaryIdPair::try_from(term_ids)?;
+                entries.push((index(row), index(column), c));
+            }
+        }
+        entries.sort_unstable_by_key(|(row, column, _)| (*row, *column));
+        entries.dedup_by(
+            |(row, column, value), (prev_row, prev_column, prev_value)| {
+                let same = row == prev_row && column == prev_column;
+                if same {
+                    *prev_value += *value;
+                }
+                same
+            },
+        );
+        entries.retain(|(_, _, value)| value.abs() >= f64::EPSILON);
+        let (rows, columns, values) = entries.into_iter().multiunzip();
+        Ok((ids, rows, columns, values, offset))
+    }
+
     /// Encode an integer decision variable into binary decision variables.
     ///
     /// Note that this method does not substitute the yielded binary representation into the objective and constraints.
@@ -784,6 +946,22 @@ mod tests {
             }
         }
 
+        #[test]
+        fn test_qubo_coo(instance in Instance::arbitrary_with(InstanceParameters::default_qubo())) {
+            if instance.sense() == Sense::Maximize {
+                return Ok(());
+            }
+            let (quad, constant) = instance.as_qubo_format().unwrap();
+            let (ids, rows, columns, values, offset) = instance.as_qubo_coo().unwrap();
+            prop_assert!(ids.windows(2).all(|w| w[0] < w[1]));
+            prop_assert_eq!(offset, constant);
+            prop_assert_eq!(values.len(), quad.len());
+            for (((row, column), value), (pair, c)) in rows.iter().zip(&columns).zip(&values).zip(&quad) {
+                prop_assert_eq!((ids[*row as usize], ids[*column as usize]), (pair.0, pair.1));
+                prop_assert!(value.abs_diff_eq(c, 1e-10));
+            }
+        }
+
         #[test]
         fn log_encode((lower, upper) in (-10.0_f64..10.0, -10.0_f64..10.0)
             .prop_filter("At least one integer", |(lower, upper)| lower.ceil() <= upper.floor())
@@ -842,4 +1020,53 @@ mod tests {
             }
         }
     }
+
+    #[test]
+    fn add_linear_constraints_csr() {
+        let mut instance = Instance::default();
+        for id in 0..3 {
+            instance.decision_variables.push(DecisionVariable {
+                id,
+                kind: Kind::Continuous as i32,
+                ..Default::default()
+            });
+        }
+        instance.constraints.push(Constraint {
+            id: 5,
+            function: Some(Function::from(Linear::single_term(0, 1.0))),
+            ..Default::default()
+        });
+
+        // [[1, 0, 2], [0, 0, 0], [0, 3, 1]] x <= [1, 2, 3], with unsorted indices in the last row
+        let ids = instance
+            .add_linear_constraints_csr(
+                &[0, 2, 2, 4],
+                &[0, 2, 2, 1],
+                &[1.0, 2.0, 1.0, 3.0],
+                &[1.0, 2.0, 3.0],
+                Equality::LessThanOrEqualToZero,
+            )
+            .unwrap();
+        assert_eq!(ids, vec![6, 7, 8]);
+        instance.validate().unwrap();
+
+        let expected = [
+            Linear::new([(0, 1.0), (2, 2.0)].into_iter(), -1.0),
+            Linear::from(-2.0),
+            Linear::new([(1, 3.0), (2, 1.0)].into_iter(), -3.0),
+        ];
+        for (c, linear) in instance.constraints[1..].iter().zip(expected) {
+            assert_eq!(c.equality(), Equality::LessThanOrEqualToZero);
+            assert_eq!(c.function().into_owned(), Function::from(linear));
+        }
+
+        // Undefined decision variable ID
+        assert!(instance
+            .add_linear_constraints_csr(&[0, 1], &[3], &[1.0], &[0.0], Equality::EqualToZero)
+            .is_err());
+        // Inconsistent lengths
+        assert!(instance
+            .add_linear_constraints_csr(&[0, 1], &[0], &[1.0], &[0.0, 1.0], Equality::EqualToZero)
+            .is_err());
+    }
 }